@@ -1,955 +1,1911 @@
-import argparse
-import os
-import re
-import ijson
-from datetime import datetime, timedelta
-from dateutil.parser import parse as parse_date
-from collections import defaultdict
-import math
-import csv
-
-try:
-    from tqdm import tqdm
-    tqdm_available = True
-except ImportError:
-    tqdm_available = False
-    print("Consider installing tqdm for progress bar: 'pip install tqdm'")
-
-#import time
-#import sys
-
-## for debugging only
-import pprint
-
-# Global variable(s)
-cc_snapshot_seconds = 1 # the size of concurrency snapshots in seconds
-
-
-
-def ingest_file(file_path):
-    print("Reading data file...", end="", flush=True)
-    scans = []
-    tmp_field_names = []
-    with open(file_path, 'rb') as file:
-        # Extract field names from the @odata.context string
-        context = ijson.items(file, '@odata.context')
-        context_str = next(context)
-        pattern = r"#Scans\((.*?)\)"
-        match = re.search(pattern, context_str)
-        if match:
-            fields_str = match.group(1)
-            tmp_field_names = [field.strip() for field in fields_str.split(',')]
-            # Adjust the field names here, using tmp_field_names
-            field_names = [field.replace('(LanguageName', '') if 'ScannedLanguages' in field else field for field in tmp_field_names]
-
-        # Reset file pointer and extract scan items
-        file.seek(0)
-        for scan in ijson.items(file, 'value.item'):
-            scans.append(scan)
-
-    print("completed!")
-    return field_names, scans
-
-
-def calculate_time_difference(t1, t2):
-    dt1 = parse_date(t1)
-    dt2 = parse_date(t2)
-    time_diff = (dt2 - dt1).total_seconds()
-    
-    return time_diff
-
-
-
-# Process the scan data.
-# One single function will be more efficient but start to get messy. Brace youreself.
-def process_scans(scans, full_csv):
-
-    # define (most) variables and data structures
-
-    # date range of data
-    first_date = datetime.max.date()
-    last_date = datetime.min.date()
-
-    # general scan stats
-    sum_scan_count = yes_scan_count = no_scan_count = 0
-    scan_stats_by_date = {}
-    scanned_projects = {}
-
-    # results info
-    results = {
-        "total_vulns__sum": 0, "high__sum": 0, "medium__sum": 0, "low__sum": 0, "info__sum": 0, 
-        "total_vulns__max": 0, "high__max": 0, "medium__max": 0, "low__max": 0, "info__max": 0, 
-        "total_vulns__avg": 0, "high__avg": 0, "medium__avg": 0, "low__avg": 0, "info__avg": 0,
-        "high_results__scan_count": 0, "medium_results__scan_count": 0, "low_results__scan_count": 0, "info_results__scan_count": 0, "zero_results__scan_count": 0}
-
-    # presets
-    preset_names = {}
-    
-    # languages
-    scanned_languages = {}
-
-    # scan origins
-    origins = {}
-    printable_origins = {
-        "ADO": "ADO",
-        "Bamboo": "Bamboo",
-        "CLI": "CLI",
-        "cx-CLI": "cx-CLI",
-        "CxFlow": "CxFlow",
-        "Eclipse": "Eclipse",
-        "cx-intellij": "IntelliJ",
-        "Jenkins": "Jenkins",
-        "Manual": "Manual",
-        "Maven": "Maven",
-        "Other": "Other",
-        "System": "Scheduled",
-        "TeamCity": "TeamCity",
-        "TFS": "TFS",
-        "Visual Studio": "Visual Studio",
-        "Visual-Studio-Code": "Visual Studio Code",
-        "VSTS": "VSTS",
-        "Web Portal": "Web Portal",
-        "MISSING ORIGIN TYPE": "Missing Origin Type"
-    }
-    grouped_origins = {value: 0 for value in printable_origins.values()}
-
-    # bins to track scan info based on LOC range (count and various time data)
-    size_bins = {
-        '0 to 20k': {"yes_scan_count": 0, "no_scan_count": 0, "total_scan_time__sum": 0, "source_pulling_time__sum": 0, "queue_time__sum": 0,
-        "engine_scan_time__sum": 0, "total_scan_time__max": 0, "source_pulling_time__max": 0, "queue_time__max": 0, "engine_scan_time__max": 0,
-        "total_scan_time__avg": 0, "source_pulling_time__avg": 0, "queue_time__avg": 0, "engine_scan_time__avg": 0},
-        '20k-50k': {"yes_scan_count": 0, "no_scan_count": 0, "total_scan_time__sum": 0, "source_pulling_time__sum": 0, "queue_time__sum": 0,
-        "engine_scan_time__sum": 0, "total_scan_time__max": 0, "source_pulling_time__max": 0, "queue_time__max": 0, "engine_scan_time__max": 0,
-        "total_scan_time__avg": 0, "source_pulling_time__avg": 0, "queue_time__avg": 0, "engine_scan_time__avg": 0},
-        '50k-100k': {"yes_scan_count": 0, "no_scan_count": 0, "total_scan_time__sum": 0, "source_pulling_time__sum": 0, "queue_time__sum": 0,
-        "engine_scan_time__sum": 0, "total_scan_time__max": 0, "source_pulling_time__max": 0, "queue_time__max": 0, "engine_scan_time__max": 0,
-        "total_scan_time__avg": 0, "source_pulling_time__avg": 0, "queue_time__avg": 0, "engine_scan_time__avg": 0},
-        '100k-250k': {"yes_scan_count": 0, "no_scan_count": 0, "total_scan_time__sum": 0, "source_pulling_time__sum": 0, "queue_time__sum": 0,
-        "engine_scan_time__sum": 0, "total_scan_time__max": 0, "source_pulling_time__max": 0, "queue_time__max": 0, "engine_scan_time__max": 0,
-        "total_scan_time__avg": 0, "source_pulling_time__avg": 0, "queue_time__avg": 0, "engine_scan_time__avg": 0},
-        '250k-500k': {"yes_scan_count": 0, "no_scan_count": 0, "total_scan_time__sum": 0, "source_pulling_time__sum": 0, "queue_time__sum": 0,
-        "engine_scan_time__sum": 0, "total_scan_time__max": 0, "source_pulling_time__max": 0, "queue_time__max": 0, "engine_scan_time__max": 0,
-        "total_scan_time__avg": 0, "source_pulling_time__avg": 0, "queue_time__avg": 0, "engine_scan_time__avg": 0},
-        '500k-1M': {"yes_scan_count": 0, "no_scan_count": 0, "total_scan_time__sum": 0, "source_pulling_time__sum": 0, "queue_time__sum": 0,
-        "engine_scan_time__sum": 0, "total_scan_time__max": 0, "source_pulling_time__max": 0, "queue_time__max": 0, "engine_scan_time__max": 0,
-        "total_scan_time__avg": 0, "source_pulling_time__avg": 0, "queue_time__avg": 0, "engine_scan_time__avg": 0},
-        '1M-2M': {"yes_scan_count": 0, "no_scan_count": 0, "total_scan_time__sum": 0, "source_pulling_time__sum": 0, "queue_time__sum": 0,
-        "engine_scan_time__sum": 0, "total_scan_time__max": 0, "source_pulling_time__max": 0, "queue_time__max": 0, "engine_scan_time__max": 0,
-        "total_scan_time__avg": 0, "source_pulling_time__avg": 0, "queue_time__avg": 0, "engine_scan_time__avg": 0},
-        '2M-3M': {"yes_scan_count": 0, "no_scan_count": 0, "total_scan_time__sum": 0, "source_pulling_time__sum": 0, "queue_time__sum": 0,
-        "engine_scan_time__sum": 0, "total_scan_time__max": 0, "source_pulling_time__max": 0, "queue_time__max": 0, "engine_scan_time__max": 0,
-        "total_scan_time__avg": 0, "source_pulling_time__avg": 0, "queue_time__avg": 0, "engine_scan_time__avg": 0},
-        '3M-5M': {"yes_scan_count": 0, "no_scan_count": 0, "total_scan_time__sum": 0, "source_pulling_time__sum": 0, "queue_time__sum": 0,
-        "engine_scan_time__sum": 0, "total_scan_time__max": 0, "source_pulling_time__max": 0, "queue_time__max": 0, "engine_scan_time__max": 0,
-        "total_scan_time__avg": 0, "source_pulling_time__avg": 0, "queue_time__avg": 0, "engine_scan_time__avg": 0},
-        '5M-7M': {"yes_scan_count": 0, "no_scan_count": 0, "total_scan_time__sum": 0, "source_pulling_time__sum": 0, "queue_time__sum": 0,
-        "engine_scan_time__sum": 0, "total_scan_time__max": 0, "source_pulling_time__max": 0, "queue_time__max": 0, "engine_scan_time__max": 0,
-        "total_scan_time__avg": 0, "source_pulling_time__avg": 0, "queue_time__avg": 0, "engine_scan_time__avg": 0},
-        '7M-10M': {"yes_scan_count": 0, "no_scan_count": 0, "total_scan_time__sum": 0, "source_pulling_time__sum": 0, "queue_time__sum": 0,
-        "engine_scan_time__sum": 0, "total_scan_time__max": 0, "source_pulling_time__max": 0, "queue_time__max": 0, "engine_scan_time__max": 0,
-        "total_scan_time__avg": 0, "source_pulling_time__avg": 0, "queue_time__avg": 0, "engine_scan_time__avg": 0},
-        '10M+':  {"yes_scan_count": 0, "no_scan_count": 0, "total_scan_time__sum": 0, "source_pulling_time__sum": 0, "queue_time__sum": 0,
-        "engine_scan_time__sum": 0, "total_scan_time__max": 0, "source_pulling_time__max": 0, "queue_time__max": 0, "engine_scan_time__max": 0,
-        "total_scan_time__avg": 0, "source_pulling_time__avg": 0, "queue_time__avg": 0, "engine_scan_time__avg": 0}
-    }
-
-    # Variables for concurrency
-    # Event format: (timestamp, change_in_count, event_type)
-    # Snapshot format: (timestamp, active_engines, queue_length)
-    # change_in_count is +1 for starts (entering queue or starting engine) and -1 for ends (leaving queue or engine finishing)
-    # event_type distinguishes between 'queue' and 'engine'
-    cc_events = filtered_cc_events = snapshot_metrics = []
-    
-    # Prepare to output CSV of all scan data and create output file, if required
-    if full_csv['enabled']:
-        try:
-            filename = os.path.join(full_csv['csv_dir'], f"00-full_scan_data.csv")
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(full_csv['field_names'])
-        except IOError as e:
-            print(f"IOError when writing to file: {e}")
-        except Exception as e:
-            print(f"Unexpected error when creating/writing to the CSV file: {e}")
-
-    # Initialize tqdm object; we exclude concurrency processing because it's so fast, even for massive data sets
-    if tqdm_available:
-        pbar = tqdm(total=len(scans), desc="Processing scans")
-    else:
-        print("Processing scans...", end="", flush=True)
-
-    # process all the things
-    for scan in scans:
-        if tqdm_available:
-            pbar.update(1)
-            pbar.refresh()
-        
-        # If required, we want to output to the full scan CSV first so as to include scans with missing fields (such as loc). This will cause a potential
-        # mismatch between record counts but shouldn't impact anything relating to metrics or analysis. This CSV is only used for manual analysis.
-        if full_csv['enabled']:
-            try:
-                filename = os.path.join(full_csv['csv_dir'], f"00-full_scan_data.csv")
-                with open(filename, mode='a', newline='', encoding='utf-8') as file:
-                    writer = csv.writer(file)
-                    # Build a row by extracting each field from the scan in the order of field_names
-                    row = []
-                    for field in full_csv['field_names']:
-                        if field == 'ScannedLanguages':
-                            # Special handling for ScannedLanguages field to convert list of dicts to comma-separated string
-                            languages = scan.get(field, [])
-                            language_str = ', '.join(lang['LanguageName'] for lang in languages)
-                            row.append(language_str)
-                        else:
-                            # For all other fields, use the value as-is
-                            row.append(scan.get(field, ""))
-                    # Write the constructed row to the CSV file
-                    writer.writerow(row)
-            except IOError as e:
-                print(f"IOError when writing to file: {e}")
-            except Exception as e:
-                print(f"Unexpected error when creating/writing to the CSV file: {e}")
-
-        # If there is no LOC value, we might as well just completely skip the scan.
-        # This differs from the current process but ensures that scan counts actually match in various metrics. Also, other fields are typically also missing.
-        loc = scan.get('LOC', None)
-        if loc is None:
-            continue
-
-        # update the date range
-        scan_date_str = scan.get('ScanRequestedOn', '').split('T')[0]
-        scan_date = datetime.strptime(scan_date_str, "%Y-%m-%d").date()
-        first_date = min(first_date, scan_date)
-        last_date = max(last_date, scan_date)
-
-        # determine the correct bin key
-        if loc <= 20000:
-            bin_key = '0 to 20k'
-        elif loc <= 50000:
-            bin_key = '20k-50k'
-        elif loc <= 100000:
-            bin_key = '50k-100k'
-        elif loc <= 250000:
-            bin_key = '100k-250k'
-        elif loc <= 500000:
-            bin_key = '250k-500k'
-        elif loc <= 1000000:
-            bin_key = '500k-1M'
-        elif loc <= 2000000:
-            bin_key = '1M-2M'
-        elif loc <= 3000000:
-            bin_key = '2M-3M'
-        elif loc <= 5000000:
-            bin_key = '3M-5M'
-        elif loc <= 7000000:
-            bin_key = '5M-7M'
-        elif loc <= 10000000:
-            bin_key = '7M-10M'
-        else:
-            bin_key = '10M+'
-
-        # general stats + bin metrics; only update engine time if there was actually a scan
-        if scan_date not in scan_stats_by_date:
-            scan_stats_by_date[scan_date] = {
-                'total_scan_count': 0,
-                'yes_scan_count': 0,
-                'no_scan_count': 0,
-                'full_scan_count': 0,
-                'incremental_scan_count': 0,
-                'loc__sum': 0,
-                'loc__max': 0,
-                'failed_loc__sum': 0,
-                'failed_loc__max': 0
-            }
-
-        scan_stats_by_date[scan_date]['total_scan_count'] += 1
-        scan_stats_by_date[scan_date]['loc__sum'] += loc
-        scan_stats_by_date[scan_date]['loc__max'] = max(loc, scan_stats_by_date[scan_date]['loc__max'])
-        scan_stats_by_date[scan_date]['failed_loc__sum'] += scan.get('FailedLOC', 0)
-        scan_stats_by_date[scan_date]['failed_loc__max'] = max(scan.get('FailedLOC', 0), scan_stats_by_date[scan_date]['failed_loc__max'])
-        
-        if scan.get('IsIncremental', None):
-            scan_stats_by_date[scan_date]['incremental_scan_count'] += 1
-        else:
-            scan_stats_by_date[scan_date]['full_scan_count'] += 1
-        
-        # sometimes one of these fields is empty
-        project_id = scan.get('ProjectId', 0)
-        project_name = scan.get('ProjectName', "")
-        pid = str(project_id) + "_" + project_name
-
-        if pid not in scanned_projects:
-            scanned_projects[pid] = {
-                'id': project_id,
-                'project_name': project_name,
-                'project_scan_count': 0,
-                'total_vulns_count': 0,
-                'high_count': 0,
-                'medium_count': 0,
-                'low_count': 0,
-                'info_count': 0,
-            }
-
-        scanned_projects[pid]['project_scan_count'] += 1
-        scanned_projects[pid]['total_vulns_count'] = scan.get('TotalVulnerabilities', 0)
-        scanned_projects[pid]['high_count'] = scan.get('High', 0)
-        scanned_projects[pid]['medium_count'] = scan.get('Medium', 0)
-        scanned_projects[pid]['low_count'] = scan.get('Low', 0)
-        scanned_projects[pid]['info_count'] = scan.get('Info', 0)
-
-        source_pulling_time = math.ceil(calculate_time_difference(scan.get('ScanRequestedOn'),scan.get('QueuedOn')))
-        queue_time = math.ceil(calculate_time_difference(scan.get('QueuedOn'),scan.get('EngineStartedOn')))
-        total_scan_time = math.ceil(calculate_time_difference(scan.get('ScanRequestedOn'),scan.get('ScanCompletedOn')))
-
-        bin = size_bins[bin_key]
-
-        bin['source_pulling_time__sum'] += source_pulling_time
-        bin['queue_time__sum'] += queue_time
-        bin['total_scan_time__sum'] += total_scan_time
-        bin['source_pulling_time__max'] = max(source_pulling_time, bin['source_pulling_time__max'])
-        bin['queue_time__max'] = max(queue_time, bin['queue_time__max'])
-        bin['total_scan_time__max'] = max(total_scan_time, bin['total_scan_time__max'])
-
-        if scan.get('EngineFinishedOn', None) is not None:
-            engine_scan_time = math.ceil(calculate_time_difference(scan.get('EngineStartedOn'),scan.get('EngineFinishedOn')))
-            yes_scan_count += 1
-            scan_stats_by_date[scan_date]['yes_scan_count'] += 1
-            bin['yes_scan_count'] += 1
-            bin['engine_scan_time__sum'] += engine_scan_time
-            bin['engine_scan_time__max'] = max(engine_scan_time, bin['engine_scan_time__max'])
-        else:
-            no_scan_count +=1
-            scan_stats_by_date[scan_date]['no_scan_count'] += 1
-            bin['no_scan_count'] += 1
-
-        # results info
-        results['total_vulns__sum'] += scan.get('TotalVulnerabilities', 0)
-        results['high__sum'] += scan.get('High', 0)
-        results['medium__sum'] += scan.get('Medium', 0)
-        results['low__sum'] += scan.get('Low', 0)
-        results['info__sum'] += scan.get('Info', 0)
-        results['total_vulns__max'] = max(results['total_vulns__max'], scan.get('TotalVulnerabilities', 0))
-        results['high__max'] = max(results['high__max'], scan.get('High', 0))
-        results['medium__max'] = max(results['medium__max'], scan.get('Medium', 0))
-        results['low__max'] = max(results['low__max'], scan.get('Low', 0))
-        results['info__max'] = max(results['info__max'], scan.get('Info', 0))
-        if scan.get('High', 0) > 0:
-            results['high_results__scan_count'] += 1
-        if scan.get('Medium', 0) > 0:
-            results['medium_results__scan_count'] += 1
-        if scan.get('Low', 0) > 0:
-            results['low_results__scan_count'] += 1
-        if scan.get('Info', 0) > 0:
-            results['info_results__scan_count'] += 1
-        if scan.get('TotalVulnerabilities', 0) == 0:
-            results['zero_results__scan_count'] += 1
-        
-        # presets
-        preset_name = scan.get('PresetName')
-        preset_names[preset_name] = preset_names.get(preset_name, 0) + 1
-        
-        # languages
-        for language in scan.get('ScannedLanguages', []):
-            lang_name = language.get('LanguageName')
-            if lang_name and lang_name != "Common":
-                scanned_languages[lang_name] = scanned_languages.get(lang_name, 0) + 1
-
-        # scan origins
-        origin = scan.get('Origin', 'Unknown')
-        origins[origin] = origins.get(origin, 0) + 1
-
-        # parse timestamps for concurrency queueing and engine events
-        queued_on = parse_date(scan['QueuedOn']).timestamp()
-        engine_started_on = parse_date(scan['EngineStartedOn']).timestamp()
-        engine_finished_on = None
-        optimal_scan_finish = None
-
-        cc_events.append((queued_on, +1, 'queue'))
-        cc_events.append((engine_started_on, -1, 'queue'))
-
-        if 'EngineFinishedOn' in scan and scan['EngineFinishedOn'] is not None:
-            engine_finished_on = parse_date(scan['EngineFinishedOn']).timestamp()
-            engine_scan_duration = engine_finished_on - engine_started_on
-            optimal_scan_finish = queued_on + engine_scan_duration  # Calculate based on no queue delay assumption
-            cc_events.append((engine_started_on, +1, 'engine'))
-            cc_events.append((optimal_scan_finish, -1, 'engine'))
-
-    # calculate totals and averages
-    total_scan_count = yes_scan_count + no_scan_count
-    for bin_key, bin in size_bins.items():
-        if (bin['yes_scan_count'] + bin['no_scan_count']) > 0:
-            bin['source_pulling_time__avg'] = math.ceil(bin['source_pulling_time__sum'] / (bin['yes_scan_count'] + bin['no_scan_count']))
-            bin['queue_time__avg'] = math.ceil(bin['queue_time__sum'] / (bin['yes_scan_count'] + bin['no_scan_count']))
-            bin['total_scan_time__avg'] = math.ceil(bin['total_scan_time__sum'] / (bin['yes_scan_count'] + bin['no_scan_count']))
-        if bin['yes_scan_count'] > 0:
-            bin['engine_scan_time__avg'] = math.ceil(bin['engine_scan_time__sum'] / bin['yes_scan_count'])
-            bin['total_scan_time__avg'] = math.ceil(bin['total_scan_time__sum'] / bin['yes_scan_count'])
-    results['total_vulns__avg'] = math.ceil(results['total_vulns__sum'] / total_scan_count)
-    results['high__avg'] = round(results['high__sum'] / total_scan_count)
-    results['medium__avg'] = round(results['medium__sum'] / total_scan_count)
-    results['low__avg'] = round(results['low__sum'] / total_scan_count)
-    results['info__avg']= round(results['info__sum'] / total_scan_count)
-
-    # group origins
-    for origin, count in origins.items():
-        # Determine the group for each origin
-        group = next((printable_origins[key] for key in printable_origins if origin.startswith(key)), 'Other')
-        # Update the grouped origins count
-        grouped_origins[group] += count
-    grouped_origins_2 = {origin: count for origin, count in grouped_origins.items() if count > 0}
-
-    # Process concurrency events
-
-    # Initialize variables
-    cc_window_start_ts = datetime.combine(first_date, datetime.min.time()).timestamp()
-    cc_window_end_ts = datetime.combine(last_date, datetime.min.time()).timestamp()
-    num_snapshots = math.ceil((cc_window_end_ts - cc_window_start_ts) / cc_snapshot_seconds)
-
-    # Filter out objects based on the window and sort them
-    filtered_cc_events = [event for event in cc_events if cc_window_start_ts <= event[0] <= cc_window_end_ts]
-    filtered_cc_events.sort(key=lambda x: x[0])
-
-    current_active_engines = 0
-    current_queue_length = 0
-    event_index = 0
-    snapshot_metrics = []
-    
-    # For each snapshot...
-    for snapshot in range(num_snapshots):
-        # Calculate the bounds of the snapshot in timestamp format
-        snapshot_start_ts = cc_window_start_ts + snapshot * cc_snapshot_seconds
-        next_snapshot_start_ts = snapshot_start_ts + cc_snapshot_seconds
-        
-        while event_index < len(filtered_cc_events) and filtered_cc_events[event_index][0] < next_snapshot_start_ts:
-            event_time, change, event_type = filtered_cc_events[event_index]
-            
-            if event_type == 'engine':
-                current_active_engines += change
-            elif event_type == 'queue':
-                current_queue_length += change
-            
-            event_index += 1
-        
-        # Convert snapshot_start_ts to datetime for recording
-        snapshot_start_dt = datetime.fromtimestamp(snapshot_start_ts)
-
-        # Append the metrics for the current snapshot to the list
-        snapshot_metrics.append((snapshot_start_dt, current_active_engines, current_queue_length))
-
-    if tqdm_available:
-        pbar.close()
-    else:
-            print("completed!")
-
-    return {
-        'first_date': first_date,
-        'last_date': last_date,
-        'scan_stats_by_date': scan_stats_by_date,
-        'scanned_projects': scanned_projects,
-        'size_bins': size_bins,
-        'results': results,
-        'preset_names': preset_names,
-        'scanned_languages': scanned_languages,
-        'origins': grouped_origins_2,
-        'cc_metrics': snapshot_metrics
-    }
-
-
-
-def format_seconds_to_hms(seconds):
-    hours = seconds // 3600
-    minutes = (seconds % 3600) // 60
-    seconds = seconds % 60
-    return f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}"
-
-
-# Output to the screen as well as create very specific CSVs.
-# One single function for simplification / variable reuse (but a bit messy, as well).
-def output_analysis(data, csv_config):
-
-    total_scan_count = yes_scan_count = no_scan_count = full_scan_count = incremental_scan_count = date_max_scan_count = 0
-    scan_loc__sum = scan_loc__max = scan_failed_loc__sum = scan_failed_loc__max = date_loc__max = 0
-    total_scan_time__sum = source_pulling_time__sum = queue_time__sum = engine_scan_time__sum = 0
-    total_scan_time__max = source_pulling_time__max = queue_time__max = engine_scan_time__max = 0
-    total_scan_time__avg = source_pulling_time__avg = queue_time__avg = engine_scan_time__avg = 0
-    
-    day_of_week_scan_totals = {
-        'Monday': 0,
-        'Tuesday': 0,
-        'Wednesday': 0,
-        'Thursday': 0,
-        'Friday': 0,
-        'Saturday': 0,
-        'Sunday': 0,
-        'Weekday': 0,
-        'Weekend': 0
-    }
-
-    daily_scan_counts = {}
-    weekly_scan_counts = {}
-
-
-    # unpack scan stats and crunch a few more numbers
-    for scan_date, stats in data['scan_stats_by_date'].items():
-        full_scan_count += stats['full_scan_count']
-        incremental_scan_count += stats['incremental_scan_count']
-        yes_scan_count += stats['yes_scan_count']
-        no_scan_count += stats['no_scan_count']
-        scan_loc__sum += stats['loc__sum']
-        scan_loc__max = max(scan_loc__max, stats['loc__max'])
-        scan_failed_loc__sum += stats['failed_loc__sum']
-        scan_failed_loc__max = max(scan_failed_loc__max, stats['failed_loc__max'])
-        daily_scan_counts[scan_date] = stats['total_scan_count']
-        
-        # Calculate the Monday of the current week
-        monday_of_week = scan_date - timedelta(days=scan_date.weekday())
-        
-        # Add the count for the current week
-        if monday_of_week not in weekly_scan_counts:
-            weekly_scan_counts[monday_of_week] = stats['total_scan_count']
-        else:
-            weekly_scan_counts[monday_of_week] += stats['total_scan_count']
-        
-        date_loc__max = max(date_loc__max, stats['loc__sum'])
-        
-        if(stats['total_scan_count'] > date_max_scan_count):
-            date_max_scan_count = stats['total_scan_count']
-            date_max_scan_date = scan_date
-       
-        day_name = scan_date.strftime('%A')
-        day_index = scan_date.weekday()
-        day_of_week_scan_totals[day_name] += stats['total_scan_count']
-
-        if day_index >= 5:  # Saturday or Sunday
-            day_of_week_scan_totals['Weekend'] += stats['total_scan_count']
-        else:
-            day_of_week_scan_totals['Weekday'] += stats['total_scan_count']
-
-    total_scan_count = yes_scan_count + no_scan_count
-    high_results__scan_count = data['results']['high_results__scan_count']
-    medium_results__scan_count = data['results']['medium_results__scan_count']
-    low_results__scan_count = data['results']['low_results__scan_count']
-    info_results__scan_count = data['results']['info_results__scan_count']
-    zero_results__scan_count = data['results']['zero_results__scan_count']
-    total_days = (data['last_date'] - data['first_date']).days
-    total_weeks = math.ceil(total_days / 7)
-    total_scan_days = len(data['scan_stats_by_date'])
-            
-    # Iterate through the size_bins dictionary to calculate avg and max durations (overall)
-    for bin_key, bin_values in data['size_bins'].items():
-        total_scan_time__sum += bin_values['total_scan_time__sum']
-        total_scan_time__max = max(total_scan_time__max, bin_values['total_scan_time__max'])
-        source_pulling_time__sum += bin_values['source_pulling_time__sum']
-        source_pulling_time__max = max(source_pulling_time__max, bin_values['source_pulling_time__max'])
-        queue_time__sum += bin_values['queue_time__sum']
-        queue_time__max = max(queue_time__max, bin_values['queue_time__max'])
-        engine_scan_time__sum += bin_values['engine_scan_time__sum']
-        engine_scan_time__max = max(engine_scan_time__max, bin_values['engine_scan_time__max'])
-    total_scan_time__avg = total_scan_time__sum / yes_scan_count
-    source_pulling_time__avg = source_pulling_time__sum / yes_scan_count
-    queue_time__avg = queue_time__sum / yes_scan_count
-    engine_scan_time__avg = engine_scan_time__sum / yes_scan_count
-    
-    # Identify daily max concurrency values based on the granular calculations made previously
-    daily_maxima = defaultdict(lambda: {'actual': 0, 'optimal': 0})
-    overall_max_actual = 0
-    overall_max_optimal = 0
-    overall_max_actual_dates = set()
-    overall_max_optimal_dates = set()
-
-    for snapshot in data['cc_metrics']:
-        snapshot_dt, active_engines, queue_length = snapshot
-        snapshot_date = snapshot_dt.date()
-        optimal_concurrency = active_engines + queue_length
-
-        # Update daily maximums
-        daily_record = daily_maxima[snapshot_date]
-        daily_record['actual'] = max(daily_record['actual'], active_engines)
-        daily_record['optimal'] = max(daily_record['optimal'], optimal_concurrency)
-
-        # Update overall maximums and their dates
-        if daily_record['actual'] > overall_max_actual:
-            overall_max_actual = daily_record['actual']
-            overall_max_actual_dates = {snapshot_date}
-        elif daily_record['actual'] == overall_max_actual:
-            overall_max_actual_dates.add(snapshot_date)
-
-        if daily_record['optimal'] > overall_max_optimal:
-            overall_max_optimal = daily_record['optimal']
-            overall_max_optimal_dates = {snapshot_date}
-        elif daily_record['optimal'] == overall_max_optimal:
-            overall_max_optimal_dates.add(snapshot_date)
-
-    # Print Summary of Scans
-    print(f"\nSummary of Scans ({data['first_date']} to {data['last_date']})")
-    print("-" * 50)
-    print(f"Total number of scans: {format(total_scan_count, ',')}")
-    print(f"- Full Scans: {format(full_scan_count, ',')} ({(full_scan_count / total_scan_count) * 100:.1f}%)")
-    print(f"- Incremental Scans: {format(incremental_scan_count, ',')} ({(incremental_scan_count / total_scan_count) * 100:.1f}%)")
-    print(f"- No Code Change Scans: {format(no_scan_count, ',')} ({(no_scan_count / total_scan_count) * 100:.1f}%)")
-    print(f"- Scans with High Results: {format(high_results__scan_count, ',')} ({(high_results__scan_count / total_scan_count) * 100:.1f}%)")
-    print(f"- Scans with Medium Results: {format(medium_results__scan_count, ',')} ({(medium_results__scan_count / total_scan_count) * 100:.1f}%)")
-    print(f"- Scans with Low Results: {format(low_results__scan_count, ',')} ({(low_results__scan_count / total_scan_count) * 100:.1f}%)")
-    print(f"- Scans with Informational Results: {format(info_results__scan_count, ',')} ({(info_results__scan_count / total_scan_count) * 100:.1f}%)")
-    print(f"- Scans with Zero Results: {format(zero_results__scan_count, ',')} ({(zero_results__scan_count / total_scan_count) * 100:.1f}%)")
-    print(f"- Unique Projects Scanned: {format(len(data['scanned_projects']), ',')}")
-    
-    # Create output file, if required
-    if csv_config['enabled']:
-        try:
-            filename = os.path.join(csv_config['csv_dir'], f"01-summary_of_scans.csv")
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Description','Value', '%'])
-                writer.writerow(['Start Date',data['first_date']])
-                writer.writerow(['End Date',data['last_date']])
-                writer.writerow(['Days',total_days])
-                writer.writerow(['Weeks',total_weeks])
-                writer.writerow(['Scans Submitted',total_scan_count])
-                writer.writerow(['Full Scans Submitted',full_scan_count,(full_scan_count / total_scan_count)])
-                writer.writerow(['Incremental Scans Submitted',incremental_scan_count,(incremental_scan_count / total_scan_count)])
-                writer.writerow(['No-Change Scans',no_scan_count,(no_scan_count / total_scan_count)])
-                writer.writerow(['Scans with High Results',high_results__scan_count,(high_results__scan_count / total_scan_count)])
-                writer.writerow(['Scans with Medium Results',medium_results__scan_count,(medium_results__scan_count / total_scan_count)])
-                writer.writerow(['Scans with Low Results',low_results__scan_count,(low_results__scan_count / total_scan_count)])
-                writer.writerow(['Scans with Informational Results',info_results__scan_count,(info_results__scan_count / total_scan_count)])
-                writer.writerow(['Scans with Zero Results',zero_results__scan_count,(zero_results__scan_count / total_scan_count)])
-                writer.writerow(['Unique Projects Scanned',len(data['scanned_projects'])])
-        except IOError as e:
-            print(f"IOError when writing to file: {e}")
-        except Exception as e:
-            print(f"Unexpected error when creating/writing to the CSV file: {e}")
-
-
-    # Print Scan Metrics
-    print("\nScan Metrics")
-    print(f"- Avg LOC per Scan: {format(round(scan_loc__sum / total_scan_count), ',')}")
-    print(f"- Max LOC per Scan:  {format(round(scan_loc__max), ',')}")
-    print(f"- Avg Failed LOC per Scan: {format(round(scan_failed_loc__sum / yes_scan_count), ',')}")
-    print(f"- Max Failed LOC per Scan:  {format(round(scan_failed_loc__max), ',')}")
-    print(f"- Avg Daily LOC: {format(round(scan_loc__sum / total_scan_days), ',')}")
-    print(f"- Max Daily LOC: {format(round(date_loc__max), ',')}")
-    
-    # Create output file, if required
-    if csv_config['enabled']:
-        try:
-            filename = os.path.join(csv_config['csv_dir'], f"02-scan_metrics.csv")
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Description','Average', 'Max'])
-                writer.writerow(['LOC per Scan',round(scan_loc__sum / total_scan_count),round(scan_loc__max)])
-                writer.writerow(['Failed LOC per Scan',round(scan_failed_loc__sum / yes_scan_count),round(scan_failed_loc__max)])
-                writer.writerow(['Daily LOC',round(scan_loc__sum / total_scan_days),round(date_loc__max)])
-        except IOError as e:
-            print(f"IOError when writing to file: {e}")
-        except Exception as e:
-            print(f"Unexpected error when creating/writing to the CSV file: {e}")
-
-    # Print Scan Duration
-    print("\nScan Duration")
-    print(f"- Avg Total Scan Duration: {format_seconds_to_hms(total_scan_time__avg)}")
-    print(f"- Max Total Scan Duration: {format_seconds_to_hms(total_scan_time__max)}")
-    print(f"- Avg Engine Scan Duration: {format_seconds_to_hms(engine_scan_time__avg)}")
-    print(f"- Max Engine Scan Duration: {format_seconds_to_hms(engine_scan_time__max)}")
-    print(f"- Avg Queued Duration: {format_seconds_to_hms(queue_time__avg)}")
-    print(f"- Max Queued Scan Duration: {format_seconds_to_hms(queue_time__max)}")
-    print(f"- Avg Source Pulling Duration: {format_seconds_to_hms(source_pulling_time__avg)}")
-    print(f"- Max Source Pulling Duration: {format_seconds_to_hms(source_pulling_time__max)}")
-
-    # Create output file, if required
-    if csv_config['enabled']:
-        try:
-            filename = os.path.join(csv_config['csv_dir'], f"03-scan_duration.csv")
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Description','Average', 'Max'])
-                writer.writerow(['Total Scan Duration',format_seconds_to_hms(total_scan_time__avg),format_seconds_to_hms(total_scan_time__max)])
-                writer.writerow(['Engine Scan Duration',format_seconds_to_hms(engine_scan_time__avg),format_seconds_to_hms(engine_scan_time__max)])
-                writer.writerow(['Queued Duration',format_seconds_to_hms(queue_time__avg),format_seconds_to_hms(queue_time__max)])
-                writer.writerow(['Source Pulling Duration',format_seconds_to_hms(source_pulling_time__avg),format_seconds_to_hms(source_pulling_time__max)])
-        except IOError as e:
-            print(f"IOError when writing to file: {e}")
-        except Exception as e:
-            print(f"Unexpected error when creating/writing to the CSV file: {e}")
-
-    # Print Scan Results / Severity
-    print("\nScan Results / Severity")
-    print(f"- Average Total Results: {data['results']['total_vulns__avg']}")
-    print(f"- Max Total Results: {data['results']['total_vulns__max']}")
-    print(f"- Average High Results: {data['results']['high__avg']}")
-    print(f"- Max High Results: {data['results']['high__max']}")
-    print(f"- Average Medium Results: {data['results']['medium__avg']}")
-    print(f"- Max Medium Results: {data['results']['medium__max']}")
-    print(f"- Average Low Results: {data['results']['low__avg']}")
-    print(f"- Max Low Results: {data['results']['low__max']}")
-    print(f"- Average Informational Results: {data['results']['info__avg']}")
-    print(f"- Max Informational Results: {data['results']['info__max']}")
-
-    # Create output file, if required
-    if csv_config['enabled']:
-        try:
-            filename = os.path.join(csv_config['csv_dir'], f"04-scan_results_severity.csv")
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Description','Average', 'Max'])
-                writer.writerow(['Total',data['results']['total_vulns__avg'],data['results']['total_vulns__max']])
-                writer.writerow(['High',data['results']['high__avg'],data['results']['high__max']])
-                writer.writerow(['Medium',data['results']['medium__avg'],data['results']['medium__max']])
-                writer.writerow(['Low',data['results']['low__avg'],data['results']['low__max']])
-                writer.writerow(['Informational',data['results']['info__avg'],data['results']['info__max']])
-        except IOError as e:
-            print(f"IOError when writing to file: {e}")
-        except Exception as e:
-            print(f"Unexpected error when creating/writing to the CSV file: {e}")
-    
-    # Print Languages
-    print("\nLanguages")
-    for language_name, language_count in sorted(data['scanned_languages'].items(), key=lambda x: x[1], reverse=True):
-        percentage = (language_count / total_scan_count) * 100
-        print(f"- {language_name}: {format(language_count, ',')} ({percentage:.1f}%)")
-    
-    # Create output file, if required
-    if csv_config['enabled']:
-        try:
-            filename = os.path.join(csv_config['csv_dir'], f"05-languages.csv")
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Language','%', 'Scans'])
-                for language_name, language_count in sorted(data['scanned_languages'].items(), key=lambda x: x[1], reverse=True):
-                    percentage = language_count / total_scan_count
-                    writer.writerow([language_name,percentage,language_count])
-        except IOError as e:
-            print(f"IOError when writing to file: {e}")
-        except Exception as e:
-            print(f"Unexpected error when creating/writing to the CSV file: {e}")
-
-    # Print Scan Submission Summary
-    print("\nScan Submission Summary")
-    print(f"- Average Scans Submitted per Week: {format(round(total_scan_count / total_weeks), ',')}")
-    print(f"- Average Scans Submitted per Day: {format(round(total_scan_count / total_days), ',')}")
-    print(f"- Average Scans Submitted per Week Day: {format(round(day_of_week_scan_totals['Weekday'] / (total_weeks * 5)), ',')}")
-    print(f"- Average Scans Submitted per Weekend Day: {format(round(day_of_week_scan_totals['Weekend'] / (total_weeks * 2)), ',')}")
-    print(f"- Max Daily Scans Submitted: {format(date_max_scan_count, ',')}")
-    print(f"- Date of Max Scans: {date_max_scan_date}")
-
-    # Create output file, if required
-    if csv_config['enabled']:
-        try:
-            filename = os.path.join(csv_config['csv_dir'], f"06-scan_submissison_summary.csv")
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Description','Value'])
-                writer.writerow(['Average Scans Submitted per Week',round(total_scan_count / total_weeks)])
-                writer.writerow(['Average Scans Submitted per Day',round(total_scan_count / total_days)])
-                writer.writerow(['Average Scans Submitted per Weekday',round(day_of_week_scan_totals['Weekday'] / (total_weeks * 5))])
-                writer.writerow(['Average Scans Submitted per Weekend Day',round(day_of_week_scan_totals['Weekend'] / (total_weeks * 2))])
-                writer.writerow(['Max Daily Scans Submitted',date_max_scan_count])
-                writer.writerow(['Date of Max Scans',date_max_scan_date])
-        except IOError as e:
-            print(f"IOError when writing to file: {e}")
-        except Exception as e:
-            print(f"Unexpected error when creating/writing to the CSV file: {e}")
-
-    # Print Day of Week Scan Average
-    print("\nDay of Week Scan Average")
-    for day_name, total_day_count in day_of_week_scan_totals.items():
-        if day_name == "Weekday" or day_name == "Weekend":
-            continue
-        percentage = (total_day_count / total_scan_count) * 100
-        print(f"- {day_name}: {format(round(total_day_count / total_weeks), ',')} ({percentage:.1f}%)")
-
-    # Create output file, if required
-    if csv_config['enabled']:
-        try:
-            filename = os.path.join(csv_config['csv_dir'], f"07-day_of_week_scan_average.csv")
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Day of Week', 'Scans', '%'])
-                for day_name, total_day_count in day_of_week_scan_totals.items():
-                    if day_name == "Weekday" or day_name == "Weekend":
-                        continue
-                    percentage = (total_day_count / total_scan_count)
-                    writer.writerow([day_name,round(total_day_count / total_weeks),percentage])
-        except IOError as e:
-            print(f"IOError when writing to file: {e}")
-        except Exception as e:
-            print(f"Unexpected error when creating/writing to the CSV file: {e}")
-
-    # Print Origins
-    print("\nOrigins")
-    for origin, origin_count in sorted(data['origins'].items(), key=lambda x: x[1], reverse=True):
-        percentage = (origin_count / total_scan_count) * 100
-        print(f"- {origin}: {format(origin_count, ',')} ({percentage:.1f}%)")
-
-    # Create output file, if required
-    if csv_config['enabled']:
-        try:
-            filename = os.path.join(csv_config['csv_dir'], f"08-origins.csv")
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Origin', 'Scans', '%'])
-                for origin, origin_count in sorted(data['origins'].items(), key=lambda x: x[1], reverse=True):
-                    percentage = (origin_count / total_scan_count)
-                    writer.writerow([origin,origin_count,percentage])
-        except IOError as e:
-            print(f"IOError when writing to file: {e}")
-        except Exception as e:
-            print(f"Unexpected error when creating/writing to the CSV file: {e}")
-
-    # Print Presets
-    print("\nPresets")
-    for preset_name, preset_count in sorted(data['preset_names'].items(), key=lambda x: x[1], reverse=True):
-        percentage = (preset_count / total_scan_count) * 100
-        print(f"- {preset_name}: {format(preset_count, ',')} ({percentage:.1f}%)")
-
-    # Create output file, if required
-    if csv_config['enabled']:
-        try:
-            filename = os.path.join(csv_config['csv_dir'], f"09-presets.csv")
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Preset', 'Scans', '%'])
-                for preset_name, preset_count in sorted(data['preset_names'].items(), key=lambda x: x[1], reverse=True):
-                    percentage = (preset_count / total_scan_count)
-                    writer.writerow([preset_name,preset_count,percentage])
-        except IOError as e:
-            print(f"IOError when writing to file: {e}")
-        except Exception as e:
-            print(f"Unexpected error when creating/writing to the CSV file: {e}")
-
-    # Print Scan Time Analysis
-    print("\nScan Time Analysis")
-    # Print the header of the table
-    print(f"{'LOC Range':<12} {'Scans':<12} {'% Scans':<10} {'Avg Total':<18} {'Avg Src Pulling':<18} {'Avg Queue':<18} "
-    f"{'Avg Engine':<18}")
-    
-    # Iterate through the size_bins dictionary to print the per-bin data
-    for bin_key, bin_values in data['size_bins'].items():
-        # Format times from seconds to HH:MM:SS
-        source_pulling_time__avg = format_seconds_to_hms(bin_values['source_pulling_time__avg'])
-        queue_time__avg = format_seconds_to_hms(bin_values['queue_time__avg'])
-        engine_scan_time__avg = format_seconds_to_hms(bin_values['engine_scan_time__avg'])
-        total_scan_time__avg = format_seconds_to_hms(bin_values['total_scan_time__avg'])
-        
-        # Print the formatted row for each bin
-        print(f"{bin_key:<12} {bin_values['yes_scan_count'] + bin_values['no_scan_count']:<12,} "
-        f"{(math.ceil((10000 * (bin_values['yes_scan_count'] + bin_values['no_scan_count']) / total_scan_count)) / 100):<11.2f}"
-        f"{total_scan_time__avg:<18} {source_pulling_time__avg:<18} {queue_time__avg:<18} {engine_scan_time__avg:<18}")
-
-    # Create output file, if required
-    if csv_config['enabled']:
-        try:
-            filename = os.path.join(csv_config['csv_dir'], f"10-scan_time_analysis.csv")
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(['LOC Range','Scans','% Scans','Avg Total Time','Avg Source Pulling Time','Avg Queue Time','Avg Engine Scan Time'])
-                
-                # Iterate through the size_bins dictionary to print the per-bin data
-                for bin_key, bin_values in data['size_bins'].items():
-                    # Format times from seconds to HH:MM:SS
-                    source_pulling_time__avg = format_seconds_to_hms(bin_values['source_pulling_time__avg'])
-                    queue_time__avg = format_seconds_to_hms(bin_values['queue_time__avg'])
-                    engine_scan_time__avg = format_seconds_to_hms(bin_values['engine_scan_time__avg'])
-                    total_scan_time__avg = format_seconds_to_hms(bin_values['total_scan_time__avg'])
-                    writer.writerow([bin_key,bin_values['yes_scan_count'] + bin_values['no_scan_count'],
-                        math.ceil((10000 * (bin_values['yes_scan_count'] + bin_values['no_scan_count']) / total_scan_count)) / 10000,
-                        total_scan_time__avg,source_pulling_time__avg,queue_time__avg,engine_scan_time__avg])
-        except IOError as e:
-            print(f"IOError when writing to file: {e}")
-        except Exception as e:
-            print(f"Unexpected error when creating/writing to the CSV file: {e}")
-    
-    # Print Concurrency Summary with unique and sorted dates
-    print("\nConcurrency Summary")
-    print(f"- Overall Peak Actual Concurrency: {overall_max_actual} concurrent scans on {', '.join(map(str, overall_max_actual_dates))}")
-    print(f"- Overall Peak Optimal Concurrency: {overall_max_optimal} concurrent scans on {', '.join(map(str, overall_max_optimal_dates))}")
-
-    # Create output file, if required
-    if csv_config['enabled']:
-        try:
-            filename = os.path.join(csv_config['csv_dir'], f"11-concurrency_analysis.csv")
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Date', 'Max Actual', 'Max Optimal'])
-                for date, maxima in sorted(daily_maxima.items()):
-                    writer.writerow([date, maxima['actual'], maxima['optimal']])
-        except IOError as e:
-            print(f"IOError when writing to file: {e}")
-        except Exception as e:
-            print(f"Unexpected error when creating/writing to the CSV file: {e}")
-
-    # Create other output files for data that we don't print to the summary, if required
-    if csv_config['enabled']:
-        # Daily scan counts
-        try:
-            filename = os.path.join(csv_config['csv_dir'], f"12-scans_by_date.csv")
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Date', 'Scans'])
-                for date, count in sorted(daily_scan_counts.items()):
-                    writer.writerow([date, count])
-        except IOError as e:
-            print(f"IOError when writing to file: {e}")
-        except Exception as e:
-            print(f"Unexpected error when creating/writing to the CSV file: {e}")
-
-        # Weekly scan counts
-        try:
-            filename = os.path.join(csv_config['csv_dir'], f"13-scans_by_week.csv")
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Week', 'Scans'])
-                for week, count in sorted(weekly_scan_counts.items()):
-                    writer.writerow([week, count])
-        except IOError as e:
-            print(f"IOError when writing to file: {e}")
-        except Exception as e:
-            print(f"Unexpected error when creating/writing to the CSV file: {e}")
-
-
-    print("")
-
-
-
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Process scans and output CSV files if requested.")
-    parser.add_argument("input-file", type=str, help="The JSON file containing scan data.")
-    parser.add_argument("--csv", action="store_true", help="Generate CSV output files.")
-    parser.add_argument("--full-data", action="store_true", help="Generate CSV output of complete scan data.")
-    parser.add_argument("--name", type=str, default="", help="Optional name for the output directory")
-
-    args = parser.parse_args()
-    input_file = args.input_file
-    output_name = args.name if args.name else os.path.splitext(os.path.basename(input_file))[0]
-
-    # define the output directory using the optional name if provided
-    csv_dir = os.path.join(os.getcwd(), f"ehc_output_{output_name}_{datetime.now().strftime('%Y%m%d-%H%M%S')}")
-
-    # create the output directory if we are creating any CSV files
-    if args.full_data or args.csv:
-        try:
-            # Attempt to create the directory
-            os.makedirs(csv_dir, exist_ok=True)
-
-        except PermissionError as e:
-            print(f"Permission Error: {e}")
-            exit(1)
-        except Exception as e:
-            print(f"Error creating directory: {e}")
-            exit(1)
-
-    field_names, scans = ingest_file(input_file)
-
-    # define structures to hold output info
-    full_csv = {
-        'enabled': args.full_data,
-        'csv_dir': csv_dir,
-        'field_names': field_names
-    }
-    csv_config = {
-        'enabled': args.csv,
-        'csv_dir': csv_dir
-    }
-
-    processed_data = process_scans(scans, full_csv)
-
-    output_analysis(processed_data, csv_config)
+import argparse
+import importlib.util
+import os
+import pickle
+import signal
+from datetime import datetime, timedelta, timezone
+from collections import defaultdict
+import math
+import csv
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from ehc.fileio import base_name, read_context, field_names_from_context
+from ehc.sampling import StratifiedSampler, StratifiedEstimates
+from ehc.checkpoint import ScanReader, Quarantine, Checkpoint, input_signature, checkpoint_interval
+from ehc.accumulators import DateStats, LocBins, SeverityResults, ProjectStats, CategoricalCounter, LanguageCounter, OriginCounter, ConcurrencyEvents, \
+    DistinctCounter, TopProjects, EngineServerStats, CostAttribution, WastedTime, IncrementalEfficiency, QueueEpisodes, QueueContributors, BinnedStats, check_scan, \
+    grouping_dimensions, waste_failed_loc_ratio, cc_event_memory_budget, memory_budget_shares, use_spill_directory
+from ehc.binning import bins, load_bins_config
+from ehc.schedule import plan_schedule_shift
+from ehc.telemetry import Telemetry, metrics_formats, telemetry_interval
+
+# pyarrow is only needed for the optional Parquet output, so it (and dateutil, which only the Parquet timestamps need) is
+# imported by load_parquet_modules() when Parquet is written rather than whenever the script is loaded
+pyarrow_available = importlib.util.find_spec('pyarrow') is not None
+pa = pq = parse_date = None
+
+# Global variable(s)
+cc_snapshot_seconds = 1 # the size of concurrency snapshots in seconds
+engine_utilization_bucket_seconds = 3600 # the size of the time buckets of the engine server utilization matrix
+top_consumers_count = 10 # groups shown on screen per breakdown of the cost attribution report (the CSV has all of them)
+queue_episode_threshold = 5 # a queue congestion episode is more than this many queued scans...
+queue_episode_min_seconds = 15 * 60 # ...for at least this long
+queue_episode_contributors = 5 # projects and origins listed per episode
+queue_episodes_shown = 10 # episodes shown on screen, most scan-seconds first (the CSV has all of them)
+wasted_time_shown = 10 # projects and origins shown on screen in the wasted time report (the CSV has all of them)
+incremental_full_scans_per_week = 2 # projects with this many full scans a week or more could switch to incremental (keeping one full scan a week)
+incremental_min_scans = 3 # incremental scans a project needs for its own average incremental engine time to be used in the projection
+incremental_slow_ratio = 0.8 # incremental scans taking at least this fraction of the engine time of a full scan save little
+incremental_projects_shown = 10 # projects shown on screen in the incremental efficiency report (the CSV has all of them)
+schedule_engine_count = 0 # engines in the queue simulation of the schedule shift; 0 for the number of engine servers in the data
+schedule_moves_shown = 10 # moved schedules shown on screen, most engine time first (the CSV has all of the schedules)
+parquet_row_group_size = 100000 # scans buffered per Parquet row group for the full scan data
+checkpoint_check_scans = 1000 # scans between checks of whether a checkpoint is due
+checkpoint_signals = [getattr(signal, name) for name in ('SIGINT', 'SIGTERM', 'SIGHUP') if hasattr(signal, name)]
+
+# Column types for the full scan data in Parquet; any other field is written as a dictionary-encoded string
+parquet_integer_fields = {'Id', 'ProjectId', 'LOC', 'FailedLOC', 'EngineServerId', 'TotalVulnerabilities', 'High', 'Medium', 'Low', 'Info'}
+parquet_boolean_fields = {'IsIncremental', 'IsPublic', 'IsLocked'}
+
+
+def load_parquet_modules():
+    global pa, pq, parse_date
+    if pa is None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        from dateutil.parser import parse as parse_date
+
+
+
+# Streams the full scan data into a Parquet file, one row group per parquet_row_group_size scans. Timestamps ('...On' fields) are
+# typed UTC timestamps and strings are dictionary encoded, which is what makes the file much smaller and faster to load than the CSV.
+class FullDataParquetWriter:
+    def __init__(self, filename, field_names):
+        load_parquet_modules()
+        self.field_names = field_names
+        fields = []
+        for field in field_names:
+            if field in parquet_integer_fields:
+                fields.append(pa.field(field, pa.int64()))
+            elif field in parquet_boolean_fields:
+                fields.append(pa.field(field, pa.bool_()))
+            elif field.endswith('On'):
+                fields.append(pa.field(field, pa.timestamp('ms', tz='UTC')))
+            else:
+                fields.append(pa.field(field, pa.dictionary(pa.int32(), pa.string())))
+        self.schema = pa.schema(fields)
+        self.columns = {field: [] for field in field_names}
+        self.writer = pq.ParquetWriter(filename, self.schema, compression='zstd')
+
+    def add(self, scan):
+        for field in self.field_names:
+            value = scan.get(field, None)
+            if field == 'ScannedLanguages':
+                value = ', '.join(lang['LanguageName'] for lang in (value or []))
+            elif value is not None:
+                arrow_type = self.schema.field(field).type
+                if pa.types.is_timestamp(arrow_type):
+                    try:
+                        value = parse_date(value)
+                        if value.tzinfo is None:
+                            value = value.replace(tzinfo=timezone.utc)
+                    except (TypeError, ValueError, OverflowError):
+                        value = None
+                elif pa.types.is_dictionary(arrow_type):
+                    value = str(value)
+            self.columns[field].append(value)
+        if len(self.columns[self.field_names[0]]) >= parquet_row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self.field_names or not self.columns[self.field_names[0]]:
+            return
+        batch = pa.record_batch([pa.array(self.columns[field]).cast(self.schema.field(field).type) if pa.types.is_dictionary(self.schema.field(field).type)
+            else pa.array(self.columns[field], type=self.schema.field(field).type) for field in self.field_names], schema=self.schema)
+        self.writer.write_batch(batch)
+        self.columns = {field: [] for field in self.field_names}
+
+    def finish(self):
+        self.flush()
+        self.writer.close()
+
+
+# Writes a report table to Parquet. Report columns can mix types (e.g. dates and counts in the summary), so any column that
+# does not have a single type is written as strings.
+def write_parquet_report(csv_config, file_name, header, rows):
+    try:
+        load_parquet_modules()
+        columns = {}
+        for index, column_name in enumerate(header):
+            values = [row[index] if index < len(row) else None for row in rows]
+            value_types = {type(value) for value in values if value is not None}
+            if len(value_types) > 1 and value_types != {int, float}:
+                values = [str(value) if value is not None else None for value in values]
+            columns[column_name] = values
+        filename = os.path.join(csv_config['csv_dir'], os.path.splitext(file_name)[0] + '.parquet')
+        pq.write_table(pa.table(columns), filename)
+    except IOError as e:
+        print(f"IOError when writing to file: {e}")
+    except Exception as e:
+        print(f"Unexpected error when creating/writing to the Parquet file: {e}")
+
+
+
+
+# Writes the full scan data CSV (used only for manual analysis); the file is opened once rather than once per scan
+class FullDataCsvWriter:
+    def __init__(self, filename, field_names):
+        self.field_names = field_names
+        self.file = open(filename, mode='w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(field_names)
+
+    def add(self, scan):
+        # Build a row by extracting each field from the scan in the order of field_names
+        row = []
+        for field in self.field_names:
+            if field == 'ScannedLanguages':
+                # Special handling for ScannedLanguages field to convert list of dicts to comma-separated string
+                languages = scan.get(field, [])
+                language_str = ', '.join(lang['LanguageName'] for lang in languages)
+                row.append(language_str)
+            else:
+                # For all other fields, use the value as-is
+                row.append(scan.get(field, ""))
+        # Write the constructed row to the CSV file
+        self.writer.writerow(row)
+
+    def finish(self):
+        self.file.close()
+
+
+# Create the writers for the full scan data (CSV, plus Parquet if requested), if required
+def open_full_data_writers(full_csv):
+    writers = []
+    if not full_csv['enabled']:
+        return writers
+    try:
+        writers.append(FullDataCsvWriter(os.path.join(full_csv['csv_dir'], f"00-full_scan_data.csv"), full_csv['field_names']))
+    except IOError as e:
+        print(f"IOError when writing to file: {e}")
+    except Exception as e:
+        print(f"Unexpected error when creating/writing to the CSV file: {e}")
+    if full_csv.get('parquet', False):
+        try:
+            writers.append(FullDataParquetWriter(os.path.join(full_csv['csv_dir'], f"00-full_scan_data.parquet"), full_csv['field_names']))
+        except Exception as e:
+            print(f"Unexpected error when creating the Parquet file: {e}")
+    return writers
+
+
+# Process the scan data.
+# Scans are pushed one at a time with add(), so a single parse of the file can feed this and other consumers (see ehc/pipeline.py);
+# finish() runs the concurrency sweep, plans the schedule shift and returns the data used by output_analysis, then (unless
+# cleanup=False, e.g. when a pickle of the processor is still to be loaded) removes the records spilled to disk. The work is
+# done by the accumulators in ehc/accumulators.py, so two processors (e.g. for two files) can also be combined with merge().
+# engine_servers=False leaves out the engine runs per engine server (reports 15 and 16), as concurrency=False does the concurrency events.
+# With approximate=True the per-project data is replaced by fixed size sketches (distinct counts and top projects) and the
+# scanned_projects result is left empty. crosstabs are the combinations of grouping_dimensions to break the scan times down by
+# (see --crosstab).
+class ScanProcessor:
+    def __init__(self, concurrency=True, cc_memory_budget=None, approximate=False, engine_servers=True, crosstabs=()):
+        self.concurrency = concurrency
+        self.engine_servers = engine_servers
+        self.approximate = approximate
+        self.crosstabs = [BinnedStats(dimensions) for dimensions in crosstabs]
+        self.date_stats = DateStats()
+        self.loc_bins = LocBins()
+        self.severity_results = SeverityResults()
+        self.project_stats = ProjectStats()
+        self.incremental_efficiency = IncrementalEfficiency()
+        self.presets = CategoricalCounter('PresetName')
+        self.languages = LanguageCounter()
+        self.origins = OriginCounter()
+        memory_budget = cc_memory_budget or cc_event_memory_budget
+        self.concurrency_events = ConcurrencyEvents(int(memory_budget * memory_budget_shares['concurrency_events']))
+        self.queue_contributors = QueueContributors(int(memory_budget * memory_budget_shares['queue_contributors']))
+        self.distinct_projects = DistinctCounter('Project', approximate)
+        self.distinct_engine_servers = DistinctCounter('EngineServerId', approximate)
+        self.distinct_origins = DistinctCounter('Origin', approximate)
+        self.top_projects = TopProjects(approximate)
+        self.cost_attribution = CostAttribution(approximate)
+        self.wasted_time = WastedTime(approximate)
+        self.engine_server_stats = EngineServerStats(int(memory_budget * memory_budget_shares['engine_server_stats']))
+
+    def accumulators(self):
+        accumulators = [self.date_stats, self.loc_bins, self.severity_results, self.presets, self.languages, self.origins,
+            self.distinct_projects, self.distinct_engine_servers, self.distinct_origins, self.top_projects, self.cost_attribution, self.wasted_time]
+        if not self.approximate:
+            accumulators.append(self.project_stats)
+            accumulators.append(self.incremental_efficiency)
+        if self.concurrency:
+            accumulators.append(self.concurrency_events)
+            accumulators.append(self.queue_contributors)
+        if self.engine_servers:
+            accumulators.append(self.engine_server_stats)
+        accumulators.extend(self.crosstabs)
+        return accumulators
+
+    # weight > 1 stands for that many scans (scans sampled with --sample are weighted back up to their stratum)
+    def add(self, scan, weight=1):
+        # If there is no LOC value, we might as well just completely skip the scan.
+        # This differs from the current process but ensures that scan counts actually match in various metrics. Also, other fields are typically also missing.
+        if scan.get('LOC', None) is None:
+            return
+
+        # a scan that would fail part way through is rejected (ValueError) before any accumulator has counted it
+        check_scan(scan)
+        for accumulator in self.accumulators():
+            accumulator.add(scan, weight)
+
+    def merge(self, other):
+        for accumulator, other_accumulator in zip(self.accumulators(), other.accumulators()):
+            accumulator.merge(other_accumulator)
+        return self
+
+    # Move the records spilled to disk to directory, to keep them with a pickle of the processor saved there
+    def move_runs(self, directory):
+        self.concurrency_events.move_runs(directory)
+        self.queue_contributors.move_runs(directory)
+        self.engine_server_stats.move_runs(directory)
+
+    def cleanup(self):
+        self.concurrency_events.cleanup()
+        self.queue_contributors.cleanup()
+        self.engine_server_stats.cleanup()
+
+    def finish(self, cleanup=True):
+        date_stats = self.date_stats.to_dict()
+
+        # without concurrency there are no events and therefore no snapshots to take (or queue episodes to find)
+        if self.concurrency:
+            episodes = QueueEpisodes(queue_episode_threshold, queue_episode_min_seconds)
+            snapshot_metrics = self.concurrency_events.snapshots(date_stats['first_date'], date_stats['last_date'], cc_snapshot_seconds, episodes)
+            queue_episodes = self.queue_contributors.add_contributors(episodes.episodes, queue_episode_contributors)
+            # the queue simulation runs the scans on as many engines as there were engine servers, unless told otherwise
+            capacity = schedule_engine_count or self.distinct_engine_servers.to_dict()['count']
+            schedule_shift = plan_schedule_shift(self.queue_contributors.scan_times, capacity, self.queue_contributors.scans.memory_budget)
+        else:
+            snapshot_metrics = []
+            queue_episodes = []
+            schedule_shift = None
+
+        data = {
+            'first_date': date_stats['first_date'],
+            'last_date': date_stats['last_date'],
+            'scan_stats_by_date': date_stats['scan_stats_by_date'],
+            'scanned_projects': {} if self.approximate else self.project_stats.to_dict(),
+            'distinct_counts': {
+                'projects': self.distinct_projects.to_dict(),
+                'engine_servers': self.distinct_engine_servers.to_dict(),
+                'origins': self.distinct_origins.to_dict()
+            },
+            'top_projects': self.top_projects.to_dict(),
+            'cost_attribution': self.cost_attribution.to_dict(),
+            'wasted_time': self.wasted_time.to_dict(),
+            'incremental_efficiency': None if self.approximate else self.incremental_efficiency.to_dict(),
+            'size_bins': self.loc_bins.to_dict(),
+            'crosstabs': {crosstab.dimensions: crosstab.to_dict() for crosstab in self.crosstabs},
+            'results': self.severity_results.to_dict(),
+            'preset_names': self.presets.to_dict(),
+            'scanned_languages': self.languages.to_dict(),
+            'origins': self.origins.to_dict(),
+            'cc_metrics': snapshot_metrics,
+            'queue_episodes': queue_episodes,
+            'schedule_shift': schedule_shift,
+            'engine_servers': self.engine_server_stats.to_dict() if self.engine_servers else {},
+            'confidence_intervals': {},
+            'sample': None
+        }
+        if cleanup:
+            self.cleanup()
+        return data
+
+
+# Stream the scans of a file through the processor (and the full scan data writers, if any). A scan that can't be processed
+# (a record that isn't valid JSON, or a scan rejected by check_scan) is written to the quarantine rather than ending the run.
+# With a checkpoint, the processor and the position in the file are saved every checkpoint.interval seconds and when the run
+# is stopped (Ctrl-C, SIGTERM or SIGHUP); resume is the state of such a checkpoint, to carry on from where it left off.
+# With finish=False the processor itself is returned rather than its results, e.g. to be merged with those of other files.
+# With telemetry (see ehc/telemetry.py), the progress is sampled on its timer from the scan count and the position in the file.
+def process_file(file_path, full_csv, quarantine, concurrency=True, cc_memory_budget=None, approximate=False, checkpoint=None, resume=None,
+        engine_servers=True, crosstabs=(), progress=True, finish=True, telemetry=None):
+    if resume is not None:
+        processor = resume['processor']
+        scan_count = resume['scan_count']
+        reader = ScanReader(file_path, resume['offset'], quarantine)
+    else:
+        processor = ScanProcessor(concurrency, cc_memory_budget, approximate, engine_servers, crosstabs)
+        scan_count = 0
+        reader = ScanReader(file_path, 0, quarantine)
+
+    # Prepare to output CSV of all scan data and create output file, if required
+    writers = open_full_data_writers(full_csv)
+
+    # A stop signal is only acted on between scans, so a checkpoint never holds a half counted scan
+    stop_signals = []
+    previous_handlers = {}
+    if checkpoint is not None:
+        for signal_number in checkpoint_signals:
+            previous_handlers[signal_number] = signal.signal(signal_number, lambda signal_number, frame: stop_signals.append(signal_number))
+
+    def save_checkpoint():
+        checkpoint.save({
+            'input': input_signature(file_path),
+            'offset': reader.offset,
+            'scan_count': scan_count,
+            'processor': processor,
+            'quarantine_size': quarantine.size(),
+            'quarantine_count': quarantine.count
+        })
+
+    # The loop does nothing per scan for the progress; the telemetry thread reads scan_count and the position in the file. While
+    # the telemetry line is shown on the terminal, "Processing scans..." is only printed once it has completed.
+    live = progress and telemetry is not None and telemetry.display
+    if telemetry is not None:
+        telemetry.set_stage("Processing scans", lambda: (scan_count, reader.position()), os.path.getsize(file_path))
+    if progress and not live:
+        print("Processing scans...", end="", flush=True)
+
+    try:
+        # process all the things
+        for scan in reader:
+            scan_count += 1
+
+            # If required, we want to output to the full scan CSV first so as to include scans with missing fields (such as loc). This will cause a potential
+            # mismatch between record counts but shouldn't impact anything relating to metrics or analysis. This CSV is only used for manual analysis.
+            for writer in writers:
+                try:
+                    writer.add(scan)
+                except IOError as e:
+                    print(f"IOError when writing to file: {e}")
+                except Exception as e:
+                    print(f"Unexpected error when writing to the full scan data file: {e}")
+
+            try:
+                processor.add(scan)
+            except Exception as e:
+                quarantine.add(e, scan=scan, offset=reader.scan_offset)
+
+            if checkpoint is not None:
+                if stop_signals:
+                    save_checkpoint()
+                    if telemetry is not None:
+                        telemetry.stop()
+                    print(f"\nStopped after {format(scan_count, ',')} scans; run again with --resume to carry on from here")
+                    exit(1)
+                if scan_count % checkpoint_check_scans == 0 and checkpoint.due():
+                    save_checkpoint()
+    finally:
+        for signal_number, handler in previous_handlers.items():
+            signal.signal(signal_number, handler)
+
+    if telemetry is not None:
+        telemetry.set_stage("Finishing scans")
+    for writer in writers:
+        try:
+            writer.finish()
+        except Exception as e:
+            print(f"Unexpected error when writing to the full scan data file: {e}")
+
+    processed_data = processor.finish() if finish else processor
+
+    if live:
+        telemetry.hide()
+        print("Processing scans...completed!")
+    elif progress:
+        print("completed!")
+
+    if reader.truncated:
+        print(f"Warning: {file_path} ends before the end of the scan data; the analysis covers the {format(scan_count, ',')} scans read")
+    return processed_data
+
+
+
+# Analyze a deterministic, stratified sample of the scans (see ehc/sampling.py) instead of all of them. Each sampled scan is
+# weighted up to its stratum so counts and sums are estimates for the whole file, and the averages in the summary, duration
+# and severity reports get confidence intervals. Maxima are the maxima of the sample. There is no concurrency or engine server
+# analysis.
+def sample_scans(file_path, rate, crosstabs=()):
+    print("Sampling scans...", end="", flush=True)
+    sampler = StratifiedSampler(rate)
+    sampled = list(sampler.read(file_path))
+    weights = sampler.weights()
+
+    processor = ScanProcessor(concurrency=False, engine_servers=False, crosstabs=crosstabs)
+    estimates = StratifiedEstimates()
+    for stratum, scan in sampled:
+        processor.add(scan, weights[stratum])
+        estimates.add(stratum, scan)
+
+    data = processor.finish()
+    data['confidence_intervals'] = estimates.intervals(sampler.stratum_totals)
+    data['sample'] = {
+        'rate': rate,
+        'sampled_count': sampler.sampled_count(),
+        'total_count': sampler.total_count(),
+        'skipped_parsing': sampler.skipped_parsing
+    }
+    print("completed!")
+    print(f"Sampled {format(sampler.sampled_count(), ',')} of {format(sampler.total_count(), ',')} scans ({rate * 100:g}% plus at least "
+        f"{sampler.min_per_stratum} per date and LOC range); counts are estimates and maxima are those of the sample")
+    return data
+
+
+def format_seconds_to_hms(seconds):
+    hours = seconds // 3600
+    minutes = (seconds % 3600) // 60
+    seconds = seconds % 60
+    return f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}"
+
+
+# Derived stages are computed once from the process_file result and shared by the reports that declare them as inputs.
+
+# Totals, daily/weekly rollups and day-of-week counts from the per-date scan stats
+def compute_scan_totals(data):
+    totals = {
+        'full_scan_count': 0, 'incremental_scan_count': 0, 'yes_scan_count': 0, 'no_scan_count': 0,
+        'scan_loc__sum': 0, 'scan_loc__max': 0, 'scan_failed_loc__sum': 0, 'scan_failed_loc__max': 0,
+        'date_loc__max': 0, 'date_max_scan_count': 0, 'date_max_scan_date': None
+    }
+
+    day_of_week_scan_totals = {
+        'Monday': 0,
+        'Tuesday': 0,
+        'Wednesday': 0,
+        'Thursday': 0,
+        'Friday': 0,
+        'Saturday': 0,
+        'Sunday': 0,
+        'Weekday': 0,
+        'Weekend': 0
+    }
+
+    daily_scan_counts = {}
+    weekly_scan_counts = {}
+
+    # unpack scan stats and crunch a few more numbers
+    for scan_date, stats in data['scan_stats_by_date'].items():
+        totals['full_scan_count'] += stats['full_scan_count']
+        totals['incremental_scan_count'] += stats['incremental_scan_count']
+        totals['yes_scan_count'] += stats['yes_scan_count']
+        totals['no_scan_count'] += stats['no_scan_count']
+        totals['scan_loc__sum'] += stats['loc__sum']
+        totals['scan_loc__max'] = max(totals['scan_loc__max'], stats['loc__max'])
+        totals['scan_failed_loc__sum'] += stats['failed_loc__sum']
+        totals['scan_failed_loc__max'] = max(totals['scan_failed_loc__max'], stats['failed_loc__max'])
+        daily_scan_counts[scan_date] = stats['total_scan_count']
+
+        # Calculate the Monday of the current week
+        monday_of_week = scan_date - timedelta(days=scan_date.weekday())
+
+        # Add the count for the current week
+        if monday_of_week not in weekly_scan_counts:
+            weekly_scan_counts[monday_of_week] = stats['total_scan_count']
+        else:
+            weekly_scan_counts[monday_of_week] += stats['total_scan_count']
+
+        totals['date_loc__max'] = max(totals['date_loc__max'], stats['loc__sum'])
+
+        if(stats['total_scan_count'] > totals['date_max_scan_count']):
+            totals['date_max_scan_count'] = stats['total_scan_count']
+            totals['date_max_scan_date'] = scan_date
+
+        day_name = scan_date.strftime('%A')
+        day_index = scan_date.weekday()
+        day_of_week_scan_totals[day_name] += stats['total_scan_count']
+
+        if day_index >= 5:  # Saturday or Sunday
+            day_of_week_scan_totals['Weekend'] += stats['total_scan_count']
+        else:
+            day_of_week_scan_totals['Weekday'] += stats['total_scan_count']
+
+    totals['total_scan_count'] = totals['yes_scan_count'] + totals['no_scan_count']
+    totals['total_days'] = (data['last_date'] - data['first_date']).days
+    totals['total_weeks'] = math.ceil(totals['total_days'] / 7)
+    totals['total_scan_days'] = len(data['scan_stats_by_date'])
+    totals['day_of_week_scan_totals'] = day_of_week_scan_totals
+    totals['daily_scan_counts'] = daily_scan_counts
+    totals['weekly_scan_counts'] = weekly_scan_counts
+    return totals
+
+
+# Overall avg and max durations across all of the LOC bins
+def compute_duration_totals(data):
+    durations = {}
+    yes_scan_count = sum(bin_values['yes_scan_count'] for bin_values in data['size_bins'].values())
+    for metric in ['total_scan_time', 'source_pulling_time', 'queue_time', 'engine_scan_time']:
+        metric_sum = sum(bin_values[f'{metric}__sum'] for bin_values in data['size_bins'].values())
+        durations[f'{metric}__max'] = max(bin_values[f'{metric}__max'] for bin_values in data['size_bins'].values())
+        durations[f'{metric}__avg'] = metric_sum / yes_scan_count
+    return durations
+
+
+# Identify daily max concurrency values based on the granular calculations made previously
+def compute_concurrency_maxima(data):
+    daily_maxima = defaultdict(lambda: {'actual': 0, 'optimal': 0})
+    overall_max_actual = 0
+    overall_max_optimal = 0
+    overall_max_actual_dates = set()
+    overall_max_optimal_dates = set()
+
+    for snapshot in data['cc_metrics']:
+        snapshot_dt, active_engines, queue_length = snapshot
+        snapshot_date = snapshot_dt.date()
+        optimal_concurrency = active_engines + queue_length
+
+        # Update daily maximums
+        daily_record = daily_maxima[snapshot_date]
+        daily_record['actual'] = max(daily_record['actual'], active_engines)
+        daily_record['optimal'] = max(daily_record['optimal'], optimal_concurrency)
+
+        # Update overall maximums and their dates
+        if daily_record['actual'] > overall_max_actual:
+            overall_max_actual = daily_record['actual']
+            overall_max_actual_dates = {snapshot_date}
+        elif daily_record['actual'] == overall_max_actual:
+            overall_max_actual_dates.add(snapshot_date)
+
+        if daily_record['optimal'] > overall_max_optimal:
+            overall_max_optimal = daily_record['optimal']
+            overall_max_optimal_dates = {snapshot_date}
+        elif daily_record['optimal'] == overall_max_optimal:
+            overall_max_optimal_dates.add(snapshot_date)
+
+    return {
+        'daily_maxima': dict(daily_maxima),
+        'overall_max_actual': overall_max_actual,
+        'overall_max_optimal': overall_max_optimal,
+        'overall_max_actual_dates': overall_max_actual_dates,
+        'overall_max_optimal_dates': overall_max_optimal_dates
+    }
+
+
+# Utilization of each engine server from midnight of first_date to midnight after last_date: the busy time (the union of its
+# engine runs) over the window, overall and per engine_utilization_bucket_seconds bucket (the utilization matrix)
+def compute_engine_server_metrics(data):
+    window_start_ts = datetime.combine(data['first_date'], datetime.min.time()).timestamp()
+    window_end_ts = datetime.combine(data['last_date'] + timedelta(days=1), datetime.min.time()).timestamp()
+    bucket_count = max(1, math.ceil((window_end_ts - window_start_ts) / engine_utilization_bucket_seconds))
+
+    servers = {}
+    utilization_matrix = {}
+    for server_id, server in data['engine_servers'].items():
+        busy_seconds = 0
+        bucket_busy_seconds = [0] * bucket_count
+        for busy_start, busy_end in server['busy_intervals']:
+            busy_start = max(busy_start, window_start_ts)
+            busy_end = min(busy_end, window_end_ts)
+            if busy_end <= busy_start:
+                continue
+            busy_seconds += busy_end - busy_start
+            # spread the interval over the buckets it covers
+            bucket = int((busy_start - window_start_ts) // engine_utilization_bucket_seconds)
+            while bucket < bucket_count and busy_start < busy_end:
+                bucket_end = min(busy_end, window_start_ts + (bucket + 1) * engine_utilization_bucket_seconds)
+                bucket_busy_seconds[bucket] += bucket_end - busy_start
+                busy_start = bucket_end
+                bucket += 1
+
+        metrics = {key: value for key, value in server.items() if key != 'busy_intervals'}
+        metrics['window_busy_seconds'] = busy_seconds
+        metrics['utilization'] = busy_seconds / (window_end_ts - window_start_ts)
+        servers[server_id] = metrics
+        utilization_matrix[server_id] = [busy / engine_utilization_bucket_seconds for busy in bucket_busy_seconds]
+
+    return {
+        'window_seconds': window_end_ts - window_start_ts,
+        'servers': servers,
+        'buckets': [datetime.fromtimestamp(window_start_ts + bucket * engine_utilization_bucket_seconds) for bucket in range(bucket_count)],
+        'utilization_matrix': utilization_matrix
+    }
+
+
+# Per project, the engine time per LOC and per scan of the full and the incremental scans, and the engine time that would be saved
+# by switching the full scans of projects with incremental_full_scans_per_week or more to incremental, keeping one full scan a
+# week. The incremental engine time of a project with fewer than incremental_min_scans incremental scans is estimated from its
+# full scans and the ratio of the average incremental to the average full engine time of the projects that have both.
+def compute_incremental_savings(data):
+    if data['incremental_efficiency'] is None:
+        return None
+    weeks = max(1, ((data['last_date'] - data['first_date']).days + 1) / 7)
+    projects = data['incremental_efficiency']
+
+    both = [project for project in projects if project['full']['scan_count'] and project['incremental']['scan_count'] >= incremental_min_scans]
+    full_avg = sum(project['full']['engine_seconds'] for project in both) / sum(project['full']['scan_count'] for project in both) if both else 0
+    incremental_avg = sum(project['incremental']['engine_seconds'] for project in both) / sum(project['incremental']['scan_count'] for project in both) if both else 0
+    instance_ratio = incremental_avg / full_avg if full_avg else None
+
+    def ratio(part, whole):
+        return part / whole if whole else None
+
+    savings = []
+    for project in projects:
+        full, incremental = project['full'], project['incremental']
+        full_avg_seconds = ratio(full['engine_seconds'], full['scan_count'])
+        incremental_avg_seconds = ratio(incremental['engine_seconds'], incremental['scan_count'])
+        if incremental['scan_count'] >= incremental_min_scans:
+            estimated_incremental_seconds = incremental_avg_seconds
+        elif full_avg_seconds is not None and instance_ratio is not None:
+            estimated_incremental_seconds = full_avg_seconds * instance_ratio
+        else:
+            estimated_incremental_seconds = None
+
+        switchable_scans = 0
+        if full['scan_count'] / weeks >= incremental_full_scans_per_week:
+            switchable_scans = max(0, full['scan_count'] - math.ceil(weeks))
+        saved_seconds = None
+        if estimated_incremental_seconds is not None:
+            saved_seconds = switchable_scans * max(0, full_avg_seconds - estimated_incremental_seconds) if switchable_scans else 0
+
+        savings.append({
+            'name': project['name'],
+            'full': full,
+            'incremental': incremental,
+            'incremental_ratio': incremental['scan_count'] / (full['scan_count'] + incremental['scan_count']),
+            'full_seconds_per_loc': ratio(full['engine_seconds'], full['loc']),
+            'incremental_seconds_per_loc': ratio(incremental['engine_seconds'], incremental['loc']),
+            'full_avg_seconds': full_avg_seconds,
+            'incremental_avg_seconds': incremental_avg_seconds,
+            'time_ratio': ratio(incremental_avg_seconds, full_avg_seconds) if incremental_avg_seconds is not None else None,
+            'full_scans_per_week': full['scan_count'] / weeks,
+            'switchable_scans': switchable_scans,
+            'saved_seconds': saved_seconds
+        })
+    # most engine time saved first, then most full scan engine time
+    savings.sort(key=lambda project: (-(project['saved_seconds'] or 0), -project['full']['engine_seconds'], project['name']))
+
+    return {
+        'weeks': weeks,
+        'instance_ratio': instance_ratio,
+        'projects': savings,
+        'saved_seconds': sum(project['saved_seconds'] or 0 for project in savings)
+    }
+
+
+report_stages = {
+    'scan_totals': {'function': compute_scan_totals, 'inputs': ['scan_stats_by_date', 'first_date', 'last_date']},
+    'duration_totals': {'function': compute_duration_totals, 'inputs': ['size_bins']},
+    'concurrency_maxima': {'function': compute_concurrency_maxima, 'inputs': ['cc_metrics']},
+    'engine_server_metrics': {'function': compute_engine_server_metrics, 'inputs': ['engine_servers', 'first_date', 'last_date']},
+    'incremental_savings': {'function': compute_incremental_savings, 'inputs': ['incremental_efficiency', 'first_date', 'last_date']}
+}
+
+
+# Each report generator receives only its declared inputs and returns the lines to print, plus the CSV header and rows
+# (header is None for reports without a CSV file).
+
+# The 95% confidence interval of an estimate from a --sample run, formatted for the screen; empty for a full analysis
+def confidence_suffix(intervals, name, formatter):
+    interval = intervals.get(name)
+    if interval is None:
+        return ""
+    return f" [95% CI ±{formatter(interval['margin'])}]"
+
+def format_percentage_margin(margin):
+    return f"{margin * 100:.1f}%"
+
+def format_results_margin(margin):
+    return f"{margin:.1f}"
+
+# For a --sample run, add the confidence interval (half width) of the estimate in each CSV row listed in row_estimates
+def add_confidence_column(intervals, header, rows, row_estimates):
+    if not intervals:
+        return
+    header.append('95% CI ±')
+    for row in rows:
+        name = row_estimates.get(row[0])
+        if name in intervals:
+            row.extend([''] * (len(header) - 1 - len(row)))
+            row.append(intervals[name]['margin'])
+
+
+def report_summary_of_scans(inputs):
+    totals = inputs['scan_totals']
+    results = inputs['results']
+    total_scan_count = totals['total_scan_count']
+    full_scan_count = totals['full_scan_count']
+    incremental_scan_count = totals['incremental_scan_count']
+    no_scan_count = totals['no_scan_count']
+    high_results__scan_count = results['high_results__scan_count']
+    medium_results__scan_count = results['medium_results__scan_count']
+    low_results__scan_count = results['low_results__scan_count']
+    info_results__scan_count = results['info_results__scan_count']
+    zero_results__scan_count = results['zero_results__scan_count']
+    intervals = inputs['confidence_intervals']
+
+    lines = [
+        f"\nSummary of Scans ({inputs['first_date']} to {inputs['last_date']})",
+        "-" * 50,
+        f"Total number of scans: {format(total_scan_count, ',')}",
+        f"- Full Scans: {format(full_scan_count, ',')} ({(full_scan_count / total_scan_count) * 100:.1f}%)"
+        f"{confidence_suffix(intervals, 'full_scan_pct', format_percentage_margin)}",
+        f"- Incremental Scans: {format(incremental_scan_count, ',')} ({(incremental_scan_count / total_scan_count) * 100:.1f}%)"
+        f"{confidence_suffix(intervals, 'incremental_scan_pct', format_percentage_margin)}",
+        f"- No Code Change Scans: {format(no_scan_count, ',')} ({(no_scan_count / total_scan_count) * 100:.1f}%)"
+        f"{confidence_suffix(intervals, 'no_scan_pct', format_percentage_margin)}",
+        f"- Scans with High Results: {format(high_results__scan_count, ',')} ({(high_results__scan_count / total_scan_count) * 100:.1f}%)"
+        f"{confidence_suffix(intervals, 'high_results_pct', format_percentage_margin)}",
+        f"- Scans with Medium Results: {format(medium_results__scan_count, ',')} ({(medium_results__scan_count / total_scan_count) * 100:.1f}%)"
+        f"{confidence_suffix(intervals, 'medium_results_pct', format_percentage_margin)}",
+        f"- Scans with Low Results: {format(low_results__scan_count, ',')} ({(low_results__scan_count / total_scan_count) * 100:.1f}%)"
+        f"{confidence_suffix(intervals, 'low_results_pct', format_percentage_margin)}",
+        f"- Scans with Informational Results: {format(info_results__scan_count, ',')} ({(info_results__scan_count / total_scan_count) * 100:.1f}%)"
+        f"{confidence_suffix(intervals, 'info_results_pct', format_percentage_margin)}",
+        f"- Scans with Zero Results: {format(zero_results__scan_count, ',')} ({(zero_results__scan_count / total_scan_count) * 100:.1f}%)"
+        f"{confidence_suffix(intervals, 'zero_results_pct', format_percentage_margin)}",
+        f"- Unique Projects Scanned: {format_distinct_count(inputs['distinct_counts']['projects'])}"
+    ]
+
+    header = ['Description','Value', '%']
+    rows = [
+        ['Start Date',inputs['first_date']],
+        ['End Date',inputs['last_date']],
+        ['Days',totals['total_days']],
+        ['Weeks',totals['total_weeks']],
+        ['Scans Submitted',total_scan_count],
+        ['Full Scans Submitted',full_scan_count,(full_scan_count / total_scan_count)],
+        ['Incremental Scans Submitted',incremental_scan_count,(incremental_scan_count / total_scan_count)],
+        ['No-Change Scans',no_scan_count,(no_scan_count / total_scan_count)],
+        ['Scans with High Results',high_results__scan_count,(high_results__scan_count / total_scan_count)],
+        ['Scans with Medium Results',medium_results__scan_count,(medium_results__scan_count / total_scan_count)],
+        ['Scans with Low Results',low_results__scan_count,(low_results__scan_count / total_scan_count)],
+        ['Scans with Informational Results',info_results__scan_count,(info_results__scan_count / total_scan_count)],
+        ['Scans with Zero Results',zero_results__scan_count,(zero_results__scan_count / total_scan_count)],
+        ['Unique Projects Scanned',inputs['distinct_counts']['projects']['count']]
+    ]
+    add_confidence_column(intervals, header, rows, {
+        'Full Scans Submitted': 'full_scan_pct', 'Incremental Scans Submitted': 'incremental_scan_pct', 'No-Change Scans': 'no_scan_pct',
+        'Scans with High Results': 'high_results_pct', 'Scans with Medium Results': 'medium_results_pct', 'Scans with Low Results': 'low_results_pct',
+        'Scans with Informational Results': 'info_results_pct', 'Scans with Zero Results': 'zero_results_pct'})
+    return lines, header, rows
+
+
+def report_scan_metrics(inputs):
+    totals = inputs['scan_totals']
+    total_scan_count = totals['total_scan_count']
+    yes_scan_count = totals['yes_scan_count']
+    total_scan_days = totals['total_scan_days']
+
+    lines = [
+        "\nScan Metrics",
+        f"- Avg LOC per Scan: {format(round(totals['scan_loc__sum'] / total_scan_count), ',')}",
+        f"- Max LOC per Scan:  {format(round(totals['scan_loc__max']), ',')}",
+        f"- Avg Failed LOC per Scan: {format(round(totals['scan_failed_loc__sum'] / yes_scan_count), ',')}",
+        f"- Max Failed LOC per Scan:  {format(round(totals['scan_failed_loc__max']), ',')}",
+        f"- Avg Daily LOC: {format(round(totals['scan_loc__sum'] / total_scan_days), ',')}",
+        f"- Max Daily LOC: {format(round(totals['date_loc__max']), ',')}"
+    ]
+
+    header = ['Description','Average', 'Max']
+    rows = [
+        ['LOC per Scan',round(totals['scan_loc__sum'] / total_scan_count),round(totals['scan_loc__max'])],
+        ['Failed LOC per Scan',round(totals['scan_failed_loc__sum'] / yes_scan_count),round(totals['scan_failed_loc__max'])],
+        ['Daily LOC',round(totals['scan_loc__sum'] / total_scan_days),round(totals['date_loc__max'])]
+    ]
+    return lines, header, rows
+
+
+def report_scan_duration(inputs):
+    durations = inputs['duration_totals']
+    intervals = inputs['confidence_intervals']
+
+    lines = [
+        "\nScan Duration",
+        f"- Avg Total Scan Duration: {format_seconds_to_hms(durations['total_scan_time__avg'])}"
+        f"{confidence_suffix(intervals, 'total_scan_time__avg', format_seconds_to_hms)}",
+        f"- Max Total Scan Duration: {format_seconds_to_hms(durations['total_scan_time__max'])}",
+        f"- Avg Engine Scan Duration: {format_seconds_to_hms(durations['engine_scan_time__avg'])}"
+        f"{confidence_suffix(intervals, 'engine_scan_time__avg', format_seconds_to_hms)}",
+        f"- Max Engine Scan Duration: {format_seconds_to_hms(durations['engine_scan_time__max'])}",
+        f"- Avg Queued Duration: {format_seconds_to_hms(durations['queue_time__avg'])}"
+        f"{confidence_suffix(intervals, 'queue_time__avg', format_seconds_to_hms)}",
+        f"- Max Queued Scan Duration: {format_seconds_to_hms(durations['queue_time__max'])}",
+        f"- Avg Source Pulling Duration: {format_seconds_to_hms(durations['source_pulling_time__avg'])}"
+        f"{confidence_suffix(intervals, 'source_pulling_time__avg', format_seconds_to_hms)}",
+        f"- Max Source Pulling Duration: {format_seconds_to_hms(durations['source_pulling_time__max'])}"
+    ]
+
+    header = ['Description','Average', 'Max']
+    rows = [
+        ['Total Scan Duration',format_seconds_to_hms(durations['total_scan_time__avg']),format_seconds_to_hms(durations['total_scan_time__max'])],
+        ['Engine Scan Duration',format_seconds_to_hms(durations['engine_scan_time__avg']),format_seconds_to_hms(durations['engine_scan_time__max'])],
+        ['Queued Duration',format_seconds_to_hms(durations['queue_time__avg']),format_seconds_to_hms(durations['queue_time__max'])],
+        ['Source Pulling Duration',format_seconds_to_hms(durations['source_pulling_time__avg']),format_seconds_to_hms(durations['source_pulling_time__max'])]
+    ]
+    add_confidence_column(intervals, header, rows, {
+        'Total Scan Duration': 'total_scan_time__avg', 'Engine Scan Duration': 'engine_scan_time__avg',
+        'Queued Duration': 'queue_time__avg', 'Source Pulling Duration': 'source_pulling_time__avg'})
+    return lines, header, rows
+
+
+def report_scan_results_severity(inputs):
+    results = inputs['results']
+    intervals = inputs['confidence_intervals']
+
+    lines = [
+        "\nScan Results / Severity",
+        f"- Average Total Results: {results['total_vulns__avg']}{confidence_suffix(intervals, 'total_vulns__avg', format_results_margin)}",
+        f"- Max Total Results: {results['total_vulns__max']}",
+        f"- Average High Results: {results['high__avg']}{confidence_suffix(intervals, 'high__avg', format_results_margin)}",
+        f"- Max High Results: {results['high__max']}",
+        f"- Average Medium Results: {results['medium__avg']}{confidence_suffix(intervals, 'medium__avg', format_results_margin)}",
+        f"- Max Medium Results: {results['medium__max']}",
+        f"- Average Low Results: {results['low__avg']}{confidence_suffix(intervals, 'low__avg', format_results_margin)}",
+        f"- Max Low Results: {results['low__max']}",
+        f"- Average Informational Results: {results['info__avg']}{confidence_suffix(intervals, 'info__avg', format_results_margin)}",
+        f"- Max Informational Results: {results['info__max']}"
+    ]
+
+    header = ['Description','Average', 'Max']
+    rows = [
+        ['Total',results['total_vulns__avg'],results['total_vulns__max']],
+        ['High',results['high__avg'],results['high__max']],
+        ['Medium',results['medium__avg'],results['medium__max']],
+        ['Low',results['low__avg'],results['low__max']],
+        ['Informational',results['info__avg'],results['info__max']]
+    ]
+    add_confidence_column(intervals, header, rows, {
+        'Total': 'total_vulns__avg', 'High': 'high__avg', 'Medium': 'medium__avg', 'Low': 'low__avg', 'Informational': 'info__avg'})
+    return lines, header, rows
+
+
+def report_languages(inputs):
+    total_scan_count = inputs['scan_totals']['total_scan_count']
+    lines = ["\nLanguages"]
+    header = ['Language','%', 'Scans']
+    rows = []
+    for language_name, language_count in sorted(inputs['scanned_languages'].items(), key=lambda x: x[1], reverse=True):
+        percentage = language_count / total_scan_count
+        lines.append(f"- {language_name}: {format(language_count, ',')} ({percentage * 100:.1f}%)")
+        rows.append([language_name,percentage,language_count])
+    return lines, header, rows
+
+
+def report_scan_submission_summary(inputs):
+    totals = inputs['scan_totals']
+    total_scan_count = totals['total_scan_count']
+    total_days = totals['total_days']
+    total_weeks = totals['total_weeks']
+    day_of_week_scan_totals = totals['day_of_week_scan_totals']
+
+    lines = [
+        "\nScan Submission Summary",
+        f"- Average Scans Submitted per Week: {format(round(total_scan_count / total_weeks), ',')}",
+        f"- Average Scans Submitted per Day: {format(round(total_scan_count / total_days), ',')}",
+        f"- Average Scans Submitted per Week Day: {format(round(day_of_week_scan_totals['Weekday'] / (total_weeks * 5)), ',')}",
+        f"- Average Scans Submitted per Weekend Day: {format(round(day_of_week_scan_totals['Weekend'] / (total_weeks * 2)), ',')}",
+        f"- Max Daily Scans Submitted: {format(totals['date_max_scan_count'], ',')}",
+        f"- Date of Max Scans: {totals['date_max_scan_date']}"
+    ]
+
+    header = ['Description','Value']
+    rows = [
+        ['Average Scans Submitted per Week',round(total_scan_count / total_weeks)],
+        ['Average Scans Submitted per Day',round(total_scan_count / total_days)],
+        ['Average Scans Submitted per Weekday',round(day_of_week_scan_totals['Weekday'] / (total_weeks * 5))],
+        ['Average Scans Submitted per Weekend Day',round(day_of_week_scan_totals['Weekend'] / (total_weeks * 2))],
+        ['Max Daily Scans Submitted',totals['date_max_scan_count']],
+        ['Date of Max Scans',totals['date_max_scan_date']]
+    ]
+    return lines, header, rows
+
+
+def report_day_of_week_scan_average(inputs):
+    totals = inputs['scan_totals']
+    total_scan_count = totals['total_scan_count']
+    total_weeks = totals['total_weeks']
+    lines = ["\nDay of Week Scan Average"]
+    header = ['Day of Week', 'Scans', '%']
+    rows = []
+    for day_name, total_day_count in totals['day_of_week_scan_totals'].items():
+        if day_name == "Weekday" or day_name == "Weekend":
+            continue
+        percentage = (total_day_count / total_scan_count)
+        lines.append(f"- {day_name}: {format(round(total_day_count / total_weeks), ',')} ({percentage * 100:.1f}%)")
+        rows.append([day_name,round(total_day_count / total_weeks),percentage])
+    return lines, header, rows
+
+
+def report_origins(inputs):
+    total_scan_count = inputs['scan_totals']['total_scan_count']
+    lines = ["\nOrigins"]
+    header = ['Origin', 'Scans', '%']
+    rows = []
+    for origin, origin_count in sorted(inputs['origins'].items(), key=lambda x: x[1], reverse=True):
+        percentage = (origin_count / total_scan_count)
+        lines.append(f"- {origin}: {format(origin_count, ',')} ({percentage * 100:.1f}%)")
+        rows.append([origin,origin_count,percentage])
+    return lines, header, rows
+
+
+def report_presets(inputs):
+    total_scan_count = inputs['scan_totals']['total_scan_count']
+    lines = ["\nPresets"]
+    header = ['Preset', 'Scans', '%']
+    rows = []
+    for preset_name, preset_count in sorted(inputs['preset_names'].items(), key=lambda x: x[1], reverse=True):
+        percentage = (preset_count / total_scan_count)
+        lines.append(f"- {preset_name}: {format(preset_count, ',')} ({percentage * 100:.1f}%)")
+        rows.append([preset_name,preset_count,percentage])
+    return lines, header, rows
+
+
+def report_scan_time_analysis(inputs):
+    total_scan_count = inputs['scan_totals']['total_scan_count']
+    lines = [
+        "\nScan Time Analysis",
+        f"{'LOC Range':<12} {'Scans':<12} {'% Scans':<10} {'Avg Total':<18} {'Avg Src Pulling':<18} {'Avg Queue':<18} "
+        f"{'Avg Engine':<18}"
+    ]
+    header = ['LOC Range','Scans','% Scans','Avg Total Time','Avg Source Pulling Time','Avg Queue Time','Avg Engine Scan Time']
+    rows = []
+
+    # Iterate through the size_bins dictionary to print the per-bin data
+    for bin_key, bin_values in inputs['size_bins'].items():
+        # Format times from seconds to HH:MM:SS
+        source_pulling_time__avg = format_seconds_to_hms(bin_values['source_pulling_time__avg'])
+        queue_time__avg = format_seconds_to_hms(bin_values['queue_time__avg'])
+        engine_scan_time__avg = format_seconds_to_hms(bin_values['engine_scan_time__avg'])
+        total_scan_time__avg = format_seconds_to_hms(bin_values['total_scan_time__avg'])
+        bin_scan_count = bin_values['yes_scan_count'] + bin_values['no_scan_count']
+
+        lines.append(f"{bin_key:<12} {bin_scan_count:<12,} "
+            f"{(math.ceil((10000 * bin_scan_count / total_scan_count)) / 100):<11.2f}"
+            f"{total_scan_time__avg:<18} {source_pulling_time__avg:<18} {queue_time__avg:<18} {engine_scan_time__avg:<18}")
+        rows.append([bin_key,bin_scan_count,
+            math.ceil((10000 * bin_scan_count / total_scan_count)) / 10000,
+            total_scan_time__avg,source_pulling_time__avg,queue_time__avg,engine_scan_time__avg])
+    return lines, header, rows
+
+
+def report_concurrency_analysis(inputs):
+    maxima = inputs['concurrency_maxima']
+    lines = [
+        "\nConcurrency Summary",
+        f"- Overall Peak Actual Concurrency: {maxima['overall_max_actual']} concurrent scans on {', '.join(map(str, maxima['overall_max_actual_dates']))}",
+        f"- Overall Peak Optimal Concurrency: {maxima['overall_max_optimal']} concurrent scans on {', '.join(map(str, maxima['overall_max_optimal_dates']))}"
+    ]
+    header = ['Date', 'Max Actual', 'Max Optimal']
+    rows = [[date, daily['actual'], daily['optimal']] for date, daily in sorted(maxima['daily_maxima'].items())]
+    return lines, header, rows
+
+
+def report_scans_by_date(inputs):
+    rows = [[date, count] for date, count in sorted(inputs['scan_totals']['daily_scan_counts'].items())]
+    return [], ['Date', 'Scans'], rows
+
+
+def report_scans_by_week(inputs):
+    rows = [[week, count] for week, count in sorted(inputs['scan_totals']['weekly_scan_counts'].items())]
+    return [], ['Week', 'Scans'], rows
+
+
+# Distinct counts are exact unless --approximate was used, in which case they are shown with their relative error
+def format_distinct_count(distinct):
+    if distinct['relative_error']:
+        return f"~{format(distinct['count'], ',')} (±{distinct['relative_error'] * 100:.1f}%)"
+    return format(distinct['count'], ',')
+
+
+def report_top_projects(inputs):
+    distinct_counts = inputs['distinct_counts']
+    top_projects = inputs['top_projects']
+    approximate = any(distinct['relative_error'] for distinct in distinct_counts.values())
+
+    lines = [
+        "\nTop Projects" + (" (approximate)" if approximate else ""),
+        f"- Distinct Projects: {format_distinct_count(distinct_counts['projects'])}",
+        f"- Distinct Engine Servers: {format_distinct_count(distinct_counts['engine_servers'])}",
+        f"- Distinct Origins: {format_distinct_count(distinct_counts['origins'])}"
+    ]
+    header = ['Metric', 'Rank', 'Project', 'Value', 'Max Error']
+    rows = [
+        ['Distinct Projects', '', '', distinct_counts['projects']['count'], distinct_counts['projects']['relative_error']],
+        ['Distinct Engine Servers', '', '', distinct_counts['engine_servers']['count'], distinct_counts['engine_servers']['relative_error']],
+        ['Distinct Origins', '', '', distinct_counts['origins']['count'], distinct_counts['origins']['relative_error']]
+    ]
+
+    for metric, title, formatter in (('scans', 'Most Scanned Projects', lambda value: format(value, ',')),
+                                     ('engine_seconds', 'Most Engine Hours', format_seconds_to_hms),
+                                     ('vulnerabilities', 'Most Vulnerabilities (all scans)', lambda value: format(value, ','))):
+        lines.append(f"{title}:")
+        for rank, (project_name, value, error) in enumerate(top_projects[metric], start=1):
+            error_str = f" (±{formatter(error)})" if error else ""
+            lines.append(f"  {rank}. {project_name}: {formatter(value)}{error_str}")
+            rows.append([title, rank, project_name, value, error])
+    return lines, header, rows
+
+
+# Engine servers are usually numbered; sort numbers before names without comparing the two
+def engine_server_order(server_id):
+    return (isinstance(server_id, str), server_id)
+
+
+def report_engine_servers(inputs):
+    metrics = inputs['engine_server_metrics']
+    servers = metrics['servers']
+    lines = [
+        "\nEngine Servers",
+        f"{'Server':<10} {'Scans':<10} {'Busy Time':<12} {'Utilization':<13} {'Peak Scans':<12} {'LOC/Engine Sec':<16} "
+        f"{'Median Engine':<15} {'P90 Engine':<15}"
+    ]
+    header = ['Engine Server','Scans','LOC','Engine Time','Busy Time','Utilization','Peak Concurrent Scans','Overlap Time',
+        'LOC per Engine Second','Min Engine Time','Avg Engine Time','Median Engine Time','P90 Engine Time','P99 Engine Time',
+        'Max Engine Time'] + [f"Engine Time {bin_key}" for bin_key in bins['engine_time'].names]
+    rows = []
+
+    for server_id in sorted(servers, key=engine_server_order):
+        server = servers[server_id]
+        busy_time = format_seconds_to_hms(server['window_busy_seconds'])
+        lines.append(f"{str(server_id):<10} {server['scan_count']:<10,} {busy_time:<12} {server['utilization'] * 100:<13.1f}"
+            f"{server['peak_concurrent_scans']:<12} {server['loc_per_engine_second']:<16.1f}"
+            f"{format_seconds_to_hms(server['duration__p50']):<15} {format_seconds_to_hms(server['duration__p90']):<15}")
+        rows.append([server_id, server['scan_count'], server['loc__sum'], format_seconds_to_hms(server['engine_seconds__sum']), busy_time,
+            round(server['utilization'], 4), server['peak_concurrent_scans'], format_seconds_to_hms(server['overlap_seconds']),
+            round(server['loc_per_engine_second'], 2), format_seconds_to_hms(server['duration__min']),
+            format_seconds_to_hms(server['duration__avg']), format_seconds_to_hms(server['duration__p50']),
+            format_seconds_to_hms(server['duration__p90']), format_seconds_to_hms(server['duration__p99']),
+            format_seconds_to_hms(server['duration__max'])] + list(server['duration_bins'].values()))
+    if not servers:
+        lines.append("- No finished scans with an engine server")
+    return lines, header, rows
+
+
+# The busy fraction of each engine server per time bucket, one row per bucket and one column per server
+def report_engine_utilization(inputs):
+    metrics = inputs['engine_server_metrics']
+    server_ids = sorted(metrics['utilization_matrix'], key=engine_server_order)
+    header = ['Time'] + [f"Engine Server {server_id}" for server_id in server_ids]
+    rows = [[bucket] + [round(metrics['utilization_matrix'][server_id][index], 4) for server_id in server_ids]
+        for index, bucket in enumerate(metrics['buckets'])]
+    return [], header, rows
+
+
+# The groups using the most engine time by preset, language, origin and project. Shares of a total are relative to all scans;
+# a scan of several languages counts for each of them in full in 'Language (full)', so those shares add up to more than 100%.
+def report_cost_attribution(inputs):
+    attribution = inputs['cost_attribution']
+    totals = {metric: sum(group[metric] for group in attribution['preset']) for metric in ('scan_count', 'engine_seconds', 'queue_seconds', 'loc')}
+
+    lines = []
+    header = ['Group By','Rank','Name','Scans','Engine Time','% Engine Time','Queue Time','% Queue Time','LOC','% LOC']
+    rows = []
+    for dimension, title in (('preset', 'Preset'), ('language', 'Language'), ('language_full', 'Language (full)'),
+                             ('origin', 'Origin'), ('project', 'Project')):
+        if dimension not in attribution:
+            continue
+        lines.append(f"\nEngine Time by {title}")
+        for rank, group in enumerate(attribution[dimension], start=1):
+            shares = {metric: group[metric] / totals[metric] if totals[metric] else 0 for metric in totals}
+            if rank <= top_consumers_count:
+                lines.append(f"  {rank}. {group['name']}: {format_seconds_to_hms(group['engine_seconds'])} ({shares['engine_seconds'] * 100:.1f}%), "
+                    f"queue {format_seconds_to_hms(group['queue_seconds'])}, {format(group['scan_count'], ',')} scans, {format(group['loc'], ',')} LOC")
+            rows.append([title, rank, group['name'], group['scan_count'], format_seconds_to_hms(group['engine_seconds']),
+                round(shares['engine_seconds'], 4), format_seconds_to_hms(group['queue_seconds']), round(shares['queue_seconds'], 4),
+                group['loc'], round(shares['loc'], 4)])
+    if 'project' not in attribution:
+        lines.append("- There is no breakdown by project with --approximate; see the top projects report")
+    return lines, header, rows
+
+
+# The queue congestion episodes (more than queue_episode_threshold scans queued for at least queue_episode_min_seconds) with
+# the projects and origins that had the most scans queued during each one
+def report_queue_episodes(inputs):
+    episodes = inputs['queue_episodes']
+    lines = [
+        "\nQueue Congestion Episodes",
+        f"- Episodes with more than {queue_episode_threshold} queued scans for {format_seconds_to_hms(queue_episode_min_seconds)} or longer: {len(episodes)}"
+    ]
+    header = ['Start','End','Duration','Peak Queue','Scan-Seconds Queued','Avg Queue','Top Projects (queued scans)','Top Origins (queued scans)']
+    rows = []
+
+    def format_contributors(contributors):
+        return ', '.join(f"{name} ({scans})" for name, scans, _ in contributors)
+
+    for episode in episodes:
+        duration = episode['end'] - episode['start']
+        rows.append([datetime.fromtimestamp(episode['start']), datetime.fromtimestamp(episode['end']), format_seconds_to_hms(duration),
+            episode['peak_queue'], round(episode['scan_seconds']), round(episode['scan_seconds'] / duration, 1),
+            format_contributors(episode['projects']), format_contributors(episode['origins'])])
+
+    if episodes:
+        lines.append(f"- Total time congested: {format_seconds_to_hms(sum(episode['end'] - episode['start'] for episode in episodes))}")
+        lines.append(f"Worst episodes (by scan-seconds queued):")
+    for episode in sorted(episodes, key=lambda episode: -episode['scan_seconds'])[:queue_episodes_shown]:
+        lines.append(f"  {datetime.fromtimestamp(episode['start']):%Y-%m-%d %H:%M} to {datetime.fromtimestamp(episode['end']):%Y-%m-%d %H:%M} "
+            f"({format_seconds_to_hms(episode['end'] - episode['start'])}): peak {episode['peak_queue']} queued, "
+            f"{format_seconds_to_hms(episode['scan_seconds'])} scan-time queued")
+        lines.append(f"    projects: {format_contributors(episode['projects'])}")
+        lines.append(f"    origins: {format_contributors(episode['origins'])}")
+    return lines, header, rows
+
+
+# The proposed hours of the week for the scheduled scans (see ehc/schedule.py) and the projected effect on the peak concurrency
+# and on the queue time of the CI scans
+def report_schedule_shift(inputs):
+    plan = inputs['schedule_shift']
+    lines = ["\nSchedule Shift for Scheduled Scans"]
+    header = ['Project','Scans','Engine Time','Current Hour','Proposed Hour','Shift (hours)']
+    rows = [[schedule['project'], schedule['scan_count'], format_seconds_to_hms(schedule['engine_seconds']), schedule['from_slot'],
+        schedule['to_slot'], schedule['shift_hours']] for schedule in plan['schedules']]
+
+    if not plan['schedules']:
+        lines.append("- No scheduled scans")
+        return lines, header, rows
+
+    def change(before, after):
+        return f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+
+    busiest = plan['busiest_hour']
+    peak = plan['peak_concurrency']
+    queue_seconds = plan['ci_queue_seconds']
+    lines += [
+        f"- Scheduled scans: {format(plan['scheduled_scan_count'], ',')} in {format(plan['schedule_count'], ',')} schedules (project and hour of the week); "
+        f"{format(plan['moved_schedule_count'], ',')} schedules would move",
+        f"- Busiest hour of the week: {busiest['before']['slot']} with {busiest['before']['concurrency']:.1f} concurrent scans on average, "
+        f"after the shift {busiest['after']['slot']} with {busiest['after']['concurrency']:.1f} ({change(busiest['before']['concurrency'], busiest['after']['concurrency'])})",
+        f"- Peak concurrency (scans started as soon as they are queued): {peak['before']}, after the shift {peak['after']} ({change(peak['before'], peak['after'])})"
+    ]
+    if plan['capacity']:
+        lines.append(f"- Queue time of the {format(plan['ci_scan_count'], ',')} CI scans simulated with {plan['capacity']} engines: {format_seconds_to_hms(queue_seconds['before'])}, "
+            f"after the shift {format_seconds_to_hms(queue_seconds['after'])} ({change(queue_seconds['before'], queue_seconds['after'])}); "
+            f"observed {format_seconds_to_hms(queue_seconds['observed'])}")
+    else:
+        lines.append(f"- Queue time of the {format(plan['ci_scan_count'], ',')} CI scans: observed {format_seconds_to_hms(queue_seconds['observed'])}; "
+            "not simulated, as there are no engine servers in the data (see --schedule-engines)")
+    moved = [schedule for schedule in plan['schedules'] if schedule['shift_hours']]
+    if moved:
+        lines.append("Largest schedules to move (by engine time):")
+    for schedule in moved[:schedule_moves_shown]:
+        lines.append(f"  {schedule['project']}: {schedule['from_slot']} -> {schedule['to_slot']} ({schedule['shift_hours']:+d}h), "
+            f"{format(schedule['scan_count'], ',')} scans, {format_seconds_to_hms(schedule['engine_seconds'])} engine time")
+    return lines, header, rows
+
+
+# The pipeline time (source pulling, queue and total) spent on no-change scans and mostly failed scans, overall and for the
+# projects and origins that waste the most
+def report_wasted_time(inputs):
+    waste = inputs['wasted_time']
+    totals = waste['totals']
+
+    def share(part, whole):
+        return part / whole if whole else 0
+
+    lines = ["\nWasted Pipeline Time"]
+    for category, title in (('no_change', 'No-change scans'), ('failed_loc', f"Scans with {waste_failed_loc_ratio * 100:g}%+ of LOC failed")):
+        sums = totals[category]
+        lines.append(f"- {title}: {format(sums['scan_count'], ',')} ({share(sums['scan_count'], totals['all']['scan_count']) * 100:.1f}% of scans), "
+            f"source pulling {format_seconds_to_hms(sums['pull_seconds'])} ({share(sums['pull_seconds'], totals['all']['pull_seconds']) * 100:.1f}%), "
+            f"queue {format_seconds_to_hms(sums['queue_seconds'])} ({share(sums['queue_seconds'], totals['all']['queue_seconds']) * 100:.1f}%), "
+            f"total {format_seconds_to_hms(sums['total_seconds'])} ({share(sums['total_seconds'], totals['all']['total_seconds']) * 100:.1f}%)")
+
+    header = ['Group By','Rank','Name','Scans','No-Change Scans','% No-Change','No-Change Source Pulling Time','No-Change Queue Time',
+        'No-Change Total Time','Failed LOC Scans','Failed LOC Source Pulling Time','Failed LOC Queue Time','Failed LOC Total Time',
+        'Failed LOC Engine Time','Wasted Time','% Wasted Time']
+    rows = []
+    for dimension, title in (('project', 'Project'), ('origin', 'Origin')):
+        if dimension not in waste:
+            continue
+        lines.append(f"Most wasted time by {title.lower()}:")
+        for rank, group in enumerate(waste[dimension], start=1):
+            all_scans, no_change, failed_loc = group['all'], group['no_change'], group['failed_loc']
+            if rank <= wasted_time_shown:
+                lines.append(f"  {rank}. {group['name']}: {format_seconds_to_hms(group['wasted_seconds'])} "
+                    f"({share(group['wasted_seconds'], all_scans['total_seconds']) * 100:.1f}% of its scan time), "
+                    f"{format(no_change['scan_count'], ',')} of {format(all_scans['scan_count'], ',')} scans no-change "
+                    f"(queue {format_seconds_to_hms(no_change['queue_seconds'])}), {format(failed_loc['scan_count'], ',')} mostly failed")
+            rows.append([title, rank, group['name'], all_scans['scan_count'], no_change['scan_count'],
+                round(share(no_change['scan_count'], all_scans['scan_count']), 4), format_seconds_to_hms(no_change['pull_seconds']),
+                format_seconds_to_hms(no_change['queue_seconds']), format_seconds_to_hms(no_change['total_seconds']), failed_loc['scan_count'],
+                format_seconds_to_hms(failed_loc['pull_seconds']), format_seconds_to_hms(failed_loc['queue_seconds']),
+                format_seconds_to_hms(failed_loc['total_seconds']), format_seconds_to_hms(failed_loc['engine_seconds']),
+                format_seconds_to_hms(group['wasted_seconds']), round(share(group['wasted_seconds'], all_scans['total_seconds']), 4)])
+    if 'project' not in waste:
+        lines.append("- There is no breakdown by project with --approximate")
+    return lines, header, rows
+
+
+# Incremental against full scans per project, ranked by the engine time switching the frequent full scans to incremental would save
+def report_incremental_efficiency(inputs):
+    savings = inputs['incremental_savings']
+    lines = ["\nIncremental Scan Efficiency"]
+    header = ['Rank','Project','Full Scans','Incremental Scans','Incremental Ratio','Full Engine Sec per LOC','Incremental Engine Sec per LOC',
+        'Avg Full Engine Time','Avg Incremental Engine Time','Incremental/Full Engine Time','Full Scans per Week','Switchable Full Scans',
+        'Projected Engine Time Saved']
+    if savings is None:
+        lines.append("- There is no breakdown by project with --approximate")
+        return lines, header, []
+    projects = savings['projects']
+    if not projects:
+        lines.append("- No finished scans")
+        return lines, header, []
+
+    def optional(value, formatter):
+        return formatter(value) if value is not None else ''
+
+    rows = []
+    for rank, project in enumerate(projects, start=1):
+        rows.append([rank, project['name'], project['full']['scan_count'], project['incremental']['scan_count'], round(project['incremental_ratio'], 4),
+            optional(project['full_seconds_per_loc'], lambda value: round(value, 6)), optional(project['incremental_seconds_per_loc'], lambda value: round(value, 6)),
+            optional(project['full_avg_seconds'], format_seconds_to_hms), optional(project['incremental_avg_seconds'], format_seconds_to_hms),
+            optional(project['time_ratio'], lambda value: round(value, 4)), round(project['full_scans_per_week'], 2), project['switchable_scans'],
+            optional(project['saved_seconds'], format_seconds_to_hms)])
+
+    full_scans = sum(project['full']['scan_count'] for project in projects)
+    incremental_scans = sum(project['incremental']['scan_count'] for project in projects)
+    slow = [project for project in projects if project['time_ratio'] is not None and project['incremental']['scan_count'] >= incremental_min_scans
+        and project['full']['scan_count'] and project['time_ratio'] >= incremental_slow_ratio]
+    lines += [
+        f"- Incremental scans: {format(incremental_scans, ',')} of {format(full_scans + incremental_scans, ',')} finished scans "
+        f"({incremental_scans / (full_scans + incremental_scans) * 100:.1f}%)",
+        f"- Average incremental engine time: {savings['instance_ratio'] * 100:.1f}% of a full scan (projects with both)" if savings['instance_ratio'] is not None
+            else "- No project has both full and incremental scans",
+        f"- Projects whose incremental scans take {incremental_slow_ratio * 100:g}% or more of the engine time of a full scan: {format(len(slow), ',')}",
+        f"- Projected engine time saved by switching projects with {incremental_full_scans_per_week}+ full scans a week to incremental "
+        f"(one full scan a week kept): {format_seconds_to_hms(savings['saved_seconds'])}"
+    ]
+    if savings['saved_seconds']:
+        lines.append("Most engine time saved:")
+    for project in [project for project in projects if project['saved_seconds']][:incremental_projects_shown]:
+        lines.append(f"  {project['name']}: {format_seconds_to_hms(project['saved_seconds'])} from {format(project['switchable_scans'], ',')} full scans "
+            f"({project['full_scans_per_week']:.1f} a week, {project['incremental_ratio'] * 100:.0f}% incremental now)")
+    if slow:
+        lines.append("Slowest incremental scans (incremental/full engine time):")
+    for project in sorted(slow, key=lambda project: (-project['time_ratio'], project['name']))[:incremental_projects_shown]:
+        lines.append(f"  {project['name']}: {project['time_ratio'] * 100:.0f}% ({format_seconds_to_hms(project['incremental_avg_seconds'])} against "
+            f"{format_seconds_to_hms(project['full_avg_seconds'])})")
+    return lines, header, rows
+
+
+# The reports in output order. The inputs are keys of the process_file result or names of report_stages; reports that depend
+# on concurrency_inputs (directly or through a stage) are the expensive ones since they need the concurrency sweep, and the ones that
+# depend on 'engine_servers' keep the engine runs of every scan.
+reports = [
+    {'number': 1, 'name': 'summary_of_scans', 'file': '01-summary_of_scans.csv', 'function': report_summary_of_scans,
+        'inputs': ['first_date', 'last_date', 'scan_totals', 'results', 'distinct_counts', 'confidence_intervals']},
+    {'number': 2, 'name': 'scan_metrics', 'file': '02-scan_metrics.csv', 'function': report_scan_metrics,
+        'inputs': ['scan_totals']},
+    {'number': 3, 'name': 'scan_duration', 'file': '03-scan_duration.csv', 'function': report_scan_duration,
+        'inputs': ['duration_totals', 'confidence_intervals']},
+    {'number': 4, 'name': 'scan_results_severity', 'file': '04-scan_results_severity.csv', 'function': report_scan_results_severity,
+        'inputs': ['results', 'confidence_intervals']},
+    {'number': 5, 'name': 'languages', 'file': '05-languages.csv', 'function': report_languages,
+        'inputs': ['scan_totals', 'scanned_languages']},
+    {'number': 6, 'name': 'scan_submission_summary', 'file': '06-scan_submissison_summary.csv', 'function': report_scan_submission_summary,
+        'inputs': ['scan_totals']},
+    {'number': 7, 'name': 'day_of_week_scan_average', 'file': '07-day_of_week_scan_average.csv', 'function': report_day_of_week_scan_average,
+        'inputs': ['scan_totals']},
+    {'number': 8, 'name': 'origins', 'file': '08-origins.csv', 'function': report_origins,
+        'inputs': ['scan_totals', 'origins']},
+    {'number': 9, 'name': 'presets', 'file': '09-presets.csv', 'function': report_presets,
+        'inputs': ['scan_totals', 'preset_names']},
+    {'number': 10, 'name': 'scan_time_analysis', 'file': '10-scan_time_analysis.csv', 'function': report_scan_time_analysis,
+        'inputs': ['scan_totals', 'size_bins']},
+    {'number': 11, 'name': 'concurrency_analysis', 'file': '11-concurrency_analysis.csv', 'function': report_concurrency_analysis,
+        'inputs': ['concurrency_maxima']},
+    {'number': 12, 'name': 'scans_by_date', 'file': '12-scans_by_date.csv', 'function': report_scans_by_date,
+        'inputs': ['scan_totals']},
+    {'number': 13, 'name': 'scans_by_week', 'file': '13-scans_by_week.csv', 'function': report_scans_by_week,
+        'inputs': ['scan_totals']},
+    {'number': 14, 'name': 'top_projects', 'file': '14-top_projects.csv', 'function': report_top_projects,
+        'inputs': ['distinct_counts', 'top_projects']},
+    {'number': 15, 'name': 'engine_servers', 'file': '15-engine_servers.csv', 'function': report_engine_servers,
+        'inputs': ['engine_server_metrics']},
+    {'number': 16, 'name': 'engine_utilization', 'file': '16-engine_utilization.csv', 'function': report_engine_utilization,
+        'inputs': ['engine_server_metrics']},
+    {'number': 17, 'name': 'cost_attribution', 'file': '17-cost_attribution.csv', 'function': report_cost_attribution,
+        'inputs': ['cost_attribution']},
+    {'number': 18, 'name': 'queue_episodes', 'file': '18-queue_episodes.csv', 'function': report_queue_episodes,
+        'inputs': ['queue_episodes']},
+    {'number': 19, 'name': 'schedule_shift', 'file': '19-schedule_shift.csv', 'function': report_schedule_shift,
+        'inputs': ['schedule_shift']},
+    {'number': 20, 'name': 'wasted_time', 'file': '20-wasted_time.csv', 'function': report_wasted_time,
+        'inputs': ['wasted_time']},
+    {'number': 21, 'name': 'incremental_efficiency', 'file': '21-incremental_efficiency.csv', 'function': report_incremental_efficiency,
+        'inputs': ['incremental_savings']}
+]
+
+
+# The scan times broken down by a combination of grouping dimensions (--crosstab), as the scan time analysis is by LOC range. A
+# scan of several languages counts in full for each of them, so the scan shares of a breakdown by language add up to more than 100%.
+def report_crosstab(dimensions, inputs):
+    total_scan_count = inputs['scan_totals']['total_scan_count']
+    titles = [grouping_dimensions[name]['title'] for name in dimensions]
+    lines = [
+        f"\nScan Time Analysis by {' and '.join(titles)}",
+        ' '.join(f"{title:<16}" for title in titles) + f" {'Scans':<12} {'% Scans':<10} {'Avg Total':<18} {'Avg Src Pulling':<18} {'Avg Queue':<18} {'Avg Engine':<18}"
+    ]
+    header = titles + ['Scans','% Scans','No-Change Scans','Avg Total Time','Avg Source Pulling Time','Avg Queue Time','Avg Engine Scan Time',
+        'Max Total Time','Max Source Pulling Time','Max Queue Time','Max Engine Scan Time']
+    rows = []
+    for cell in inputs['crosstabs'][tuple(dimensions)]:
+        scan_count = cell['yes_scan_count'] + cell['no_scan_count']
+        share = math.ceil(10000 * scan_count / total_scan_count) / 10000 if total_scan_count else 0
+        averages = [format_seconds_to_hms(cell[f"{field}__avg"]) for field in BinnedStats.time_fields]
+        lines.append(' '.join(f"{str(value):<16}" for value in cell['key']) + f" {scan_count:<12,} {share * 100:<11.2f}" +
+            ''.join(f"{average:<18} " for average in averages).rstrip())
+        rows.append(list(cell['key']) + [scan_count, share, cell['no_scan_count']] + averages +
+            [format_seconds_to_hms(cell[f"{field}__max"]) for field in BinnedStats.time_fields])
+    return lines, header, rows
+
+
+# Parse a --crosstab value (grouping dimension names, comma separated) into the report for it; it comes after the numbered reports
+def crosstab_report(selection):
+    dimensions = [item.strip().lower() for item in selection.split(',') if item.strip()]
+    if not dimensions:
+        raise ValueError("A cross-tab needs at least one dimension")
+    for name in dimensions:
+        if name not in grouping_dimensions:
+            raise ValueError(f"Unknown cross-tab dimension: {name} (expected {', '.join(grouping_dimensions)})")
+    if len(set(dimensions)) != len(dimensions):
+        raise ValueError(f"A cross-tab dimension is repeated: {selection}")
+    return {'number': None, 'name': f"crosstab_{'_'.join(dimensions)}", 'file': f"crosstab-{'-'.join(dimensions)}.csv",
+        'function': lambda inputs: report_crosstab(dimensions, inputs), 'inputs': ['scan_totals', 'crosstabs'], 'dimensions': tuple(dimensions)}
+
+
+# The process_file results that come from the concurrency sweep
+concurrency_inputs = {'cc_metrics', 'queue_episodes', 'schedule_shift'}
+
+# Whether any of the reports needs the concurrency sweep (and the events it is run over)
+def needs_concurrency(selected_reports):
+    return bool(required_inputs(selected_reports) & concurrency_inputs)
+
+
+# Parse a --reports value (report numbers and/or names, comma separated) into the matching report definitions, in output order
+def select_reports(selection):
+    if not selection:
+        return list(reports)
+    selected = set()
+    for item in selection.split(','):
+        item = item.strip().lower()
+        if not item:
+            continue
+        matches = [report for report in reports if item in (report['name'], report['file'][:-4]) or
+            (item.isdigit() and int(item) == report['number'])]
+        if not matches:
+            raise ValueError(f"Unknown report: {item}")
+        selected.update(report['number'] for report in matches)
+    return [report for report in reports if report['number'] in selected]
+
+
+# The raw process_file keys needed by a set of reports, following the report stages
+def required_inputs(selected_reports):
+    needed = set()
+    for report in selected_reports:
+        for key in report['inputs']:
+            needed.update(report_stages[key]['inputs'] if key in report_stages else [key])
+    return needed
+
+
+def write_csv_report(csv_config, file_name, header, rows):
+    try:
+        filename = os.path.join(csv_config['csv_dir'], file_name)
+        with open(filename, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            writer.writerows(rows)
+    except IOError as e:
+        print(f"IOError when writing to file: {e}")
+    except Exception as e:
+        print(f"Unexpected error when creating/writing to the CSV file: {e}")
+
+
+def generate_report(report, context, csv_config):
+    lines, header, rows = report['function']({key: context[key] for key in report['inputs']})
+    if csv_config['enabled'] and header is not None:
+        write_csv_report(csv_config, report['file'], header, rows)
+        if csv_config.get('parquet', False):
+            write_parquet_report(csv_config, report['file'], header, rows)
+    return lines
+
+
+# Output to the screen as well as create very specific CSVs.
+# The derived stages and then the reports run in a thread pool (the CSV writes are I/O bound); the screen output is still
+# printed in report order.
+# The report context: the data plus the stages the selected reports need, computed in executor if there is one. A stage that
+# fails is left out of the context and its exception returned in errors (stage name -> exception), so only the reports that
+# need it (see failed_stages) are skipped.
+def compute_stages(data, selected_reports, executor=None):
+    context = dict(data)
+    errors = {}
+    stage_names = [name for name in report_stages if any(name in report['inputs'] for report in selected_reports)]
+    if executor is not None:
+        stage_futures = {name: executor.submit(report_stages[name]['function'], data) for name in stage_names}
+    for name in stage_names:
+        try:
+            context[name] = stage_futures[name].result() if executor is not None else report_stages[name]['function'](data)
+        except Exception as e:
+            errors[name] = e
+    return context, errors
+
+# The stages a report needs that failed
+def failed_stages(report, errors):
+    return [name for name in report['inputs'] if name in errors]
+
+
+def output_analysis(data, csv_config, selected_reports=None, max_workers=4):
+    if selected_reports is None:
+        selected_reports = reports
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        context, errors = compute_stages(data, selected_reports, executor)
+        for name, e in errors.items():
+            print(f"\nUnable to compute the {name} data: {e}")
+
+        report_futures = [(report, None if failed_stages(report, errors) else executor.submit(generate_report, report, context, csv_config))
+            for report in selected_reports]
+        for report, future in report_futures:
+            if future is None:
+                print(f"\nSkipped the {report['name']} report, as the {', '.join(failed_stages(report, errors))} data could not be computed")
+                continue
+            try:
+                lines = future.result()
+            except Exception as e:
+                print(f"\nUnable to generate the {report['name']} report: {e}")
+                continue
+            for line in lines:
+                print(line)
+
+    print("")
+    return context
+
+
+# The reports compared side by side when several instances (EHC files) are analyzed at once: each row of the report becomes
+# one row per column, with a column per instance and one for the total of all of them. 'shown' is the number of report rows
+# shown on screen (None for all of them; the CSV has all of them).
+def concurrency_comparison_table(inputs):
+    _, header, rows = report_concurrency_analysis(inputs)
+    maxima = inputs['concurrency_maxima']
+    return header, [['Overall', maxima['overall_max_actual'], maxima['overall_max_optimal']]] + rows
+
+compared_reports = {
+    'summary_of_scans': {'title': 'Summary of Scans', 'shown': None},
+    'scan_duration': {'title': 'Scan Duration', 'shown': None},
+    'scan_time_analysis': {'title': 'Scan Time Analysis', 'shown': None},
+    'concurrency_analysis': {'title': 'Concurrency', 'shown': 1, 'table': concurrency_comparison_table}
+}
+
+
+def format_compared_value(column, value):
+    if value is None or value == '':
+        return '-'
+    if isinstance(value, float):
+        return f"{value * 100:.1f}%" if '%' in column else f"{value:,.2f}"
+    if isinstance(value, int):
+        return format(value, ',')
+    return str(value)
+
+# contexts are the report contexts of the instances (in the order of names) followed by that of the total
+def compare_report(report, names, contexts, csv_config):
+    comparison = compared_reports[report['name']]
+    tables = []
+    for context in contexts:
+        inputs = {key: context[key] for key in report['inputs']}
+        if 'table' in comparison:
+            tables.append(comparison['table'](inputs))
+        else:
+            tables.append(report['function'](inputs)[1:])
+
+    # the rows in the order of the total, which has all of them, then any only an instance has
+    header = tables[-1][0]
+    keys = []
+    cells = {}
+    for index in [len(tables) - 1] + list(range(len(tables) - 1)):
+        table_header, rows = tables[index]
+        for row in rows:
+            if row[0] not in cells:
+                keys.append(row[0])
+                cells[row[0]] = {}
+            for column, value in zip(table_header[1:], row[1:]):
+                cells[row[0]][(column, index)] = value
+
+    compared_header = [header[0], 'Metric'] + names + ['Total']
+    compared_rows = []
+    shown_rows = []
+    for key_index, key in enumerate(keys):
+        for column in header[1:]:
+            values = [cells[key].get((column, index), '') for index in range(len(tables))]
+            if all(value == '' for value in values):
+                continue
+            compared_rows.append([key, column] + values)
+            if comparison['shown'] is None or key_index < comparison['shown']:
+                shown_rows.append([str(key) if column == 'Value' else f"{key} ({column})"] + [format_compared_value(column, value) for value in values])
+
+    label_width = max([len(row[0]) for row in shown_rows] + [len(header[0])])
+    value_width = max([len(value) for row in shown_rows for value in row[1:]] + [len(name) for name in compared_header[2:]])
+    lines = [
+        f"\n{comparison['title']} by Instance",
+        f"{header[0]:<{label_width}}  " + "  ".join(f"{name:>{value_width}}" for name in compared_header[2:])
+    ]
+    for row in shown_rows:
+        lines.append(f"{row[0]:<{label_width}}  " + "  ".join(f"{value:>{value_width}}" for value in row[1:]))
+    if len(shown_rows) < len(compared_rows):
+        lines.append(f"(the CSV has all {format(len(keys), ',')} rows)")
+
+    if csv_config['enabled']:
+        file_name = 'compare-' + report['file']
+        write_csv_report(csv_config, file_name, compared_header, compared_rows)
+        if csv_config.get('parquet', False):
+            write_parquet_report(csv_config, file_name, compared_header, compared_rows)
+    return lines
+
+
+# The command line settings a worker of a multi-instance run needs; a worker started by spawning a new interpreter (rather than
+# forking) imports this module afresh, without them
+def configure_worker(settings):
+    global queue_episode_threshold, queue_episode_min_seconds, schedule_engine_count
+    queue_episode_threshold = settings['queue_episode_threshold']
+    queue_episode_min_seconds = settings['queue_episode_min_seconds']
+    schedule_engine_count = settings['schedule_engine_count']
+    if settings['bins_config']:
+        load_bins_config(settings['bins_config'])
+
+
+# Analyze one instance in a worker process: its reports are written to csv_dir (if enabled) and what comes back is the processor,
+# pickled before it is finished so it can be merged into the total, and the report inputs (the concurrency snapshots, one per
+# second, are left behind once the concurrency maxima have been worked out from them)
+def analyze_instance(file_path, name, options):
+    selected_reports = select_reports(options['reports']) + [crosstab_report(selection) for selection in options['crosstab']]
+    csv_dir = options['csv_dir']
+    full_csv = {
+        'enabled': options['full_data'],
+        'csv_dir': csv_dir,
+        'field_names': field_names_from_context(read_context(file_path)) if options['full_data'] else [],
+        'parquet': options['parquet']
+    }
+    if options['full_data'] or options['csv']:
+        os.makedirs(csv_dir, exist_ok=True)
+
+    quarantine_file = os.path.join(os.getcwd(), f"ehc_quarantine_{name}.jsonl")
+    quarantine = Quarantine(quarantine_file, 0)
+    try:
+        processor = process_file(file_path, full_csv, quarantine, options['concurrency'], options['cc_memory_budget'], options['approximate'],
+            engine_servers=options['engine_servers'], crosstabs=options['crosstabs'], progress=False, finish=False)
+    finally:
+        quarantine.close()
+
+    scan_count = processor.date_stats.yes_scan_count + processor.date_stats.no_scan_count
+    result = {'scan_count': scan_count, 'quarantine_count': quarantine.count, 'quarantine_file': quarantine_file, 'processor': None, 'context': None}
+    if scan_count == 0:
+        return result
+    result['processor'] = pickle.dumps(processor, protocol=pickle.HIGHEST_PROTOCOL)
+
+    # the spilled records now belong to the pickle, which the total is merged from
+    data = processor.finish(cleanup=False)
+    context, errors = compute_stages(data, selected_reports)
+    for stage, e in errors.items():
+        print(f"\nUnable to compute the {stage} data for {name}: {e}")
+    csv_config = {'enabled': options['csv'], 'csv_dir': csv_dir, 'parquet': options['parquet']}
+    for report in selected_reports:
+        if failed_stages(report, errors):
+            continue
+        try:
+            generate_report(report, context, csv_config)
+        except Exception as e:
+            print(f"\nUnable to generate the {report['name']} report for {name}: {e}")
+    result['context'] = {key: context[key] for report in selected_reports for key in report['inputs'] if key in context}
+    return result
+
+
+# Analyze several instances (EHC files) at once, each in a worker process, then merge their processors into a total (no file is
+# read twice), print the reports of the total and compare the instances side by side. Instance reports are written to a
+# directory per instance under csv_dir and those of the total to csv_dir/total. The telemetry progress goes by the instances
+# that have completed (their scans and file sizes).
+def analyze_instances(input_files, names, options, settings, selected_reports, csv_config, workers, report_threads, telemetry=None):
+    print(f"Analyzing {len(input_files)} instances in {min(workers, len(input_files))} processes...")
+    report = telemetry.message if telemetry is not None else print
+    completed = {'scans': 0, 'bytes': 0}
+    if telemetry is not None:
+        telemetry.set_stage("Analyzing instances", lambda: (completed['scans'], completed['bytes']), sum(input_sizes(input_files)))
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=configure_worker, initargs=(settings,)) as executor:
+        futures = {executor.submit(analyze_instance, file_path, name, dict(options, csv_dir=os.path.join(csv_config['csv_dir'], name))): name
+            for file_path, name in zip(input_files, names)}
+        for future in as_completed(futures):
+            name = futures[future]
+            file_path = input_files[names.index(name)]
+            completed['bytes'] += sum(input_sizes([file_path]))
+            try:
+                result = future.result()
+            except (IOError, ValueError) as e:
+                report(f"- {name}: unable to read {file_path}: {e}; it is left out")
+                continue
+            completed['scans'] += result['scan_count']
+            if result['quarantine_count']:
+                report(f"- {name}: {format(result['quarantine_count'], ',')} scans could not be processed and were written to {result['quarantine_file']}")
+            if result['processor'] is None:
+                report(f"- {name}: no scans to analyze; it is left out")
+                continue
+            report(f"- {name}: {format(result['scan_count'], ',')} scans analyzed")
+            results[name] = result
+
+    if telemetry is not None:
+        telemetry.set_stage("Writing reports")
+        telemetry.hide()
+
+    names = [name for name in names if name in results]
+    if not names:
+        return False
+
+    total = None
+    for name in names:
+        processor = pickle.loads(results[name]['processor'])
+        if total is None:
+            total = processor
+        else:
+            # the runs the total didn't take over (records it added again with its own indexes) are no longer needed
+            total.merge(processor)
+            processor.cleanup()
+        results[name]['processor'] = None
+
+    print(f"\nTotal of {len(names)} instances ({', '.join(names)})")
+    total_csv_config = dict(csv_config, csv_dir=os.path.join(csv_config['csv_dir'], 'total'))
+    if total_csv_config['enabled']:
+        os.makedirs(total_csv_config['csv_dir'], exist_ok=True)
+    total_context = output_analysis(total.finish(), total_csv_config, selected_reports, report_threads)
+
+    contexts = [results[name]['context'] for name in names] + [total_context]
+    for report in selected_reports:
+        if report['name'] not in compared_reports:
+            continue
+        try:
+            lines = compare_report(report, names, contexts, csv_config)
+        except Exception as e:
+            print(f"\nUnable to compare the {report['name']} report: {e}")
+            continue
+        for line in lines:
+            print(line)
+    print("")
+    return True
+
+
+# The sizes of the input files on disk (0 for one that can't be read)
+def input_sizes(input_files):
+    sizes = []
+    for file_path in input_files:
+        try:
+            sizes.append(os.path.getsize(file_path))
+        except OSError:
+            sizes.append(0)
+    return sizes
+
+
+# Names for the instances, from their file names (made unique)
+def instance_names(input_files):
+    names = []
+    for file_path in input_files:
+        name = base_name(file_path)
+        candidate = name
+        number = 2
+        while candidate in names or candidate == 'total':
+            candidate = f"{name}-{number}"
+            number += 1
+        names.append(candidate)
+    return names
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process scans and output CSV files if requested.")
+    parser.add_argument("input_files", metavar="input-file", nargs='+', type=str, help="The JSON file containing scan data (optionally .gz, .bz2, .xz or .zst "
+        "compressed). With several files (e.g. the exports of several CxSAST instances), each is analyzed in a process of its own and the "
+        "reports of their total are followed by side-by-side comparisons.")
+    parser.add_argument("--csv", action="store_true", help="Generate CSV output files.")
+    parser.add_argument("--full-data", action="store_true", help="Generate CSV output of complete scan data.")
+    parser.add_argument("--name", type=str, default="", help="Optional name for the output directory")
+    parser.add_argument("--parquet", action="store_true", help="Also write Parquet versions of the --csv and --full-data output (requires pyarrow).")
+    parser.add_argument("--reports", type=str, default="", help="Comma-separated report numbers or names to generate (default: all), "
+        "e.g. 1,3,scan_time_analysis. " + ", ".join(f"{report['number']}={report['name']}" for report in reports))
+    parser.add_argument("--report-threads", type=int, default=4, help="Number of threads used to generate the reports.")
+    parser.add_argument("--cc-memory-mb", type=int, default=cc_event_memory_budget // (1024 * 1024),
+        help=f"Memory (MB) the concurrency events, queue times and engine runs of the scans may use before they are spilled to temporary files (default: {cc_event_memory_budget // (1024 * 1024)}).")
+    parser.add_argument("--queue-threshold", type=int, default=queue_episode_threshold, help=f"Queue congestion episodes are periods with more than this many queued scans (default: {queue_episode_threshold}).")
+    parser.add_argument("--queue-min-minutes", type=float, default=queue_episode_min_seconds / 60, help=f"Minimum length of a queue congestion episode in minutes (default: {queue_episode_min_seconds // 60}).")
+    parser.add_argument("--schedule-engines", type=int, default=schedule_engine_count, help="Engines in the queue simulation of the schedule shift report "
+        "(default: the number of engine servers in the data).")
+    parser.add_argument("--bins-config", type=str, default="", metavar="FILE", help="JSON file with the bins to use for LOC ('loc') and/or "
+        "engine time ('engine_time'), e.g. {\"loc\": {\"bins\": [[100000, \"0 to 100k\"]], \"overflow\": \"100k+\"}}.")
+    parser.add_argument("--crosstab", type=str, action="append", default=[], metavar="DIMENSIONS", help="Also break the scan times down by "
+        "these comma-separated dimensions (e.g. loc,scan_type); can be repeated. Dimensions: " + ", ".join(grouping_dimensions) + ".")
+    parser.add_argument("--approximate", action="store_true", help="Use fixed memory sketches for the distinct counts and top projects (for very large instances).")
+    parser.add_argument("--sample", type=float, default=0, metavar="RATE", help="Analyze a deterministic, stratified sample of this fraction of the scans "
+        "(e.g. 0.05) and scale the results up; averages get 95%% confidence intervals.")
+    parser.add_argument("--checkpoint", action="store_true", help="Save a checkpoint (in the current directory) periodically and when the run is stopped, "
+        "so an interrupted run can be carried on with --resume; it is removed once the run completes.")
+    parser.add_argument("--resume", action="store_true", help="Carry on from the checkpoint of an interrupted run of the same file (and --name); implies --checkpoint.")
+    parser.add_argument("--checkpoint-interval", type=int, default=checkpoint_interval, help=f"Seconds between checkpoints (default: {checkpoint_interval}); 0 turns checkpoints off.")
+    parser.add_argument("--workers", type=int, default=0, help="Processes used to analyze several input files (default: one per file, up to the number of CPUs).")
+    parser.add_argument("--metrics-file", type=str, default="", metavar="FILE", help="Write the progress (throughput, ETA, memory) of the run to this file "
+        "every --telemetry-interval seconds: a Prometheus textfile for a .prom file, otherwise JSON lines.")
+    parser.add_argument("--metrics-format", type=str, choices=metrics_formats, default=None, help="Format of the --metrics-file (default: from its suffix).")
+    parser.add_argument("--telemetry-interval", type=float, default=telemetry_interval, help=f"Seconds between progress samples (default: {telemetry_interval}).")
+
+    args = parser.parse_args()
+    input_file = args.input_files[0]
+    instances = len(args.input_files) > 1
+    output_name = args.name if args.name else ('comparison' if instances else base_name(input_file))
+    queue_episode_threshold = args.queue_threshold
+    queue_episode_min_seconds = args.queue_min_minutes * 60
+    schedule_engine_count = args.schedule_engines
+
+    try:
+        selected_reports = select_reports(args.reports)
+        crosstab_reports = [crosstab_report(selection) for selection in args.crosstab]
+    except ValueError as e:
+        print(e)
+        exit(1)
+    selected_reports += crosstab_reports
+    crosstabs = [report['dimensions'] for report in crosstab_reports]
+
+    if args.bins_config:
+        try:
+            load_bins_config(args.bins_config)
+        except (IOError, ValueError) as e:
+            print(f"Unable to read the bins from {args.bins_config}: {e}")
+            exit(1)
+
+    if args.parquet and not pyarrow_available:
+        print("Parquet output requires pyarrow: 'pip install pyarrow'; only CSV files will be written")
+        args.parquet = False
+
+    # The progress is shown on the terminal (when stderr is one) and, with --metrics-file, written for scheduled and daemon runs
+    telemetry = Telemetry(args.telemetry_interval, True, args.metrics_file or None, args.metrics_format, output_name)
+
+    if instances and (args.sample or args.resume or args.checkpoint):
+        print(f"--{'sample' if args.sample else 'resume' if args.resume else 'checkpoint'} is only available with a single input file")
+        exit(1)
+
+    if args.sample:
+        if not 0 < args.sample <= 1:
+            print("--sample must be a fraction greater than 0 and at most 1")
+            exit(1)
+        if args.full_data:
+            print("--full-data is not available with --sample")
+            exit(1)
+        if needs_concurrency(selected_reports):
+            print("The concurrency analysis is not available with --sample and will be skipped")
+            selected_reports = [report for report in selected_reports if not needs_concurrency([report])]
+        if any('engine_server_metrics' in report['inputs'] for report in selected_reports):
+            print("The engine server analysis is not available with --sample and will be skipped")
+            selected_reports = [report for report in selected_reports if 'engine_server_metrics' not in report['inputs']]
+
+    # define the output directory using the optional name if provided
+    csv_dir = os.path.join(os.getcwd(), f"ehc_output_{output_name}_{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+
+    # create the output directory if we are creating any CSV files
+    if args.full_data or args.csv:
+        try:
+            # Attempt to create the directory
+            os.makedirs(csv_dir, exist_ok=True)
+
+        except PermissionError as e:
+            print(f"Permission Error: {e}")
+            exit(1)
+        except Exception as e:
+            print(f"Error creating directory: {e}")
+            exit(1)
+
+    if instances:
+        csv_config = {
+            'enabled': args.csv,
+            'csv_dir': csv_dir,
+            'parquet': args.parquet
+        }
+        options = {
+            'reports': args.reports,
+            'crosstab': args.crosstab,
+            'crosstabs': crosstabs,
+            'csv': args.csv,
+            'full_data': args.full_data,
+            'parquet': args.parquet,
+            'concurrency': needs_concurrency(selected_reports),
+            'engine_servers': 'engine_servers' in required_inputs(selected_reports),
+            'cc_memory_budget': args.cc_memory_mb * 1024 * 1024,
+            'approximate': args.approximate
+        }
+        settings = {
+            'queue_episode_threshold': queue_episode_threshold,
+            'queue_episode_min_seconds': queue_episode_min_seconds,
+            'schedule_engine_count': schedule_engine_count,
+            'bins_config': args.bins_config
+        }
+        workers = args.workers if args.workers > 0 else min(len(args.input_files), os.cpu_count() or 1)
+        analyzed = analyze_instances(args.input_files, instance_names(args.input_files), options, settings, selected_reports, csv_config, workers,
+            args.report_threads, telemetry)
+        telemetry.stop()
+        if not analyzed:
+            print("None of the input files could be analyzed")
+            exit(1)
+        exit(0)
+
+    if args.sample:
+        csv_config = {
+            'enabled': args.csv,
+            'csv_dir': csv_dir,
+            'parquet': args.parquet
+        }
+        output_analysis(sample_scans(input_file, args.sample, crosstabs), csv_config, selected_reports, args.report_threads)
+        exit(0)
+
+    # define structures to hold output info
+    full_csv = {
+        'enabled': args.full_data,
+        'csv_dir': csv_dir,
+        'field_names': field_names_from_context(read_context(input_file)) if args.full_data else [],
+        'parquet': args.parquet
+    }
+    csv_config = {
+        'enabled': args.csv,
+        'csv_dir': csv_dir,
+        'parquet': args.parquet
+    }
+
+    # the concurrency sweep is only needed (and only run) when a selected report uses it
+    concurrency = needs_concurrency(selected_reports)
+    engine_servers = 'engine_servers' in required_inputs(selected_reports)
+
+    # Checkpoints are only saved when asked for (--checkpoint, or --resume to carry on saving them). The checkpoint and quarantine
+    # files are named after the output, so a resumed run finds them again. The full scan data files are written as the scans are
+    # read and can't be resumed, so there are no checkpoints with --full-data. The records spilled to disk are written next to the
+    # checkpoint (which refers to them) rather than to the temp directory.
+    checkpoint = None
+    if (args.checkpoint or args.resume) and args.checkpoint_interval > 0 and not args.full_data:
+        checkpoint = Checkpoint(os.path.join(os.getcwd(), f".ehc_checkpoint_{output_name}.pickle"), args.checkpoint_interval)
+        if not args.resume:
+            checkpoint.remove()
+        use_spill_directory(checkpoint.runs_dir)
+    elif args.resume:
+        print("--resume needs checkpoints, which are off with --full-data or --checkpoint-interval 0")
+        exit(1)
+
+    resume = None
+    if args.resume:
+        try:
+            resume = checkpoint.load()
+        except Exception as e:
+            print(f"Unable to read the checkpoint: {e}; run without --resume to start over")
+            exit(1)
+        if resume is None:
+            print("No checkpoint found; starting from the beginning")
+        elif resume['input'] != input_signature(input_file):
+            print(f"The checkpoint {checkpoint.path} is for a different (or changed) input file; run without --resume to start over")
+            exit(1)
+        elif resume['processor'].concurrency != concurrency and concurrency:
+            print("The checkpoint was taken without the concurrency analysis; leave out reports 11, 18 and 19 or run without --resume")
+            exit(1)
+        elif resume['processor'].engine_servers != engine_servers and engine_servers:
+            print("The checkpoint was taken without the engine server analysis; leave out reports 15 and 16 or run without --resume")
+            exit(1)
+        elif resume['processor'].loc_bins.bins != {'loc': bins['loc']} or [crosstab.dimensions for crosstab in resume['processor'].crosstabs] != crosstabs:
+            print("The checkpoint was taken with different bins (--bins-config) or cross-tabs (--crosstab); use the same options to resume")
+            exit(1)
+        elif resume['processor'].approximate != args.approximate:
+            print(f"The checkpoint was taken {'with' if resume['processor'].approximate else 'without'} --approximate; use the same option to resume")
+            exit(1)
+        else:
+            print(f"Resuming after {format(resume['scan_count'], ',')} scans")
+
+    quarantine_file = os.path.join(os.getcwd(), f"ehc_quarantine_{output_name}.jsonl")
+    if resume is not None:
+        quarantine = Quarantine(quarantine_file, resume['quarantine_size'], resume['quarantine_count'])
+    else:
+        quarantine = Quarantine(quarantine_file, 0)
+
+    try:
+        processed_data = process_file(input_file, full_csv, quarantine, concurrency, args.cc_memory_mb * 1024 * 1024, args.approximate, checkpoint, resume,
+            engine_servers, crosstabs, telemetry=telemetry)
+    except (IOError, ValueError) as e:
+        telemetry.hide()
+        print(f"\nUnable to read {input_file}: {e}")
+        exit(1)
+    finally:
+        quarantine.close()
+
+    if checkpoint is not None:
+        checkpoint.remove()
+    if quarantine.count:
+        print(f"{format(quarantine.count, ',')} scans could not be processed and were written to {quarantine_file}")
+
+    telemetry.set_stage("Writing reports")
+    output_analysis(processed_data, csv_config, selected_reports, args.report_threads)
+    telemetry.stop()
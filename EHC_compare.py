@@ -0,0 +1,377 @@
+import argparse
+import csv
+import fnmatch
+import json
+import math
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from ehc.fileio import open_input, compression_suffixes
+from ehc.synthetic import write_synthetic_file
+
+# Differential check of the toolkit's engines: runs a reference command and any number of candidate commands (e.g. the
+# single-parse pipeline, the passthrough split, or a new optimized engine) on the same inputs, each in a directory of its own,
+# then compares every file they write (CSV reports cell by cell, JSON exports value by value) within the given tolerances and
+# prints the run time and peak memory of each engine side by side. The exit code is 1 if any engine's output differs.
+#
+# Commands are shell-style strings with these placeholders: {python} (this interpreter), {tools} (the directory of the
+# toolkit), {reference} (the directory of the reference copies of the tools, see ehc/reference) and {input} (the input file,
+# linked into the engine's directory, so tools that write next to their input write there).
+
+tools_dir = os.path.dirname(os.path.abspath(__file__))
+reference_dir = os.path.join(tools_dir, 'ehc', 'reference')
+
+# The built-in suites: the reference copy of a tool as it was before the optimized engines, and the engines that should give
+# the same results. The reference analysis has reports 1 to 13, so the engines write just those.
+reference_reports = '1,2,3,4,5,6,7,8,9,10,11,12,13'
+suites = {
+    'analyze': {
+        'reference': '{python} {reference}/EHC_analyze.py --csv --full-data --name run {input}',
+        'engines': {
+            'analyze': '{python} {tools}/EHC_analyze.py --csv --full-data --name run --reports ' + reference_reports + ' {input}',
+            'pipeline': '{python} {tools}/EHC_pipeline.py --analyze --csv --full-data --name run --reports ' + reference_reports + ' {input}'
+        }
+    },
+    'deviation': {
+        'reference': '{python} {reference}/EHC_scantime_deviation.py --csv-export {input}',
+        'engines': {
+            'deviation': '{python} {tools}/EHC_scantime_deviation.py --csv-export {input}',
+            'pipeline': '{python} {tools}/EHC_pipeline.py --deviation --csv-export {input}'
+        }
+    },
+    'split': {
+        'reference': '{python} {reference}/EHC_split.py {input}',
+        'engines': {
+            'split': '{python} {tools}/EHC_split.py {input}',
+            'passthrough': '{python} {tools}/EHC_split.py --passthrough {input}'
+        }
+    },
+    'merge': {
+        'reference': '{python} {reference}/EHC_merge.py {input} {input} merged.json',
+        'engines': {
+            'merge': '{python} {tools}/EHC_merge.py {input} {input} merged.json',
+            'passthrough': '{python} {tools}/EHC_merge.py --passthrough {input} {input} merged.json'
+        }
+    }
+}
+
+# Output files that are never compared
+ignored_files = ['.ehc_checkpoint_*', 'engine.log']
+output_dir_pattern = re.compile(r'^ehc_output_(.*)_\d{8}-\d{6}$')
+hms_pattern = re.compile(r'^(-?)(\d+):(\d{2}):(\d{2})$')
+differences_shown = 10 # per file
+
+
+def format_seconds(seconds):
+    return f"{seconds:.2f}s"
+
+def format_memory(size):
+    return f"{size / (1024 * 1024):.0f} MB" if size is not None else "n/a"
+
+
+# Run a command in work_dir; returns (exit code, seconds, peak memory in bytes or None where it can't be measured)
+def run_engine(command, input_file, work_dir):
+    link = os.path.join(work_dir, os.path.basename(input_file))
+    try:
+        os.symlink(os.path.abspath(input_file), link)
+    except OSError:
+        shutil.copyfile(input_file, link)
+    arguments = shlex.split(command.format(python=shlex.quote(sys.executable), tools=shlex.quote(tools_dir), reference=shlex.quote(reference_dir),
+        input=shlex.quote(os.path.basename(input_file))))
+
+    with open(os.path.join(work_dir, 'engine.log'), 'wb') as log_file:
+        start = time.perf_counter()
+        process = subprocess.Popen(arguments, cwd=work_dir, stdout=log_file, stderr=subprocess.STDOUT)
+        peak_memory = None
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            # ru_maxrss is in bytes on macOS and in KB elsewhere
+            peak_memory = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+        else:
+            process.wait()
+        seconds = time.perf_counter() - start
+    os.remove(link)
+    return process.returncode, seconds, peak_memory
+
+
+# The files an engine wrote, by a name that doesn't depend on when it ran (the timestamp of ehc_output_ directories is dropped)
+def output_files(work_dir):
+    files = {}
+    for directory, _, names in os.walk(work_dir):
+        for name in names:
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, work_dir)
+            if any(fnmatch.fnmatch(name, pattern) for pattern in ignored_files):
+                continue
+            parts = relative.split(os.sep)
+            match = output_dir_pattern.match(parts[0])
+            if match and len(parts) > 1:
+                parts[0] = f"ehc_output_{match.group(1)}"
+            files['/'.join(parts)] = path
+    return files
+
+
+class Tolerances:
+    def __init__(self, relative, absolute, seconds, per_file):
+        self.relative = relative
+        self.absolute = absolute
+        self.seconds = seconds
+        # [(file pattern, relative tolerance)], the last matching pattern wins
+        self.per_file = per_file
+
+    def relative_for(self, name):
+        relative = self.relative
+        for pattern, value in self.per_file:
+            if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(os.path.basename(name), pattern):
+                relative = value
+        return relative
+
+    def numbers_match(self, a, b, relative, absolute):
+        if a == b or (math.isnan(a) and math.isnan(b)):
+            return True
+        return abs(a - b) <= absolute + relative * max(abs(a), abs(b))
+
+
+def parse_number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def parse_hms(value):
+    match = hms_pattern.match(value)
+    if match is None:
+        return None
+    seconds = int(match.group(2)) * 3600 + int(match.group(3)) * 60 + int(match.group(4))
+    return -seconds if match.group(1) else seconds
+
+def cells_match(a, b, tolerances, relative):
+    if a == b:
+        return True
+    number_a, number_b = parse_number(a), parse_number(b)
+    if number_a is not None and number_b is not None:
+        return tolerances.numbers_match(number_a, number_b, relative, tolerances.absolute)
+    seconds_a, seconds_b = parse_hms(a), parse_hms(b)
+    if seconds_a is not None and seconds_b is not None:
+        return tolerances.numbers_match(seconds_a, seconds_b, relative, tolerances.seconds)
+    return False
+
+# The differences between two CSV files, as descriptions
+def compare_csv(reference_path, path, tolerances, relative):
+    with open(reference_path, newline='', encoding='utf-8') as file:
+        reference_rows = list(csv.reader(file))
+    with open(path, newline='', encoding='utf-8') as file:
+        rows = list(csv.reader(file))
+    differences = []
+    if len(rows) != len(reference_rows):
+        differences.append(f"{len(rows)} rows instead of {len(reference_rows)}")
+    for row_number, (reference_row, row) in enumerate(zip(reference_rows, rows), start=1):
+        if len(row) != len(reference_row):
+            differences.append(f"row {row_number}: {len(row)} columns instead of {len(reference_row)}")
+            continue
+        for column, (reference_cell, cell) in enumerate(zip(reference_row, row)):
+            if not cells_match(reference_cell, cell, tolerances, relative):
+                title = reference_rows[0][column] if reference_rows and column < len(reference_rows[0]) else column + 1
+                differences.append(f"row {row_number}, {title}: {cell!r} instead of {reference_cell!r}")
+    return differences
+
+def compare_values(reference, value, tolerances, relative, path, differences):
+    if isinstance(reference, bool) or isinstance(value, bool) or not isinstance(reference, (int, float)) or not isinstance(value, (int, float)):
+        if type(reference) is not type(value) and not (isinstance(reference, (int, float)) and isinstance(value, (int, float))):
+            differences.append(f"{path or 'top level'}: {value!r} instead of {reference!r}")
+        elif isinstance(reference, dict):
+            for key in sorted(set(reference) | set(value)):
+                if key not in value or key not in reference:
+                    differences.append(f"{path}/{key}: {'missing' if key not in value else 'not in the reference'}")
+                else:
+                    compare_values(reference[key], value[key], tolerances, relative, f"{path}/{key}", differences)
+        elif isinstance(reference, list):
+            if len(reference) != len(value):
+                differences.append(f"{path or 'top level'}: {len(value)} items instead of {len(reference)}")
+            for index, (reference_item, item) in enumerate(zip(reference, value)):
+                compare_values(reference_item, item, tolerances, relative, f"{path}[{index}]", differences)
+        elif reference != value:
+            differences.append(f"{path or 'top level'}: {value!r} instead of {reference!r}")
+    elif not tolerances.numbers_match(float(reference), float(value), relative, tolerances.absolute):
+        differences.append(f"{path}: {value!r} instead of {reference!r}")
+
+def compare_json(reference_path, path, tolerances, relative):
+    with open_input(reference_path) as file:
+        reference = json.load(file)
+    with open_input(path) as file:
+        value = json.load(file)
+    differences = []
+    compare_values(reference, value, tolerances, relative, '', differences)
+    return differences
+
+def compare_bytes(reference_path, path):
+    with open(reference_path, 'rb') as reference_file, open(path, 'rb') as file:
+        while True:
+            reference_chunk = reference_file.read(1024 * 1024)
+            chunk = file.read(1024 * 1024)
+            if reference_chunk != chunk:
+                return ["the contents differ"]
+            if not chunk:
+                return []
+
+def compare_file(name, reference_path, path, tolerances):
+    relative = tolerances.relative_for(name)
+    base = name
+    for suffix in compression_suffixes.values():
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+    if base.endswith('.csv'):
+        return compare_csv(reference_path, path, tolerances, relative)
+    if base.endswith('.json'):
+        return compare_json(reference_path, path, tolerances, relative)
+    return compare_bytes(reference_path, path)
+
+# The differences between the outputs of an engine and the reference, by file
+def compare_outputs(reference_files, files, tolerances):
+    differences = {}
+    for name in sorted(set(reference_files) | set(files)):
+        if name not in files:
+            differences[name] = ["not written"]
+        elif name not in reference_files:
+            differences[name] = ["not written by the reference"]
+        else:
+            try:
+                file_differences = compare_file(name, reference_files[name], files[name], tolerances)
+            except (IOError, ValueError) as e:
+                file_differences = [f"could not be compared: {e}"]
+            if file_differences:
+                differences[name] = file_differences
+    return differences
+
+
+# Run the reference and the engines repeat times each on an input (the fastest run counts) and compare the outputs of the last runs
+def compare_input(input_file, reference, engines, tolerances, repeat, keep):
+    results = []
+    work_dirs = []
+    for name, command in [('reference', reference)] + list(engines.items()):
+        best_seconds = None
+        peak_memory = None
+        for _ in range(repeat):
+            work_dir = tempfile.mkdtemp(prefix=f"ehc_compare_{name}_")
+            work_dirs.append(work_dir)
+            exit_code, seconds, memory = run_engine(command, input_file, work_dir)
+            best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+            if memory is not None:
+                peak_memory = memory if peak_memory is None else max(peak_memory, memory)
+        results.append({'name': name, 'command': command, 'work_dir': work_dir, 'exit_code': exit_code, 'seconds': best_seconds,
+            'peak_memory': peak_memory, 'files': output_files(work_dir)})
+
+    reference_result = results[0]
+    for result in results[1:]:
+        result['differences'] = compare_outputs(reference_result['files'], result['files'], tolerances)
+
+    if not keep:
+        for work_dir in work_dirs:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def print_results(input_file, results, keep):
+    reference = results[0]
+    print(f"\n{input_file}")
+    print(f"{'Engine':<16} {'Exit':<6} {'Time':<12} {'Speedup':<10} {'Peak Memory':<14} {'Files':<7} Result")
+    for result in results:
+        speedup = f"{reference['seconds'] / result['seconds']:.2f}x" if result['seconds'] else "n/a"
+        if result is reference:
+            outcome = "reference"
+        elif result['exit_code'] != 0 or reference['exit_code'] != 0:
+            outcome = "failed" if result['exit_code'] != 0 else "reference failed"
+        elif result['differences']:
+            outcome = f"{len(result['differences'])} files differ"
+        else:
+            outcome = "same"
+        print(f"{result['name']:<16} {result['exit_code']:<6} {format_seconds(result['seconds']):<12} {speedup:<10} "
+            f"{format_memory(result['peak_memory']):<14} {len(result['files']):<7} {outcome}")
+
+    for result in results:
+        if result['exit_code'] != 0:
+            print(f"- {result['name']} exited with {result['exit_code']}; see {os.path.join(result['work_dir'], 'engine.log')}"
+                if keep else f"- {result['name']} exited with {result['exit_code']}; run with --keep to see its log")
+        for name, differences in result.get('differences', {}).items():
+            print(f"- {result['name']}: {name}: {len(differences)} difference{'s' if len(differences) != 1 else ''}")
+            for difference in differences[:differences_shown]:
+                print(f"    {difference}")
+    if keep:
+        for result in results:
+            print(f"- {result['name']} output: {result['work_dir']}")
+
+
+def parse_engine(value):
+    name, separator, command = value.partition('=')
+    if not separator or not name.strip() or not command.strip():
+        raise argparse.ArgumentTypeError(f"expected NAME=COMMAND, got {value!r}")
+    return name.strip(), command.strip()
+
+def parse_tolerance(value):
+    pattern, separator, relative = value.rpartition('=')
+    try:
+        if not separator or not pattern:
+            raise ValueError
+        return pattern, float(relative)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected FILE_PATTERN=RELATIVE_TOLERANCE, got {value!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a reference and candidate engines on the same inputs, compare their outputs and time them.")
+    parser.add_argument("input_files", metavar="input-file", nargs='*', type=str, help="EHC exports to run the engines on (optionally .gz, .bz2, .xz or .zst compressed).")
+    parser.add_argument("--suite", choices=list(suites), default='analyze', help="The built-in reference and engines to start from (default: analyze).")
+    parser.add_argument("--reference", type=str, default=None, metavar="COMMAND", help="Replace the reference command of the suite.")
+    parser.add_argument("--engine", type=parse_engine, action="append", default=[], metavar="NAME=COMMAND", help="Add (or replace) an engine to compare "
+        "with the reference; can be repeated. Placeholders: {python}, {tools}, {reference}, {input}.")
+    parser.add_argument("--only", action="store_true", help="Only compare the --engine engines, not the built-in ones of the suite.")
+    parser.add_argument("--synthetic", type=int, action="append", default=[], metavar="SCANS", help="Also run on a synthetic export of this many scans; can be repeated.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the synthetic exports (default: 1).")
+    parser.add_argument("--rel-tol", type=float, default=0, help="Relative tolerance for numbers (default: 0, i.e. exact).")
+    parser.add_argument("--abs-tol", type=float, default=0, help="Absolute tolerance for numbers (default: 0).")
+    parser.add_argument("--time-tol", type=float, default=0, help="Absolute tolerance in seconds for HH:MM:SS times (default: 0).")
+    parser.add_argument("--tolerance", type=parse_tolerance, action="append", default=[], metavar="FILE_PATTERN=RELATIVE",
+        help="Relative tolerance for the output files matching a pattern, e.g. 14-top_projects.csv=0.02; can be repeated.")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs of each engine per input; the fastest counts (default: 1).")
+    parser.add_argument("--keep", action="store_true", help="Keep the output directories of the engines.")
+    args = parser.parse_args()
+
+    suite = suites[args.suite]
+    reference = args.reference or suite['reference']
+    engines = {} if args.only else dict(suite['engines'])
+    engines.update(args.engine)
+    if not engines:
+        parser.error("no engines to compare; add one with --engine")
+    if not args.input_files and not args.synthetic:
+        parser.error("no inputs; give input files and/or --synthetic")
+
+    synthetic_dir = tempfile.mkdtemp(prefix="ehc_compare_inputs_") if args.synthetic else None
+    input_files = list(args.input_files)
+    for scan_count in args.synthetic:
+        print(f"Generating a synthetic export of {format(scan_count, ',')} scans...", end="", flush=True)
+        input_files.append(write_synthetic_file(os.path.join(synthetic_dir, f"synthetic-{scan_count}.json"), scan_count, args.seed))
+        print("completed!")
+
+    tolerances = Tolerances(args.rel_tol, args.abs_tol, args.time_tol, args.tolerance)
+    failed = False
+    try:
+        for input_file in input_files:
+            if not os.path.exists(input_file):
+                print(f"\n{input_file} not found")
+                failed = True
+                continue
+            results = compare_input(input_file, reference, engines, tolerances, max(1, args.repeat), args.keep)
+            print_results(input_file, results, args.keep)
+            failed = failed or any(result['exit_code'] != 0 or result.get('differences') for result in results)
+    finally:
+        if synthetic_dir is not None and not args.keep:
+            shutil.rmtree(synthetic_dir, ignore_errors=True)
+
+    print("")
+    exit(1 if failed else 0)
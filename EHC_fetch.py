@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+from datetime import datetime
+from urllib.parse import urlsplit
+from ehc.fileio import open_output, compressed_path, compression_suffixes
+from ehc.odata import OdataFetcher, aiohttp_available, default_page_size, default_prefetch, default_connections, default_retries, default_timeout
+from ehc.pipeline import Pipeline
+from ehc.checkpoint import Quarantine
+from ehc.accumulators import cc_event_memory_budget
+from EHC_analyze import ScanProcessor, output_analysis, select_reports, required_inputs, needs_concurrency, reports
+
+# Fetches the scans from the CxSAST OData endpoint into an EHC export file and/or straight into the analysis, without a
+# separately exported file. With --state, each run only fetches the scans added since the previous run.
+
+
+# Writes the fetched scans as an EHC export; the file is written under a temporary name and only renamed once the fetch has
+# completed, so a failed fetch never leaves a truncated export behind
+class ExportWriter:
+    def __init__(self, output_file, compress, fetcher):
+        self.output_file = output_file
+        self.temp_file = output_file + '.part'
+        self.fetcher = fetcher
+        self.file = open_output(self.temp_file, compress)
+        self.count = 0
+
+    def write_header(self):
+        self.file.write('{"@odata.context": ' + json.dumps(self.fetcher.context) + ', "value": [')
+
+    def add(self, scan):
+        if self.count == 0:
+            self.write_header()
+        else:
+            self.file.write(', ')
+        self.file.write(json.dumps(scan))
+        self.count += 1
+
+    def finish(self):
+        if self.count == 0:
+            self.write_header()
+        self.file.write(']}')
+        self.file.close()
+        os.replace(self.temp_file, self.output_file)
+        return self.count
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.remove(self.temp_file)
+        except OSError:
+            pass
+
+
+def load_state(state_file):
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def save_state(state_file, state):
+    temp_file = state_file + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as file:
+        json.dump(state, file, indent=4)
+    os.replace(temp_file, state_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch EHC scan data from the CxSAST OData endpoint.")
+    parser.add_argument("url", type=str, help="The OData service root (e.g. https://cx.example/Cxwebinterface/odata/v1) or its Scans URL.")
+    parser.add_argument("--output", type=str, default="", help="Output JSON file (default: ehc_<host>_<timestamp>.json).")
+    parser.add_argument("--compress", choices=list(compression_suffixes), default=None, help="Compress the output file.")
+    parser.add_argument("--no-output", action="store_true", help="Don't write the scans to a file (use with --analyze or --csv).")
+    parser.add_argument("--token", type=str, default=os.environ.get('EHC_ODATA_TOKEN', ''), help="Bearer token (default: the EHC_ODATA_TOKEN environment variable).")
+    parser.add_argument("--username", type=str, default=os.environ.get('EHC_ODATA_USERNAME', ''), help="User name for basic authentication (default: the EHC_ODATA_USERNAME environment variable).")
+    parser.add_argument("--password", type=str, default=os.environ.get('EHC_ODATA_PASSWORD', ''), help="Password for basic authentication (default: the EHC_ODATA_PASSWORD environment variable).")
+    parser.add_argument("--page-size", type=int, default=default_page_size, help="Scans per request ($top).")
+    parser.add_argument("--prefetch", type=int, default=default_prefetch, help="Number of pages fetched ahead.")
+    parser.add_argument("--connections", type=int, default=default_connections, help="Maximum number of concurrent connections.")
+    parser.add_argument("--retries", type=int, default=default_retries, help="Number of retries of a failed request.")
+    parser.add_argument("--timeout", type=int, default=default_timeout, help="Seconds before a request times out.")
+    parser.add_argument("--since", type=str, default="", help="Only fetch the scans requested on or after this date (YYYY-MM-DD).")
+    parser.add_argument("--after-id", type=int, default=None, help="Only fetch the scans with a greater Id.")
+    parser.add_argument("--state", type=str, default="", help="State file for incremental fetches: only the scans added since the last successful fetch of this URL are fetched.")
+
+    analyze_group = parser.add_argument_group("analysis (EHC_analyze.py)")
+    analyze_group.add_argument("--analyze", action="store_true", help="Analyze the fetched scans and print the reports.")
+    analyze_group.add_argument("--csv", action="store_true", help="Generate CSV output files for the analysis.")
+    analyze_group.add_argument("--name", type=str, default="", help="Optional name for the output directory")
+    analyze_group.add_argument("--reports", type=str, default="", help="Comma-separated report numbers or names to generate (default: all), "
+        "e.g. 1,3,scan_time_analysis. " + ", ".join(f"{report['number']}={report['name']}" for report in reports))
+    analyze_group.add_argument("--report-threads", type=int, default=4, help="Number of threads used to generate the reports.")
+    analyze_group.add_argument("--cc-memory-mb", type=int, default=cc_event_memory_budget // (1024 * 1024),
+        help=f"Memory (MB) the concurrency events, queue times and engine runs of the scans may use before they are spilled to temporary files (default: {cc_event_memory_budget // (1024 * 1024)}).")
+
+    args = parser.parse_args()
+
+    analyze = args.analyze or args.csv
+    if args.no_output and not analyze:
+        parser.error("--no-output needs --analyze or --csv")
+
+    if args.since:
+        try:
+            datetime.strptime(args.since, '%Y-%m-%d')
+        except ValueError:
+            print("Invalid date format for --since; use YYYY-MM-DD")
+            exit(1)
+
+    try:
+        selected_reports = select_reports(args.reports)
+    except ValueError as e:
+        print(e)
+        exit(1)
+
+    state = load_state(args.state) if args.state else {}
+    after_id = args.after_id
+    if after_id is None and args.url in state:
+        after_id = state[args.url]['last_id']
+        print(f"Fetching the scans after Id {after_id} (fetched on {state[args.url]['fetched_on']})")
+
+    if not aiohttp_available:
+        print("Consider installing aiohttp for faster fetching: 'pip install aiohttp'")
+
+    fetcher = OdataFetcher(args.url, args.token, args.username, args.password, args.page_size, args.prefetch, args.connections,
+        args.retries, args.timeout, after_id, args.since)
+    # scans a consumer rejects are written to the quarantine file, as with EHC_analyze.py
+    quarantine_file = os.path.join(os.getcwd(), f"ehc_quarantine_{args.name or urlsplit(args.url).hostname}.jsonl")
+    quarantine = Quarantine(quarantine_file, 0)
+    pipeline = Pipeline(args.url, fetcher.scans(), quarantine=quarantine)
+
+    writer = None
+    if not args.no_output:
+        output_file = args.output if args.output else f"ehc_{urlsplit(args.url).hostname}_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        output_file = compressed_path(output_file, args.compress)
+        try:
+            writer = pipeline.register(ExportWriter(output_file, args.compress, fetcher))
+        except IOError as e:
+            print(f"IOError when writing to file: {e}")
+            exit(1)
+
+    if analyze:
+        output_name = args.name if args.name else urlsplit(args.url).hostname
+        csv_dir = os.path.join(os.getcwd(), f"ehc_output_{output_name}_{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        if args.csv:
+            try:
+                os.makedirs(csv_dir, exist_ok=True)
+            except PermissionError as e:
+                print(f"Permission Error: {e}")
+                exit(1)
+            except Exception as e:
+                print(f"Error creating directory: {e}")
+                exit(1)
+        csv_config = {
+            'enabled': args.csv,
+            'csv_dir': csv_dir,
+            'parquet': False
+        }
+        processor = pipeline.register(ScanProcessor(concurrency=needs_concurrency(selected_reports), cc_memory_budget=args.cc_memory_mb * 1024 * 1024,
+            engine_servers='engine_servers' in required_inputs(selected_reports)))
+
+    try:
+        results = pipeline.run()
+    except (IOError, ValueError) as e:
+        print(f"\nUnable to fetch the scans: {e}")
+        if writer is not None:
+            writer.abort()
+        exit(1)
+    finally:
+        quarantine.close()
+
+    print(f"Fetched {fetcher.scan_count} scans in {fetcher.request_count} requests ({fetcher.retry_count} retried)")
+    if writer is not None:
+        print(f"Scans written to {writer.output_file}")
+    if quarantine.count:
+        print(f"{format(quarantine.count, ',')} scans could not be processed and were written to {quarantine_file}")
+    if args.state:
+        state[args.url] = {'last_id': fetcher.last_id, 'fetched_on': datetime.now().isoformat(timespec='seconds')}
+        save_state(args.state, state)
+
+    if analyze:
+        if fetcher.scan_count:
+            output_analysis(results[pipeline.consumers.index(processor)], csv_config, selected_reports, args.report_threads)
+        else:
+            print("No scans to analyze")
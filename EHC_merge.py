@@ -1,35 +1,54 @@
 import json
 import argparse
+import ijson
+from ehc.fileio import open_input, open_output, read_buffer_size, compressed_path, compression_suffixes, read_context
 
 def combine_scans(file_paths):
     combined_scans = []
     metadata = None
     
     for i, file_path in enumerate(file_paths):
-        with open(file_path, 'r') as file:
-            data = json.load(file)
-            if i == 0:
-                # Capture the metadata from the first file
-                metadata = data.get("@odata.context", None)
-            combined_scans.extend(data["value"])  # Combine the "value" arrays
+        if i == 0:
+            # Capture the metadata from the first file
+            metadata = read_context(file_path)
+        with open_input(file_path) as file:
+            combined_scans.extend(ijson.items(file, 'value.item', buf_size=read_buffer_size, use_float=True))  # Combine the "value" arrays
             
     return metadata, combined_scans
 
+# Passthrough: the scans of each file are copied to the output byte for byte as they are read, so nothing is decoded or held in
+# memory; the metadata comes from the first file
+def combine_scans_raw(file_paths, output_file, compress=None):
+    from ehc.passthrough import RawScanReader, RawScanWriter
+    writer = RawScanWriter(output_file, compress, read_context(file_paths[0]))
+    for file_path in file_paths:
+        for raw, _ in RawScanReader(file_path):
+            writer.add(raw)
+    return writer.finish()
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Combine multiple JSON files into one.')
-    parser.add_argument('input-files', nargs='+', type=str, help='Input JSON files with scan data.')
-    parser.add_argument('output-file', type=str, help='Output JSON file to write combined data.')
+    parser.add_argument('input_files', metavar='input-files', nargs='+', type=str, help='Input JSON files with scan data (optionally .gz, .bz2, .xz or .zst compressed).')
+    parser.add_argument('output_file', metavar='output-file', type=str, help='Output JSON file to write combined data (compressed if it ends with .gz, .bz2, .xz or .zst).')
+    parser.add_argument('--compress', choices=list(compression_suffixes), default=None, help='Compress the output file.')
+    parser.add_argument('--passthrough', action='store_true', help='Copy the scans as they are in the inputs (much faster; not re-indented).')
     args = parser.parse_args()
 
+    output_file = compressed_path(args.output_file, args.compress)
+    if args.passthrough:
+        combine_scans_raw(args.input_files, output_file, args.compress)
+        print(f"Combined output written to {output_file}")
+        exit(0)
+
     # Combine the scans from the input files
     metadata, combined_scans = combine_scans(args.input_files)
 
     # Output the combined data to a file
-    with open(args.output_file, 'w') as output_file:
+    with open_output(output_file, args.compress) as output:
         # Write the metadata and combined scans
         json.dump({
             "@odata.context": metadata,
             "value": combined_scans
-        }, output_file, indent=4)
+        }, output, indent=4)
     
-    print(f"Combined output written to {args.output_file}")
+    print(f"Combined output written to {output_file}")
@@ -0,0 +1,132 @@
+import argparse
+import os
+from datetime import datetime
+from ehc.fileio import base_name, read_context, field_names_from_context, compression_suffixes
+from ehc.checkpoint import Quarantine
+from ehc.pipeline import Pipeline
+from ehc.telemetry import Telemetry, metrics_formats, telemetry_interval
+from ehc.accumulators import DeviationTracker, cc_event_memory_budget
+from EHC_analyze import ScanProcessor, open_full_data_writers, output_analysis, select_reports, required_inputs, needs_concurrency, reports, pyarrow_available
+from EHC_scantime_deviation import parse_time_to_seconds, output_deviations
+from EHC_project_filter import ProjectFilter
+from EHC_split import TimeWindowSplitter
+
+# Runs any combination of the analysis, scan time deviation, project filter and split tools over a single parse of the input file
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run several EHC tools over a single parse of the input file.")
+    parser.add_argument("input_file", metavar="input-file", type=str, help="The JSON file containing scan data (optionally .gz, .bz2, .xz or .zst compressed).")
+
+    analyze_group = parser.add_argument_group("analysis (EHC_analyze.py)")
+    analyze_group.add_argument("--analyze", action="store_true", help="Run the analysis and print the reports.")
+    analyze_group.add_argument("--csv", action="store_true", help="Generate CSV output files for the analysis.")
+    analyze_group.add_argument("--full-data", action="store_true", help="Generate CSV output of complete scan data.")
+    analyze_group.add_argument("--name", type=str, default="", help="Optional name for the output directory")
+    analyze_group.add_argument("--parquet", action="store_true", help="Also write Parquet versions of the --csv and --full-data output (requires pyarrow).")
+    analyze_group.add_argument("--reports", type=str, default="", help="Comma-separated report numbers or names to generate (default: all), "
+        "e.g. 1,3,scan_time_analysis. " + ", ".join(f"{report['number']}={report['name']}" for report in reports))
+    analyze_group.add_argument("--report-threads", type=int, default=4, help="Number of threads used to generate the reports.")
+    analyze_group.add_argument("--cc-memory-mb", type=int, default=cc_event_memory_budget // (1024 * 1024),
+        help=f"Memory (MB) the concurrency events, queue times and engine runs of the scans may use before they are spilled to temporary files (default: {cc_event_memory_budget // (1024 * 1024)}).")
+    analyze_group.add_argument("--approximate", action="store_true", help="Use fixed memory sketches for the distinct counts, top projects and deviation project count.")
+
+    deviation_group = parser.add_argument_group("scan time deviation (EHC_scantime_deviation.py)")
+    deviation_group.add_argument("--deviation", action="store_true", help="Find deviations in scan times.")
+    deviation_group.add_argument("--min-deviation-percentage", type=int, default=500, help="Deviation percentage threshold.")
+    deviation_group.add_argument("--min-deviation-time", type=str, default="5m", help="Minimum deviation time.")
+    deviation_group.add_argument("--csv-export", action="store_true", help="Export the deviations to CSV.")
+    deviation_group.add_argument("--incremental", action="store_true", help="Include incremental scans.")
+
+    output_group = parser.add_argument_group("filter and split (EHC_project_filter.py, EHC_split.py)")
+    output_group.add_argument("--filter-project", action="append", default=[], help="Project name to filter the scans by; may be repeated.")
+    output_group.add_argument("--split", action="store_true", help="Split the scans into three 30 day parts.")
+    output_group.add_argument("--compress", choices=list(compression_suffixes), default=None, help="Compress the filtered and split output files.")
+
+    telemetry_group = parser.add_argument_group("progress")
+    telemetry_group.add_argument("--metrics-file", type=str, default="", metavar="FILE", help="Write the progress (throughput, ETA, memory) of the run to "
+        "this file every --telemetry-interval seconds: a Prometheus textfile for a .prom file, otherwise JSON lines.")
+    telemetry_group.add_argument("--metrics-format", type=str, choices=metrics_formats, default=None, help="Format of the --metrics-file (default: from its suffix).")
+    telemetry_group.add_argument("--telemetry-interval", type=float, default=telemetry_interval, help=f"Seconds between progress samples (default: {telemetry_interval}).")
+
+    args = parser.parse_args()
+    input_file = args.input_file
+
+    if not (args.analyze or args.csv or args.full_data or args.deviation or args.filter_project or args.split):
+        parser.error("nothing to do; select at least one of --analyze, --csv, --full-data, --deviation, --filter-project or --split")
+
+    try:
+        selected_reports = select_reports(args.reports)
+    except ValueError as e:
+        print(e)
+        exit(1)
+
+    min_deviation_time_seconds = parse_time_to_seconds(args.min_deviation_time)
+    if args.deviation and min_deviation_time_seconds is None:
+        print("Invalid time format for --min-deviation-time")
+        exit(1)
+
+    if args.parquet and not pyarrow_available:
+        print("Parquet output requires pyarrow: 'pip install pyarrow'; only CSV files will be written")
+        args.parquet = False
+
+    telemetry = Telemetry(args.telemetry_interval, True, args.metrics_file or None, args.metrics_format, args.name or base_name(input_file))
+    # scans a consumer rejects are written to the quarantine file, as with EHC_analyze.py
+    quarantine_file = os.path.join(os.getcwd(), f"ehc_quarantine_{args.name or base_name(input_file)}.jsonl")
+    quarantine = Quarantine(quarantine_file, 0)
+    pipeline = Pipeline(input_file, telemetry=telemetry, quarantine=quarantine)
+
+    # --csv implies the analysis; --full-data alone only writes the scan data
+    analyze = args.analyze or args.csv
+    if analyze or args.full_data:
+        output_name = args.name if args.name else base_name(input_file)
+        csv_dir = os.path.join(os.getcwd(), f"ehc_output_{output_name}_{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        if args.full_data or args.csv:
+            try:
+                os.makedirs(csv_dir, exist_ok=True)
+            except PermissionError as e:
+                print(f"Permission Error: {e}")
+                exit(1)
+            except Exception as e:
+                print(f"Error creating directory: {e}")
+                exit(1)
+
+        full_csv = {
+            'enabled': args.full_data,
+            'csv_dir': csv_dir,
+            'field_names': field_names_from_context(read_context(input_file)) if args.full_data else [],
+            'parquet': args.parquet
+        }
+        csv_config = {
+            'enabled': args.csv,
+            'csv_dir': csv_dir,
+            'parquet': args.parquet
+        }
+        # The full scan data writers go first so they see every scan, as in EHC_analyze.py
+        for writer in open_full_data_writers(full_csv):
+            pipeline.register(writer)
+
+    if analyze:
+        processor = pipeline.register(ScanProcessor(concurrency=needs_concurrency(selected_reports), cc_memory_budget=args.cc_memory_mb * 1024 * 1024, approximate=args.approximate,
+            engine_servers='engine_servers' in required_inputs(selected_reports)))
+    if args.deviation:
+        tracker = pipeline.register(DeviationTracker(min_deviation_time_seconds, args.min_deviation_percentage, args.incremental, args.approximate))
+    for project_name in args.filter_project:
+        pipeline.register(ProjectFilter(input_file, project_name, args.compress))
+    if args.split:
+        pipeline.register(TimeWindowSplitter(input_file, args.compress))
+
+    try:
+        results = pipeline.run()
+    finally:
+        quarantine.close()
+    if quarantine.count:
+        print(f"{format(quarantine.count, ',')} scans could not be processed and were written to {quarantine_file}")
+
+    telemetry.set_stage("Writing reports")
+    if analyze:
+        output_analysis(results[pipeline.consumers.index(processor)], csv_config, selected_reports, args.report_threads)
+    if args.deviation:
+        deviations, total_projects = results[pipeline.consumers.index(tracker)]
+        output_deviations(deviations, total_projects, input_file, args.csv_export, args.min_deviation_time, args.min_deviation_percentage)
+
+    telemetry.stop()
@@ -1,40 +1,76 @@
-import ijson
-import sys
-import json
-import argparse
-
-def filter_scans(input_file, project_name):
-    filtered_scans = []
-
-    with open(input_file, 'rb') as f:
-        scans = ijson.items(f, 'value.item')
-
-        for scan in scans:
-            if scan.get('ProjectName') == project_name:
-                filtered_scans.append(scan)
-
-    return filtered_scans
-
-if __name__ == "__main__":
-    # Command line argument parsing
-    parser = argparse.ArgumentParser(description="Filter scans by project name.")
-    parser.add_argument("input-file", help="Path to the input JSON file containing scan data.")
-    parser.add_argument("--filter-project", required=True, help="Project name to filter the scans by.")
-    
-    args = parser.parse_args()
-
-    # Filter scans
-    filtered_data = filter_scans(args.input_file, args.filter_project)
-
-    output_file = f"filtered-{args.filter_project}-{args.input_file}"
-    with open(args.input_file, 'r') as in_f, open(output_file, 'w') as out_f:
-        # Read the original file content
-        json_content = json.load(in_f)
-        
-        # Replace the 'value' key with the filtered data
-        json_content["value"] = filtered_data
-
-        # Dump the updated structure to the output file
-        json.dump(json_content, out_f, indent=4)
-
-    print(f"Filtered data written to: {output_file}")
+import ijson
+import sys
+import json
+import os
+import argparse
+from ehc.fileio import open_input, open_output, read_buffer_size, compressed_path, strip_compression_suffix, compression_suffixes, read_context
+
+# The output file for a project: filtered-{project}-{name} next to the input
+def filtered_output_path(input_file, project_name, compress=None):
+    input_dir, input_name = os.path.split(strip_compression_suffix(input_file))
+    return compressed_path(os.path.join(input_dir, f"filtered-{project_name}-{input_name}"), compress)
+
+# Collects the scans of one project; finish() writes them next to the input as filtered-{project}-{name}
+class ProjectFilter:
+    def __init__(self, input_file, project_name, compress=None):
+        self.input_file = input_file
+        self.project_name = project_name
+        self.compress = compress
+        self.filtered_scans = []
+
+    def add(self, scan):
+        if scan.get('ProjectName') == self.project_name:
+            self.filtered_scans.append(scan)
+
+    def finish(self):
+        output_file = filtered_output_path(self.input_file, self.project_name, self.compress)
+        with open_output(output_file, self.compress) as out_f:
+            # Keep the original context and replace the 'value' key with the filtered data
+            json_content = {
+                "@odata.context": read_context(self.input_file),
+                "value": self.filtered_scans
+            }
+
+            # Dump the updated structure to the output file
+            json.dump(json_content, out_f, indent=4)
+
+        print(f"Filtered data written to: {output_file}")
+        return output_file
+
+def filter_scans(input_file, project_name, compress=None):
+    project_filter = ProjectFilter(input_file, project_name, compress)
+
+    with open_input(input_file) as f:
+        for scan in ijson.items(f, 'value.item', buf_size=read_buffer_size, use_float=True):
+            project_filter.add(scan)
+
+    return project_filter.finish()
+
+# Passthrough: the scans of the project are copied from the input byte for byte, without decoding and encoding them again
+# (only ProjectName is decoded), and written as they are found rather than collected first
+def filter_scans_raw(input_file, project_name, compress=None):
+    from ehc.passthrough import RawScanReader, RawScanWriter
+    writer = RawScanWriter(filtered_output_path(input_file, project_name, compress), compress, read_context(input_file))
+    for raw, fields in RawScanReader(input_file, ('ProjectName',)):
+        if fields.get('ProjectName') == project_name:
+            writer.add(raw)
+    output_file = writer.finish()
+
+    print(f"Filtered data written to: {output_file}")
+    return output_file
+
+if __name__ == "__main__":
+    # Command line argument parsing
+    parser = argparse.ArgumentParser(description="Filter scans by project name.")
+    parser.add_argument("input_file", metavar="input-file", help="Path to the input JSON file containing scan data (optionally .gz, .bz2, .xz or .zst compressed).")
+    parser.add_argument("--filter-project", required=True, help="Project name to filter the scans by.")
+    parser.add_argument("--compress", choices=list(compression_suffixes), default=None, help="Compress the output file.")
+    parser.add_argument("--passthrough", action="store_true", help="Copy the matching scans as they are in the input (much faster; not re-indented).")
+
+    args = parser.parse_args()
+
+    # Filter scans and write the output file
+    if args.passthrough:
+        filter_scans_raw(args.input_file, args.filter_project, args.compress)
+    else:
+        filter_scans(args.input_file, args.filter_project, args.compress)
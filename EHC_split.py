@@ -1,69 +1,109 @@
-import json
-import argparse
-import datetime
-import os
-
-def parse_date(date_string):
-    formats = [
-        '%Y-%m-%dT%H:%M:%S.%fZ',           # Format with 'Z' at the end with milliseconds
-        '%Y-%m-%dT%H:%M:%S.%f%z',          # Format with timezone offset with milliseconds
-        '%Y-%m-%dT%H:%M:%SZ',              # Format with 'Z' at the end without milliseconds
-        '%Y-%m-%dT%H:%M:%S%z'              # Format with timezone offset without milliseconds
-    ]
-
-    for date_format in formats:
-        try:
-            return datetime.datetime.strptime(date_string, date_format).date()
-        except ValueError:
-            continue
-
-    raise ValueError(f"Unknown date format for string {date_string}")
-
-def split_scans(file_path):
-    with open(file_path, 'r') as file:
-        data = json.load(file)
-        all_scans = data["value"]
-        
-        start_date = parse_date(all_scans[0]['ScanRequestedOn'])
-        end_date_1 = start_date + datetime.timedelta(days=30)
-        end_date_2 = end_date_1 + datetime.timedelta(days=30)
-
-        part1 = []
-        part2 = []
-        part3 = []
-
-        for scan in all_scans:
-            current_date = parse_date(scan['ScanRequestedOn'])
-            if current_date < end_date_1:
-                part1.append(scan)
-            elif current_date < end_date_2:
-                part2.append(scan)
-            else:
-                part3.append(scan)
-
-    return part1, part2, part3
-
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description='Split scans into three parts based on dates.')
-    parser.add_argument('input-file', type=str, help='Input JSON file with scan data.')
-    args = parser.parse_args()
-
-    # Split the scans into three parts based on date
-    part1, part2, part3 = split_scans(args.input_file)
-
-    # Generate filenames
-    base_path, filename = os.path.split(args.input_file)
-    base_filename, _ = os.path.splitext(filename)
-    output_filename1 = os.path.join(base_path, f"{base_filename}-part1.json")
-    output_filename2 = os.path.join(base_path, f"{base_filename}-part2.json")
-    output_filename3 = os.path.join(base_path, f"{base_filename}-part3.json")
-
-    # Output the split data to files
-    with open(output_filename1, 'w') as file:
-        json.dump({"value": part1}, file)
-    with open(output_filename2, 'w') as file:
-        json.dump({"value": part2}, file)
-    with open(output_filename3, 'w') as file:
-        json.dump({"value": part3}, file)
-
-    print(f"Output written to:\n{output_filename1}\n{output_filename2}\n{output_filename3}")
+import json
+import argparse
+import datetime
+import os
+import ijson
+from ehc.fileio import open_input, open_output, read_buffer_size, compressed_path, base_name, compression_suffixes
+
+def parse_date(date_string):
+    formats = [
+        '%Y-%m-%dT%H:%M:%S.%fZ',           # Format with 'Z' at the end with milliseconds
+        '%Y-%m-%dT%H:%M:%S.%f%z',          # Format with timezone offset with milliseconds
+        '%Y-%m-%dT%H:%M:%SZ',              # Format with 'Z' at the end without milliseconds
+        '%Y-%m-%dT%H:%M:%S%z'              # Format with timezone offset without milliseconds
+    ]
+
+    for date_format in formats:
+        try:
+            return datetime.datetime.strptime(date_string, date_format).date()
+        except ValueError:
+            continue
+
+    raise ValueError(f"Unknown date format for string {date_string}")
+
+# Splits the scans into three 30 day parts starting from the date of the first scan. Each scan is written to its part's
+# file as it arrives, so the parts are never held in memory. With passthrough=True the scans are raw items from RawScanReader,
+# added with add_raw() and copied to the parts as they are.
+class TimeWindowSplitter:
+    def __init__(self, input_file, compress=None, passthrough=False):
+        base_path = os.path.dirname(input_file)
+        base_filename = base_name(input_file)
+        self.output_filenames = [compressed_path(os.path.join(base_path, f"{base_filename}-part{part}.json"), compress) for part in (1, 2, 3)]
+        self.passthrough = passthrough
+        self.counts = [0, 0, 0]
+        self.start_date = None
+        if passthrough:
+            from ehc.passthrough import RawScanWriter
+            self.files = [RawScanWriter(output_filename, compress) for output_filename in self.output_filenames]
+            return
+        self.files = [open_output(output_filename, compress) for output_filename in self.output_filenames]
+        for file in self.files:
+            file.write('{"value": [')
+
+    def part_of(self, scan_requested_on):
+        current_date = parse_date(scan_requested_on)
+        # the parts start from the date of the first scan
+        if self.start_date is None:
+            self.start_date = current_date
+            self.end_date_1 = self.start_date + datetime.timedelta(days=30)
+            self.end_date_2 = self.end_date_1 + datetime.timedelta(days=30)
+
+        if current_date < self.end_date_1:
+            part = 0
+        elif current_date < self.end_date_2:
+            part = 1
+        else:
+            part = 2
+        return part
+
+    def add(self, scan):
+        part = self.part_of(scan['ScanRequestedOn'])
+
+        # Same layout json.dump({"value": [...]}) produces
+        if self.counts[part]:
+            self.files[part].write(', ')
+        self.files[part].write(json.dumps(scan))
+        self.counts[part] += 1
+
+    def add_raw(self, raw, fields):
+        self.files[self.part_of(fields['ScanRequestedOn'])].add(raw)
+
+    def finish(self):
+        for file in self.files:
+            if self.passthrough:
+                file.finish()
+                continue
+            file.write(']}')
+            file.close()
+        print("Output written to:\n" + "\n".join(self.output_filenames))
+        return self.output_filenames
+
+def split_scans(file_path, compress=None):
+    splitter = TimeWindowSplitter(file_path, compress)
+
+    with open_input(file_path) as file:
+        for scan in ijson.items(file, 'value.item', buf_size=read_buffer_size, use_float=True):
+            splitter.add(scan)
+
+    return splitter.finish()
+
+# Passthrough: only ScanRequestedOn is decoded and the scans are copied to the parts byte for byte
+def split_scans_raw(file_path, compress=None):
+    from ehc.passthrough import RawScanReader
+    splitter = TimeWindowSplitter(file_path, compress, passthrough=True)
+    for raw, fields in RawScanReader(file_path, ('ScanRequestedOn',)):
+        splitter.add_raw(raw, fields)
+    return splitter.finish()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Split scans into three parts based on dates.')
+    parser.add_argument('input_file', metavar='input-file', type=str, help='Input JSON file with scan data (optionally .gz, .bz2, .xz or .zst compressed).')
+    parser.add_argument('--compress', choices=list(compression_suffixes), default=None, help='Compress the output files.')
+    parser.add_argument('--passthrough', action='store_true', help='Copy the scans as they are in the input (much faster).')
+    args = parser.parse_args()
+
+    # Split the scans into three parts based on date and write them out
+    if args.passthrough:
+        split_scans_raw(args.input_file, args.compress)
+    else:
+        split_scans(args.input_file, args.compress)
@@ -0,0 +1,490 @@
+import argparse
+import csv
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+import ijson
+from dateutil.parser import parse as parse_date
+from ehc.fileio import open_input, read_buffer_size, read_context, field_names_from_context, strip_compression_suffix
+
+# Rows are buffered and handed to executemany() in batches; a transaction is committed every commit_batches batches
+default_batch_size = 50000
+default_commit_batches = 10
+
+# Columns that the report views rely on; they are always created even if the export's @odata.context omits them
+required_fields = ['Id', 'ProjectId', 'ProjectName', 'ScanRequestedOn', 'QueuedOn', 'EngineStartedOn', 'EngineFinishedOn',
+    'ScanCompletedOn', 'LOC', 'FailedLOC', 'IsIncremental', 'PresetName', 'Origin', 'EngineServerId',
+    'TotalVulnerabilities', 'High', 'Medium', 'Low', 'Info']
+
+field_types = {
+    'Id': 'INTEGER', 'ProjectId': 'INTEGER', 'ProjectName': 'TEXT', 'ScanRequestedOn': 'TEXT', 'QueuedOn': 'TEXT',
+    'EngineStartedOn': 'TEXT', 'EngineFinishedOn': 'TEXT', 'ScanCompletedOn': 'TEXT', 'LOC': 'INTEGER',
+    'FailedLOC': 'INTEGER', 'IsIncremental': 'INTEGER', 'PresetName': 'TEXT', 'Origin': 'TEXT',
+    'EngineServerId': 'INTEGER', 'TotalVulnerabilities': 'INTEGER', 'High': 'INTEGER', 'Medium': 'INTEGER',
+    'Low': 'INTEGER', 'Info': 'INTEGER'
+}
+
+# Values derived at load time so that the views do not have to parse timestamps; durations use the same
+# math.ceil() rounding as EHC_analyze.py
+derived_columns = [
+    ('scan_date', 'TEXT'),
+    ('queued_ts', 'REAL'),
+    ('engine_started_ts', 'REAL'),
+    ('engine_finished_ts', 'REAL'),
+    ('source_pulling_time', 'INTEGER'),
+    ('queue_time', 'INTEGER'),
+    ('total_scan_time', 'INTEGER'),
+    ('engine_scan_time', 'INTEGER')
+]
+
+# Same grouping (and order of precedence) as printable_origins in ehc/accumulators.py
+origin_groups = [
+    ("ADO", "ADO"), ("Bamboo", "Bamboo"), ("CLI", "CLI"), ("cx-CLI", "cx-CLI"), ("CxFlow", "CxFlow"),
+    ("Eclipse", "Eclipse"), ("cx-intellij", "IntelliJ"), ("Jenkins", "Jenkins"), ("Manual", "Manual"),
+    ("Maven", "Maven"), ("Other", "Other"), ("System", "Scheduled"), ("TeamCity", "TeamCity"), ("TFS", "TFS"),
+    ("Visual Studio", "Visual Studio"), ("Visual-Studio-Code", "Visual Studio Code"), ("VSTS", "VSTS"),
+    ("Web Portal", "Web Portal"), ("MISSING ORIGIN TYPE", "Missing Origin Type")
+]
+
+# Same LOC ranges as size_bins in EHC_analyze.py; upper bounds are inclusive
+loc_bins = [
+    ('0 to 20k', 20000), ('20k-50k', 50000), ('50k-100k', 100000), ('100k-250k', 250000), ('250k-500k', 500000),
+    ('500k-1M', 1000000), ('1M-2M', 2000000), ('2M-3M', 3000000), ('3M-5M', 5000000), ('5M-7M', 7000000),
+    ('7M-10M', 10000000), ('10M+', None)
+]
+
+# Deferred until after the bulk load so that inserts do not pay for index maintenance
+index_statements = [
+    "CREATE INDEX IF NOT EXISTS idx_scans_id ON scans (Id)",
+    "CREATE INDEX IF NOT EXISTS idx_scans_project ON scans (ProjectId, ProjectName)",
+    "CREATE INDEX IF NOT EXISTS idx_scans_scan_date ON scans (scan_date)",
+    "CREATE INDEX IF NOT EXISTS idx_scans_origin ON scans (Origin)",
+    "CREATE INDEX IF NOT EXISTS idx_scans_preset ON scans (PresetName)",
+    "CREATE INDEX IF NOT EXISTS idx_scan_languages_scan ON scan_languages (scan_key)",
+    "CREATE INDEX IF NOT EXISTS idx_scan_languages_name ON scan_languages (LanguageName)"
+]
+
+# SQL for ceil() of a non-negative value; the math functions are not compiled into every SQLite build
+def sql_ceil(expr):
+    return f"(CAST(({expr}) AS INTEGER) + (({expr}) > CAST(({expr}) AS INTEGER)))"
+
+def sql_hms(expr):
+    return f"printf('%02d:%02d:%02d', CAST(({expr}) AS INTEGER) / 3600, (CAST(({expr}) AS INTEGER) % 3600) / 60, CAST(({expr}) AS INTEGER) % 60)"
+
+# One view per CSV report produced by EHC_analyze.py --csv; the names follow the CSV file names
+report_views = {
+    'report_01_summary_of_scans': f"""
+        WITH t AS (
+            SELECT COUNT(*) AS total,
+                SUM(COALESCE(IsIncremental, 0) = 0) AS full_scans,
+                SUM(COALESCE(IsIncremental, 0) != 0) AS incremental_scans,
+                SUM(EngineFinishedOn IS NULL) AS no_change_scans,
+                SUM(COALESCE(High, 0) > 0) AS high_scans,
+                SUM(COALESCE(Medium, 0) > 0) AS medium_scans,
+                SUM(COALESCE(Low, 0) > 0) AS low_scans,
+                SUM(COALESCE(Info, 0) > 0) AS info_scans,
+                SUM(COALESCE(TotalVulnerabilities, 0) = 0) AS zero_scans,
+                COUNT(DISTINCT COALESCE(ProjectId, 0) || '_' || COALESCE(ProjectName, '')) AS projects
+            FROM v_scans
+        ),
+        d AS (SELECT first_date, last_date, CAST(julianday(last_date) - julianday(first_date) AS INTEGER) AS days FROM meta)
+        SELECT Description, Value, "%" FROM (
+            SELECT 1 AS ord, 'Start Date' AS Description, d.first_date AS Value, NULL AS "%" FROM d
+            UNION ALL SELECT 2, 'End Date', d.last_date, NULL FROM d
+            UNION ALL SELECT 3, 'Days', d.days, NULL FROM d
+            UNION ALL SELECT 4, 'Weeks', (d.days + 6) / 7, NULL FROM d
+            UNION ALL SELECT 5, 'Scans Submitted', total, NULL FROM t
+            UNION ALL SELECT 6, 'Full Scans Submitted', full_scans, full_scans * 1.0 / total FROM t
+            UNION ALL SELECT 7, 'Incremental Scans Submitted', incremental_scans, incremental_scans * 1.0 / total FROM t
+            UNION ALL SELECT 8, 'No-Change Scans', no_change_scans, no_change_scans * 1.0 / total FROM t
+            UNION ALL SELECT 9, 'Scans with High Results', high_scans, high_scans * 1.0 / total FROM t
+            UNION ALL SELECT 10, 'Scans with Medium Results', medium_scans, medium_scans * 1.0 / total FROM t
+            UNION ALL SELECT 11, 'Scans with Low Results', low_scans, low_scans * 1.0 / total FROM t
+            UNION ALL SELECT 12, 'Scans with Informational Results', info_scans, info_scans * 1.0 / total FROM t
+            UNION ALL SELECT 13, 'Scans with Zero Results', zero_scans, zero_scans * 1.0 / total FROM t
+            UNION ALL SELECT 14, 'Unique Projects Scanned', projects, NULL FROM t
+        ) ORDER BY ord""",
+
+    'report_02_scan_metrics': """
+        WITH t AS (
+            SELECT COUNT(*) AS total, SUM(EngineFinishedOn IS NOT NULL) AS yes_scans, SUM(LOC) AS loc_sum, MAX(LOC) AS loc_max,
+                SUM(COALESCE(FailedLOC, 0)) AS failed_loc_sum, MAX(COALESCE(FailedLOC, 0)) AS failed_loc_max
+            FROM v_scans
+        ),
+        daily AS (SELECT scan_date, SUM(LOC) AS loc_sum FROM v_scans GROUP BY scan_date)
+        SELECT Description, Average, Max FROM (
+            SELECT 1 AS ord, 'LOC per Scan' AS Description, CAST(ROUND(loc_sum * 1.0 / total) AS INTEGER) AS Average, loc_max AS Max FROM t
+            UNION ALL SELECT 2, 'Failed LOC per Scan', CAST(ROUND(failed_loc_sum * 1.0 / yes_scans) AS INTEGER), failed_loc_max FROM t
+            UNION ALL SELECT 3, 'Daily LOC', CAST(ROUND(AVG(loc_sum)) AS INTEGER), MAX(loc_sum) FROM daily
+        ) ORDER BY ord""",
+
+    'report_03_scan_duration': f"""
+        WITH t AS (
+            SELECT SUM(EngineFinishedOn IS NOT NULL) AS yes_scans,
+                SUM(total_scan_time) AS total_sum, MAX(total_scan_time) AS total_max,
+                SUM(engine_scan_time) AS engine_sum, MAX(engine_scan_time) AS engine_max,
+                SUM(queue_time) AS queue_sum, MAX(queue_time) AS queue_max,
+                SUM(source_pulling_time) AS pull_sum, MAX(source_pulling_time) AS pull_max
+            FROM v_scans
+        )
+        SELECT 'Total Scan Duration' AS Description, {sql_hms('total_sum * 1.0 / yes_scans')} AS Average, {sql_hms('total_max')} AS Max FROM t
+        UNION ALL SELECT 'Engine Scan Duration', {sql_hms('engine_sum * 1.0 / yes_scans')}, {sql_hms('engine_max')} FROM t
+        UNION ALL SELECT 'Queued Duration', {sql_hms('queue_sum * 1.0 / yes_scans')}, {sql_hms('queue_max')} FROM t
+        UNION ALL SELECT 'Source Pulling Duration', {sql_hms('pull_sum * 1.0 / yes_scans')}, {sql_hms('pull_max')} FROM t""",
+
+    'report_04_scan_results_severity': f"""
+        WITH t AS (
+            SELECT COUNT(*) AS total,
+                SUM(COALESCE(TotalVulnerabilities, 0)) AS total_sum, MAX(COALESCE(TotalVulnerabilities, 0)) AS total_max,
+                SUM(COALESCE(High, 0)) AS high_sum, MAX(COALESCE(High, 0)) AS high_max,
+                SUM(COALESCE(Medium, 0)) AS medium_sum, MAX(COALESCE(Medium, 0)) AS medium_max,
+                SUM(COALESCE(Low, 0)) AS low_sum, MAX(COALESCE(Low, 0)) AS low_max,
+                SUM(COALESCE(Info, 0)) AS info_sum, MAX(COALESCE(Info, 0)) AS info_max
+            FROM v_scans
+        )
+        SELECT 'Total' AS Description, {sql_ceil('total_sum * 1.0 / total')} AS Average, total_max AS Max FROM t
+        UNION ALL SELECT 'High', CAST(ROUND(high_sum * 1.0 / total) AS INTEGER), high_max FROM t
+        UNION ALL SELECT 'Medium', CAST(ROUND(medium_sum * 1.0 / total) AS INTEGER), medium_max FROM t
+        UNION ALL SELECT 'Low', CAST(ROUND(low_sum * 1.0 / total) AS INTEGER), low_max FROM t
+        UNION ALL SELECT 'Informational', CAST(ROUND(info_sum * 1.0 / total) AS INTEGER), info_max FROM t""",
+
+    'report_05_languages': """
+        SELECT l.LanguageName AS Language, COUNT(*) * 1.0 / (SELECT COUNT(*) FROM v_scans) AS "%", COUNT(*) AS Scans
+        FROM scan_languages l JOIN v_scans s ON s.scan_key = l.scan_key
+        WHERE l.LanguageName IS NOT NULL AND l.LanguageName != '' AND l.LanguageName != 'Common'
+        GROUP BY l.LanguageName
+        ORDER BY Scans DESC""",
+
+    'report_06_scan_submission_summary': """
+        WITH d AS (SELECT CAST(julianday(last_date) - julianday(first_date) AS INTEGER) AS days FROM meta),
+        w AS (SELECT days, (days + 6) / 7 AS weeks FROM d),
+        t AS (
+            SELECT COUNT(*) AS total,
+                SUM(strftime('%w', scan_date) NOT IN ('0', '6')) AS weekday_total,
+                SUM(strftime('%w', scan_date) IN ('0', '6')) AS weekend_total
+            FROM v_scans
+        ),
+        daily AS (SELECT scan_date, COUNT(*) AS scans FROM v_scans GROUP BY scan_date ORDER BY scans DESC, scan_date LIMIT 1)
+        SELECT 'Average Scans Submitted per Week' AS Description, CAST(ROUND(total * 1.0 / weeks) AS INTEGER) AS Value FROM t, w
+        UNION ALL SELECT 'Average Scans Submitted per Day', CAST(ROUND(total * 1.0 / days) AS INTEGER) FROM t, w
+        UNION ALL SELECT 'Average Scans Submitted per Weekday', CAST(ROUND(weekday_total * 1.0 / (weeks * 5)) AS INTEGER) FROM t, w
+        UNION ALL SELECT 'Average Scans Submitted per Weekend Day', CAST(ROUND(weekend_total * 1.0 / (weeks * 2)) AS INTEGER) FROM t, w
+        UNION ALL SELECT 'Max Daily Scans Submitted', scans FROM daily
+        UNION ALL SELECT 'Date of Max Scans', scan_date FROM daily""",
+
+    'report_07_day_of_week_scan_average': """
+        WITH w AS (SELECT (CAST(julianday(last_date) - julianday(first_date) AS INTEGER) + 6) / 7 AS weeks FROM meta),
+        days(ord, dow, day_name) AS (VALUES (1, '1', 'Monday'), (2, '2', 'Tuesday'), (3, '3', 'Wednesday'),
+            (4, '4', 'Thursday'), (5, '5', 'Friday'), (6, '6', 'Saturday'), (7, '0', 'Sunday')),
+        counts AS (SELECT strftime('%w', scan_date) AS dow, COUNT(*) AS scans FROM v_scans GROUP BY dow)
+        SELECT days.day_name AS "Day of Week", CAST(ROUND(COALESCE(counts.scans, 0) * 1.0 / w.weeks) AS INTEGER) AS Scans,
+            COALESCE(counts.scans, 0) * 1.0 / (SELECT COUNT(*) FROM v_scans) AS "%"
+        FROM days CROSS JOIN w LEFT JOIN counts ON counts.dow = days.dow
+        ORDER BY days.ord""",
+
+    'report_08_origins': """
+        WITH g AS (
+            SELECT COALESCE((SELECT og.name FROM origin_groups og
+                WHERE substr(COALESCE(s.Origin, 'Unknown'), 1, length(og.prefix)) = og.prefix
+                ORDER BY og.ord LIMIT 1), 'Other') AS origin_group
+            FROM v_scans s
+        )
+        SELECT origin_group AS Origin, COUNT(*) AS Scans, COUNT(*) * 1.0 / (SELECT COUNT(*) FROM v_scans) AS "%"
+        FROM g GROUP BY origin_group ORDER BY Scans DESC""",
+
+    'report_09_presets': """
+        SELECT PresetName AS Preset, COUNT(*) AS Scans, COUNT(*) * 1.0 / (SELECT COUNT(*) FROM v_scans) AS "%"
+        FROM v_scans GROUP BY PresetName ORDER BY Scans DESC""",
+
+    'report_10_scan_time_analysis': f"""
+        WITH b AS (
+            SELECT lb.ord, lb.label, COUNT(s.scan_key) AS scans, SUM(s.EngineFinishedOn IS NOT NULL) AS yes_scans,
+                COALESCE(SUM(s.total_scan_time), 0) AS total_sum, COALESCE(SUM(s.source_pulling_time), 0) AS pull_sum,
+                COALESCE(SUM(s.queue_time), 0) AS queue_sum, COALESCE(SUM(s.engine_scan_time), 0) AS engine_sum
+            FROM loc_bins lb LEFT JOIN v_scans s ON s.LOC > lb.lower_bound AND (lb.upper_bound IS NULL OR s.LOC <= lb.upper_bound)
+            GROUP BY lb.ord, lb.label
+        )
+        SELECT label AS "LOC Range", scans AS Scans,
+            {sql_ceil('10000.0 * scans / (SELECT COUNT(*) FROM v_scans)')} / 10000.0 AS "% Scans",
+            {sql_hms(f"CASE WHEN yes_scans > 0 THEN {sql_ceil('total_sum * 1.0 / yes_scans')} WHEN scans > 0 THEN {sql_ceil('total_sum * 1.0 / scans')} ELSE 0 END")} AS "Avg Total Time",
+            {sql_hms(f"CASE WHEN scans > 0 THEN {sql_ceil('pull_sum * 1.0 / scans')} ELSE 0 END")} AS "Avg Source Pulling Time",
+            {sql_hms(f"CASE WHEN scans > 0 THEN {sql_ceil('queue_sum * 1.0 / scans')} ELSE 0 END")} AS "Avg Queue Time",
+            {sql_hms(f"CASE WHEN yes_scans > 0 THEN {sql_ceil('engine_sum * 1.0 / yes_scans')} ELSE 0 END")} AS "Avg Engine Scan Time"
+        FROM b ORDER BY ord""",
+
+    # Reproduces the one-second snapshot sweep of EHC_analyze.py: events are bucketed into snapshots, the running totals give
+    # the state of each snapshot, and each state holds until the next bucket (possibly across several days)
+    'report_11_concurrency_analysis': """
+        WITH m AS (SELECT cc_window_start_ts AS ws, cc_window_end_ts AS we, CAST(cc_window_end_ts - cc_window_start_ts AS INTEGER) AS snapshots FROM meta),
+        ev AS (
+            SELECT queued_ts AS ts, 1 AS dq, 0 AS de FROM v_scans
+            UNION ALL SELECT engine_started_ts, -1, 0 FROM v_scans
+            UNION ALL SELECT engine_started_ts, 0, 1 FROM v_scans WHERE engine_finished_ts IS NOT NULL
+            UNION ALL SELECT queued_ts + (engine_finished_ts - engine_started_ts), 0, -1 FROM v_scans WHERE engine_finished_ts IS NOT NULL
+        ),
+        buckets AS (
+            SELECT CAST(ev.ts - m.ws AS INTEGER) AS k, SUM(dq) AS dq, SUM(de) AS de
+            FROM ev, m WHERE ev.ts >= m.ws AND ev.ts <= m.we AND CAST(ev.ts - m.ws AS INTEGER) < m.snapshots
+            GROUP BY k
+        ),
+        segments AS (
+            SELECT k, LEAD(k, 1, (SELECT snapshots FROM m)) OVER (ORDER BY k) - 1 AS last_k,
+                SUM(de) OVER (ORDER BY k) AS engines, SUM(de + dq) OVER (ORDER BY k) AS optimal
+            FROM buckets
+        ),
+        spans AS (
+            SELECT date(m.ws + k, 'unixepoch', 'localtime') AS first_day, date(m.ws + last_k, 'unixepoch', 'localtime') AS last_day, engines, optimal
+            FROM segments, m
+        ),
+        calendar(day) AS (
+            SELECT date(ws, 'unixepoch', 'localtime') FROM m WHERE snapshots > 0
+            UNION ALL SELECT date(day, '+1 day') FROM calendar, m WHERE day < date(m.we - 1, 'unixepoch', 'localtime')
+        ),
+        day_values AS (
+            SELECT day, 0 AS engines, 0 AS optimal FROM calendar
+            UNION ALL SELECT first_day, MAX(engines), MAX(optimal) FROM spans GROUP BY first_day
+            UNION ALL SELECT calendar.day, spans.engines, spans.optimal FROM spans JOIN calendar
+                ON spans.last_day > spans.first_day AND calendar.day > spans.first_day AND calendar.day <= spans.last_day
+        )
+        SELECT day AS Date, MAX(engines) AS "Max Actual", MAX(optimal) AS "Max Optimal"
+        FROM day_values GROUP BY day ORDER BY day""",
+
+    'report_12_scans_by_date': """
+        SELECT scan_date AS Date, COUNT(*) AS Scans FROM v_scans GROUP BY scan_date ORDER BY scan_date""",
+
+    'report_13_scans_by_week': """
+        SELECT date(scan_date, '-6 days', 'weekday 1') AS Week, COUNT(*) AS Scans
+        FROM v_scans GROUP BY Week ORDER BY Week"""
+}
+
+
+def parse_timestamp(value):
+    # fromisoformat() is an order of magnitude faster than dateutil and handles the usual OData format; fall back for anything else
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return parse_date(value)
+
+
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def create_schema(conn, columns):
+    scan_columns = ', '.join(f"{quote_identifier(field)} {field_types.get(field, '')}".strip() for field in columns)
+    scan_columns += ', ' + ', '.join(f"{name} {column_type}" for name, column_type in derived_columns)
+    conn.execute(f"CREATE TABLE scans (scan_key INTEGER PRIMARY KEY, {scan_columns})")
+    conn.execute("CREATE TABLE scan_languages (scan_key INTEGER NOT NULL, LanguageName TEXT)")
+    conn.execute("CREATE TABLE origin_groups (ord INTEGER PRIMARY KEY, prefix TEXT NOT NULL, name TEXT NOT NULL)")
+    conn.executemany("INSERT INTO origin_groups (ord, prefix, name) VALUES (?, ?, ?)",
+        [(i, prefix, name) for i, (prefix, name) in enumerate(origin_groups)])
+    conn.execute("CREATE TABLE loc_bins (ord INTEGER PRIMARY KEY, label TEXT NOT NULL, lower_bound INTEGER, upper_bound INTEGER)")
+    lower_bound = -sys.maxsize
+    for i, (label, upper_bound) in enumerate(loc_bins):
+        conn.execute("INSERT INTO loc_bins (ord, label, lower_bound, upper_bound) VALUES (?, ?, ?, ?)", (i, label, lower_bound, upper_bound))
+        lower_bound = upper_bound
+    conn.execute("CREATE TABLE meta (source_file TEXT, loaded_on TEXT, scan_count INTEGER, first_date TEXT, last_date TEXT, "
+        "cc_window_start_ts REAL, cc_window_end_ts REAL)")
+    conn.execute("CREATE VIEW v_scans AS SELECT * FROM scans WHERE LOC IS NOT NULL")
+    for view_name, view_sql in report_views.items():
+        conn.execute(f"CREATE VIEW {view_name} AS {view_sql}")
+
+
+def derive_values(scan):
+    scan_date = source_pulling_time = queue_time = total_scan_time = engine_scan_time = None
+    queued_ts = engine_started_ts = engine_finished_ts = None
+    try:
+        scan_date = scan.get('ScanRequestedOn', '').split('T')[0] or None
+        requested_on = parse_timestamp(scan.get('ScanRequestedOn'))
+        queued_on = parse_timestamp(scan.get('QueuedOn'))
+        engine_started_on = parse_timestamp(scan.get('EngineStartedOn'))
+        completed_on = parse_timestamp(scan.get('ScanCompletedOn'))
+        queued_ts = queued_on.timestamp()
+        engine_started_ts = engine_started_on.timestamp()
+        source_pulling_time = math.ceil((queued_on - requested_on).total_seconds())
+        queue_time = math.ceil((engine_started_on - queued_on).total_seconds())
+        total_scan_time = math.ceil((completed_on - requested_on).total_seconds())
+        if scan.get('EngineFinishedOn', None) is not None:
+            engine_finished_on = parse_timestamp(scan['EngineFinishedOn'])
+            engine_finished_ts = engine_finished_on.timestamp()
+            engine_scan_time = math.ceil((engine_finished_on - engine_started_on).total_seconds())
+    except (AttributeError, TypeError, ValueError, OverflowError):
+        # incomplete scans (typically the ones without LOC) are still loaded; they simply lack the derived values
+        pass
+    return [scan_date, queued_ts, engine_started_ts, engine_finished_ts, source_pulling_time, queue_time, total_scan_time, engine_scan_time]
+
+
+def column_value(value):
+    # nested values other than ScannedLanguages are kept as their JSON text
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def load_database(input_file, db_file, batch_size, commit_batches):
+    field_names = field_names_from_context(read_context(input_file))
+    columns = [field for field in field_names if field != 'ScannedLanguages']
+    columns += [field for field in required_fields if field not in columns]
+
+    if os.path.exists(db_file):
+        os.remove(db_file)
+    conn = sqlite3.connect(db_file, isolation_level=None)
+
+    # WAL plus relaxed syncing during the load; the database is rebuilt from the export if the load is interrupted
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")
+
+    create_schema(conn, columns)
+
+    placeholders = ', '.join('?' for _ in range(len(columns) + len(derived_columns) + 1))
+    scan_insert = f"INSERT INTO scans (scan_key, {', '.join(quote_identifier(c) for c in columns)}, " \
+        f"{', '.join(name for name, _ in derived_columns)}) VALUES ({placeholders})"
+    language_insert = "INSERT INTO scan_languages (scan_key, LanguageName) VALUES (?, ?)"
+
+    print("Loading data file...", end="", flush=True)
+    start_time = time.perf_counter()
+    scan_count = 0
+    batches = 0
+    scan_rows = []
+    language_rows = []
+
+    conn.execute("BEGIN")
+    with open_input(input_file) as file:
+        for scan in ijson.items(file, 'value.item', buf_size=read_buffer_size, use_float=True):
+            scan_count += 1
+            scan_rows.append([scan_count] + [column_value(scan.get(field)) for field in columns] + derive_values(scan))
+            for language in scan.get('ScannedLanguages') or []:
+                language_rows.append((scan_count, language.get('LanguageName')))
+
+            if len(scan_rows) >= batch_size:
+                conn.executemany(scan_insert, scan_rows)
+                conn.executemany(language_insert, language_rows)
+                scan_rows = []
+                language_rows = []
+                batches += 1
+                if batches % commit_batches == 0:
+                    conn.execute("COMMIT")
+                    conn.execute("BEGIN")
+
+    conn.executemany(scan_insert, scan_rows)
+    conn.executemany(language_insert, language_rows)
+    conn.execute("COMMIT")
+    load_seconds = time.perf_counter() - start_time
+    print(f"completed! ({format(scan_count, ',')} scans in {load_seconds:.1f}s, {format(round(scan_count / max(load_seconds, 1e-9)), ',')} scans/s)")
+
+    print("Creating indexes...", end="", flush=True)
+    conn.execute("BEGIN")
+    for statement in index_statements:
+        conn.execute(statement)
+
+    # the concurrency window matches EHC_analyze.py: local midnight of the first date up to local midnight of the last date
+    first_date, last_date = conn.execute("SELECT MIN(scan_date), MAX(scan_date) FROM v_scans").fetchone()
+    cc_window_start_ts = cc_window_end_ts = None
+    if first_date is not None:
+        cc_window_start_ts = datetime.strptime(first_date, "%Y-%m-%d").timestamp()
+        cc_window_end_ts = datetime.strptime(last_date, "%Y-%m-%d").timestamp()
+    conn.execute("INSERT INTO meta VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (os.path.abspath(input_file), datetime.now().isoformat(timespec='seconds'), scan_count, first_date, last_date,
+        cc_window_start_ts, cc_window_end_ts))
+    conn.execute("COMMIT")
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    print("completed!")
+    print(f"Database written to {db_file}")
+
+
+def list_views(conn):
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'view' AND name LIKE 'report_%' ORDER BY name").fetchall()
+    return [row[0] for row in rows]
+
+
+def resolve_view(conn, name):
+    # allow the full view name, the CSV-style name ("05-languages") or just the report number ("5")
+    views = list_views(conn)
+    if name in views:
+        return name
+    normalized = name.replace('-', '_').lower()
+    for view in views:
+        number = view.split('_')[1]
+        if normalized in (view[len('report_'):], number) or (normalized.isdigit() and int(normalized) == int(number)):
+            return view
+    return None
+
+
+def run_query(db_file, view, sql, output_file, list_only):
+    if not os.path.exists(db_file):
+        print(f"Database not found: {db_file}")
+        exit(1)
+    conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+
+    if list_only:
+        for view_name in list_views(conn):
+            print(view_name)
+        return
+
+    if sql is None:
+        view_name = resolve_view(conn, view)
+        if view_name is None:
+            print(f"Unknown report view: {view}. Use --list to see the available views.")
+            exit(1)
+        sql = f"SELECT * FROM {view_name}"
+
+    try:
+        cursor = conn.execute(sql)
+    except sqlite3.Error as e:
+        print(f"SQL error: {e}")
+        exit(1)
+
+    header = [column[0] for column in cursor.description or []]
+    try:
+        if output_file:
+            file = open(output_file, mode='w', newline='', encoding='utf-8')
+        else:
+            file = sys.stdout
+        writer = csv.writer(file)
+        writer.writerow(header)
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            writer.writerows(rows)
+        if output_file:
+            file.close()
+            print(f"Query output written to {output_file}")
+    except IOError as e:
+        print(f"IOError when writing to file: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load EHC scan data into a SQLite database and query it.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    load_parser = subparsers.add_parser("load", help="Load an EHC JSON file into a new SQLite database.")
+    load_parser.add_argument("input_file", metavar="input-file", type=str, help="The JSON file containing scan data (optionally .gz, .bz2, .xz or .zst compressed).")
+    load_parser.add_argument("--db", type=str, default="", help="Output database file (default: <input name>.sqlite)")
+    load_parser.add_argument("--batch-size", type=int, default=default_batch_size, help="Rows per executemany() batch.")
+    load_parser.add_argument("--commit-batches", type=int, default=default_commit_batches, help="Batches per transaction.")
+
+    query_parser = subparsers.add_parser("query", help="Query a loaded database using a report view or ad-hoc SQL.")
+    query_parser.add_argument("db_file", metavar="db-file", type=str, help="The SQLite database created by the load command.")
+    query_parser.add_argument("view", nargs="?", default="", help="Report view to output, e.g. report_05_languages, 05-languages or 5")
+    query_parser.add_argument("--sql", type=str, default=None, help="Run an ad-hoc SQL query instead of a report view.")
+    query_parser.add_argument("--output", type=str, default="", help="Write the results to a CSV file instead of the screen.")
+    query_parser.add_argument("--list", action="store_true", help="List the available report views.")
+
+    args = parser.parse_args()
+
+    if args.command == "load":
+        db_file = args.db if args.db else os.path.splitext(strip_compression_suffix(args.input_file))[0] + ".sqlite"
+        load_database(args.input_file, db_file, max(1, args.batch_size), max(1, args.commit_batches))
+    else:
+        if not args.list and not args.view and args.sql is None:
+            query_parser.error("a report view, --sql or --list is required")
+        run_query(args.db_file, args.view, args.sql, args.output, args.list)
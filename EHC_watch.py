@@ -0,0 +1,284 @@
+import argparse
+import os
+import pickle
+import shutil
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from hashlib import blake2b
+from ehc.daemon import StateStore, create_watcher, inotify_available
+from ehc.checkpoint import ScanReader, Quarantine
+from ehc.accumulators import cc_event_memory_budget, use_spill_directory
+from EHC_analyze import ScanProcessor, compute_stages, failed_stages, select_reports, required_inputs, needs_concurrency, generate_report
+
+# Watches a directory for EHC exports and keeps a set of CSV reports up to date as files arrive, change or are removed.
+#
+# Each file is analyzed once into a partial result (a pickled ScanProcessor) kept in the state directory; the reports come
+# from merging the partials, so history is never re-parsed. Exports often overlap (e.g. nightly pulls of the last 90 days),
+# so every scan Id is counted once: a file skips the scans already in a file registered before it. Only the reports whose
+# inputs changed are rewritten.
+
+
+def log(message):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+def contains_id(sorted_id_arrays, scan_id):
+    for ids in sorted_id_arrays:
+        index = bisect_left(ids, scan_id)
+        if index < len(ids) and ids[index] == scan_id:
+            return True
+    return False
+
+def ids_overlap(ids, other_ids):
+    if not ids or not other_ids or ids[-1] < other_ids[0] or other_ids[-1] < ids[0]:
+        return False
+    smaller, larger = (ids, other_ids) if len(ids) < len(other_ids) else (other_ids, ids)
+    return any(contains_id([larger], scan_id) for scan_id in smaller)
+
+
+# Analyze one file, skipping the scans whose Id is in excluded_ids (sorted arrays). Runs in a worker process. As with
+# EHC_analyze.py, a record that isn't valid JSON or a scan the processor rejects (e.g. one check_scan rejects) is written to
+# the quarantine file rather than failing the whole file.
+def analyze_file(file_path, excluded_ids, concurrency, cc_memory_budget, engine_servers, quarantine_path):
+    processor = ScanProcessor(concurrency, cc_memory_budget, engine_servers=engine_servers)
+    ids = array('q')
+    quarantine = Quarantine(quarantine_path, 0)
+    try:
+        reader = ScanReader(file_path, 0, quarantine)
+        for scan in reader:
+            scan_id = scan.get('Id')
+            if scan_id is not None:
+                ids.append(scan_id)
+                if contains_id(excluded_ids, scan_id):
+                    continue
+            try:
+                processor.add(scan)
+            except Exception as e:
+                quarantine.add(e, scan=scan, offset=reader.scan_offset)
+    finally:
+        quarantine.close()
+    return {'processor': processor, 'ids': array('q', sorted(ids)), 'rejected_count': quarantine.count}
+
+
+# A digest of a report's inputs that doesn't depend on dict ordering, used to find the reports that need to be rewritten
+def stable_repr(value):
+    if isinstance(value, dict):
+        return '{' + ','.join(sorted(f"{stable_repr(key)}:{stable_repr(item)}" for key, item in value.items())) + '}'
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(stable_repr(item) for item in value) + ']'
+    if isinstance(value, (set, frozenset)):
+        return '{' + ','.join(sorted(stable_repr(item) for item in value)) + '}'
+    return repr(value)
+
+def inputs_digest(inputs):
+    return blake2b(stable_repr(inputs).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class WatchFolder:
+    def __init__(self, directory, state_dir, output_dir, selected_reports, workers=2, cc_memory_budget=None):
+        self.directory = directory
+        self.output_dir = output_dir
+        self.selected_reports = selected_reports
+        self.concurrency = needs_concurrency(selected_reports)
+        self.engine_servers = 'engine_servers' in required_inputs(selected_reports)
+        self.cc_memory_budget = cc_memory_budget
+        self.store = StateStore(state_dir)
+        self.aggregate_file = os.path.join(state_dir, 'aggregate.pickle')
+        # records are spilled into the state directory: those of a partial are moved next to it, those the aggregate spills
+        # itself stay here until the aggregate is rebuilt
+        self.aggregate_runs = os.path.join(state_dir, 'aggregate.runs')
+        use_spill_directory(self.aggregate_runs)
+        self.aggregate = None
+        self.ids = {}
+        self.executor = ProcessPoolExecutor(max_workers=max(1, workers))
+        os.makedirs(output_dir, exist_ok=True)
+
+    def close(self):
+        self.executor.shutdown()
+
+    def file_ids(self, record):
+        if record['sequence'] not in self.ids:
+            self.ids[record['sequence']] = self.store.load_partial(record)['ids']
+        return self.ids[record['sequence']]
+
+    # Files recorded in the state that no longer exist (e.g. removed while the daemon wasn't running)
+    def missing_files(self):
+        return [file_path for file_path in self.store.files if not os.path.exists(file_path)]
+
+    def update(self, changed, removed):
+        # a changed file is handled as the removal of the old version and the arrival of a new one
+        new_files = [file_path for file_path in changed if os.path.exists(file_path) and not self.store.unchanged(file_path)]
+        removed_records = [self.store.remove(file_path) for file_path in list(removed) + new_files if file_path in self.store.files]
+        for record in removed_records:
+            self.ids.pop(record['sequence'], None)
+        if not new_files and not removed_records:
+            self.store.save()
+            return
+
+        # files registered after a removed file may have skipped scans that only it counted, so they are analyzed again
+        reanalyze = []
+        for file_path, record in self.store.ordered():
+            if any(record['sequence'] > removed_record['sequence'] and record['min_id'] <= removed_record['max_id'] and
+                    removed_record['min_id'] <= record['max_id'] for removed_record in removed_records):
+                reanalyze.append(file_path)
+        for file_path in new_files:
+            self.store.register(file_path)
+            log(f"Analyzing {file_path}")
+        for file_path in reanalyze:
+            log(f"Re-analyzing {file_path} (overlaps a removed or changed file)")
+
+        batch = sorted(new_files + reanalyze, key=lambda file_path: self.store.files[file_path]['sequence'])
+        self.analyze_batch(batch)
+
+        # only new files can simply be merged into the aggregate; anything else means rebuilding it from the partials
+        if removed_records or reanalyze or self.load_aggregate() is None:
+            self.rebuild_aggregate()
+        else:
+            for file_path in new_files:
+                self.aggregate.merge(self.store.load_partial(self.store.files[file_path])['processor'])
+        self.save_aggregate()
+        self.store.save()
+        self.update_reports()
+
+    # Analyze the files in the worker pool, each skipping the scans of the files registered before the batch. A file that
+    # overlaps an earlier file of the same batch is analyzed again with those scans skipped too.
+    def analyze_batch(self, batch):
+        batch_sequences = {self.store.files[file_path]['sequence'] for file_path in batch}
+        ordered = self.store.ordered()
+        futures = {}
+        for file_path in batch:
+            sequence = self.store.files[file_path]['sequence']
+            excluded_ids = [self.file_ids(record) for _, record in ordered if record['sequence'] < sequence and record['sequence'] not in batch_sequences]
+            futures[file_path] = self.executor.submit(analyze_file, file_path, excluded_ids, self.concurrency, self.cc_memory_budget, self.engine_servers,
+                self.store.quarantine_path(self.store.files[file_path]))
+
+        done = []
+        for file_path in batch:
+            try:
+                partial = futures[file_path].result()
+            except Exception as e:
+                log(f"Unable to analyze {file_path}: {e}")
+                self.store.remove(file_path)
+                continue
+            if any(ids_overlap(partial['ids'], self.ids[self.store.files[earlier]['sequence']]) for earlier in done):
+                partial['processor'].cleanup()
+                sequence = self.store.files[file_path]['sequence']
+                excluded_ids = [self.file_ids(record) for _, record in self.store.ordered() if record['sequence'] < sequence]
+                partial = analyze_file(file_path, excluded_ids, self.concurrency, self.cc_memory_budget, self.engine_servers,
+                    self.store.quarantine_path(self.store.files[file_path]))
+
+            record = self.store.files[file_path]
+            if partial['rejected_count']:
+                log(f"{format(partial['rejected_count'], ',')} scans of {file_path} could not be processed and were written to {self.store.quarantine_path(record)}")
+            record['min_id'] = partial['ids'][0] if partial['ids'] else 0
+            record['max_id'] = partial['ids'][-1] if partial['ids'] else -1
+            # the partial refers to its spilled records, so they are kept with it in the state directory
+            partial['processor'].move_runs(self.store.runs_path(record))
+            self.store.save_partial(record, partial)
+            self.ids[record['sequence']] = partial['ids']
+            done.append(file_path)
+
+    def load_aggregate(self):
+        if self.aggregate is None and os.path.exists(self.aggregate_file):
+            try:
+                with open(self.aggregate_file, 'rb') as file:
+                    self.aggregate = pickle.load(file)
+            except IOError as e:
+                log(f"Unable to load the aggregate, rebuilding it: {e}")
+        return self.aggregate
+
+    def save_aggregate(self):
+        temp_file = self.aggregate_file + '.tmp'
+        with open(temp_file, 'wb') as file:
+            pickle.dump(self.aggregate, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, self.aggregate_file)
+
+    def rebuild_aggregate(self):
+        shutil.rmtree(self.aggregate_runs, ignore_errors=True)
+        use_spill_directory(self.aggregate_runs)
+        self.aggregate = ScanProcessor(self.concurrency, self.cc_memory_budget, engine_servers=self.engine_servers)
+        for _, record in self.store.ordered():
+            self.aggregate.merge(self.store.load_partial(record)['processor'])
+
+    def update_reports(self):
+        if self.aggregate.date_stats.yes_scan_count + self.aggregate.date_stats.no_scan_count == 0:
+            log("No scans to report on")
+            return
+
+        # the spilled records belong to the partials, so they are kept
+        data = self.aggregate.finish(cleanup=False)
+        context, errors = compute_stages(data, self.selected_reports)
+        for name, e in errors.items():
+            log(f"Unable to compute the {name} data: {e}")
+
+        csv_config = {'enabled': True, 'csv_dir': self.output_dir, 'parquet': False}
+        digests = self.store.extra.setdefault('report_digests', {})
+        updated = []
+        for report in self.selected_reports:
+            if failed_stages(report, errors):
+                continue
+            digest = inputs_digest({key: context[key] for key in report['inputs']})
+            if digests.get(report['name']) == digest and os.path.exists(os.path.join(self.output_dir, report['file'])):
+                continue
+            try:
+                generate_report(report, context, csv_config)
+            except Exception as e:
+                log(f"Unable to generate the {report['name']} report: {e}")
+                continue
+            digests[report['name']] = digest
+            updated.append(report['file'])
+        self.store.save()
+        log(f"Updated reports: {', '.join(updated)}" if updated else "Reports are up to date")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watch a directory for EHC files and keep the analysis CSV reports up to date.")
+    parser.add_argument("directory", type=str, help="Directory to watch for EHC files (.json, optionally .gz, .bz2, .xz or .zst compressed).")
+    parser.add_argument("--output-dir", type=str, default="", help="Directory for the CSV reports (default: ehc_reports in the watched directory).")
+    parser.add_argument("--state-dir", type=str, default="", help="Directory for the persisted state (default: .ehc_state in the watched directory).")
+    parser.add_argument("--workers", type=int, default=2, help="Number of files analyzed in parallel.")
+    parser.add_argument("--interval", type=int, default=30, help="Seconds between polls of the directory (or inotify wake-ups).")
+    parser.add_argument("--polling", action="store_true", help="Poll the directory even if inotify is available.")
+    parser.add_argument("--once", action="store_true", help="Process the files in the directory once and exit.")
+    parser.add_argument("--reports", type=str, default="", help="Comma-separated report numbers or names to keep up to date (default: all).")
+    parser.add_argument("--cc-memory-mb", type=int, default=cc_event_memory_budget // (1024 * 1024),
+        help=f"Memory (MB) the concurrency events, queue times and engine runs of the scans may use before they are spilled to temporary files (default: {cc_event_memory_budget // (1024 * 1024)}).")
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"Not a directory: {args.directory}")
+        exit(1)
+
+    try:
+        selected_reports = select_reports(args.reports)
+    except ValueError as e:
+        print(e)
+        exit(1)
+
+    directory = os.path.abspath(args.directory)
+    output_dir = args.output_dir if args.output_dir else os.path.join(directory, 'ehc_reports')
+    state_dir = args.state_dir if args.state_dir else os.path.join(directory, '.ehc_state')
+
+    watch_folder = WatchFolder(directory, state_dir, output_dir, selected_reports, args.workers, args.cc_memory_mb * 1024 * 1024)
+    watcher = create_watcher(directory, args.interval, args.polling)
+    if not args.polling and not inotify_available:
+        print("Consider installing inotify_simple to be notified of new files instead of polling: 'pip install inotify_simple'")
+    log(f"Watching {directory}; reports are written to {output_dir}")
+
+    try:
+        removed = watch_folder.missing_files()
+        while True:
+            changed, newly_removed = watcher.poll()
+            removed = removed + newly_removed
+            if changed or removed:
+                watch_folder.update(changed, removed)
+                removed = []
+            if args.once:
+                break
+    except KeyboardInterrupt:
+        log("Stopping")
+    finally:
+        watcher.close()
+        watch_folder.close()
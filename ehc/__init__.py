@@ -0,0 +1 @@
+# Shared modules for the CxSAST EHC Toolkit scripts
@@ -0,0 +1,1388 @@
+import heapq
+import importlib.util
+import itertools
+import math
+import os
+import shutil
+import struct
+import tempfile
+from array import array
+from datetime import datetime, timedelta
+from decimal import Decimal
+from dateutil.parser import parse as parse_date
+from ehc.sketches import HyperLogLog, SpaceSaving
+from ehc.binning import bins
+
+# numpy is optional; it only speeds up sorting the records spilled to disk (SortedRecords), so it is only imported when they are sorted
+numpy_available = importlib.util.find_spec('numpy') is not None
+
+# Accumulators for the EHC analysis. Each one is fed a scan at a time with add(scan), can be combined with another of the same
+# kind with merge(other) (e.g. the results for two files, or two halves of one file), and returns its current results with
+# to_dict() without changing its state, so a long running process can keep adding scans and query the results at any moment.
+# They hold only plain containers, so they can be pickled as-is; spilled records stay in their run files, which the pickle
+# refers to (see SortedRecords).
+#
+# The accumulators expect scans that have a LOC value; ScanProcessor in EHC_analyze.py skips the others before calling them.
+
+# Origins are grouped by prefix into these (printable) names, in this order of precedence
+printable_origins = {
+    "ADO": "ADO",
+    "Bamboo": "Bamboo",
+    "CLI": "CLI",
+    "cx-CLI": "cx-CLI",
+    "CxFlow": "CxFlow",
+    "Eclipse": "Eclipse",
+    "cx-intellij": "IntelliJ",
+    "Jenkins": "Jenkins",
+    "Manual": "Manual",
+    "Maven": "Maven",
+    "Other": "Other",
+    "System": "Scheduled",
+    "TeamCity": "TeamCity",
+    "TFS": "TFS",
+    "Visual Studio": "Visual Studio",
+    "Visual-Studio-Code": "Visual Studio Code",
+    "VSTS": "VSTS",
+    "Web Portal": "Web Portal",
+    "MISSING ORIGIN TYPE": "Missing Origin Type"
+}
+
+# Concurrency event types, and the memory the records kept per scan (the concurrency events, the queue times of
+# QueueContributors and the engine runs of EngineServerStats) may use before they are spilled to sorted runs on disk
+cc_queue = 1
+cc_engine = 2
+cc_event_memory_budget = 256 * 1024 * 1024
+# The shares of that memory (--cc-memory-mb) for each kind of record kept per scan, spilled separately
+memory_budget_shares = {'concurrency_events': 0.4, 'queue_contributors': 0.35, 'engine_server_stats': 0.25}
+cc_run_block_size = 65536 # records per block when reading and writing runs
+sort_chunk_size = 131072 # records sorted at a time when numpy isn't installed
+spill_directory = None # where the runs are written; None for the temp directory
+
+# Approximate mode: HyperLogLog precision for distinct counts and the number of keys monitored by the Space-Saving top-k
+hll_precision = 14
+top_projects_capacity = 1000
+top_projects_count = 10
+
+# Cost attribution: the group for scans without a preset or scanned languages
+cost_unknown_group = 'Unknown'
+
+# Wasted time: scans the engine finished with at least this fraction of their LOC failed count as mostly failed
+waste_failed_loc_ratio = 0.5
+
+
+def calculate_time_difference(t1, t2):
+    dt1 = parse_date(t1)
+    dt2 = parse_date(t2)
+    time_diff = (dt2 - dt1).total_seconds()
+
+    return time_diff
+
+# A date in the usual ISO format goes through the (fast) datetime.fromisoformat, anything else through dateutil
+def parse_datetime(value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return parse_date(value)
+
+def parse_timestamp(value):
+    return parse_datetime(value).timestamp()
+
+def scan_date_of(scan):
+    return datetime.strptime(scan.get('ScanRequestedOn', '').split('T')[0], "%Y-%m-%d").date()
+
+checked_date_fields = ('ScanRequestedOn', 'QueuedOn', 'EngineStartedOn', 'ScanCompletedOn')
+checked_number_fields = ('LOC', 'FailedLOC', 'TotalVulnerabilities', 'High', 'Medium', 'Low', 'Info')
+
+# Raise ValueError if a scan has a missing or malformed field that one of the accumulators would fail on part way through, so a
+# bad scan can be set aside before it has been counted anywhere. Dates in the usual ISO format are checked with the (fast)
+# datetime.fromisoformat; anything else goes to the same parsers the accumulators use.
+def check_scan(scan):
+    if not isinstance(scan, dict):
+        raise ValueError(f"The scan is a {type(scan).__name__}, not an object")
+    date_fields = checked_date_fields + (('EngineFinishedOn',) if scan.get('EngineFinishedOn', None) is not None else ())
+    aware = set()
+    for field in date_fields:
+        value = scan.get(field)
+        if not isinstance(value, str):
+            raise ValueError(f"{field} is {value!r}")
+        try:
+            parsed = datetime.fromisoformat(value)
+            if field == 'ScanRequestedOn' and value[10:11] != 'T':
+                scan_date_of(scan)
+        except ValueError:
+            try:
+                parsed = parse_date(value)
+                if field == 'ScanRequestedOn':
+                    scan_date_of(scan)
+            except (ValueError, OverflowError) as e:
+                raise ValueError(f"{field} {value!r} is not a valid date: {e}")
+        aware.add(parsed.tzinfo is not None)
+    if len(aware) > 1:
+        raise ValueError("The dates mix times with and without a time zone")
+    for field in checked_number_fields:
+        value = scan.get(field, 0)
+        if not isinstance(value, (int, float, Decimal)):
+            raise ValueError(f"{field} is {value!r}, not a number")
+    if not isinstance(scan.get('ProjectName', ""), str):
+        raise ValueError(f"ProjectName is {scan.get('ProjectName')!r}")
+    languages = scan.get('ScannedLanguages', [])
+    if not isinstance(languages, list) or not all(isinstance(language, dict) for language in languages):
+        raise ValueError(f"ScannedLanguages is {languages!r}")
+
+# Weighted (sampled) counts and sums are floats; they are reported as whole numbers
+def rounded(value):
+    return round(value) if isinstance(value, float) else value
+
+def rounded_dict(values):
+    return {key: rounded(value) for key, value in values.items()}
+
+# Projects are keyed by id and name since sometimes one of these fields is empty
+def project_key(scan):
+    return str(scan.get('ProjectId', 0)) + "_" + scan.get('ProjectName', "")
+
+def project_name_of(key):
+    return key.split('_', 1)[1]
+
+def engine_duration_bin_key(seconds):
+    return bins['engine_time'].key(seconds)
+
+# The (0-based) position of the nearest-rank percentile in count sorted values
+def percentile_rank(count, fraction):
+    return min(count - 1, max(0, math.ceil(fraction * count) - 1))
+
+# The printable_origins group of an origin; anything not matched is 'Other'
+def origin_group(origin):
+    return next((printable_origins[key] for key in printable_origins if origin.startswith(key)), 'Other')
+
+def loc_bin_key(loc):
+    return bins['loc'].key(loc)
+
+# Write the runs of SortedRecords spilled from now on to directory (created if need be) rather than to the temp directory
+def use_spill_directory(directory):
+    global spill_directory
+    os.makedirs(directory, exist_ok=True)
+    spill_directory = directory
+
+
+# Date range of the data, scan counts and LOC by (requested) date
+class DateStats:
+    def __init__(self):
+        self.first_date = datetime.max.date()
+        self.last_date = datetime.min.date()
+        self.yes_scan_count = self.no_scan_count = 0
+        self.scan_stats_by_date = {}
+
+    def add(self, scan, weight=1):
+        scan_date = scan_date_of(scan)
+        self.first_date = min(self.first_date, scan_date)
+        self.last_date = max(self.last_date, scan_date)
+
+        if scan_date not in self.scan_stats_by_date:
+            self.scan_stats_by_date[scan_date] = {
+                'total_scan_count': 0,
+                'yes_scan_count': 0,
+                'no_scan_count': 0,
+                'full_scan_count': 0,
+                'incremental_scan_count': 0,
+                'loc__sum': 0,
+                'loc__max': 0,
+                'failed_loc__sum': 0,
+                'failed_loc__max': 0
+            }
+        stats = self.scan_stats_by_date[scan_date]
+
+        loc = scan['LOC']
+        stats['total_scan_count'] += weight
+        stats['loc__sum'] += loc * weight
+        stats['loc__max'] = max(loc, stats['loc__max'])
+        stats['failed_loc__sum'] += scan.get('FailedLOC', 0) * weight
+        stats['failed_loc__max'] = max(scan.get('FailedLOC', 0), stats['failed_loc__max'])
+
+        if scan.get('IsIncremental', None):
+            stats['incremental_scan_count'] += weight
+        else:
+            stats['full_scan_count'] += weight
+
+        # only scans with an engine finish time were actually scanned
+        if scan.get('EngineFinishedOn', None) is not None:
+            self.yes_scan_count += weight
+            stats['yes_scan_count'] += weight
+        else:
+            self.no_scan_count += weight
+            stats['no_scan_count'] += weight
+
+    def merge(self, other):
+        self.first_date = min(self.first_date, other.first_date)
+        self.last_date = max(self.last_date, other.last_date)
+        self.yes_scan_count += other.yes_scan_count
+        self.no_scan_count += other.no_scan_count
+        for scan_date, other_stats in other.scan_stats_by_date.items():
+            stats = self.scan_stats_by_date.get(scan_date)
+            if stats is None:
+                self.scan_stats_by_date[scan_date] = dict(other_stats)
+                continue
+            for key, value in other_stats.items():
+                stats[key] = max(stats[key], value) if key.endswith('__max') else stats[key] + value
+        return self
+
+    def to_dict(self):
+        return {
+            'first_date': self.first_date,
+            'last_date': self.last_date,
+            'yes_scan_count': rounded(self.yes_scan_count),
+            'no_scan_count': rounded(self.no_scan_count),
+            'scan_stats_by_date': {scan_date: rounded_dict(stats) for scan_date, stats in self.scan_stats_by_date.items()}
+        }
+
+
+# The dimensions scans can be grouped by in BinnedStats: a title, the keys of a scan given its times (a scan of several languages
+# has a key per language, each counting the scan in full) and, for binned dimensions, the name of the bins (ehc/binning.py)
+# whose order the keys follow. Other dimensions are ordered by key.
+def scan_language_keys(scan, times):
+    languages = [language.get('LanguageName') for language in scan.get('ScannedLanguages', [])]
+    return [language for language in languages if language and language != "Common"] or [cost_unknown_group]
+
+grouping_dimensions = {
+    'loc': {'title': 'LOC Range', 'bins': 'loc', 'keys': lambda scan, times: (bins['loc'].key(scan['LOC']),)},
+    'engine_time': {'title': 'Engine Time', 'bins': 'engine_time',
+        'keys': lambda scan, times: (bins['engine_time'].key(times[3]) if times[4] else 'No Engine Run',)},
+    'scan_type': {'title': 'Scan Type', 'keys': lambda scan, times: ('Incremental' if scan.get('IsIncremental', None) else 'Full',)},
+    'language': {'title': 'Language', 'keys': scan_language_keys},
+    'engine_server': {'title': 'Engine Server', 'keys': lambda scan, times: (str(scan.get('EngineServerId', None)),)},
+    'origin': {'title': 'Origin', 'keys': lambda scan, times: (origin_group(scan.get('Origin') or 'Unknown'),)},
+    'preset': {'title': 'Preset', 'keys': lambda scan, times: (scan.get('PresetName') or cost_unknown_group,)}
+}
+
+
+# Scan counts and total, source pulling, queue and engine scan times grouped by any combination of grouping_dimensions. Each
+# group (cell) has an index into flat arrays of counters, cell_fields sums followed by the maxima of the time_fields, rather than
+# a dict of its own. With prefill, every combination of bins is there from the start (for dimensions that are all binned), so
+# empty bins are reported too.
+class BinnedStats:
+    time_fields = ('total_scan_time', 'source_pulling_time', 'queue_time', 'engine_scan_time')
+    sum_fields = ('yes_scan_count', 'no_scan_count') + tuple(f"{field}__sum" for field in time_fields)
+    max_fields = tuple(f"{field}__max" for field in time_fields)
+
+    def __init__(self, dimensions, prefill=False):
+        for name in dimensions:
+            if name not in grouping_dimensions:
+                raise ValueError(f"Unknown dimension {name!r} (expected {', '.join(grouping_dimensions)})")
+        self.dimensions = tuple(dimensions)
+        # the bins the keys were made with, so results made with different bins aren't merged
+        self.bins = {grouping_dimensions[name]['bins']: bins[grouping_dimensions[name]['bins']] for name in self.dimensions if 'bins' in grouping_dimensions[name]}
+        self.key_functions = None
+        self.cell_indexes = {}
+        self.cell_keys = []
+        self.sums = array('d')
+        self.maxima = array('d')
+        if prefill:
+            for key in itertools.product(*(self.bins[grouping_dimensions[name]['bins']].names for name in self.dimensions)):
+                self.cell(key)
+
+    # The key functions aren't pickled (they are lambdas)
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['key_functions'] = None
+        return state
+
+    def cell(self, key):
+        index = self.cell_indexes.get(key)
+        if index is None:
+            index = self.cell_indexes[key] = len(self.cell_keys)
+            self.cell_keys.append(key)
+            self.sums.extend([0] * len(self.sum_fields))
+            self.maxima.extend([0] * len(self.max_fields))
+        return index
+
+    def add(self, scan, weight=1):
+        if self.key_functions is None:
+            self.key_functions = [grouping_dimensions[name]['keys'] for name in self.dimensions]
+        requested_on = parse_datetime(scan['ScanRequestedOn'])
+        queued_on = parse_datetime(scan['QueuedOn'])
+        engine_started_on = parse_datetime(scan['EngineStartedOn'])
+        # total, source pulling, queue and engine scan time, and whether there was an engine run (only then is the engine time counted)
+        finished = scan.get('EngineFinishedOn', None) is not None
+        times = (
+            math.ceil((parse_datetime(scan['ScanCompletedOn']) - requested_on).total_seconds()),
+            math.ceil((queued_on - requested_on).total_seconds()),
+            math.ceil((engine_started_on - queued_on).total_seconds()),
+            math.ceil((parse_datetime(scan['EngineFinishedOn']) - engine_started_on).total_seconds()) if finished else 0,
+            finished
+        )
+        sums = (weight if finished else 0, 0 if finished else weight, times[0] * weight, times[1] * weight, times[2] * weight, times[3] * weight)
+
+        for key in itertools.product(*(keys(scan, times) for keys in self.key_functions)):
+            index = self.cell(key)
+            offset = index * len(self.sum_fields)
+            for i, value in enumerate(sums):
+                self.sums[offset + i] += value
+            offset = index * len(self.max_fields)
+            for i in range(len(self.max_fields)):
+                if times[i] > self.maxima[offset + i]:
+                    self.maxima[offset + i] = times[i]
+
+    def merge(self, other):
+        if other.dimensions != self.dimensions or other.bins != self.bins:
+            raise ValueError("Cannot merge scan times grouped by different dimensions or bins")
+        for other_index, key in enumerate(other.cell_keys):
+            index = self.cell(key)
+            for i in range(len(self.sum_fields)):
+                self.sums[index * len(self.sum_fields) + i] += other.sums[other_index * len(self.sum_fields) + i]
+            for i in range(len(self.max_fields)):
+                self.maxima[index * len(self.max_fields) + i] = max(self.maxima[index * len(self.max_fields) + i], other.maxima[other_index * len(self.max_fields) + i])
+        return self
+
+    def order(self, key):
+        order = []
+        for name, value in zip(self.dimensions, key):
+            bins_name = grouping_dimensions[name].get('bins')
+            names = self.bins[bins_name].names if bins_name else []
+            order.append((names.index(value), '') if value in names else (len(names), value))
+        return order
+
+    # The cells in dimension order as (key, stats), with the averages of the times. The average total scan time is over the scans
+    # with an engine run when there are any, as in the original scan time analysis.
+    def cells(self):
+        cells = []
+        for key in sorted(self.cell_keys, key=self.order):
+            index = self.cell_indexes[key]
+            stats = dict(zip(self.sum_fields, self.sums[index * len(self.sum_fields):(index + 1) * len(self.sum_fields)]))
+            stats.update(zip(self.max_fields, self.maxima[index * len(self.max_fields):(index + 1) * len(self.max_fields)]))
+            scan_count = stats['yes_scan_count'] + stats['no_scan_count']
+            for field in self.time_fields:
+                stats[f"{field}__avg"] = 0
+            if scan_count > 0:
+                stats['source_pulling_time__avg'] = math.ceil(stats['source_pulling_time__sum'] / scan_count)
+                stats['queue_time__avg'] = math.ceil(stats['queue_time__sum'] / scan_count)
+                stats['total_scan_time__avg'] = math.ceil(stats['total_scan_time__sum'] / scan_count)
+            if stats['yes_scan_count'] > 0:
+                stats['engine_scan_time__avg'] = math.ceil(stats['engine_scan_time__sum'] / stats['yes_scan_count'])
+                stats['total_scan_time__avg'] = math.ceil(stats['total_scan_time__sum'] / stats['yes_scan_count'])
+            cells.append((key, rounded_dict(stats)))
+        return cells
+
+    def to_dict(self):
+        return [dict(stats, key=key) for key, stats in self.cells()]
+
+
+# Scan counts and source pulling, queue, engine and total scan times by LOC bin
+class LocBins(BinnedStats):
+    def __init__(self):
+        super().__init__(['loc'], prefill=True)
+
+    def to_dict(self):
+        return {key[0]: stats for key, stats in self.cells()}
+
+
+# Result (vulnerability) totals and maxima by severity, and the number of scans with results of each severity
+class SeverityResults:
+    def __init__(self):
+        self.scan_count = 0
+        self.results = {
+            "total_vulns__sum": 0, "high__sum": 0, "medium__sum": 0, "low__sum": 0, "info__sum": 0,
+            "total_vulns__max": 0, "high__max": 0, "medium__max": 0, "low__max": 0, "info__max": 0,
+            "high_results__scan_count": 0, "medium_results__scan_count": 0, "low_results__scan_count": 0, "info_results__scan_count": 0, "zero_results__scan_count": 0}
+
+    def add(self, scan, weight=1):
+        self.scan_count += weight
+        self.results['total_vulns__sum'] += scan.get('TotalVulnerabilities', 0) * weight
+        self.results['high__sum'] += scan.get('High', 0) * weight
+        self.results['medium__sum'] += scan.get('Medium', 0) * weight
+        self.results['low__sum'] += scan.get('Low', 0) * weight
+        self.results['info__sum'] += scan.get('Info', 0) * weight
+        self.results['total_vulns__max'] = max(self.results['total_vulns__max'], scan.get('TotalVulnerabilities', 0))
+        self.results['high__max'] = max(self.results['high__max'], scan.get('High', 0))
+        self.results['medium__max'] = max(self.results['medium__max'], scan.get('Medium', 0))
+        self.results['low__max'] = max(self.results['low__max'], scan.get('Low', 0))
+        self.results['info__max'] = max(self.results['info__max'], scan.get('Info', 0))
+        if scan.get('High', 0) > 0:
+            self.results['high_results__scan_count'] += weight
+        if scan.get('Medium', 0) > 0:
+            self.results['medium_results__scan_count'] += weight
+        if scan.get('Low', 0) > 0:
+            self.results['low_results__scan_count'] += weight
+        if scan.get('Info', 0) > 0:
+            self.results['info_results__scan_count'] += weight
+        if scan.get('TotalVulnerabilities', 0) == 0:
+            self.results['zero_results__scan_count'] += weight
+
+    def merge(self, other):
+        self.scan_count += other.scan_count
+        for key, value in other.results.items():
+            self.results[key] = max(self.results[key], value) if key.endswith('__max') else self.results[key] + value
+        return self
+
+    def to_dict(self):
+        results = dict(self.results)
+        results['total_vulns__avg'] = results['high__avg'] = results['medium__avg'] = results['low__avg'] = results['info__avg'] = 0
+        if self.scan_count > 0:
+            results['total_vulns__avg'] = math.ceil(results['total_vulns__sum'] / self.scan_count)
+            results['high__avg'] = round(results['high__sum'] / self.scan_count)
+            results['medium__avg'] = round(results['medium__sum'] / self.scan_count)
+            results['low__avg'] = round(results['low__sum'] / self.scan_count)
+            results['info__avg']= round(results['info__sum'] / self.scan_count)
+        return rounded_dict(results)
+
+
+# Number of scans by the value of one field (e.g. PresetName or Origin)
+class CategoricalCounter:
+    def __init__(self, field, default=None):
+        self.field = field
+        self.default = default
+        self.counts = {}
+
+    def add(self, scan, weight=1):
+        value = scan.get(self.field, self.default)
+        self.counts[value] = self.counts.get(value, 0) + weight
+
+    def merge(self, other):
+        for value, count in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        return self
+
+    def to_dict(self):
+        return rounded_dict(self.counts)
+
+
+# Number of scans by scanned language; "Common" isn't a real language so it isn't counted
+class LanguageCounter(CategoricalCounter):
+    def __init__(self):
+        super().__init__('ScannedLanguages')
+
+    def add(self, scan, weight=1):
+        for language in scan.get('ScannedLanguages', []):
+            lang_name = language.get('LanguageName')
+            if lang_name and lang_name != "Common":
+                self.counts[lang_name] = self.counts.get(lang_name, 0) + weight
+
+
+# Number of scans by origin, grouped into printable_origins by to_dict(); anything not matched is 'Other'
+class OriginCounter(CategoricalCounter):
+    def __init__(self):
+        super().__init__('Origin', 'Unknown')
+
+    def to_dict(self):
+        grouped_origins = {value: 0 for value in printable_origins.values()}
+        for origin, count in self.counts.items():
+            grouped_origins[origin_group(origin)] += count
+        return {origin: rounded(count) for origin, count in grouped_origins.items() if count > 0}
+
+
+# Scan count and the results of the latest scan per project. The latest scan is the last one added; when merging, the one
+# requested last wins.
+class ProjectStats:
+    def __init__(self):
+        self.scanned_projects = {}
+        self.last_requested = {}
+
+    def add(self, scan, weight=1):
+        project_id = scan.get('ProjectId', 0)
+        project_name = scan.get('ProjectName', "")
+        pid = project_key(scan)
+
+        if pid not in self.scanned_projects:
+            self.scanned_projects[pid] = {
+                'id': project_id,
+                'project_name': project_name,
+                'project_scan_count': 0,
+                'total_vulns_count': 0,
+                'high_count': 0,
+                'medium_count': 0,
+                'low_count': 0,
+                'info_count': 0,
+            }
+        project = self.scanned_projects[pid]
+
+        project['project_scan_count'] += weight
+        project['total_vulns_count'] = scan.get('TotalVulnerabilities', 0)
+        project['high_count'] = scan.get('High', 0)
+        project['medium_count'] = scan.get('Medium', 0)
+        project['low_count'] = scan.get('Low', 0)
+        project['info_count'] = scan.get('Info', 0)
+        self.last_requested[pid] = scan.get('ScanRequestedOn', '')
+
+    def merge(self, other):
+        for pid, other_project in other.scanned_projects.items():
+            project = self.scanned_projects.get(pid)
+            if project is None:
+                self.scanned_projects[pid] = dict(other_project)
+                self.last_requested[pid] = other.last_requested[pid]
+                continue
+            scan_count = project['project_scan_count'] + other_project['project_scan_count']
+            if parse_date(other.last_requested[pid]) >= parse_date(self.last_requested[pid]):
+                project.update(other_project)
+                self.last_requested[pid] = other.last_requested[pid]
+            project['project_scan_count'] = scan_count
+        return self
+
+    def to_dict(self):
+        return {pid: rounded_dict(project) for pid, project in self.scanned_projects.items()}
+
+
+# Number of distinct values of a field (the project key for 'Project'). Exact by default; with approximate=True a HyperLogLog
+# is used instead of a set, so the memory is fixed and the count has a relative (standard) error.
+class DistinctCounter:
+    def __init__(self, field, approximate=False):
+        self.field = field
+        self.approximate = approximate
+        self.values = HyperLogLog(hll_precision) if approximate else set()
+
+    def add(self, scan, weight=1):
+        value = project_key(scan) if self.field == 'Project' else scan.get(self.field)
+        if value is not None:
+            self.values.add(value)
+
+    def merge(self, other):
+        if self.approximate:
+            self.values.merge(other.values)
+        else:
+            self.values.update(other.values)
+        return self
+
+    def to_dict(self):
+        if self.approximate:
+            return {'count': self.values.count(), 'relative_error': self.values.relative_error()}
+        return {'count': len(self.values), 'relative_error': 0}
+
+
+# The projects with the most scans, engine time (seconds) and vulnerabilities (summed over their scans). Exact by default; with
+# approximate=True a Space-Saving sketch per metric keeps the memory fixed, and each count comes with its maximum error.
+class TopProjects:
+    metrics = ('scans', 'engine_seconds', 'vulnerabilities')
+
+    def __init__(self, approximate=False):
+        self.approximate = approximate
+        self.counters = {metric: SpaceSaving(top_projects_capacity) if approximate else {} for metric in self.metrics}
+
+    def add(self, scan, weight=1):
+        pid = project_key(scan)
+        engine_seconds = 0
+        if scan.get('EngineFinishedOn', None) is not None:
+            engine_seconds = math.ceil(calculate_time_difference(scan.get('EngineStartedOn'),scan.get('EngineFinishedOn')))
+        for metric, value in (('scans', 1), ('engine_seconds', engine_seconds), ('vulnerabilities', scan.get('TotalVulnerabilities', 0))):
+            counter = self.counters[metric]
+            if self.approximate:
+                counter.add(pid, value * weight)
+            else:
+                counter[pid] = counter.get(pid, 0) + value * weight
+
+    def merge(self, other):
+        for metric in self.metrics:
+            counter = self.counters[metric]
+            if self.approximate:
+                counter.merge(other.counters[metric])
+            else:
+                for pid, count in other.counters[metric].items():
+                    counter[pid] = counter.get(pid, 0) + count
+        return self
+
+    # The top projects per metric as (project name, count, maximum error)
+    def to_dict(self, count=None):
+        count = count if count else top_projects_count
+        top = {}
+        for metric in self.metrics:
+            counter = self.counters[metric]
+            if self.approximate:
+                top[metric] = [(project_name_of(pid), rounded(value), rounded(error)) for pid, value, error in counter.top(count)]
+            else:
+                top[metric] = [(project_name_of(pid), rounded(value), 0) for pid, value in heapq.nsmallest(count, counter.items(), key=lambda x: (-x[1], x[0]))]
+        return top
+
+
+# Engine time, queue time (seconds) and LOC by preset, scanned language, origin (grouped like OriginCounter) and project, to see
+# what uses the engine capacity. A scan of several languages counts for each of them in equal shares ('language', which adds up
+# to the totals) and in full ('language_full', which doesn't). With approximate=True there is no project breakdown; the top
+# projects by engine time are in TopProjects.
+class CostAttribution:
+    def __init__(self, approximate=False):
+        self.approximate = approximate
+        # dimension -> group -> [scans, engine seconds, queue seconds, LOC]
+        self.groups = {'preset': {}, 'language': {}, 'language_full': {}, 'origin': {}}
+        if not approximate:
+            self.groups['project'] = {}
+
+    def add_to(self, dimension, key, scans, engine_seconds, queue_seconds, loc):
+        sums = self.groups[dimension].get(key)
+        if sums is None:
+            self.groups[dimension][key] = [scans, engine_seconds, queue_seconds, loc]
+        else:
+            sums[0] += scans
+            sums[1] += engine_seconds
+            sums[2] += queue_seconds
+            sums[3] += loc
+
+    def add(self, scan, weight=1):
+        engine_started_on = parse_datetime(scan['EngineStartedOn'])
+        queue_seconds = math.ceil((engine_started_on - parse_datetime(scan['QueuedOn'])).total_seconds()) * weight
+        engine_seconds = 0
+        if scan.get('EngineFinishedOn', None) is not None:
+            engine_seconds = math.ceil((parse_datetime(scan['EngineFinishedOn']) - engine_started_on).total_seconds()) * weight
+        loc = scan['LOC'] * weight
+
+        self.add_to('preset', scan.get('PresetName') or cost_unknown_group, weight, engine_seconds, queue_seconds, loc)
+        self.add_to('origin', scan.get('Origin') or 'Unknown', weight, engine_seconds, queue_seconds, loc)
+        if not self.approximate:
+            self.add_to('project', project_key(scan), weight, engine_seconds, queue_seconds, loc)
+
+        languages = [language.get('LanguageName') for language in scan.get('ScannedLanguages', [])]
+        languages = [language for language in languages if language and language != "Common"] or [cost_unknown_group]
+        share = 1 / len(languages)
+        for language in languages:
+            self.add_to('language', language, weight * share, engine_seconds * share, queue_seconds * share, loc * share)
+            self.add_to('language_full', language, weight, engine_seconds, queue_seconds, loc)
+
+    def merge(self, other):
+        for dimension, groups in self.groups.items():
+            for key, sums in other.groups[dimension].items():
+                self.add_to(dimension, key, *sums)
+        return self
+
+    # Per dimension, the groups as {'name', 'scan_count', 'engine_seconds', 'queue_seconds', 'loc'}, most engine time first
+    # (ties by name)
+    def to_dict(self):
+        attribution = {}
+        for dimension, groups in self.groups.items():
+            if dimension == 'origin':
+                grouped_origins = {}
+                for origin, sums in groups.items():
+                    group = origin_group(origin)
+                    grouped_origins[group] = [a + b for a, b in zip(grouped_origins.get(group, [0, 0, 0, 0]), sums)]
+                groups = grouped_origins
+            names = project_name_of if dimension == 'project' else str
+            attribution[dimension] = sorted(({'name': names(key), 'scan_count': rounded(float(sums[0])),
+                'engine_seconds': rounded(float(sums[1])), 'queue_seconds': rounded(float(sums[2])), 'loc': rounded(float(sums[3]))}
+                for key, sums in groups.items()), key=lambda group: (-group['engine_seconds'], group['name']))
+        return attribution
+
+
+# The source pulling, queue and total time (and engine time) spent on scans that gave no engine result (no-change scans, without
+# EngineFinishedOn) and on mostly failed scans (FailedLOC at least failed_loc_ratio of LOC), per project and per origin, next to
+# the same sums over all of the scans of the project or origin. The wasted time of a group is the total time (requested to
+# completed) of both kinds of scans.
+class WastedTime:
+    categories = ('all', 'no_change', 'failed_loc')
+
+    def __init__(self, approximate=False, failed_loc_ratio=waste_failed_loc_ratio):
+        self.approximate = approximate
+        self.failed_loc_ratio = failed_loc_ratio
+        # dimension -> group -> category -> [scans, pull seconds, queue seconds, total seconds, engine seconds]
+        self.groups = {'origin': {}}
+        if not approximate:
+            self.groups['project'] = {}
+
+    def add_to(self, dimension, key, category, sums):
+        group = self.groups[dimension].get(key)
+        if group is None:
+            group = self.groups[dimension][key] = {name: [0, 0, 0, 0, 0] for name in self.categories}
+        group[category] = [a + b for a, b in zip(group[category], sums)]
+
+    def add(self, scan, weight=1):
+        queued_on = parse_datetime(scan['QueuedOn'])
+        engine_started_on = parse_datetime(scan['EngineStartedOn'])
+        requested_on = parse_datetime(scan['ScanRequestedOn'])
+        pull_seconds = math.ceil((queued_on - requested_on).total_seconds())
+        queue_seconds = math.ceil((engine_started_on - queued_on).total_seconds())
+        total_seconds = math.ceil((parse_datetime(scan['ScanCompletedOn']) - requested_on).total_seconds())
+        engine_seconds = 0
+        if scan.get('EngineFinishedOn', None) is not None:
+            engine_seconds = math.ceil((parse_datetime(scan['EngineFinishedOn']) - engine_started_on).total_seconds())
+            category = 'failed_loc' if scan['LOC'] and scan.get('FailedLOC', 0) / scan['LOC'] >= self.failed_loc_ratio else None
+        else:
+            category = 'no_change'
+        sums = [weight, pull_seconds * weight, queue_seconds * weight, total_seconds * weight, engine_seconds * weight]
+
+        keys = [('origin', scan.get('Origin') or 'Unknown')]
+        if not self.approximate:
+            keys.append(('project', project_key(scan)))
+        for dimension, key in keys:
+            self.add_to(dimension, key, 'all', sums)
+            if category is not None:
+                self.add_to(dimension, key, category, sums)
+
+    def merge(self, other):
+        for dimension, groups in self.groups.items():
+            for key, group in other.groups[dimension].items():
+                for category, sums in group.items():
+                    self.add_to(dimension, key, category, sums)
+        return self
+
+    # The totals over all scans, and per dimension the groups with any wasted time as {'name', 'wasted_seconds', category:
+    # {'scan_count', 'pull_seconds', 'queue_seconds', 'total_seconds', 'engine_seconds'}}, most wasted time first (ties by name)
+    def to_dict(self):
+        def category_dict(sums):
+            return dict(zip(('scan_count', 'pull_seconds', 'queue_seconds', 'total_seconds', 'engine_seconds'), (rounded(float(value)) for value in sums)))
+
+        totals = {category: [0, 0, 0, 0, 0] for category in self.categories}
+        for group in self.groups['origin'].values():
+            for category, sums in group.items():
+                totals[category] = [a + b for a, b in zip(totals[category], sums)]
+        waste = {'totals': {category: category_dict(sums) for category, sums in totals.items()}}
+
+        for dimension, groups in self.groups.items():
+            if dimension == 'origin':
+                grouped_origins = {}
+                for origin, group in groups.items():
+                    name = origin_group(origin)
+                    grouped = grouped_origins.setdefault(name, {category: [0, 0, 0, 0, 0] for category in self.categories})
+                    for category, sums in group.items():
+                        grouped[category] = [a + b for a, b in zip(grouped[category], sums)]
+                groups = grouped_origins
+            names = project_name_of if dimension == 'project' else str
+            waste[dimension] = sorted((dict({category: category_dict(sums) for category, sums in group.items()}, name=names(key),
+                wasted_seconds=rounded(float(group['no_change'][3] + group['failed_loc'][3])))
+                for key, group in groups.items() if group['no_change'][0] or group['failed_loc'][0]),
+                key=lambda group: (-group['wasted_seconds'], group['name']))
+        return waste
+
+
+# Engine time and LOC of the full and of the incremental scans the engine finished, per project, to compare the engine time per
+# LOC of the two kinds of scans and to work out what switching full scans to incremental would save
+class IncrementalEfficiency:
+    def __init__(self):
+        # project key -> [full scans, full engine seconds, full LOC, incremental scans, incremental engine seconds, incremental LOC]
+        self.projects = {}
+
+    def add(self, scan, weight=1):
+        if scan.get('EngineFinishedOn', None) is None:
+            return
+        engine_seconds = max(0, math.ceil((parse_datetime(scan['EngineFinishedOn']) - parse_datetime(scan['EngineStartedOn'])).total_seconds()))
+        sums = self.projects.get(project_key(scan))
+        if sums is None:
+            sums = self.projects[project_key(scan)] = [0, 0, 0, 0, 0, 0]
+        offset = 3 if scan.get('IsIncremental', None) else 0
+        sums[offset] += weight
+        sums[offset + 1] += engine_seconds * weight
+        sums[offset + 2] += scan['LOC'] * weight
+
+    def merge(self, other):
+        for key, other_sums in other.projects.items():
+            sums = self.projects.get(key)
+            self.projects[key] = list(other_sums) if sums is None else [a + b for a, b in zip(sums, other_sums)]
+        return self
+
+    # The projects as {'name', 'full': {'scan_count', 'engine_seconds', 'loc'}, 'incremental': {...}}
+    def to_dict(self):
+        def kind_dict(sums):
+            return dict(zip(('scan_count', 'engine_seconds', 'loc'), (rounded(float(value)) for value in sums)))
+
+        return [{'name': project_name_of(key), 'full': kind_dict(sums[:3]), 'incremental': kind_dict(sums[3:])}
+            for key, sums in self.projects.items()]
+
+
+# Fixed size records (tuples of numbers, with an array typecode per field) stored as packed arrays, a column per field, rather
+# than as tuples. Once they take more than memory_budget bytes they are sorted and spilled to a run file on disk; records()
+# returns all of them in order (tuples compare field by field) with a k-way merge of the sorted runs and of the records still
+# in memory. cleanup() removes the run files.
+#
+# A pickle refers to the run files rather than holding their records (the records still in memory are spilled first), so
+# pickling, e.g. for a checkpoint, takes no more memory than the budget. The runs then belong to whoever unpickles it: they
+# are removed by whichever copy is cleaned up, and must outlive every pickle that is still to be loaded (move_runs() puts
+# them somewhere lasting).
+class SortedRecords:
+    def __init__(self, typecodes, memory_budget=None):
+        self.typecodes = typecodes
+        self.record_size = sum(array(typecode).itemsize for typecode in typecodes)
+        self.memory_budget = memory_budget if memory_budget else cc_event_memory_budget
+        self.columns = [array(typecode) for typecode in typecodes]
+        self.runs = [] # (path, record count)
+
+    def __len__(self):
+        return len(self.columns[0]) + sum(count for _, count in self.runs)
+
+    def add(self, record):
+        for column, value in zip(self.columns, record):
+            column.append(value)
+        if len(self.columns[0]) * self.record_size >= self.memory_budget:
+            self.spill()
+
+    # The runs (files) of the other records are taken over rather than copied
+    def merge(self, other):
+        for column, other_column in zip(self.columns, other.columns):
+            column.extend(other_column)
+        self.runs.extend(other.runs)
+        other.runs = []
+        if len(self.columns[0]) * self.record_size >= self.memory_budget:
+            self.spill()
+        return self
+
+    # The in-memory records as sorted chunks (lists of columns). numpy sorts them all at once; without it they are sorted
+    # sort_chunk_size records at a time, so sorting takes little memory on top of the packed columns. With consume=True the
+    # columns are emptied as they are sorted, so the records aren't held twice.
+    def sorted_chunks(self, consume=False):
+        count = len(self.columns[0])
+        if not count:
+            return []
+        if numpy_available:
+            import numpy as np
+            values = [np.frombuffer(column, dtype=column.typecode) for column in self.columns]
+            order = np.lexsort(values[::-1])
+            chunk = [array(column.typecode, column_values[order].tobytes()) for column, column_values in zip(self.columns, values)]
+            del values
+            if consume:
+                self.columns = [array(typecode) for typecode in self.typecodes]
+            return [chunk]
+        chunks = []
+        for start in reversed(range(0, count, sort_chunk_size)):
+            records = sorted(zip(*[column[start:start + sort_chunk_size] for column in self.columns]))
+            chunks.append([array(typecode, values) for typecode, values in zip(self.typecodes, zip(*records))])
+            del records
+            if consume:
+                for column in self.columns:
+                    del column[start:]
+        return chunks
+
+    def merged_chunks(self, chunks):
+        if len(chunks) == 1:
+            return zip(*chunks[0])
+        return heapq.merge(*[zip(*chunk) for chunk in chunks])
+
+    # Write the in-memory records to disk as a sorted run of blocks: the record count, then each column of the block
+    def spill(self):
+        if not self.columns[0]:
+            return
+        chunks = self.sorted_chunks(consume=True)
+        fd, path = tempfile.mkstemp(prefix='ehc_', suffix='.run', dir=spill_directory)
+        count = 0
+        with os.fdopen(fd, 'wb') as run_file:
+            block = [array(typecode) for typecode in self.typecodes]
+            for record in self.merged_chunks(chunks):
+                for column, value in zip(block, record):
+                    column.append(value)
+                if len(block[0]) == cc_run_block_size:
+                    count += self.write_block(run_file, block)
+                    block = [array(typecode) for typecode in self.typecodes]
+            count += self.write_block(run_file, block)
+        self.runs.append((path, count))
+
+    def write_block(self, run_file, block):
+        if not block[0]:
+            return 0
+        run_file.write(struct.pack('<I', len(block[0])))
+        for column in block:
+            column.tofile(run_file)
+        return len(block[0])
+
+    def read_run(self, path):
+        with open(path, 'rb') as run_file:
+            while True:
+                header = run_file.read(4)
+                if not header:
+                    return
+                count = struct.unpack('<I', header)[0]
+                block = []
+                for typecode in self.typecodes:
+                    column = array(typecode)
+                    column.fromfile(run_file, count)
+                    block.append(column)
+                yield from zip(*block)
+
+    def __getstate__(self):
+        self.spill()
+        return dict(self.__dict__)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for path, _ in self.runs:
+            if not os.path.exists(path):
+                raise IOError(f"The spilled records {path} no longer exist")
+
+    # Move the records to run files in directory (created if need be), e.g. to keep them with a pickle that is saved there
+    def move_runs(self, directory):
+        self.spill()
+        os.makedirs(directory, exist_ok=True)
+        runs = []
+        for path, count in self.runs:
+            target = os.path.join(directory, os.path.basename(path))
+            if target != path:
+                shutil.move(path, target)
+            runs.append((target, count))
+        self.runs = runs
+
+    # All records, sorted
+    def records(self):
+        sources = [self.read_run(path) for path, _ in self.runs]
+        chunks = self.sorted_chunks()
+        if chunks:
+            sources.append(self.merged_chunks(chunks))
+        if len(sources) == 1:
+            return sources[0]
+        return heapq.merge(*sources)
+
+    def cleanup(self):
+        for path, _ in self.runs:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.runs = []
+
+
+# Queue and engine events for the concurrency analysis, as SortedRecords of a float64 timestamp and an int8 code per event.
+# The code is the change in count (+1 for starts, i.e. entering the queue or starting the engine, and -1 for ends, i.e. leaving
+# the queue or the engine finishing) times the event type (cc_queue or cc_engine). finish() (or cleanup()) removes the run files.
+class ConcurrencyEvents:
+    def __init__(self, memory_budget=None):
+        self.events_store = SortedRecords('db', memory_budget)
+
+    # weight is accepted for symmetry with the other accumulators; concurrency can't be estimated from a sample
+    def add(self, scan, weight=1):
+        queued_on = parse_date(scan['QueuedOn']).timestamp()
+        engine_started_on = parse_date(scan['EngineStartedOn']).timestamp()
+
+        self.events_store.add((queued_on, cc_queue))
+        self.events_store.add((engine_started_on, -cc_queue))
+
+        if 'EngineFinishedOn' in scan and scan['EngineFinishedOn'] is not None:
+            engine_finished_on = parse_date(scan['EngineFinishedOn']).timestamp()
+            engine_scan_duration = engine_finished_on - engine_started_on
+            optimal_scan_finish = queued_on + engine_scan_duration  # Calculate based on no queue delay assumption
+            self.events_store.add((engine_started_on, cc_engine))
+            self.events_store.add((optimal_scan_finish, -cc_engine))
+
+    def merge(self, other):
+        self.events_store.merge(other.events_store)
+        return self
+
+    def event_count(self):
+        return len(self.events_store)
+
+    # All events as (timestamp, code), sorted by timestamp (events at the same time are in no particular order, which doesn't
+    # matter to the snapshots)
+    def events(self):
+        return self.events_store.records()
+
+    def move_runs(self, directory):
+        self.events_store.move_runs(directory)
+
+    def cleanup(self):
+        self.events_store.cleanup()
+
+    # Snapshots of the active engines and queue length every snapshot_seconds from midnight of first_date to midnight of last_date.
+    # Snapshot format: (timestamp, active_engines, queue_length)
+    # episodes (a QueueEpisodes) is given the queue length after every event of the same sweep.
+    def snapshots(self, first_date, last_date, snapshot_seconds=1, episodes=None):
+        cc_window_start_ts = datetime.combine(first_date, datetime.min.time()).timestamp()
+        cc_window_end_ts = datetime.combine(last_date, datetime.min.time()).timestamp()
+        num_snapshots = math.ceil((cc_window_end_ts - cc_window_start_ts) / snapshot_seconds)
+
+        # Only the events within the window count
+        events = (event for event in self.events() if cc_window_start_ts <= event[0] <= cc_window_end_ts)
+        next_event = next(events, None)
+
+        current_active_engines = 0
+        current_queue_length = 0
+        snapshot_metrics = []
+
+        # For each snapshot...
+        for snapshot in range(num_snapshots):
+            # Calculate the bounds of the snapshot in timestamp format
+            snapshot_start_ts = cc_window_start_ts + snapshot * snapshot_seconds
+            next_snapshot_start_ts = snapshot_start_ts + snapshot_seconds
+
+            while next_event is not None and next_event[0] < next_snapshot_start_ts:
+                code = next_event[1]
+
+                if code == cc_engine or code == -cc_engine:
+                    current_active_engines += 1 if code > 0 else -1
+                else:
+                    current_queue_length += 1 if code > 0 else -1
+                    if episodes is not None:
+                        episodes.update(next_event[0], current_queue_length)
+
+                next_event = next(events, None)
+
+            # Convert snapshot_start_ts to datetime for recording
+            snapshot_start_dt = datetime.fromtimestamp(snapshot_start_ts)
+
+            # Append the metrics for the current snapshot to the list
+            snapshot_metrics.append((snapshot_start_dt, current_active_engines, current_queue_length))
+
+        if episodes is not None:
+            episodes.finish(cc_window_end_ts)
+        return snapshot_metrics
+
+    def to_dict(self):
+        return {'event_count': self.event_count(), 'spilled_runs': len(self.events_store.runs)}
+
+    def finish(self):
+        self.cleanup()
+
+
+# The engine runs of each engine server (EngineServerId) of the scans the engine finished: SortedRecords of (server index, start,
+# end), so the runs are spilled to disk like the concurrency events and come back per server in time order, plus the scan count
+# and LOC per server. to_dict() sweeps each server's runs for the time the server was busy (the union of its runs, since a server
+# can run several scans at once), the time more than one scan was running, the peak number of concurrent scans and the busy
+# intervals themselves, from which the utilization over any window can be worked out.
+class EngineServerStats:
+    def __init__(self, memory_budget=None):
+        self.runs = SortedRecords('idd', memory_budget)
+        self.server_ids = []
+        self.server_indexes = {}
+        self.servers = [] # per server index: {'scan_count': n, 'loc__sum': n}
+
+    def server_index(self, server_id):
+        index = self.server_indexes.get(server_id)
+        if index is None:
+            index = self.server_indexes[server_id] = len(self.server_ids)
+            self.server_ids.append(server_id)
+            self.servers.append({'scan_count': 0, 'loc__sum': 0})
+        return index
+
+    # weight is accepted for symmetry with the other accumulators; the engine runs of a sample say nothing about utilization
+    def add(self, scan, weight=1):
+        server_id = scan.get('EngineServerId', None)
+        if server_id is None or scan.get('EngineFinishedOn', None) is None:
+            return
+        started_on = parse_timestamp(scan['EngineStartedOn'])
+        # a run that ends before it starts is taken to be instantaneous
+        finished_on = max(started_on, parse_timestamp(scan['EngineFinishedOn']))
+
+        index = self.server_index(server_id)
+        self.runs.add((index, started_on, finished_on))
+        self.servers[index]['scan_count'] += 1
+        self.servers[index]['loc__sum'] += scan['LOC']
+
+    # As QueueContributors.merge: the other's runs are taken over when its server indexes are the same as ours, otherwise
+    # they are added again with our indexes
+    def merge(self, other):
+        server_map = [self.server_index(server_id) for server_id in other.server_ids]
+        for index, other_server in zip(server_map, other.servers):
+            self.servers[index]['scan_count'] += other_server['scan_count']
+            self.servers[index]['loc__sum'] += other_server['loc__sum']
+        if server_map == list(range(len(server_map))):
+            self.runs.merge(other.runs)
+            return self
+        for index, started_on, finished_on in other.runs.records():
+            self.runs.add((server_map[index], started_on, finished_on))
+        return self
+
+    # The start (+1) and end (-1) events of the runs (start, end) of one server, given in order of start. At the same timestamp
+    # ends come before starts, so back to back runs don't overlap; runs that take no time are left out, as they don't keep the
+    # server busy.
+    def events(self, runs):
+        ends = [] # the ends of the runs going on (a heap)
+        for start, end in runs:
+            if end <= start:
+                continue
+            while ends and ends[0] <= start:
+                yield heapq.heappop(ends), -1
+            heapq.heappush(ends, end)
+            yield start, 1
+        while ends:
+            yield heapq.heappop(ends), -1
+
+    def sweep(self, runs):
+        busy_intervals = []
+        busy_start = None
+        overlap_seconds = 0
+        active = peak = 0
+        last_timestamp = None
+        for timestamp, change in self.events(runs):
+            if active > 1:
+                overlap_seconds += timestamp - last_timestamp
+            if active == 0:
+                busy_start = timestamp
+            active += change
+            peak = max(peak, active)
+            if active == 0:
+                busy_intervals.append((busy_start, timestamp))
+            last_timestamp = timestamp
+        return busy_intervals, overlap_seconds, peak
+
+    # The duration statistics of the sorted durations of a server's count runs, read once
+    def duration_stats(self, durations, count):
+        ranks = {}
+        for key, fraction in (('duration__p50', 0.5), ('duration__p90', 0.9), ('duration__p99', 0.99)):
+            ranks.setdefault(percentile_rank(count, fraction), []).append(key)
+        stats = {'duration_bins': {bin_key: 0 for bin_key in bins['engine_time'].names}}
+        engine_seconds = 0
+        for rank, duration in enumerate(durations):
+            if rank == 0:
+                stats['duration__min'] = duration
+            for key in ranks.get(rank, ()):
+                stats[key] = duration
+            stats['duration_bins'][engine_duration_bin_key(duration)] += 1
+            engine_seconds += duration
+        stats['duration__max'] = duration
+        stats['engine_seconds__sum'] = engine_seconds
+        return stats
+
+    # The runs (start, end) of a server from its records, adding their durations to durations on the way
+    def server_runs(self, records, durations, index):
+        for _, started_on, finished_on in records:
+            durations.add((index, finished_on - started_on))
+            yield started_on, finished_on
+
+    def to_dict(self):
+        sweeps = {}
+        durations = SortedRecords('id', self.runs.memory_budget) # (server index, duration)
+        try:
+            for index, runs in itertools.groupby(self.runs.records(), key=lambda run: run[0]):
+                sweeps[index] = self.sweep(self.server_runs(runs, durations, index))
+            duration_stats = {index: self.duration_stats((duration for _, duration in server_durations), self.servers[index]['scan_count'])
+                for index, server_durations in itertools.groupby(durations.records(), key=lambda record: record[0])}
+        finally:
+            durations.cleanup()
+
+        servers = {}
+        for index, server_id in enumerate(self.server_ids):
+            server = self.servers[index]
+            busy_intervals, overlap_seconds, peak = sweeps[index]
+            stats = duration_stats[index]
+            engine_seconds = stats['engine_seconds__sum']
+            servers[server_id] = {
+                'scan_count': server['scan_count'],
+                'loc__sum': server['loc__sum'],
+                'engine_seconds__sum': engine_seconds,
+                'busy_seconds': sum(end - start for start, end in busy_intervals),
+                'overlap_seconds': overlap_seconds,
+                'peak_concurrent_scans': peak,
+                'loc_per_engine_second': server['loc__sum'] / engine_seconds if engine_seconds else 0,
+                'duration__min': stats['duration__min'],
+                'duration__avg': engine_seconds / server['scan_count'],
+                'duration__p50': stats['duration__p50'],
+                'duration__p90': stats['duration__p90'],
+                'duration__p99': stats['duration__p99'],
+                'duration__max': stats['duration__max'],
+                'duration_bins': stats['duration_bins'],
+                'busy_intervals': busy_intervals
+            }
+        return servers
+
+    def move_runs(self, directory):
+        self.runs.move_runs(directory)
+
+    def cleanup(self):
+        self.runs.cleanup()
+
+
+# Queue congestion episodes, found during the concurrency sweep: the intervals in which more than threshold scans were queued,
+# kept if they lasted at least min_seconds. The queue length is constant between events, so each episode's peak and area (the
+# scan-seconds waited in the queue during the episode) are exact. Several events at the same time count as one change.
+class QueueEpisodes:
+    def __init__(self, threshold, min_seconds):
+        self.threshold = threshold
+        self.min_seconds = min_seconds
+        self.episodes = []
+        self.current = None
+        self.last_timestamp = None
+        self.queue_length = 0
+
+    # The queue length after an event at timestamp
+    def update(self, timestamp, queue_length):
+        if self.last_timestamp is not None and timestamp > self.last_timestamp:
+            self.segment(self.last_timestamp, timestamp, self.queue_length)
+        self.last_timestamp = timestamp
+        self.queue_length = queue_length
+
+    def segment(self, start, end, queue_length):
+        if queue_length > self.threshold:
+            if self.current is None:
+                self.current = {'start': start, 'peak_queue': 0, 'scan_seconds': 0}
+            self.current['peak_queue'] = max(self.current['peak_queue'], queue_length)
+            self.current['scan_seconds'] += queue_length * (end - start)
+        elif self.current is not None:
+            self.close(start)
+
+    def close(self, end):
+        episode = self.current
+        self.current = None
+        if end - episode['start'] >= self.min_seconds:
+            episode['end'] = end
+            self.episodes.append(episode)
+
+    # End of the sweep (the end of the window); an episode still going on ends there
+    def finish(self, end):
+        if self.last_timestamp is not None and end > self.last_timestamp:
+            self.segment(self.last_timestamp, end, self.queue_length)
+        if self.current is not None:
+            self.close(end)
+        return self.episodes
+
+
+# The time each scan spent in the queue and on the engine with its project and origin, to find the projects and origins behind
+# the queue congestion episodes and to plan the shift of scheduled scans (ehc/schedule.py). The scans are SortedRecords of
+# (queued on, engine started on, engine seconds, project index, origin index), in the order they were queued, so they are
+# spilled to disk like the concurrency events; the project keys and origins are stored once and referred to by index.
+class QueueContributors:
+    def __init__(self, memory_budget=None):
+        self.scans = SortedRecords('dddii', memory_budget)
+        self.project_keys = []
+        self.project_indexes = {}
+        self.origin_names = []
+        self.origin_indexes = {}
+
+    def index_of(self, names, indexes, name):
+        index = indexes.get(name)
+        if index is None:
+            index = indexes[name] = len(names)
+            names.append(name)
+        return index
+
+    # weight is accepted for symmetry with the other accumulators; like the concurrency, this isn't estimated from a sample
+    def add(self, scan, weight=1):
+        started_on = parse_timestamp(scan['EngineStartedOn'])
+        engine_seconds = 0 # for scans the engine didn't finish
+        if scan.get('EngineFinishedOn', None) is not None:
+            engine_seconds = max(0, parse_timestamp(scan['EngineFinishedOn']) - started_on)
+        self.scans.add((parse_timestamp(scan['QueuedOn']), started_on, engine_seconds,
+            self.index_of(self.project_keys, self.project_indexes, project_key(scan)),
+            self.index_of(self.origin_names, self.origin_indexes, scan.get('Origin') or 'Unknown')))
+
+    # The other's runs are taken over when its indexes are the same as ours (e.g. merging into an empty one); otherwise its
+    # records are read and added again with our indexes, leaving its runs to their owner
+    def merge(self, other):
+        project_map = [self.index_of(self.project_keys, self.project_indexes, key) for key in other.project_keys]
+        origin_map = [self.index_of(self.origin_names, self.origin_indexes, name) for name in other.origin_names]
+        if project_map == list(range(len(project_map))) and origin_map == list(range(len(origin_map))):
+            self.scans.merge(other.scans)
+            return self
+        for queued_on, started_on, engine_seconds, project, origin in other.scans.records():
+            self.scans.add((queued_on, started_on, engine_seconds, project_map[project], origin_map[origin]))
+        return self
+
+    # Add the top count projects and origins (grouped) to each episode, by the number of scans that were queued during the
+    # episode, as (name, scans, seconds queued within the episode). The episodes are in order and don't overlap, so a single
+    # pass over the scans in the order they were queued finds them all.
+    def add_contributors(self, episodes, count):
+        if not episodes:
+            return episodes
+        origin_groups = [origin_group(name) for name in self.origin_names]
+        totals = [({}, {}) for _ in episodes]
+        first = 0 # the first episode that hasn't ended when the scan is queued
+        for queued_on, started_on, _, project, origin in self.scans.records():
+            while first < len(episodes) and episodes[first]['end'] <= queued_on:
+                first += 1
+            if first == len(episodes):
+                break
+            for index in range(first, len(episodes)):
+                start, end = episodes[index]['start'], episodes[index]['end']
+                if start >= started_on:
+                    break
+                waited = min(end, started_on) - max(start, queued_on)
+                if waited <= 0:
+                    continue
+                projects, origins = totals[index]
+                for group_totals, key in ((projects, self.project_keys[project]), (origins, origin_groups[origin])):
+                    scans, seconds = group_totals.get(key, (0, 0))
+                    group_totals[key] = (scans + 1, seconds + waited)
+        for episode, (projects, origins) in zip(episodes, totals):
+            episode['projects'] = [(project_name_of(key), scans, seconds) for key, (scans, seconds) in heapq.nsmallest(count, projects.items(), key=lambda x: (-x[1][0], -x[1][1], x[0]))]
+            episode['origins'] = [(name, scans, seconds) for name, (scans, seconds) in heapq.nsmallest(count, origins.items(), key=lambda x: (-x[1][0], -x[1][1], x[0]))]
+        return episodes
+
+    # The scans in the order they were queued, as (queued on, started on, engine seconds, project key, origin)
+    def scan_times(self):
+        for queued_on, started_on, engine_seconds, project, origin in self.scans.records():
+            yield queued_on, started_on, engine_seconds, self.project_keys[project], self.origin_names[origin]
+
+    def move_runs(self, directory):
+        self.scans.move_runs(directory)
+
+    def cleanup(self):
+        self.scans.cleanup()
+
+    def to_dict(self):
+        return {'scan_count': len(self.scans)}
+
+
+# Tracks the engine scan durations per project and scan type, used to find projects whose scan times deviate by more than the
+# thresholds. finish() returns the deviations and the number of projects seen (estimated with a HyperLogLog when approximate).
+class DeviationTracker:
+    def __init__(self, min_deviation_time_seconds, deviation_percentage, include_incremental, approximate=False):
+        self.min_deviation_time_seconds = min_deviation_time_seconds
+        self.deviation_percentage = deviation_percentage
+        self.include_incremental = include_incremental
+        self.approximate = approximate
+        self.project_scan_data = {}
+        self.unique_project_ids = HyperLogLog(hll_precision) if approximate else set()
+
+    def add(self, scan):
+        project_id = scan.get('ProjectId', None)
+        if project_id is not None:
+            self.unique_project_ids.add(project_id)
+        start_time = parse_deviation_date(scan.get('EngineStartedOn'))
+        end_time = parse_deviation_date(scan.get('EngineFinishedOn'))
+        loc = scan.get('LOC', "N/A")  # Get LOC
+        engine_server_id = scan.get('EngineServerId', "N/A")  # Get EngineServerId
+        total_vulnerabilities = scan.get('TotalVulnerabilities', "N/A")  # Get TotalVulnerabilities
+
+        if start_time and end_time:
+            scan_duration = int((end_time - start_time).total_seconds())
+        else:
+            return
+
+        scan_type = 'Incremental' if scan['IsIncremental'] else 'Full'
+        project_scans = self.project_scan_data.setdefault(scan['ProjectName'], {'Incremental': [], 'Full': []})
+        project_scans[scan_type].append((scan['Id'], scan_duration, loc, engine_server_id, total_vulnerabilities))
+
+    def merge(self, other):
+        if self.approximate:
+            self.unique_project_ids.merge(other.unique_project_ids)
+        else:
+            self.unique_project_ids.update(other.unique_project_ids)
+        for project_name, scan_types in other.project_scan_data.items():
+            project_scans = self.project_scan_data.setdefault(project_name, {'Incremental': [], 'Full': []})
+            for scan_type, scan_list in scan_types.items():
+                project_scans[scan_type].extend(scan_list)
+        return self
+
+    def deviations(self):
+        deviations = []
+
+        for project_name, scan_types in self.project_scan_data.items():
+            for scan_type, scan_list in scan_types.items():
+                if not self.include_incremental and scan_type == 'Incremental':
+                    continue  # Skip incremental scans if not included
+
+                if len(scan_list) < 2:  # Skip if there are not enough scans to compare
+                    continue
+
+                min_scan = min(scan_list, key=lambda x: x[1])
+                max_scan = max(scan_list, key=lambda x: x[1])
+
+                if max_scan[1] == min_scan[1]:
+                    continue
+
+                if min_scan[1] != 0:
+                    percentage_difference = ((max_scan[1] - min_scan[1]) / min_scan[1]) * 100
+                else:
+                    continue
+
+                if max_scan[1] - min_scan[1] >= self.min_deviation_time_seconds and \
+                   percentage_difference >= self.deviation_percentage:
+
+                    deviations.append({
+                        'ProjectName': project_name,
+                        'MinDuration': str(timedelta(seconds=min_scan[1])),
+                        'MaxDuration': str(timedelta(seconds=max_scan[1])),
+                        'MinScanLOC': min_scan[2],  # Include Min Scan LOC
+                        'MaxScanLOC': max_scan[2],  # Include Max Scan LOC
+                        'MinEngineServerId': min_scan[3],  # Include Min EngineServerId
+                        'MaxEngineServerId': max_scan[3],  # Include Max EngineServerId
+                        'MinTotalVulnerabilities': min_scan[4],  # Include Min Scan TotalVulnerabilities
+                        'MaxTotalVulnerabilities': max_scan[4],  # Include Max Scan TotalVulnerabilities
+                        'PercentageDifference': int(percentage_difference),
+                        'MinScanID': min_scan[0],
+                        'MaxScanID': max_scan[0],
+                        'ScanType': scan_type
+                    })
+
+        return deviations
+
+    def project_count(self):
+        return self.unique_project_ids.count() if self.approximate else len(self.unique_project_ids)
+
+    def to_dict(self):
+        return {'deviations': self.deviations(), 'total_projects': self.project_count()}
+
+    def finish(self):
+        return self.deviations(), self.project_count()
+
+def parse_deviation_date(date_string):
+    if date_string is None:
+        return None
+    try:
+        return parse_date(date_string)
+    except ValueError:
+        return None
@@ -0,0 +1,92 @@
+import json
+from bisect import bisect_left
+
+# Bins for the numeric fields the analysis is broken down by (LOC for the scan time analysis and the sampling strata, engine time
+# for the engine server report and the cross-tabs). A value is placed in its bin by a binary search of the upper bounds rather
+# than by trying the bins in turn. The default bins can be replaced from a JSON file with load_bins_config(), e.g.
+#
+#   {"loc": {"bins": [[100000, "0 to 100k"], [1000000, "100k-1M"]], "overflow": "1M+"}}
+#
+# Only the bins in the file are replaced; it has to be loaded before any scans are added to an accumulator.
+
+# LOC bins as (upper bound, name); anything above the last bound is '10M+'
+loc_bins = [
+    (20000, '0 to 20k'),
+    (50000, '20k-50k'),
+    (100000, '50k-100k'),
+    (250000, '100k-250k'),
+    (500000, '250k-500k'),
+    (1000000, '500k-1M'),
+    (2000000, '1M-2M'),
+    (3000000, '2M-3M'),
+    (5000000, '3M-5M'),
+    (7000000, '5M-7M'),
+    (10000000, '7M-10M')
+]
+loc_bin_overflow = '10M+'
+
+# Engine scan duration ranges for the engine server report as (upper bound in seconds, name); anything longer is '4h+'
+engine_duration_bins = [
+    (300, '0-5m'),
+    (900, '5-15m'),
+    (1800, '15-30m'),
+    (3600, '30m-1h'),
+    (7200, '1-2h'),
+    (14400, '2-4h')
+]
+engine_duration_overflow = '4h+'
+
+
+# Bins with inclusive upper bounds, in increasing order, plus an overflow bin for anything above the last bound
+class Bins:
+    def __init__(self, bins, overflow):
+        self.bounds = [upper_bound for upper_bound, _ in bins]
+        self.names = [name for _, name in bins] + [overflow]
+        if any(not isinstance(bound, (int, float)) or isinstance(bound, bool) for bound in self.bounds):
+            raise ValueError("Bin upper bounds must be numbers")
+        if any(lower >= upper for lower, upper in zip(self.bounds, self.bounds[1:])):
+            raise ValueError("Bin upper bounds must be in increasing order")
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("Bin names must be unique")
+
+    def index(self, value):
+        return bisect_left(self.bounds, value)
+
+    def key(self, value):
+        return self.names[bisect_left(self.bounds, value)]
+
+    def __eq__(self, other):
+        return isinstance(other, Bins) and self.bounds == other.bounds and self.names == other.names
+
+
+# The bins in use, by name
+bins = {
+    'loc': Bins(loc_bins, loc_bin_overflow),
+    'engine_time': Bins(engine_duration_bins, engine_duration_overflow)
+}
+
+
+# Replace the bins named in a JSON file; raises ValueError for anything that isn't a valid bins definition
+def load_bins_config(file_path):
+    with open(file_path, 'r', encoding='utf-8') as file:
+        try:
+            config = json.load(file)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{file_path} is not valid JSON: {e}")
+    if not isinstance(config, dict):
+        raise ValueError(f"{file_path} should hold an object of bins by name")
+
+    loaded = {}
+    for name, definition in config.items():
+        if name not in bins:
+            raise ValueError(f"Unknown bins {name!r} (expected {', '.join(bins)})")
+        if not isinstance(definition, dict) or not isinstance(definition.get('bins'), list) or not isinstance(definition.get('overflow'), str):
+            raise ValueError(f"The {name} bins should be an object with 'bins' (a list of [upper bound, name]) and 'overflow' (a name)")
+        if not all(isinstance(item, list) and len(item) == 2 and isinstance(item[1], str) for item in definition['bins']):
+            raise ValueError(f"Each of the {name} bins should be [upper bound, name]")
+        try:
+            loaded[name] = Bins(definition['bins'], definition['overflow'])
+        except ValueError as e:
+            raise ValueError(f"The {name} bins are invalid: {e}")
+    bins.update(loaded)
+    return sorted(loaded)
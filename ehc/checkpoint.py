@@ -0,0 +1,254 @@
+import json
+import mmap
+import os
+import pickle
+import re
+import shutil
+import time
+from ehc.fileio import open_input, input_position
+from ehc.passthrough import decode_item
+
+# Checkpoints for long analyses, and a quarantine for scans that can't be processed.
+#
+# ScanReader finds the byte span of each scan of the value array with the raw item scanner of ehc/passthrough.py and decodes
+# just that span, keeping track of the byte offset of the end of the last scan, so a run can be resumed right after the last
+# scan covered by a checkpoint (for compressed files the data before the offset is decompressed again but not parsed). An
+# uncompressed file is scanned in place in its memory mapping; a compressed one a chunk at a time. A record that isn't valid
+# JSON is quarantined and the reader carries on at the next scan (the next '{"Id": ...' after a comma).
+
+checkpoint_version = 3
+checkpoint_interval = 120 # seconds between checkpoints
+reader_chunk_size = 1024 * 1024
+max_record_size = 64 * 1024 * 1024 # a record that is still incomplete after this many bytes is taken to be malformed
+max_quarantined_size = 64 * 1024 # bytes of a malformed record kept in the quarantine file
+
+value_start_pattern = re.compile(rb'"value"\s*:\s*\[')
+whitespace_pattern = re.compile(rb'[ \t\n\r]*')
+next_scan_pattern = re.compile(rb',\s*(?=\{\s*"Id"\s*:)')
+
+
+# Move a freshly opened input to offset; inputs that can't seek (e.g. zstd streams) are read up to it
+def skip_to(file, offset):
+    if offset == 0:
+        return
+    try:
+        file.seek(offset)
+        return
+    except (OSError, ValueError):
+        pass
+    remaining = offset
+    while remaining > 0:
+        chunk = file.read(min(remaining, reader_chunk_size))
+        if not chunk:
+            raise ValueError("The input file is shorter than the checkpoint offset")
+        remaining -= len(chunk)
+
+
+class ScanReader:
+    # offset is 0 to start at the beginning of the file, or the offset of a checkpoint (the end of a scan)
+    def __init__(self, file_path, offset=0, quarantine=None):
+        self.file_path = file_path
+        self.start_offset = offset
+        self.quarantine = quarantine
+        self.buffer = b''
+        self.buffer_offset = offset # byte offset of the start of the buffer
+        self.start_index = 0 # start and end of the last scan in the buffer
+        self.end_index = 0
+        self.eof = False
+        self.mapped = False
+        self.read_position = 0 # position in the file on disk after the last chunk read
+        # set if the file ends before the end of the value array (e.g. an interrupted download)
+        self.truncated = False
+
+    # Byte offset of the end of the last scan read
+    @property
+    def offset(self):
+        return self.buffer_offset + self.end_index
+
+    # Byte offset of the start of the last scan read
+    @property
+    def scan_offset(self):
+        return self.buffer_offset + self.start_index
+
+    # Position in the file on disk, for progress (for a compressed file, how far into the compressed data the reading is); it
+    # runs ahead of offset by what has been read but not parsed yet
+    def position(self):
+        return self.offset if self.mapped else self.read_position
+
+    # Append the next chunk of the file to the buffer, dropping what has been read up to the start of the last scan (so its
+    # offsets can still be worked out); returns index moved along with the buffer
+    def read_more(self, index):
+        drop = min(index, self.start_index)
+        self.buffer_offset += drop
+        self.start_index -= drop
+        self.end_index -= drop
+        chunk = self.file.read(reader_chunk_size)
+        self.read_position = input_position(self.file)
+        self.eof = not chunk
+        self.buffer = self.buffer[drop:] + chunk
+        return index - drop
+
+    def set_aside(self, index, end, error):
+        if self.quarantine is not None:
+            raw = self.buffer[index:min(end, index + max_quarantined_size)].decode('utf-8', errors='replace')
+            self.quarantine.add(error, raw=raw, offset=self.buffer_offset + index)
+
+    def __iter__(self):
+        with open_input(self.file_path) as self.file:
+            if isinstance(self.file, mmap.mmap):
+                # the mapping is the whole file, so it is the buffer
+                self.mapped = True
+                self.buffer = self.file
+                self.buffer_offset = 0
+                self.eof = True
+                index = self.start_index = self.end_index = self.start_offset
+            else:
+                skip_to(self.file, self.start_offset)
+                index = self.read_more(0)
+            if self.start_offset == 0:
+                while True:
+                    match = value_start_pattern.search(self.buffer)
+                    if match is not None:
+                        index = match.end()
+                        break
+                    if self.eof or len(self.buffer) > max_record_size:
+                        raise ValueError(f"No scans (value array) found in {self.file_path}")
+                    index = self.read_more(index)
+            expect_separator = self.start_offset != 0
+            first = True
+
+            while True:
+                index = whitespace_pattern.match(self.buffer, index).end()
+                if index >= len(self.buffer):
+                    if self.eof:
+                        self.truncated = True
+                        return
+                    index = self.read_more(index)
+                    continue
+
+                char = self.buffer[index:index + 1]
+                if char == b']' and (expect_separator or first):
+                    return
+                if expect_separator:
+                    if char == b',':
+                        index += 1
+                        expect_separator = False
+                        continue
+                    error = ValueError(f"Expected ',' or ']' between scans, found {char.decode('utf-8', errors='replace')!r}")
+                elif char != b'{':
+                    error = ValueError(f"Expected a scan object, found {char.decode('utf-8', errors='replace')!r}")
+                else:
+                    try:
+                        decoded = decode_item(self.buffer, index)
+                    except json.JSONDecodeError as e:
+                        # (e.pos is relative to the record; the quarantine records the offset of the record instead)
+                        error = ValueError(f"Invalid JSON: {e.msg}")
+                    except UnicodeDecodeError as e:
+                        error = ValueError(f"Invalid UTF-8: {e.reason}")
+                    else:
+                        if decoded is not None:
+                            scan, end = decoded
+                            first = False
+                            self.start_index = index
+                            self.end_index = end
+                            yield scan
+                            index = end
+                            expect_separator = True
+                            continue
+                        error = ValueError("Incomplete or malformed scan")
+
+                # the record may just be incomplete in the buffer; if the next scan starts within the buffer it is malformed
+                next_scan = next_scan_pattern.search(self.buffer, index + 1)
+                if next_scan is None and not self.eof and len(self.buffer) - index < max_record_size:
+                    index = self.read_more(index)
+                    continue
+                end = next_scan.start() if next_scan is not None else len(self.buffer)
+                self.set_aside(index, end, error)
+                if next_scan is None:
+                    self.truncated = True
+                    return
+                index = end
+                self.start_index = self.end_index = end
+                expect_separator = True
+
+
+# Scans (or malformed records) that couldn't be processed, one JSON object per line with the error and the byte offset of the
+# record. The file is only created once there is something in it.
+class Quarantine:
+    def __init__(self, path, resume_size=None, resume_count=0):
+        self.path = path
+        self.file = None
+        self.count = resume_count
+        # a new run starts a new file; on resume, the records quarantined after the checkpoint will be quarantined again, so
+        # they are dropped
+        if resume_size is not None and os.path.exists(path):
+            if resume_size == 0:
+                os.remove(path)
+            else:
+                with open(path, 'r+b') as file:
+                    file.truncate(resume_size)
+
+    def add(self, error, scan=None, raw=None, offset=None):
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+        record = {'offset': offset, 'error': f"{type(error).__name__}: {error}"}
+        if scan is not None:
+            record['scan'] = scan
+        else:
+            record['raw'] = raw
+        # Decimal numbers (ijson) and anything else json can't write are written as strings
+        self.file.write(json.dumps(record, default=str) + '\n')
+        self.count += 1
+
+    def size(self):
+        if self.file is not None:
+            self.file.flush()
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+# The identity of an input file, to make sure a checkpoint is resumed against the same file
+def input_signature(file_path):
+    stat = os.stat(file_path)
+    return {'path': os.path.abspath(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+# A pickled checkpoint, replaced atomically every interval seconds. The records the analysis spills to disk are kept in runs_dir,
+# since the checkpoint refers to them; remove() removes them with the checkpoint.
+class Checkpoint:
+    def __init__(self, path, interval=checkpoint_interval):
+        self.path = path
+        self.runs_dir = os.path.splitext(path)[0] + '.runs'
+        self.interval = interval
+        self.last_saved = time.monotonic()
+
+    def due(self):
+        return time.monotonic() - self.last_saved >= self.interval
+
+    def save(self, state):
+        temp_file = self.path + '.tmp'
+        with open(temp_file, 'wb') as file:
+            pickle.dump(dict(state, version=checkpoint_version), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, self.path)
+        self.last_saved = time.monotonic()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'rb') as file:
+            state = pickle.load(file)
+        if state.get('version') != checkpoint_version:
+            raise ValueError(f"The checkpoint {self.path} was written by a different version of the toolkit")
+        return state
+
+    def remove(self):
+        for path in (self.path, self.path + '.tmp'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        shutil.rmtree(self.runs_dir, ignore_errors=True)
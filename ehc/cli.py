@@ -0,0 +1,60 @@
+import os
+import runpy
+import sys
+
+# The ehc command: one entry point for the toolkit scripts, e.g. "ehc analyze --csv export.json" runs EHC_analyze.py with
+# "--csv export.json". Nothing but the standard library is imported until a subcommand is picked, and then only the modules
+# of that script, so "ehc --help" and runs on small files start quickly.
+
+# Subcommand -> (script module, description)
+commands = {
+    'analyze': ('EHC_analyze', "Analyze the scans and print the reports (EHC_analyze.py)."),
+    'deviation': ('EHC_scantime_deviation', "Find deviations in scan times (EHC_scantime_deviation.py)."),
+    'filter': ('EHC_project_filter', "Filter the scans of a project (EHC_project_filter.py)."),
+    'split': ('EHC_split', "Split the scans into three 30 day parts (EHC_split.py)."),
+    'merge': ('EHC_merge', "Combine EHC data files into one (EHC_merge.py)."),
+    'pipeline': ('EHC_pipeline', "Run several of the tools in a single pass over the file (EHC_pipeline.py)."),
+    'sqlite': ('EHC_sqlite', "Load the scans into SQLite and query them (EHC_sqlite.py)."),
+    'watch': ('EHC_watch', "Keep the reports up to date for a directory of EHC data files (EHC_watch.py)."),
+    'fetch': ('EHC_fetch', "Fetch the scans from the CxSAST OData endpoint (EHC_fetch.py)."),
+    'compare': ('EHC_compare', "Compare the outputs of engines against the reference (EHC_compare.py).")
+}
+
+
+def print_usage(file=sys.stdout):
+    print("usage: ehc [-h] command [options]\n", file=file)
+    print("CxSAST EHC Toolkit; run 'ehc COMMAND --help' for the options of a command.\n", file=file)
+    print("commands:", file=file)
+    for name, (_, description) in commands.items():
+        print(f"  {name:<10} {description}", file=file)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ('-h', '--help'):
+        print_usage()
+        return 0 if argv else 2
+    name = argv[0]
+    if name not in commands:
+        print_usage(sys.stderr)
+        print(f"\nehc: error: unknown command {name!r}", file=sys.stderr)
+        return 2
+
+    # The scripts live next to the ehc package; when running from a checkout rather than an installed package, that
+    # directory may not be on the path yet
+    tools_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if tools_dir not in sys.path:
+        sys.path.insert(0, tools_dir)
+
+    # The script parses sys.argv itself; alter_sys makes it the __main__ module (which the process pools of e.g. watch rely
+    # on) and points sys.argv[0] at the script
+    sys.argv = [name] + argv[1:]
+    try:
+        runpy.run_module(commands[name][0], run_name='__main__', alter_sys=True)
+    except SystemExit as e:
+        return e.code
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+import os
+import pickle
+import shutil
+import time
+from hashlib import blake2b
+from ehc.fileio import compression_suffixes
+
+# inotify_simple is optional (and Linux only); without it the watched directory is polled
+try:
+    from inotify_simple import INotify, flags
+    inotify_available = True
+except ImportError:
+    inotify_available = False
+
+fingerprint_read_size = 1024 * 1024
+ehc_suffixes = tuple(['.json'] + ['.json' + suffix for suffix in compression_suffixes.values()])
+
+
+def is_ehc_file(file_name):
+    return file_name.lower().endswith(ehc_suffixes) and not file_name.startswith('.')
+
+# Content fingerprint of a file; two files with the same content have the same fingerprint regardless of name or mtime
+def file_fingerprint(file_path):
+    digest = blake2b(digest_size=16)
+    with open(file_path, 'rb') as file:
+        while True:
+            chunk = file.read(fingerprint_read_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def list_ehc_files(directory):
+    return sorted(os.path.join(directory, file_name) for file_name in os.listdir(directory)
+        if is_ehc_file(file_name) and os.path.isfile(os.path.join(directory, file_name)))
+
+
+# Polls a directory for EHC files that are new, changed or removed. A new or changed file is only reported once its size and
+# mtime are the same on two polls in a row, so files that are still being copied in are left alone.
+class PollingWatcher:
+    def __init__(self, directory, interval=30):
+        self.directory = directory
+        self.interval = interval
+        self.known = {}
+        self.pending = {}
+        self.first_poll = True
+
+    # Returns (changed paths, removed paths); waits up to interval seconds, except on the first call
+    def poll(self):
+        if not self.first_poll:
+            time.sleep(self.interval)
+        current = {}
+        for file_path in list_ehc_files(self.directory):
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            current[file_path] = (stat.st_size, stat.st_mtime_ns)
+
+        changed = []
+        for file_path, file_stat in current.items():
+            if self.known.get(file_path) == file_stat:
+                continue
+            # existing files are taken as they are at startup
+            if self.first_poll or self.pending.get(file_path) == file_stat:
+                self.known[file_path] = file_stat
+                self.pending.pop(file_path, None)
+                changed.append(file_path)
+            else:
+                self.pending[file_path] = file_stat
+        removed = [file_path for file_path in self.known if file_path not in current]
+        for file_path in removed:
+            del self.known[file_path]
+        self.first_poll = False
+        return changed, removed
+
+    def close(self):
+        pass
+
+
+# Watches a directory with inotify; a file is reported once it has been closed after writing or moved into the directory
+class InotifyWatcher:
+    def __init__(self, directory, interval=30):
+        self.directory = directory
+        self.interval = interval
+        self.inotify = INotify()
+        self.inotify.add_watch(directory, flags.CLOSE_WRITE | flags.MOVED_TO | flags.DELETE | flags.MOVED_FROM)
+        self.first_poll = True
+
+    def poll(self):
+        if self.first_poll:
+            self.first_poll = False
+            return list_ehc_files(self.directory), []
+        changed = set()
+        removed = set()
+        for event in self.inotify.read(timeout=self.interval * 1000):
+            if not is_ehc_file(event.name):
+                continue
+            file_path = os.path.join(self.directory, event.name)
+            if event.mask & (flags.DELETE | flags.MOVED_FROM):
+                removed.add(file_path)
+                changed.discard(file_path)
+            else:
+                changed.add(file_path)
+                removed.discard(file_path)
+        return sorted(changed), sorted(removed)
+
+    def close(self):
+        self.inotify.close()
+
+def create_watcher(directory, interval=30, polling=False):
+    if inotify_available and not polling:
+        return InotifyWatcher(directory, interval)
+    return PollingWatcher(directory, interval)
+
+
+# Persisted state of a watched directory: the files seen (fingerprint, size, mtime and the order they were registered in) and
+# a pickled partial result per file, plus any other small values (e.g. report digests) under 'extra'.
+class StateStore:
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        self.partials_dir = os.path.join(state_dir, 'partials')
+        self.state_file = os.path.join(state_dir, 'state.pickle')
+        os.makedirs(self.partials_dir, exist_ok=True)
+        self.files = {}
+        self.extra = {}
+        self.next_sequence = 0
+        if os.path.exists(self.state_file):
+            with open(self.state_file, 'rb') as file:
+                state = pickle.load(file)
+            self.files = state['files']
+            self.extra = state['extra']
+            self.next_sequence = state['next_sequence']
+
+    def save(self):
+        # write and rename so an interrupted save never leaves a truncated state file
+        temp_file = self.state_file + '.tmp'
+        with open(temp_file, 'wb') as file:
+            pickle.dump({'files': self.files, 'extra': self.extra, 'next_sequence': self.next_sequence}, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, self.state_file)
+
+    # True if the file is already recorded with the same content. The (cheap) size and mtime are checked first; a file
+    # that was only touched or copied is recognized by its fingerprint and its stat is refreshed.
+    def unchanged(self, file_path):
+        record = self.files.get(file_path)
+        if record is None:
+            return False
+        stat = os.stat(file_path)
+        if (stat.st_size, stat.st_mtime_ns) == (record['size'], record['mtime_ns']):
+            return True
+        if stat.st_size == record['size'] and file_fingerprint(file_path) == record['fingerprint']:
+            record['mtime_ns'] = stat.st_mtime_ns
+            return True
+        return False
+
+    def register(self, file_path):
+        stat = os.stat(file_path)
+        record = {
+            'fingerprint': file_fingerprint(file_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sequence': self.next_sequence
+        }
+        self.next_sequence += 1
+        self.files[file_path] = record
+        return record
+
+    def partial_path(self, record):
+        return os.path.join(self.partials_dir, f"{record['sequence']}-{record['fingerprint']}.pickle")
+
+    # Where the records a partial spilled to disk are kept
+    def runs_path(self, record):
+        return os.path.join(self.partials_dir, f"{record['sequence']}-{record['fingerprint']}.runs")
+
+    # Where the scans of a file that could not be processed are written
+    def quarantine_path(self, record):
+        return os.path.join(self.partials_dir, f"{record['sequence']}-{record['fingerprint']}.quarantine.jsonl")
+
+    def save_partial(self, record, partial):
+        with open(self.partial_path(record), 'wb') as file:
+            pickle.dump(partial, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load_partial(self, record):
+        with open(self.partial_path(record), 'rb') as file:
+            return pickle.load(file)
+
+    def remove(self, file_path):
+        record = self.files.pop(file_path, None)
+        if record is not None:
+            try:
+                os.remove(self.partial_path(record))
+            except OSError:
+                pass
+            try:
+                os.remove(self.quarantine_path(record))
+            except OSError:
+                pass
+            shutil.rmtree(self.runs_path(record), ignore_errors=True)
+        return record
+
+    # The recorded files in the order they were registered
+    def ordered(self):
+        return sorted(self.files.items(), key=lambda item: item[1]['sequence'])
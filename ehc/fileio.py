@@ -0,0 +1,175 @@
+import bz2
+import gzip
+import importlib.util
+import io
+import json
+import lzma
+import mmap
+import os
+import re
+import ijson
+
+# zstandard is only needed for .zst files, so it is only imported when one is opened
+zstandard_available = importlib.util.find_spec('zstandard') is not None
+
+# Read size for the input streams and the ijson parser: much larger than the 64 KiB ijson default to cut per-call overhead in
+# the decompressors, but small enough to stay cache resident (multi-MiB buffers measured slower with the yajl2_c backend)
+read_buffer_size = 256 * 1024
+
+# The @odata.context header is the first member of an export, so a bounded read of the start of the file is enough to find it
+context_read_size = 64 * 1024
+context_pattern = re.compile(rb'"@odata\.context"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+compression_suffixes = {'gz': '.gz', 'bz2': '.bz2', 'xz': '.xz', 'zst': '.zst'}
+
+# Leading bytes of each format, used when a compressed file does not have the usual suffix
+compression_magic = [
+    (b'\x1f\x8b', 'gz'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zst')
+]
+
+
+def compression_from_suffix(file_path):
+    lower_path = file_path.lower()
+    for compression, suffix in compression_suffixes.items():
+        if lower_path.endswith(suffix):
+            return compression
+    return None
+
+
+def detect_compression(file_path):
+    compression = compression_from_suffix(file_path)
+    if compression is not None:
+        return compression
+    with open(file_path, 'rb') as file:
+        header = file.read(6)
+    for magic, compression in compression_magic:
+        if header.startswith(magic):
+            return compression
+    return None
+
+
+def strip_compression_suffix(file_path):
+    compression = compression_from_suffix(file_path)
+    if compression is not None:
+        return file_path[:-len(compression_suffixes[compression])]
+    return file_path
+
+
+# Adds the suffix for the given compression unless the path already has it
+def compressed_path(file_path, compression):
+    if compression is None or compression_from_suffix(file_path) == compression:
+        return file_path
+    return file_path + compression_suffixes[compression]
+
+
+def require_zstandard():
+    if not zstandard_available:
+        raise ImportError("zstd compressed files require zstandard: 'pip install zstandard'")
+    import zstandard
+    return zstandard
+
+
+# Map an uncompressed file into memory; the parser then reads large chunks straight from the page cache instead of going
+# through a second user-space buffer. Returns None if the file cannot be mapped (e.g. it is empty).
+def map_file(file_path):
+    with open(file_path, 'rb') as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            return None
+    if hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+        mapped.madvise(mmap.MADV_SEQUENTIAL)
+    return mapped
+
+
+# The decompressed stream of a compressed file; it keeps the file on disk (source) to report how far into it the decompressor
+# has read, and closes it along with the stream
+class DecompressedInput(io.BufferedReader):
+    def __init__(self, stream, source):
+        super().__init__(stream, buffer_size=read_buffer_size)
+        self.source = source
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self.source.close()
+
+
+# Open an EHC file for reading as a binary stream; uncompressed files are memory mapped and compressed files are decompressed
+# on the fly (no temp file)
+def open_input(file_path):
+    compression = detect_compression(file_path)
+    if compression is None:
+        mapped = map_file(file_path)
+        if mapped is not None:
+            return mapped
+        return open(file_path, 'rb', buffering=read_buffer_size)
+    source = open(file_path, 'rb')
+    try:
+        if compression == 'gz':
+            stream = gzip.GzipFile(fileobj=source, mode='rb')
+        elif compression == 'bz2':
+            stream = bz2.BZ2File(source, 'rb')
+        elif compression == 'xz':
+            stream = lzma.LZMAFile(source, 'rb')
+        else:
+            zstandard = require_zstandard()
+            stream = zstandard.ZstdDecompressor().stream_reader(source, read_size=read_buffer_size, closefd=False)
+    except BaseException:
+        source.close()
+        raise
+    return DecompressedInput(stream, source)
+
+
+# Position in the file on disk of a stream from open_input(); for a compressed file that is how much of the compressed data the
+# decompressor has read, which is what progress through the file is measured in
+def input_position(stream):
+    return getattr(stream, 'source', stream).tell()
+
+
+# Open an output file for writing text (or bytes with binary=True); compression is one of compression_suffixes, or None to go by
+# the file suffix
+def open_output(file_path, compression=None, binary=False):
+    if compression is None:
+        compression = compression_from_suffix(file_path)
+    if compression is None:
+        return open(file_path, 'wb') if binary else open(file_path, 'w', encoding='utf-8')
+    if compression == 'gz':
+        return gzip.open(file_path, 'wb', compresslevel=6) if binary else gzip.open(file_path, 'wt', encoding='utf-8', compresslevel=6)
+    if compression == 'bz2':
+        return bz2.open(file_path, 'wb') if binary else bz2.open(file_path, 'wt', encoding='utf-8')
+    if compression == 'xz':
+        return lzma.open(file_path, 'wb') if binary else lzma.open(file_path, 'wt', encoding='utf-8')
+    zstandard = require_zstandard()
+    writer = zstandard.ZstdCompressor(level=6).stream_writer(open(file_path, 'wb'), closefd=True)
+    return writer if binary else io.TextIOWrapper(writer, encoding='utf-8')
+
+
+# Name of the file without its directory, compression suffix and extension (e.g. "/data/ehc.json.gz" -> "ehc")
+def base_name(file_path):
+    return os.path.splitext(os.path.basename(strip_compression_suffix(file_path)))[0]
+
+
+# Extract the @odata.context string with one bounded read of the start of the file, rather than a separate parse of the document.
+# Falls back to ijson if the header is not within the first context_read_size bytes (e.g. unusually formatted files).
+def read_context(file_path):
+    with open_input(file_path) as file:
+        match = context_pattern.search(file.read(context_read_size))
+    if match:
+        return json.loads(b'"' + match.group(1) + b'"')
+    with open_input(file_path) as file:
+        return next(ijson.items(file, '@odata.context'), None)
+
+
+# The scan field names listed in the @odata.context string, e.g. "...#Scans(Id,ProjectId,...,ScannedLanguages(LanguageName))"
+def field_names_from_context(context_str):
+    field_names = []
+    match = re.search(r"#Scans\((.*?)\)", context_str or '')
+    if match:
+        tmp_field_names = [field.strip() for field in match.group(1).split(',')]
+        field_names = [field.replace('(LanguageName', '') if 'ScannedLanguages' in field else field for field in tmp_field_names]
+    return field_names
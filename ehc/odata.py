@@ -0,0 +1,288 @@
+import asyncio
+import base64
+import http.client
+import json
+import queue
+import random
+import threading
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlencode, quote, urljoin, urlsplit
+
+# aiohttp is optional; without it the requests go through http.client keep-alive connections in worker threads
+try:
+    import aiohttp
+    from yarl import URL
+    aiohttp_available = True
+except ImportError:
+    aiohttp_available = False
+
+# Pulls the Scans projection of an EHC export straight from the CxSAST OData endpoint (e.g.
+# https://cx.example/Cxwebinterface/odata/v1), page by page over a pool of keep-alive connections.
+#
+# Pages are requested with $top/$skip ordered by Id, with up to prefetch pages in flight at once and handed on in order; if the
+# server splits a page into smaller ones itself, its @odata.nextLink links are followed to complete the page.
+# Failed requests (connection errors, timeouts, 429 and 5xx responses) are retried with exponential backoff and jitter, honoring
+# Retry-After. An incremental fetch only asks for the scans with an Id above the last one fetched (and/or requested since a date).
+
+scan_fields = ['Id', 'ProjectId', 'ProjectName', 'ScanRequestedOn', 'QueuedOn', 'EngineStartedOn', 'EngineFinishedOn', 'ScanCompletedOn',
+    'LOC', 'FailedLOC', 'IsIncremental', 'PresetName', 'Origin', 'EngineServerId', 'TotalVulnerabilities', 'High', 'Medium', 'Low', 'Info']
+scan_expand = 'ScannedLanguages($select=LanguageName)'
+
+default_page_size = 1000
+default_prefetch = 4
+default_connections = 4
+default_retries = 5
+default_timeout = 120
+backoff_base = 1.0
+backoff_max = 60.0
+retry_statuses = (429, 500, 502, 503, 504)
+
+
+# The Scans entity set URL for either the service root or the entity set itself
+def scans_url(url):
+    url = url.rstrip('/')
+    return url if url.lower().endswith('/scans') else url + '/Scans'
+
+# The @odata.context of an export with the fetched projection, for servers that don't return one
+def default_context(url):
+    root = scans_url(url)[:-len('/Scans')]
+    return f"{root}/$metadata#Scans({','.join(scan_fields)},ScannedLanguages(LanguageName))"
+
+# A --since date as an OData DateTimeOffset literal
+def odata_datetime(date_str):
+    return datetime.strptime(date_str, '%Y-%m-%d').strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def retry_after_seconds(value):
+    try:
+        return min(backoff_max, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+class AiohttpTransport:
+    def __init__(self, connections, timeout):
+        self.connections = connections
+        self.timeout = timeout
+        self.session = None
+
+    async def open(self):
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.connections),
+            timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    async def close(self):
+        await self.session.close()
+
+    async def get(self, url, headers):
+        # encoded=True keeps aiohttp from re-quoting the $ and parentheses of the query
+        async with self.session.get(URL(url, encoded=True), headers=headers) as response:
+            return response.status, response.headers.get('Retry-After'), await response.read()
+
+
+# http.client connections kept alive between requests and used from the default thread pool
+class ThreadedTransport:
+    def __init__(self, connections, timeout):
+        self.connections = connections
+        self.timeout = timeout
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        with self.lock:
+            for connections in self.idle.values():
+                for connection in connections:
+                    connection.close()
+            self.idle = {}
+
+    def connection(self, parts):
+        with self.lock:
+            connections = self.idle.setdefault((parts.scheme, parts.netloc), [])
+            if connections:
+                return connections.pop()
+        if parts.scheme == 'https':
+            return http.client.HTTPSConnection(parts.netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(parts.netloc, timeout=self.timeout)
+
+    def request(self, url, headers):
+        parts = urlsplit(url)
+        connection = self.connection(parts)
+        try:
+            connection.request('GET', parts.path + ('?' + parts.query if parts.query else ''), headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            with self.lock:
+                self.idle.setdefault((parts.scheme, parts.netloc), []).append(connection)
+        return response.status, response.getheader('Retry-After'), body
+
+    async def get(self, url, headers):
+        return await asyncio.to_thread(self.request, url, headers)
+
+
+transport_errors = (OSError, asyncio.TimeoutError, http.client.HTTPException, ValueError)
+if aiohttp_available:
+    transport_errors = transport_errors + (aiohttp.ClientError,)
+
+
+class OdataFetcher:
+    def __init__(self, url, token=None, username=None, password=None, page_size=default_page_size, prefetch=default_prefetch,
+            connections=default_connections, retries=default_retries, timeout=default_timeout, after_id=None, since=None):
+        self.url = scans_url(url)
+        self.page_size = page_size
+        self.prefetch = max(1, prefetch)
+        self.connections = max(1, connections)
+        self.retries = retries
+        self.timeout = timeout
+        self.after_id = after_id
+        self.since = since
+        self.headers = {'Accept': 'application/json'}
+        if token:
+            self.headers['Authorization'] = f"Bearer {token}"
+        elif username:
+            credentials = base64.b64encode(f"{username}:{password or ''}".encode('utf-8')).decode('ascii')
+            self.headers['Authorization'] = f"Basic {credentials}"
+
+        self.context = None
+        # the largest Id fetched, for the next incremental fetch
+        self.last_id = after_id
+        self.scan_count = 0
+        self.request_count = 0
+        self.retry_count = 0
+        self.stopped = threading.Event()
+
+    def query(self, skip):
+        params = {
+            '$select': ','.join(scan_fields),
+            '$expand': scan_expand,
+            '$orderby': 'Id',
+            '$top': self.page_size,
+            '$skip': skip
+        }
+        filters = []
+        if self.after_id is not None:
+            filters.append(f"Id gt {self.after_id}")
+        if self.since:
+            filters.append(f"ScanRequestedOn ge {odata_datetime(self.since)}")
+        if filters:
+            params['$filter'] = ' and '.join(filters)
+        return self.url + '?' + urlencode(params, quote_via=quote, safe='$(),=')
+
+    async def get(self, url):
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                async with self.semaphore:
+                    status, retry_after, body = await self.transport.get(url, self.headers)
+                self.request_count += 1
+                if status == 200:
+                    return json.loads(body)
+                error = f"HTTP {status}"
+            except transport_errors as e:
+                status = None
+                error = str(e) or type(e).__name__
+            if status is not None and status not in retry_statuses:
+                raise IOError(f"{error} from {url}: {body[:200].decode('utf-8', 'replace')}")
+            if attempt >= self.retries:
+                raise IOError(f"Giving up on {url} after {attempt + 1} attempts: {error}")
+            delay = retry_after_seconds(retry_after)
+            if delay is None:
+                delay = min(backoff_max, backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+            attempt += 1
+            self.retry_count += 1
+            await asyncio.sleep(delay)
+
+    # One window of page_size scans starting at skip. A server that pages the results itself returns the window in several
+    # responses, each with an @odata.nextLink to the rest.
+    async def window(self, skip):
+        page = await self.get(self.query(skip))
+        if self.context is None:
+            self.context = page.get('@odata.context') or default_context(self.url)
+        scans = page.get('value', [])
+        next_link = page.get('@odata.nextLink')
+        while next_link and len(scans) < self.page_size:
+            page = await self.get(urljoin(self.url, next_link))
+            scans.extend(page.get('value', []))
+            next_link = page.get('@odata.nextLink')
+        return scans[:self.page_size]
+
+    # The scans, one window (list) at a time and in Id order, with up to prefetch windows being fetched ahead
+    async def pages(self):
+        self.transport = AiohttpTransport(self.connections, self.timeout) if aiohttp_available else ThreadedTransport(self.connections, self.timeout)
+        self.semaphore = asyncio.Semaphore(self.connections)
+        await self.transport.open()
+        pending = deque()
+        skip = 0
+        try:
+            while not self.stopped.is_set():
+                while len(pending) < self.prefetch:
+                    pending.append(asyncio.ensure_future(self.window(skip)))
+                    skip += self.page_size
+                scans = await pending.popleft()
+                for scan in scans:
+                    scan_id = scan.get('Id')
+                    if scan_id is not None and (self.last_id is None or scan_id > self.last_id):
+                        self.last_id = scan_id
+                self.scan_count += len(scans)
+                if scans:
+                    yield scans
+                # a short window is the last one
+                if len(scans) < self.page_size:
+                    return
+        finally:
+            for future in pending:
+                future.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            await self.transport.close()
+
+    async def produce(self, pages_queue):
+        async for scans in self.pages():
+            while not self.stopped.is_set():
+                try:
+                    await asyncio.to_thread(pages_queue.put, scans, True, 1)
+                    break
+                except queue.Full:
+                    continue
+            if self.stopped.is_set():
+                break
+
+    # The scans as a plain (blocking) iterator, e.g. for Pipeline; the event loop runs in a background thread and up to
+    # queued_pages fetched pages wait for the consumer
+    def scans(self, queued_pages=8):
+        pages_queue = queue.Queue(maxsize=queued_pages)
+        done = object()
+
+        def run():
+            try:
+                asyncio.run(self.produce(pages_queue))
+                result = done
+            except BaseException as e:
+                result = e
+            while not self.stopped.is_set():
+                try:
+                    pages_queue.put(result, timeout=1)
+                    break
+                except queue.Full:
+                    continue
+
+        thread = threading.Thread(target=run, name='odata-fetch', daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = pages_queue.get()
+                if item is done:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield from item
+        finally:
+            self.stopped.set()
+            thread.join()
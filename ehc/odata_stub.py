@@ -0,0 +1,145 @@
+import argparse
+import json
+import re
+import threading
+import ijson
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, urlencode, quote
+from ehc.fileio import open_input, read_buffer_size, read_context
+
+# A local stand-in for the CxSAST OData Scans endpoint that serves the scans of an EHC export, for trying out and testing
+# EHC_fetch.py without a CxSAST server:
+#
+#   python -m ehc.odata_stub export.json --port 8080
+#   python EHC_fetch.py http://localhost:8080/Cxwebinterface/odata/v1 --output fetched.json
+#
+# It understands $top, $skip, $orderby=Id and $filter with "Id gt N" and "ScanRequestedOn ge DATE" terms joined by "and";
+# $select and $expand are accepted and ignored. --server-page-size makes it page the results itself with @odata.nextLink, and
+# --fail-every answers every Nth request with a 503 to exercise the retries.
+
+filter_term_pattern = re.compile(r"^\s*(Id|ScanRequestedOn)\s+(gt|ge|lt|le|eq)\s+'?([^'\s]+)'?\s*$")
+
+
+def load_scans(file_path):
+    with open_input(file_path) as file:
+        return list(ijson.items(file, 'value.item', buf_size=read_buffer_size, use_float=True))
+
+def compare(left, operator, right):
+    if operator == 'gt':
+        return left > right
+    if operator == 'ge':
+        return left >= right
+    if operator == 'lt':
+        return left < right
+    if operator == 'le':
+        return left <= right
+    return left == right
+
+# A predicate for the supported $filter expressions; raises ValueError for anything else
+def parse_filter(expression):
+    terms = []
+    for term in re.split(r'\s+and\s+', expression.strip()):
+        match = filter_term_pattern.match(term)
+        if match is None:
+            raise ValueError(f"Unsupported $filter term: {term}")
+        field, operator, value = match.groups()
+        # dates are compared as text, to the second
+        terms.append((field, operator, int(value) if field == 'Id' else value[:19]))
+
+    def predicate(scan):
+        for field, operator, value in terms:
+            scan_value = scan.get(field)
+            if scan_value is None:
+                return False
+            if field == 'ScanRequestedOn':
+                scan_value = scan_value[:19]
+            if not compare(scan_value, operator, value):
+                return False
+        return True
+    return predicate
+
+
+class StubOdataServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, scans, context, server_page_size=0, fail_every=0):
+        super().__init__(address, StubOdataHandler)
+        self.scans = scans
+        self.context = context
+        self.server_page_size = server_page_size
+        self.fail_every = fail_every
+        self.request_count = 0
+        self.lock = threading.Lock()
+
+
+class StubOdataHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; odata.metadata=minimal')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            request_count = server.request_count
+        if server.fail_every and request_count % server.fail_every == 0:
+            self.send_json(503, {'error': {'message': 'Service unavailable (stub)'}}, {'Retry-After': '0'})
+            return
+
+        parts = urlsplit(self.path)
+        if not parts.path.rstrip('/').lower().endswith('/scans'):
+            self.send_json(404, {'error': {'message': f"Not found: {parts.path}"}})
+            return
+        params = {name: values[0] for name, values in parse_qs(parts.query, keep_blank_values=True).items()}
+        try:
+            scans = server.scans
+            if params.get('$filter'):
+                predicate = parse_filter(params['$filter'])
+                scans = [scan for scan in scans if predicate(scan)]
+            if params.get('$orderby', 'Id').split()[0] == 'Id':
+                scans = sorted(scans, key=lambda scan: scan.get('Id', 0))
+            skip = int(params.get('$skip', 0))
+            top = int(params['$top']) if '$top' in params else len(scans)
+        except ValueError as e:
+            self.send_json(400, {'error': {'message': str(e)}})
+            return
+
+        body = {'@odata.context': server.context}
+        if server.server_page_size and top > server.server_page_size:
+            body['value'] = scans[skip:skip + server.server_page_size]
+            if skip + server.server_page_size < min(len(scans), skip + top):
+                next_params = dict(params, **{'$skip': skip + server.server_page_size, '$top': top - server.server_page_size})
+                body['@odata.nextLink'] = parts.path + '?' + urlencode(next_params, quote_via=quote, safe='$(),=')
+        else:
+            body['value'] = scans[skip:skip + top]
+        self.send_json(200, body)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the scans of an EHC export as a stub CxSAST OData endpoint.")
+    parser.add_argument("input_file", metavar="input-file", type=str, help="The JSON file containing scan data (optionally .gz, .bz2, .xz or .zst compressed).")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on.")
+    parser.add_argument("--server-page-size", type=int, default=0, help="Page the results with @odata.nextLink, at most this many scans per response.")
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every Nth request with a 503.")
+    args = parser.parse_args()
+
+    server = StubOdataServer((args.host, args.port), load_scans(args.input_file), read_context(args.input_file), args.server_page_size, args.fail_every)
+    print(f"Serving {len(server.scans)} scans at http://{args.host}:{server.server_address[1]}/Cxwebinterface/odata/v1/Scans")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
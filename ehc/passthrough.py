@@ -0,0 +1,212 @@
+import json
+import re
+from ehc.fileio import open_input, open_output
+
+# Raw passthrough of the scans of an EHC file, for the tools that only route scans to output files (EHC_project_filter.py,
+# EHC_split.py and EHC_merge.py with --passthrough). Rather than decoding every scan into Python objects and encoding it again,
+# RawScanReader finds the byte span of each item of the value array and only decodes the routing keys a tool asks for;
+# RawScanWriter copies the spans to the output as they are. ScanReader (ehc/checkpoint.py) delimits and decodes the scans of the
+# analysis with decode_item.
+#
+# Items are normally split at the next '}, {"Id":' (which can't occur inside a JSON string, since its quotes aren't escaped)
+# within raw_separator_window bytes, after checking that the span holds one whole object; anything else goes through a regular
+# expression that follows the strings and nested objects. Likewise a routing key is taken from its first occurrence when nothing before it can be a string or nested
+# object, and otherwise found by skipping over the strings and nested objects.
+
+# the LOC is the key of the --sample strata (ehc/sampling.py)
+routing_keys = ('Id', 'ProjectId', 'ProjectName', 'ScanRequestedOn', 'LOC')
+raw_chunk_size = 1024 * 1024
+raw_separator_window = 8 * 1024 # how far past the start of an item its separator is looked for
+raw_decode_window = 8 * 1024 # bytes decoded at a time by decode_item, which holds most scans
+max_raw_item_size = 64 * 1024 * 1024 # an item that is still incomplete after this many bytes is taken to be malformed
+
+# The patterns are unrolled loops (a run of plain characters, then any number of string/object and plain run pairs): each
+# character can only be matched one way, so a failed match backtracks in linear time without possessive quantifiers or atomic
+# groups, which need Python 3.11
+raw_string = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+raw_nested_object = rb'\{[^{}"]*(?:' + raw_string + rb'[^{}"]*)*\}'
+# A scan object with objects nested at most one level deep (e.g. the ScannedLanguages items), in a single match
+raw_item_pattern = re.compile(rb'\{[^{}"]*(?:(?:' + raw_string + rb'|' + raw_nested_object + rb')[^{}"]*)*\}')
+# Strings and braces, for items nested more deeply than raw_item_pattern allows; a lone quote is an unterminated string
+raw_token_pattern = re.compile(raw_string + rb'|[{}"]')
+# The routing keys and their values at the top level of an item: strings and nested objects are matched (and skipped) as a
+# whole, so a key inside either of them isn't picked up
+raw_field_pattern = re.compile(rb'"(' + b'|'.join(key.encode('ascii') for key in routing_keys) + rb')"\s*:\s*(' + raw_string +
+    rb'|[^\s,}\]]+)|' + raw_string + rb'|' + raw_nested_object)
+raw_key_patterns = {key: re.compile(rb'"' + key.encode('ascii') + rb'"\s*:\s*(' + raw_string + rb'|[^\s,}\]]+)') for key in routing_keys}
+raw_separator_pattern = re.compile(rb'\}\s*,\s*(?=\{\s*"Id"\s*:)')
+raw_value_start_pattern = re.compile(rb'"value"\s*:\s*\[')
+raw_whitespace_pattern = re.compile(rb'[ \t\n\r]*')
+item_decoder = json.JSONDecoder()
+
+
+# End of the object starting at index, following nested objects to any depth; None if it doesn't end within buffer
+def object_end(buffer, index):
+    depth = 0
+    for match in raw_token_pattern.finditer(buffer, index):
+        token = match.group()
+        if token == b'{':
+            depth += 1
+        elif token == b'}':
+            depth -= 1
+            if depth == 0:
+                return match.end()
+        elif token == b'"':
+            return None
+    return None
+
+# A span that ends at a separator is one whole item unless the separator is between objects nested in it, in which case the
+# span has unclosed braces or brackets (and the Id of the nested object as well as its own)
+def whole_item(raw):
+    return raw.count(b'"Id"') == 1 and raw.count(b'{') == raw.count(b'}') and raw.count(b'[') == raw.count(b']')
+
+# End of the raw item (a '{') at index, or None if it doesn't end within buffer: at the separator after it when the span up to
+# there is one whole item, otherwise by following its strings and nested objects
+def item_end(buffer, index):
+    # the separator is only looked for near the item: when the next items don't start with "Id" there is none, and searching
+    # the rest of the buffer for every item would take quadratic time
+    separator = raw_separator_pattern.search(buffer, index, index + raw_separator_window)
+    if separator is not None and whole_item(buffer[index:separator.start() + 1]):
+        return separator.start() + 1
+    match = raw_item_pattern.match(buffer, index)
+    return match.end() if match is not None else object_end(buffer, index)
+
+# The item (a '{') at index decoded, with the end of its span; None if it doesn't end within buffer. Raises ValueError if the
+# item isn't valid JSON or UTF-8. The next raw_decode_window bytes are decoded and the JSON decoder stops at the end of the
+# item, so the span comes with the decoding; only an item that doesn't end within them (or isn't valid) is delimited by
+# following its strings and nested objects first.
+def decode_item(buffer, index):
+    raw = buffer[index:index + raw_decode_window]
+    try:
+        text = raw.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # the window may end within a character
+        text = raw[:e.start].decode('utf-8')
+    try:
+        item, text_end = item_decoder.raw_decode(text)
+    except ValueError:
+        end = item_end(buffer, index)
+        if end is None:
+            return None
+        return json.loads(buffer[index:end]), end
+    return item, index + (text_end if text.isascii() else len(text[:text_end].encode('utf-8')))
+
+def decode_value(value):
+    if value[:1] == b'"' and b'\\' not in value:
+        return value[1:-1].decode('utf-8')
+    return json.loads(value)
+
+# The routing keys of a raw item (those in keys) with their decoded values
+def routing_fields(raw, keys):
+    fields = {}
+    for key in keys:
+        match = raw_key_patterns[key].search(raw)
+        if match is None:
+            return scanned_routing_fields(raw, keys)
+        # with only the opening brace, no closing brace, no escapes and an even number of quotes before it, the key is at the
+        # top level and not inside a string
+        start = match.start()
+        if raw.count(b'{', 0, start) != 1 or raw.count(b'}', 0, start) or raw.count(b'"', 0, start) % 2 or raw.find(b'\\', 0, start) != -1:
+            return scanned_routing_fields(raw, keys)
+        fields[key] = decode_value(match.group(1))
+    return fields
+
+def scanned_routing_fields(raw, keys):
+    fields = {}
+    for match in raw_field_pattern.finditer(raw, 1):
+        key = match.group(1)
+        if key is None:
+            continue
+        key = key.decode('ascii')
+        if key in keys and key not in fields:
+            fields[key] = decode_value(match.group(2))
+            if len(fields) == len(keys):
+                break
+    return fields
+
+
+# Yields (raw bytes, routing fields) for each item of the value array of an EHC file
+class RawScanReader:
+    def __init__(self, file_path, keys=()):
+        self.file_path = file_path
+        self.keys = tuple(keys)
+        for key in self.keys:
+            if key not in routing_keys:
+                raise ValueError(f"{key} is not a routing key ({', '.join(routing_keys)})")
+
+    # Drop the buffer up to index and append the next chunk of the file; returns the new buffer and index
+    def read_more(self, buffer, index):
+        chunk = self.file.read(raw_chunk_size)
+        self.eof = not chunk
+        return buffer[index:] + chunk, 0
+
+    def __iter__(self):
+        with open_input(self.file_path) as self.file:
+            self.eof = False
+            buffer, index = self.read_more(b'', 0)
+            while True:
+                match = raw_value_start_pattern.search(buffer)
+                if match is not None:
+                    index = match.end()
+                    break
+                if self.eof or len(buffer) > max_raw_item_size:
+                    raise ValueError(f"No scans (value array) found in {self.file_path}")
+                buffer, index = self.read_more(buffer, 0)
+
+            expect_separator = False
+            first = True
+            while True:
+                index = raw_whitespace_pattern.match(buffer, index).end()
+                if index >= len(buffer):
+                    if self.eof:
+                        raise ValueError(f"{self.file_path} ends before the end of the scan data")
+                    buffer, index = self.read_more(buffer, index)
+                    continue
+
+                char = buffer[index:index + 1]
+                if char == b']' and (expect_separator or first):
+                    return
+                if expect_separator:
+                    if char != b',':
+                        raise ValueError(f"Expected ',' or ']' between scans, found {char!r}")
+                    index += 1
+                    expect_separator = False
+                    continue
+                if char != b'{':
+                    raise ValueError(f"Expected a scan object, found {char!r}")
+
+                end = item_end(buffer, index)
+                if end is None:
+                    if self.eof or len(buffer) - index > max_raw_item_size:
+                        raise ValueError(f"{self.file_path} ends within a scan, or a scan is malformed")
+                    buffer, index = self.read_more(buffer, index)
+                    continue
+
+                raw = buffer[index:end]
+                yield raw, routing_fields(raw, self.keys)
+                index = end
+                expect_separator = True
+                first = False
+
+
+# Writes raw items as an EHC export: the @odata.context (if any) and the items, separated as json.dumps would
+class RawScanWriter:
+    def __init__(self, output_file, compress=None, context=None):
+        self.output_file = output_file
+        self.file = open_output(output_file, compress, binary=True)
+        if context is not None:
+            self.file.write(b'{"@odata.context": ' + json.dumps(context).encode('utf-8') + b', "value": [')
+        else:
+            self.file.write(b'{"value": [')
+        self.count = 0
+
+    def add(self, raw):
+        if self.count:
+            self.file.write(b', ')
+        self.file.write(raw)
+        self.count += 1
+
+    def finish(self):
+        self.file.write(b']}')
+        self.file.close()
+        return self.output_file
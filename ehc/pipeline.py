@@ -0,0 +1,75 @@
+import os
+from ehc.checkpoint import ScanReader
+
+# A single streaming parse of an EHC file that pushes every scan to any number of registered consumers. A consumer is any
+# object with add(scan) and finish(); finish() is called once after the last scan and its return value is handed back by run().
+# The scans can also come from any other iterable (e.g. OdataFetcher.scans()) instead of a file. With telemetry (see
+# ehc/telemetry.py), the progress is sampled on its timer from the scan count and the position in the file.
+# As in EHC_analyze.py, the file is read with a ScanReader, which sets a record that isn't valid JSON aside in quarantine (see
+# ehc/checkpoint.py), and a scan a consumer can't take (anything but an IOError, e.g. a scan check_scan rejects) doesn't end
+# the run either: it is written to quarantine, if there is one, and counted in rejected_count.
+class Pipeline:
+    def __init__(self, input_file, scans=None, telemetry=None, quarantine=None):
+        self.input_file = input_file
+        self.scans = scans
+        self.telemetry = telemetry
+        self.quarantine = quarantine
+        self.rejected_count = 0
+        self.consumers = []
+        self.reader = None
+        self.scan_count = 0
+
+    def register(self, consumer):
+        self.consumers.append(consumer)
+        return consumer
+
+    # The numbers of the scans read from a file are float or int (not Decimal), so consumers writing JSON don't have to handle Decimal
+    def read_scans(self):
+        if self.scans is not None:
+            yield from self.scans
+            return
+        self.reader = ScanReader(self.input_file, 0, self.quarantine)
+        yield from self.reader
+        if self.reader.truncated:
+            print(f"\nWarning: {self.input_file} ends before the end of the scan data; only the {format(self.scan_count, ',')} scans read are processed")
+
+    # The scans and bytes read so far (no bytes for scans that don't come from a file)
+    def progress(self):
+        return self.scan_count, self.reader.position() if self.reader is not None else None
+
+    def reject(self, error, scan):
+        self.rejected_count += 1
+        if self.quarantine is not None:
+            self.quarantine.add(error, scan=scan, offset=self.reader.scan_offset if self.reader is not None else None)
+
+    def run(self):
+        live = self.telemetry is not None and self.telemetry.display
+        if self.telemetry is not None:
+            self.telemetry.set_stage("Processing scans", self.progress, os.path.getsize(self.input_file) if self.scans is None else None)
+        if not live:
+            print("Processing scans...", end="", flush=True)
+
+        for scan in self.read_scans():
+            self.scan_count += 1
+
+            # An output file that fails to write shouldn't stop the other consumers, nor should a scan one of them rejects
+            rejected = False
+            for consumer in self.consumers:
+                try:
+                    consumer.add(scan)
+                except IOError as e:
+                    print(f"IOError when writing to file: {e}")
+                except Exception as e:
+                    if not rejected:
+                        self.reject(e, scan)
+                    rejected = True
+
+        if live:
+            self.telemetry.hide()
+            print("Processing scans...completed!")
+        else:
+            print("completed!")
+
+        if self.telemetry is not None:
+            self.telemetry.set_stage("Finishing scans")
+        return [consumer.finish() for consumer in self.consumers]
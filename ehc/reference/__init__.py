@@ -0,0 +1,5 @@
+# Reference copies of EHC_analyze.py, EHC_scantime_deviation.py, EHC_split.py and EHC_merge.py as they were before the optimized
+# engines were added, run by EHC_compare.py as the reference to check the engines against. They are kept as they were except for
+# what kept them from running at all: argparse names the positional arguments input-file and so on, which the scripts read as
+# input_file (they get a metavar instead), and EHC_scantime_deviation.py shadowed dateutil's parser with its argument parser and
+# returned outside a function.
@@ -0,0 +1,190 @@
+import json
+import math
+import ijson
+from ehc.fileio import detect_compression, open_input, read_buffer_size
+from ehc.passthrough import RawScanReader
+from ehc.sketches import hash64
+from ehc.accumulators import calculate_time_difference, loc_bin_key
+
+# Deterministic, stratified sampling of scans for a quick (--sample) analysis.
+#
+# A scan is sampled when the hash of its Id falls below the sampling rate, so the same file and rate always give the same
+# sample. Scans are stratified by requested date and LOC bin; the first min_per_stratum scans of every stratum are always
+# sampled so small bins aren't starved, and every scan is counted so each stratum's sample can be weighted back up to the
+# stratum's size (weight = scans in stratum / scans sampled from it).
+#
+# For uncompressed files the scans that aren't sampled are never parsed: RawScanReader (ehc/passthrough.py) finds the span of
+# each item of the value array by following its strings and nested objects, whatever order its keys are in, and decodes only
+# the Id, LOC and date at its top level; only sampled items are decoded in full. Compressed files are parsed in full and the
+# sampling is applied afterwards.
+
+min_per_stratum = 5
+confidence_z = 1.96 # 95% confidence intervals
+
+sampling_keys = ('Id', 'LOC', 'ScanRequestedOn')
+
+
+class StratifiedSampler:
+    def __init__(self, rate, min_per_stratum=min_per_stratum):
+        self.rate = rate
+        self.threshold = int(rate * (1 << 64))
+        self.min_per_stratum = min_per_stratum
+        self.stratum_totals = {}
+        self.stratum_sampled = {}
+        # whether the unsampled scans could be skipped without parsing them
+        self.skipped_parsing = False
+
+    # Count the scan in its stratum and decide whether it is sampled; scans without a LOC are left out, as in the analysis
+    def consider(self, scan_id, loc, scan_date_str):
+        if loc is None:
+            return None
+        stratum = (scan_date_str, loc_bin_key(loc))
+        seen = self.stratum_totals.get(stratum, 0)
+        self.stratum_totals[stratum] = seen + 1
+        if seen < self.min_per_stratum or hash64(scan_id) < self.threshold:
+            self.stratum_sampled[stratum] = self.stratum_sampled.get(stratum, 0) + 1
+            return stratum
+        return None
+
+    # The sampled scans as (stratum, scan)
+    def read(self, file_path):
+        if detect_compression(file_path) is None:
+            self.skipped_parsing = True
+            yield from self.read_raw(file_path)
+        else:
+            yield from self.read_parsed(file_path)
+
+    # The Id, LOC and date of a raw item stand in for the scan until it is sampled
+    def read_raw(self, file_path):
+        for raw, fields in RawScanReader(file_path, sampling_keys):
+            stratum = self.consider_scan(fields)
+            if stratum is not None:
+                yield stratum, json.loads(raw)
+
+    def read_parsed(self, file_path):
+        with open_input(file_path) as file:
+            for scan in ijson.items(file, 'value.item', buf_size=read_buffer_size):
+                stratum = self.consider_scan(scan)
+                if stratum is not None:
+                    yield stratum, scan
+
+    def consider_scan(self, scan):
+        return self.consider(scan.get('Id'), scan.get('LOC', None), scan.get('ScanRequestedOn', '').split('T')[0])
+
+    def weights(self):
+        return {stratum: self.stratum_totals[stratum] / sampled for stratum, sampled in self.stratum_sampled.items()}
+
+    def total_count(self):
+        return sum(self.stratum_totals.values())
+
+    def sampled_count(self):
+        return sum(self.stratum_sampled.values())
+
+
+# The values of a scan used by the ratio estimates below
+def estimate_values(scan):
+    engine_finished = scan.get('EngineFinishedOn', None) is not None
+    values = {
+        'one': 1,
+        'yes': 1 if engine_finished else 0,
+        'full': 0 if scan.get('IsIncremental', None) else 1,
+        'incremental': 1 if scan.get('IsIncremental', None) else 0,
+        'no_scan': 0 if engine_finished else 1,
+        'high_results': 1 if scan.get('High', 0) > 0 else 0,
+        'medium_results': 1 if scan.get('Medium', 0) > 0 else 0,
+        'low_results': 1 if scan.get('Low', 0) > 0 else 0,
+        'info_results': 1 if scan.get('Info', 0) > 0 else 0,
+        'zero_results': 1 if scan.get('TotalVulnerabilities', 0) == 0 else 0,
+        'source_pulling_time': math.ceil(calculate_time_difference(scan.get('ScanRequestedOn'),scan.get('QueuedOn'))),
+        'queue_time': math.ceil(calculate_time_difference(scan.get('QueuedOn'),scan.get('EngineStartedOn'))),
+        'total_scan_time': math.ceil(calculate_time_difference(scan.get('ScanRequestedOn'),scan.get('ScanCompletedOn'))),
+        'engine_scan_time': math.ceil(calculate_time_difference(scan.get('EngineStartedOn'),scan.get('EngineFinishedOn'))) if engine_finished else 0,
+        'total_vulns': scan.get('TotalVulnerabilities', 0),
+        'high': scan.get('High', 0),
+        'medium': scan.get('Medium', 0),
+        'low': scan.get('Low', 0),
+        'info': scan.get('Info', 0)
+    }
+    return values
+
+# Ratio estimates (numerator, denominator) with the same definitions as the summary, duration and severity reports. The
+# durations are divided by the number of scans that were actually scanned, as compute_duration_totals does.
+estimate_ratios = {
+    'full_scan_pct': ('full', 'one'),
+    'incremental_scan_pct': ('incremental', 'one'),
+    'no_scan_pct': ('no_scan', 'one'),
+    'high_results_pct': ('high_results', 'one'),
+    'medium_results_pct': ('medium_results', 'one'),
+    'low_results_pct': ('low_results', 'one'),
+    'info_results_pct': ('info_results', 'one'),
+    'zero_results_pct': ('zero_results', 'one'),
+    'total_scan_time__avg': ('total_scan_time', 'yes'),
+    'engine_scan_time__avg': ('engine_scan_time', 'yes'),
+    'queue_time__avg': ('queue_time', 'yes'),
+    'source_pulling_time__avg': ('source_pulling_time', 'yes'),
+    'total_vulns__avg': ('total_vulns', 'one'),
+    'high__avg': ('high', 'one'),
+    'medium__avg': ('medium', 'one'),
+    'low__avg': ('low', 'one'),
+    'info__avg': ('info', 'one')
+}
+
+
+# Per stratum sums for the stratified ratio estimates and their confidence intervals (the variance uses the linearized
+# residuals y - R*x within each stratum, with the finite population correction).
+class StratifiedEstimates:
+    def __init__(self):
+        # stratum: [sampled count, {ratio: [sum y, sum x, sum y^2, sum x^2, sum x*y]}]
+        self.strata = {}
+
+    def add(self, stratum, scan):
+        values = estimate_values(scan)
+        if stratum not in self.strata:
+            self.strata[stratum] = [0, {name: [0, 0, 0, 0, 0] for name in estimate_ratios}]
+        entry = self.strata[stratum]
+        entry[0] += 1
+        for name, (y_key, x_key) in estimate_ratios.items():
+            y = values[y_key]
+            x = values[x_key]
+            sums = entry[1][name]
+            sums[0] += y
+            sums[1] += x
+            sums[2] += y * y
+            sums[3] += x * x
+            sums[4] += x * y
+
+    def merge(self, other):
+        for stratum, (count, other_sums) in other.strata.items():
+            if stratum not in self.strata:
+                self.strata[stratum] = [count, {name: list(sums) for name, sums in other_sums.items()}]
+                continue
+            entry = self.strata[stratum]
+            entry[0] += count
+            for name, sums in other_sums.items():
+                entry[1][name] = [a + b for a, b in zip(entry[1][name], sums)]
+        return self
+
+    # {ratio: {'estimate': R, 'margin': half width of the confidence interval}} given the number of scans in each stratum
+    def intervals(self, stratum_totals, z=confidence_z):
+        intervals = {}
+        for name in estimate_ratios:
+            y_total = x_total = 0
+            for stratum, (count, sums) in self.strata.items():
+                y_total += stratum_totals[stratum] * sums[name][0] / count
+                x_total += stratum_totals[stratum] * sums[name][1] / count
+            if x_total == 0:
+                continue
+            ratio = y_total / x_total
+
+            variance = 0
+            for stratum, (count, sums) in self.strata.items():
+                if count < 2:
+                    continue
+                sum_y, sum_x, sum_yy, sum_xx, sum_xy = sums[name]
+                sum_d = sum_y - ratio * sum_x
+                sum_dd = sum_yy - 2 * ratio * sum_xy + ratio * ratio * sum_xx
+                residual_variance = max(0, (sum_dd - sum_d * sum_d / count) / (count - 1))
+                stratum_total = stratum_totals[stratum]
+                variance += stratum_total * stratum_total * (1 - count / stratum_total) * residual_variance / count
+            intervals[name] = {'estimate': ratio, 'margin': z * math.sqrt(variance) / x_total}
+        return intervals
@@ -0,0 +1,185 @@
+import heapq
+from datetime import datetime
+from ehc.accumulators import SortedRecords, origin_group, printable_origins, project_name_of
+
+# Planning a shift of the scheduled scans (origin System) away from the busy hours of the week.
+#
+# Scheduled scans are grouped into schedules by project and the hour of the week they were queued in. The load of the other
+# scans, which can't be moved, is the engine time they would take if they started as soon as they were queued (as for the
+# optimal concurrency of the concurrency analysis), averaged per hour of the week. The schedules are then placed one at a time,
+# the largest (most engine time) first, in the hour of the week where the busiest hour they cover ends up least busy (greedy bin
+# packing); a schedule stays where it is unless moving it makes that hour at least schedule_min_gain less busy.
+#
+# The effect is projected by moving every scan of a schedule by the same number of hours (at most half a week either way):
+# the peak concurrency of the scans started as soon as they were queued, and the queue time of the CI scans in a first in,
+# first out simulation with capacity engines (by default one per engine server seen in the data), before and after the shift.
+
+slot_seconds = 3600 # the hours of the week
+week_slots = 7 * 24
+week_seconds = week_slots * slot_seconds
+schedule_min_gain = 0.1
+
+scheduled_origin = printable_origins['System']
+# The origin groups (see printable_origins) of scans started by a build or CI pipeline
+ci_origins = {'ADO', 'Bamboo', 'CLI', 'cx-CLI', 'CxFlow', 'Jenkins', 'Maven', 'TeamCity', 'TFS', 'VSTS'}
+weekday_names = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+# The hour of the week (0 is Monday 00:00) of a timestamp and the seconds into that hour
+def slot_of(timestamp):
+    moment = datetime.fromtimestamp(timestamp)
+    return moment.weekday() * 24 + moment.hour, moment.minute * 60 + moment.second + moment.microsecond / 1000000
+
+def slot_name(slot):
+    return f"{weekday_names[slot // 24]} {slot % 24:02d}:00"
+
+# Add duration seconds, starting offset seconds into slot, to the load of the hours of the week
+def spread(load, slot, offset, duration):
+    while duration > 0:
+        part = min(duration, slot_seconds - offset)
+        load[slot % week_slots] += part
+        duration -= part
+        offset = 0
+        slot += 1
+
+# The most scans running at once, for runs (start, duration) in order of start; at the same timestamp a scan ending comes
+# before one starting
+def peak_concurrency(runs):
+    ends = [] # a heap of the ends of the running scans
+    peak = 0
+    for start, duration in runs:
+        if duration <= 0:
+            continue
+        while ends and ends[0] <= start:
+            heapq.heappop(ends)
+        heapq.heappush(ends, start + duration)
+        peak = max(peak, len(ends))
+    return peak
+
+# First in, first out queue with capacity engines, for scans (arrival, duration, measured) in order of arrival; returns the
+# total queue time of the measured scans
+def simulate_queue_seconds(scans, capacity):
+    engines = [float('-inf')] * capacity # when each engine is next free (a heap)
+    queue_seconds = 0
+    for arrival, duration, measured in scans:
+        start = max(arrival, engines[0])
+        heapq.heapreplace(engines, start + duration)
+        if measured:
+            queue_seconds += start - arrival
+    return queue_seconds
+
+
+# scan_times returns the scans in the order they were queued, each time it is called, as QueueContributors.scan_times() does;
+# the plan reads them a few times rather than holding them. capacity is the number of engines of the queue simulation; with 0
+# (e.g. no engine servers in the data) the queue isn't simulated and its times are None. The scans as they are after the shift
+# are sorted in SortedRecords of memory_budget.
+def plan_schedule_shift(scan_times, capacity, memory_budget=None):
+    groups = {}
+    def group_of(origin):
+        group = groups.get(origin)
+        if group is None:
+            group = groups[origin] = origin_group(origin)
+        return group
+
+    # the load of the scans that stay where they are, and the schedules with their load relative to their own hour
+    fixed_load = [0] * week_slots
+    schedules = {}
+    first_queued_on = last_queued_on = None
+    scan_count = ci_scan_count = 0
+    observed_ci_queue_seconds = 0
+    for queued_on, started_on, engine_seconds, project, origin in scan_times():
+        if first_queued_on is None:
+            first_queued_on = queued_on
+        last_queued_on = queued_on
+        scan_count += 1
+        group = group_of(origin)
+        if group in ci_origins:
+            ci_scan_count += 1
+            observed_ci_queue_seconds += max(0, started_on - queued_on)
+        slot, offset = slot_of(queued_on)
+        if group != scheduled_origin:
+            spread(fixed_load, slot, offset, engine_seconds)
+            continue
+        key = (project, slot)
+        schedule = schedules.get(key)
+        if schedule is None:
+            schedule = schedules[key] = {'project': project_name_of(project), 'slot': slot, 'scan_count': 0, 'load': [0] * week_slots, 'engine_seconds': 0}
+        schedule['scan_count'] += 1
+        schedule['engine_seconds'] += engine_seconds
+        spread(schedule['load'], 0, offset, engine_seconds)
+
+    weeks = max(1, (last_queued_on - first_queued_on) / week_seconds) if scan_count else 1
+    scale = slot_seconds * weeks # engine seconds per hour of the week -> average concurrent scans
+
+    load_before = list(fixed_load)
+    for schedule in schedules.values():
+        for hours, seconds in enumerate(schedule['load']):
+            load_before[(schedule['slot'] + hours) % week_slots] += seconds
+
+    # greedy placement, largest schedule first
+    load_after = fixed_load
+    planned = sorted(schedules.values(), key=lambda schedule: (-schedule['engine_seconds'], schedule['project'], schedule['slot']))
+    for schedule in planned:
+        relative_load = [(hours, seconds) for hours, seconds in enumerate(schedule['load']) if seconds]
+
+        # the load of the busiest hour the schedule would cover if it started in target
+        def busiest(target):
+            return max((load_after[(target + hours) % week_slots] + seconds for hours, seconds in relative_load), default=0)
+
+        # least busy first, then closest to where it is now
+        schedule['target'] = min(range(week_slots), key=lambda target: (busiest(target),
+            min((target - schedule['slot']) % week_slots, (schedule['slot'] - target) % week_slots)))
+        if busiest(schedule['target']) > busiest(schedule['slot']) * (1 - schedule_min_gain):
+            schedule['target'] = schedule['slot']
+        for hours, seconds in relative_load:
+            load_after[(schedule['target'] + hours) % week_slots] += seconds
+        shift = (schedule['target'] - schedule['slot']) % week_slots
+        schedule['shift_hours'] = shift - week_slots if shift > week_slots // 2 else shift
+
+    # the projection: every scan of a schedule moved by the same number of hours, sorted again by the time it is queued
+    def before():
+        for queued_on, _, engine_seconds, _, origin in scan_times():
+            yield queued_on, engine_seconds, group_of(origin) in ci_origins
+
+    shifted = SortedRecords('ddb', memory_budget)
+    try:
+        peak_before = peak_concurrency((queued_on, engine_seconds) for queued_on, engine_seconds, _ in before())
+        queue_seconds_before = simulate_queue_seconds(before(), capacity) if capacity else None
+        for queued_on, _, engine_seconds, project, origin in scan_times():
+            group = group_of(origin)
+            if group == scheduled_origin:
+                queued_on += schedules[(project, slot_of(queued_on)[0])]['shift_hours'] * slot_seconds
+            shifted.add((queued_on, engine_seconds, group in ci_origins))
+        peak_after = peak_concurrency((queued_on, engine_seconds) for queued_on, engine_seconds, _ in shifted.records())
+        queue_seconds_after = simulate_queue_seconds(shifted.records(), capacity) if capacity else None
+    finally:
+        shifted.cleanup()
+
+    def busiest_hour(load):
+        slot = max(range(week_slots), key=load.__getitem__)
+        return {'slot': slot_name(slot), 'concurrency': load[slot] / scale}
+
+    return {
+        'capacity': capacity,
+        'weeks': weeks,
+        'scheduled_scan_count': sum(schedule['scan_count'] for schedule in planned),
+        'ci_scan_count': ci_scan_count,
+        'schedule_count': len(planned),
+        'moved_schedule_count': sum(1 for schedule in planned if schedule['shift_hours']),
+        'busiest_hour': {'before': busiest_hour(load_before), 'after': busiest_hour(load_after)},
+        'peak_concurrency': {'before': peak_before, 'after': peak_after},
+        'ci_queue_seconds': {
+            'observed': observed_ci_queue_seconds,
+            'before': queue_seconds_before,
+            'after': queue_seconds_after
+        },
+        'load_by_hour': {'before': [seconds / scale for seconds in load_before], 'after': [seconds / scale for seconds in load_after]},
+        'schedules': [{
+            'project': schedule['project'],
+            'scan_count': schedule['scan_count'],
+            'engine_seconds': schedule['engine_seconds'],
+            'from_slot': slot_name(schedule['slot']),
+            'to_slot': slot_name(schedule['target']),
+            'shift_hours': schedule['shift_hours']
+        } for schedule in planned]
+    }
@@ -0,0 +1,103 @@
+import heapq
+import math
+from hashlib import blake2b
+
+# Fixed size sketches for the approximate (--approximate) analysis of very large instances. Both can be merged and pickled
+# like the accumulators in ehc/accumulators.py.
+
+def hash64(value):
+    return int.from_bytes(blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+# HyperLogLog distinct count. 2^precision one-byte registers; the relative standard error is 1.04 / sqrt(2^precision),
+# e.g. 0.8% for the default precision of 14 (16 KB).
+class HyperLogLog:
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        hashed = hash64(value)
+        index = hashed >> (64 - self.precision)
+        remainder = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precisions")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        return self
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        # small range correction (linear counting)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+# Space-Saving top-k (heavy hitters) over weighted counts. At most capacity keys are monitored; a new key replaces the one with
+# the smallest count and inherits that count as its error. For every monitored key, count - error <= true count <= count, and
+# any key that isn't monitored has a true count of at most max_error().
+class SpaceSaving:
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        # min-heap of (count, key); entries go stale when a count changes and are skipped when popped
+        self.heap = []
+
+    def add(self, key, weight=1):
+        if key in self.counts:
+            self.counts[key] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = weight
+            self.errors[key] = 0
+        else:
+            min_count, min_key = self.pop_min()
+            del self.counts[min_key]
+            del self.errors[min_key]
+            self.counts[key] = min_count + weight
+            self.errors[key] = min_count
+        heapq.heappush(self.heap, (self.counts[key], key))
+        if len(self.heap) > 4 * self.capacity + 16:
+            self.rebuild_heap()
+
+    def pop_min(self):
+        while True:
+            count, key = heapq.heappop(self.heap)
+            if self.counts.get(key) == count:
+                return count, key
+
+    def rebuild_heap(self):
+        self.heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self.heap)
+
+    def max_error(self):
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def merge(self, other):
+        self_min = self.max_error()
+        other_min = other.max_error()
+        merged = []
+        for key in set(self.counts) | set(other.counts):
+            count = self.counts.get(key, self_min) + other.counts.get(key, other_min)
+            error = self.errors.get(key, self_min) + other.errors.get(key, other_min)
+            merged.append((count, error, key))
+        merged = heapq.nlargest(self.capacity, merged, key=lambda x: x[0])
+        self.counts = {key: count for count, _, key in merged}
+        self.errors = {key: error for _, error, key in merged}
+        self.rebuild_heap()
+        return self
+
+    # The top n keys as (key, count, error), largest count first (ties by key, so the order is deterministic)
+    def top(self, n):
+        return [(key, count, self.errors[key]) for key, count in heapq.nsmallest(n, self.counts.items(), key=lambda x: (-x[1], x[0]))]
@@ -0,0 +1,57 @@
+import json
+import random
+from datetime import datetime, timedelta
+from ehc.odata import default_context
+
+# Synthetic EHC exports, for EHC_compare.py --synthetic and the tests: scan_count scans over days days, the same for the same
+# seed, with all origins, presets and languages, full and incremental scans, queued scans, no-change scans (no EngineFinishedOn)
+# and a few scans without a LOC. The @odata.context lists the fields of the scans, as a real export's does.
+
+synthetic_context = default_context('https://example/Cxwebinterface/odata/v1')
+origins = ['Jenkins', 'CxFlow', 'System', 'Web Portal', 'cx-CLI 1.2', 'ADO', 'Maven', 'Other origin']
+presets = ['Checkmarx Default', 'OWASP TOP 10 - 2021', 'High and Medium', 'All']
+languages = ['Java', 'JavaScript', 'CSharp', 'Python', 'Go', 'Common', 'Typescript']
+
+
+def timestamp(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+# The scans sorted by ScanRequestedOn; projects defaults to one per 25 scans
+def make_scans(scan_count, seed=1, days=90, projects=None, engine_servers=5):
+    generator = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    projects = projects or max(1, scan_count // 25)
+
+    scans = []
+    for index in range(scan_count):
+        requested_on = start + timedelta(seconds=generator.randint(0, days * 86400 - 1))
+        queued_on = requested_on + timedelta(seconds=generator.randint(1, 300))
+        engine_started_on = queued_on + timedelta(seconds=generator.randint(0, 3600))
+        engine_finished_on = None if generator.random() < 0.15 else engine_started_on + timedelta(seconds=generator.randint(30, 3 * 3600))
+        loc = generator.choice([generator.randint(100, 20000), generator.randint(20000, 300000), generator.randint(300000, 12000000)])
+        project_id = generator.randint(1, projects)
+        high, medium, low, info = generator.randint(0, 20), generator.randint(0, 50), generator.randint(0, 80), generator.randint(0, 10)
+        scan = {
+            'Id': 1000000 + index, 'ProjectId': project_id, 'ProjectName': f"project-{project_id}",
+            'ScanRequestedOn': timestamp(requested_on), 'QueuedOn': timestamp(queued_on), 'EngineStartedOn': timestamp(engine_started_on),
+            'EngineFinishedOn': timestamp(engine_finished_on) if engine_finished_on else None,
+            'ScanCompletedOn': timestamp((engine_finished_on or engine_started_on) + timedelta(seconds=generator.randint(1, 120))),
+            'LOC': loc, 'FailedLOC': generator.randint(0, loc // 10), 'IsIncremental': generator.random() < 0.3,
+            'PresetName': generator.choice(presets), 'Origin': generator.choice(origins), 'EngineServerId': generator.randint(1, engine_servers),
+            'TotalVulnerabilities': high + medium + low + info, 'High': high, 'Medium': medium, 'Low': low, 'Info': info,
+            'ScannedLanguages': [{'LanguageName': language} for language in generator.sample(languages, generator.randint(1, 3))]
+        }
+        if generator.random() < 0.01:
+            del scan['LOC']
+        scans.append(scan)
+    scans.sort(key=lambda scan: scan['ScanRequestedOn'])
+    return scans
+
+# Write scans as an EHC export (indent=None for a compact one)
+def write_ehc_file(file_path, scans, indent=4):
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump({'@odata.context': synthetic_context, 'value': scans}, file, indent=indent)
+    return str(file_path)
+
+def write_synthetic_file(file_path, scan_count, seed=1):
+    return write_ehc_file(file_path, make_scans(scan_count, seed))
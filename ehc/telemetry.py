@@ -0,0 +1,232 @@
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+# Progress of a long run, sampled on a timer rather than counted per scan. A background thread calls a progress function every
+# interval seconds; it returns the scans and bytes read so far, typically by reading the counters of the loop being reported on,
+# so the loop itself does no extra work per scan. Each sample has the current stage, the scans and bytes per second since the
+# previous sample, the memory in use (RSS) and, when the size of the input is known, the ETA of the stage from its average rate.
+#
+# A sample is shown on a single line of the terminal (stderr, rewritten in place; only when stderr is a terminal) and/or written
+# to a metrics file: a Prometheus textfile, replaced atomically on each sample for the node_exporter textfile collector, or a
+# JSON lines stream with one object per sample.
+
+telemetry_interval = 2 # seconds between samples
+metrics_formats = ['prometheus', 'jsonl']
+prometheus_metrics = [
+    # (name, type, help, sample key)
+    ('ehc_scans_read_total', 'counter', "Scans read so far.", 'scans'),
+    ('ehc_bytes_read_total', 'counter', "Bytes of the input read so far (compressed bytes for a compressed input).", 'bytes'),
+    ('ehc_input_bytes', 'gauge', "Size of the input in bytes.", 'total_bytes'),
+    ('ehc_scans_per_second', 'gauge', "Scans read per second over the last interval.", 'scans_per_second'),
+    ('ehc_bytes_per_second', 'gauge', "Bytes read per second over the last interval.", 'bytes_per_second'),
+    ('ehc_eta_seconds', 'gauge', "Estimated seconds until the current stage ends.", 'eta_seconds'),
+    ('ehc_resident_memory_bytes', 'gauge', "Resident memory (RSS) of the process.", 'rss_bytes'),
+    ('ehc_elapsed_seconds', 'gauge', "Seconds since the run started.", 'elapsed_seconds'),
+    ('ehc_finished', 'gauge', "1 once the run has finished.", 'finished'),
+    ('ehc_last_sample_timestamp_seconds', 'gauge', "Unix time of the sample.", 'timestamp')
+]
+
+
+# The resident memory of the process in bytes: the current RSS where /proc is available, else the peak RSS; None if neither is
+def memory_in_use():
+    try:
+        with open('/proc/self/statm', 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def format_size(size):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# The metrics format of a file: prometheus for .prom files, otherwise JSON lines
+def metrics_format_of(file_path):
+    return 'prometheus' if file_path.endswith('.prom') else 'jsonl'
+
+
+class Telemetry:
+    # display: show the samples on the terminal (if stderr is one); metrics_file: where to write the samples, in metrics_format
+    # (by default from the file suffix); run_name: a label for the run in the metrics
+    def __init__(self, interval=telemetry_interval, display=True, metrics_file=None, metrics_format=None, run_name=''):
+        self.interval = max(0.1, interval)
+        self.display = display and sys.stderr.isatty()
+        self.metrics_file = metrics_file
+        self.metrics_format = metrics_format or (metrics_format_of(metrics_file) if metrics_file else None)
+        self.run_name = run_name
+        self.started = time.monotonic()
+        self.stage = None
+        self.progress = None
+        self.total_bytes = None
+        self.last = (0, 0)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.line_length = 0
+        self.hidden = False
+        self.metrics_stream = None
+        self.finished = False
+
+    def enabled(self):
+        return self.display or self.metrics_file is not None
+
+    # Start a stage: progress returns (scans, bytes) read so far, or is None for a stage without progress (e.g. writing the
+    # reports, whose samples keep the counts of the stage before); total_bytes is the size of the input, if known, for the ETA
+    def set_stage(self, stage, progress=None, total_bytes=None):
+        with self.lock:
+            # the counts of the stage that ends, as they are now rather than at its last sample
+            if self.progress is not None:
+                self.last = self.progress()
+            self.stage = stage
+            self.progress = progress
+            if progress is not None:
+                self.total_bytes = total_bytes
+            self.stage_started = time.monotonic()
+            self.stage_start = progress() if progress is not None else self.last
+            self.last = self.stage_start
+            self.previous = (self.stage_started, self.stage_start)
+        if self.thread is None and self.enabled():
+            self.thread = threading.Thread(target=self.run, name='ehc-telemetry', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.record(self.sample())
+
+    def sample(self):
+        with self.lock:
+            now = time.monotonic()
+            scans, position = self.progress() if self.progress is not None else self.last
+            self.last = (scans, position)
+            previous_time, (previous_scans, previous_position) = self.previous
+            self.previous = (now, (scans, position))
+            elapsed = max(now - previous_time, 1e-9)
+            sample = {
+                'timestamp': time.time(),
+                'run': self.run_name,
+                'stage': self.stage,
+                'scans': scans,
+                'bytes': position,
+                'total_bytes': self.total_bytes,
+                'scans_per_second': (scans - previous_scans) / elapsed,
+                'bytes_per_second': (position - previous_position) / elapsed if position is not None and previous_position is not None else None,
+                'eta_seconds': None,
+                'rss_bytes': memory_in_use(),
+                'elapsed_seconds': now - self.started,
+                'finished': 1 if self.finished else 0
+            }
+            # the ETA goes by the average rate of the stage so far, which is steadier than that of the last interval
+            stage_bytes = position - self.stage_start[1] if position is not None and self.stage_start[1] is not None else 0
+            if self.total_bytes and stage_bytes > 0 and not self.finished:
+                sample['eta_seconds'] = max(0, self.total_bytes - position) * (now - self.stage_started) / stage_bytes
+        return sample
+
+    def record(self, sample):
+        with self.lock:
+            if self.display and not self.hidden and not self.finished:
+                self.show(sample)
+        if self.metrics_file is not None:
+            try:
+                self.write_metrics(sample)
+            except IOError as e:
+                print(f"IOError when writing to file: {e}")
+                self.metrics_file = None
+
+    def show(self, sample):
+        if self.progress is None:
+            parts = [f"{sample['stage']}: {format_duration(time.monotonic() - self.stage_started)}"]
+        else:
+            parts = [f"{sample['stage']}: {format(sample['scans'], ',')} scans ({sample['scans_per_second']:,.0f}/s)"]
+        if self.progress is not None and sample['bytes'] is not None and sample['bytes_per_second'] is not None:
+            size = f"{format_size(sample['bytes'])} of {format_size(sample['total_bytes'])}" if sample['total_bytes'] else format_size(sample['bytes'])
+            parts.append(f"{size} ({format_size(sample['bytes_per_second'])}/s)")
+        if sample['eta_seconds'] is not None:
+            parts.append(f"ETA {format_duration(sample['eta_seconds'])}")
+        if sample['rss_bytes'] is not None:
+            parts.append(f"RSS {format_size(sample['rss_bytes'])}")
+        line = ", ".join(parts)
+        sys.stderr.write("\r" + line.ljust(self.line_length))
+        sys.stderr.flush()
+        self.line_length = len(line)
+
+    def clear(self):
+        if self.line_length:
+            sys.stderr.write("\r" + " " * self.line_length + "\r")
+            sys.stderr.flush()
+            self.line_length = 0
+
+    # Stop showing the samples (e.g. before the reports are printed); the metrics file is still written
+    def hide(self):
+        with self.lock:
+            self.hidden = True
+            self.clear()
+
+    # Print a line of output without it running into the sample shown on the terminal (which is shown again on the next sample)
+    def message(self, text):
+        with self.lock:
+            self.clear()
+            print(text, flush=True)
+
+    def write_metrics(self, sample):
+        if self.metrics_format == 'jsonl':
+            if self.metrics_stream is None:
+                self.metrics_stream = open(self.metrics_file, 'a', encoding='utf-8')
+            record = dict(sample, time=datetime.fromtimestamp(sample['timestamp'], timezone.utc).isoformat())
+            self.metrics_stream.write(json.dumps(record) + "\n")
+            self.metrics_stream.flush()
+            return
+
+        labels = f'run="{escape_label(self.run_name)}"' if self.run_name else ''
+        lines = []
+        for name, metric_type, description, key in prometheus_metrics:
+            if sample[key] is None:
+                continue
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            value = round(sample[key], 3) if isinstance(sample[key], float) else sample[key]
+            lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+        lines.append("# HELP ehc_stage The current stage of the run.")
+        lines.append("# TYPE ehc_stage gauge")
+        stage_labels = (labels + ',' if labels else '') + f'stage="{escape_label(sample["stage"])}"'
+        lines.append(f"ehc_stage{{{stage_labels}}} 1")
+        # written next to the target and renamed, so a scrape never sees half a file
+        temp_file = self.metrics_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as file:
+            file.write("\n".join(lines) + "\n")
+        os.replace(temp_file, self.metrics_file)
+
+    # End the run: a last sample is recorded (marked finished) and the terminal line is cleared
+    def stop(self):
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+        self.hide()
+        if self.metrics_file is not None and self.stage is not None:
+            self.finished = True
+            self.record(self.sample())
+        if self.metrics_stream is not None:
+            self.metrics_stream.close()
+            self.metrics_stream = None
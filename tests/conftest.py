@@ -0,0 +1,24 @@
+import pytest
+import ehc.accumulators
+from ehc.synthetic import make_scans, write_ehc_file
+
+# The tests run on synthetic EHC exports (ehc/synthetic.py) of a few hundred scans over a few days, so the per-second concurrency
+# snapshots stay quick
+
+
+@pytest.fixture
+def scans():
+    return make_scans(300, days=3, projects=20, engine_servers=3)
+
+# An EHC file of the scans fixture in the test's temp directory
+@pytest.fixture
+def ehc_file(tmp_path, scans):
+    return write_ehc_file(tmp_path / 'ehc.json', scans)
+
+# Spill the records of the test to its temp directory rather than the system temp directory
+@pytest.fixture(autouse=True)
+def spill_directory(tmp_path, monkeypatch):
+    directory = tmp_path / 'spill'
+    directory.mkdir()
+    monkeypatch.setattr(ehc.accumulators, 'spill_directory', str(directory))
+    return directory
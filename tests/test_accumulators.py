@@ -0,0 +1,194 @@
+import os
+import pickle
+import random
+from datetime import datetime
+import pytest
+from EHC_analyze import ScanProcessor, compute_concurrency_maxima
+from ehc.accumulators import (SortedRecords, ConcurrencyEvents, EngineServerStats, QueueContributors, QueueEpisodes, DateStats,
+    percentile_rank, check_scan)
+
+tiny_budget = 64 * 21 # a few dozen records of the widest store in memory, so everything is spilled in many runs
+
+
+def processed(scans, cc_memory_budget=None):
+    processor = ScanProcessor(cc_memory_budget=cc_memory_budget)
+    for scan in scans:
+        processor.add(scan)
+    return processor
+
+def test_merged_processors_equal_one_processor(scans):
+    expected = processed(scans).finish()
+    total = ScanProcessor(cc_memory_budget=tiny_budget)
+    for part in (scans[:120], scans[120:200], scans[200:]):
+        processor = processed(part, tiny_budget)
+        total.merge(processor)
+        processor.cleanup()
+    result = total.finish()
+    # the cost of a scan of several languages is shared between them, so those sums can differ in the last digit with the order
+    # they were added in
+    cost_attribution, expected_cost_attribution = result.pop('cost_attribution'), expected.pop('cost_attribution')
+    assert result == expected
+    for dimension, groups in expected_cost_attribution.items():
+        assert [group['name'] for group in cost_attribution[dimension]] == [group['name'] for group in groups]
+        for group, expected_group in zip(cost_attribution[dimension], groups):
+            assert group == pytest.approx(expected_group, abs=1)
+
+
+def random_records(count, seed=1):
+    generator = random.Random(seed)
+    return [(generator.randint(0, 9), generator.uniform(0, 1000)) for _ in range(count)]
+
+def test_sorted_records_spill_and_merge():
+    records = random_records(5000)
+    store = SortedRecords('id', 12 * 100)
+    for record in records:
+        store.add(record)
+    assert len(store.runs) > 1
+    assert len(store) == len(records)
+    assert list(store.records()) == sorted(records)
+    store.cleanup()
+    assert store.runs == []
+
+def test_sorted_records_sort_in_chunks(monkeypatch):
+    monkeypatch.setattr('ehc.accumulators.sort_chunk_size', 7)
+    monkeypatch.setattr('ehc.accumulators.cc_run_block_size', 5)
+    records = random_records(500, 2)
+    store = SortedRecords('id', 12 * 64)
+    for record in records:
+        store.add(record)
+    assert list(store.records()) == sorted(records)
+    store.cleanup()
+
+def test_sorted_records_merge_takes_over_the_runs():
+    left, right = SortedRecords('id', 12 * 50), SortedRecords('id', 12 * 50)
+    records = random_records(1000, 3)
+    for index, record in enumerate(records):
+        (left if index % 2 else right).add(record)
+    right_runs = list(right.runs)
+    left.merge(right)
+    assert right.runs == []
+    assert set(right_runs) <= set(left.runs)
+    assert list(left.records()) == sorted(records)
+    left.cleanup()
+
+def test_sorted_records_pickle_refers_to_the_runs(tmp_path):
+    records = random_records(1000, 4)
+    store = SortedRecords('id', 12 * 400)
+    for record in records:
+        store.add(record)
+    data = pickle.dumps(store)
+    # the records still in memory are spilled rather than pickled
+    assert len(data) < 1000
+    assert all(not column for column in store.columns)
+
+    store.move_runs(str(tmp_path / 'kept'))
+    loaded = pickle.loads(pickle.dumps(store))
+    assert all(os.path.dirname(path) == str(tmp_path / 'kept') for path, _ in loaded.runs)
+    assert list(loaded.records()) == sorted(records)
+
+    loaded.cleanup()
+    with pytest.raises(IOError):
+        pickle.loads(pickle.dumps(store))
+
+
+def test_spilled_processor_equals_in_memory(scans):
+    in_memory = processed(scans)
+    expected = in_memory.finish()
+    spilled = processed(scans, tiny_budget)
+    assert spilled.concurrency_events.events_store.runs and spilled.queue_contributors.scans.runs and spilled.engine_server_stats.runs.runs
+    result = spilled.finish()
+    assert result == expected
+    assert compute_concurrency_maxima(result) == compute_concurrency_maxima(expected)
+    assert compute_concurrency_maxima(result)['overall_max_optimal'] > 0
+    # finish() removes the runs
+    assert not spilled.concurrency_events.events_store.runs
+
+
+def snapshots_of(scans, memory_budget):
+    events = ConcurrencyEvents(memory_budget)
+    for scan in scans:
+        if scan.get('LOC') is not None:
+            events.add(scan)
+    date_stats = DateStats()
+    for scan in scans:
+        if scan.get('LOC') is not None:
+            date_stats.add(scan)
+    dates = date_stats.to_dict()
+    episodes = QueueEpisodes(3, 600)
+    snapshots = events.snapshots(dates['first_date'], dates['last_date'], 60, episodes)
+    spilled_runs = len(events.events_store.runs)
+    events.finish()
+    return snapshots, episodes.episodes, spilled_runs
+
+def test_concurrency_peaks_spilled_equal_in_memory(scans):
+    snapshots, episodes, spilled_runs = snapshots_of(scans, None)
+    spilled_snapshots, spilled_episodes, many_runs = snapshots_of(scans, tiny_budget)
+    assert spilled_runs == 0 and many_runs > 1
+    assert spilled_snapshots == snapshots
+    assert spilled_episodes == episodes
+    assert max(engines for _, engines, _ in spilled_snapshots) == max(engines for _, engines, _ in snapshots) > 0
+
+def test_check_scan_rejects_bad_scans(scans):
+    scan = dict(next(scan for scan in scans if scan.get('LOC') is not None))
+    check_scan(scan)
+    scan['QueuedOn'] = 'yesterday'
+    with pytest.raises(ValueError):
+        check_scan(scan)
+
+
+def filled(accumulator_class, scans, memory_budget):
+    accumulator = accumulator_class(memory_budget)
+    for scan in scans:
+        if scan.get('LOC') is not None:
+            accumulator.add(scan)
+    return accumulator
+
+def test_engine_server_stats_spilled_and_merged_equal_in_memory(scans):
+    expected = filled(EngineServerStats, scans, None).to_dict()
+    assert max(server['peak_concurrent_scans'] for server in expected.values()) > 1
+
+    spilled = filled(EngineServerStats, scans, tiny_budget)
+    assert len(spilled.runs.runs) > 1
+    assert spilled.to_dict() == expected
+
+    # the second part sees the engine servers in a different order, so its indexes are remapped
+    total = filled(EngineServerStats, scans[:100], tiny_budget)
+    part = filled(EngineServerStats, list(reversed(scans[100:])), tiny_budget)
+    assert part.server_ids != total.server_ids[:len(part.server_ids)]
+    result = total.merge(part).to_dict()
+    part.cleanup()
+    assert result == expected
+    total.cleanup()
+
+def test_percentile_rank():
+    assert percentile_rank(1, 0.5) == 0
+    assert percentile_rank(100, 0.99) == 98
+    assert percentile_rank(100, 0.5) == 49
+
+
+def test_queue_contributors_spilled_and_merged_equal_in_memory(scans):
+    expected = list(filled(QueueContributors, scans, None).scan_times())
+
+    total = filled(QueueContributors, scans[:150], tiny_budget)
+    part = filled(QueueContributors, list(reversed(scans[150:])), tiny_budget)
+    total.merge(part)
+    part.cleanup()
+    assert list(total.scan_times()) == expected
+    assert total.to_dict() == {'scan_count': len(expected)}
+
+    # merging into an empty one takes the runs over
+    empty = QueueContributors(tiny_budget)
+    empty.merge(total)
+    assert total.scans.runs == []
+    assert list(empty.scan_times()) == expected
+    empty.cleanup()
+
+def test_queue_contributors_of_an_episode():
+    contributors = QueueContributors()
+    for scan_id, (queued, started, project) in enumerate([(0, 100, 1), (10, 50, 1), (20, 200, 2), (300, 400, 3)]):
+        contributors.add({'Id': scan_id, 'ProjectId': project, 'ProjectName': f"project-{project}", 'Origin': 'Jenkins',
+            'QueuedOn': datetime.fromtimestamp(1700000000 + queued).isoformat(), 'EngineStartedOn': datetime.fromtimestamp(1700000000 + started).isoformat(),
+            'EngineFinishedOn': None})
+    episodes = contributors.add_contributors([{'start': 1700000000 + 30, 'end': 1700000000 + 150}], 5)
+    assert episodes[0]['projects'] == [('project-1', 2, 90), ('project-2', 1, 120)]
+    assert episodes[0]['origins'] == [('Jenkins', 3, 210)]
@@ -0,0 +1,77 @@
+import glob
+import os
+import subprocess
+import sys
+import pytest
+from EHC_analyze import (ScanProcessor, process_file, output_analysis, compute_stages, failed_stages, select_reports, needs_concurrency,
+    reports, report_stages)
+from ehc.checkpoint import Quarantine
+from ehc.synthetic import write_ehc_file
+
+no_full_data = {'enabled': False, 'csv_dir': '', 'field_names': []}
+tools_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def processed(scans):
+    processor = ScanProcessor()
+    for scan in scans:
+        processor.add(scan)
+    return processor
+
+def test_process_file_quarantines_rejected_scans(tmp_path, scans):
+    bad_scans = [dict(scan) for scan in scans]
+    bad_scans[5]['EngineStartedOn'] = 'never'
+    file_path = write_ehc_file(tmp_path / 'ehc.json', bad_scans)
+    quarantine = Quarantine(str(tmp_path / 'quarantine.jsonl'), 0)
+    result = process_file(file_path, no_full_data, quarantine, progress=False)
+    quarantine.close()
+    assert quarantine.count == 1
+    assert result == processed(scans[:5] + scans[6:]).finish()
+
+
+# The reports that need a failing stage are skipped; the other reports are still written
+def test_failing_stage_skips_only_its_reports(tmp_path, ehc_file, monkeypatch, capsys):
+    data = process_file(ehc_file, no_full_data, Quarantine(str(tmp_path / 'quarantine.jsonl'), 0), progress=False)
+    def fail(data):
+        raise ValueError("broken")
+    monkeypatch.setitem(report_stages, 'engine_server_metrics', dict(report_stages['engine_server_metrics'], function=fail))
+
+    context, errors = compute_stages(data, reports)
+    assert list(errors) == ['engine_server_metrics']
+    assert 'scan_totals' in context and 'engine_server_metrics' not in context
+    assert [report['number'] for report in reports if failed_stages(report, errors)] == [15, 16]
+
+    output_analysis(data, {'enabled': True, 'csv_dir': str(tmp_path)}, reports, 2)
+    output = capsys.readouterr().out
+    assert "Unable to compute the engine_server_metrics data: broken" in output
+    assert "Skipped the engine_servers report" in output and "Skipped the engine_utilization report" in output
+    written = sorted(os.path.basename(path) for path in glob.glob(str(tmp_path / '*.csv')))
+    assert written == sorted(report['file'] for report in reports if report['number'] not in (15, 16))
+
+
+def test_select_reports():
+    assert select_reports('') == reports
+    assert [report['number'] for report in select_reports('3, scan_time_analysis,19-schedule_shift')] == [3, 10, 19]
+    assert not needs_concurrency(select_reports('1,2'))
+    assert needs_concurrency(select_reports('schedule_shift'))
+    with pytest.raises(ValueError):
+        select_reports('no_such_report')
+
+
+def run_analyze(work_dir, *args):
+    return subprocess.run([sys.executable, os.path.join(tools_dir, 'EHC_analyze.py')] + list(args), cwd=work_dir, capture_output=True,
+        text=True, timeout=300)
+
+def test_command_line_writes_the_reports(tmp_path, ehc_file):
+    result = run_analyze(tmp_path, ehc_file, '--csv', '--checkpoint', '--cc-memory-mb', '1')
+    assert result.returncode == 0, result.stdout + result.stderr
+    output_dirs = glob.glob(str(tmp_path / 'ehc_output_ehc_*'))
+    assert len(output_dirs) == 1
+    assert sorted(os.listdir(output_dirs[0])) == sorted(report['file'] for report in reports)
+    # the checkpoint and the records it kept are removed once the run completes
+    assert not glob.glob(str(tmp_path / '.ehc_checkpoint_*'))
+
+def test_command_line_rejects_checkpoints_of_several_files(tmp_path, ehc_file):
+    result = run_analyze(tmp_path, ehc_file, ehc_file, '--checkpoint')
+    assert result.returncode == 1
+    assert "--checkpoint is only available with a single input file" in result.stdout
@@ -0,0 +1,48 @@
+import json
+import pytest
+import ehc.binning
+from ehc.binning import Bins, load_bins_config
+
+
+def test_bins_have_inclusive_upper_bounds():
+    size = Bins([(10, 'small'), (100, 'medium')], 'large')
+    assert [size.key(value) for value in (0, 10, 11, 100, 101)] == ['small', 'small', 'medium', 'medium', 'large']
+    assert size.index(100) == 1
+    assert size == Bins([(10, 'small'), (100, 'medium')], 'large')
+
+@pytest.mark.parametrize('bins, overflow', [
+    ([(100, 'a'), (10, 'b')], 'c'),
+    ([(10, 'a'), (100, 'a')], 'c'),
+    ([('10', 'a')], 'b')
+])
+def test_invalid_bins(bins, overflow):
+    with pytest.raises(ValueError):
+        Bins(bins, overflow)
+
+
+def write_config(tmp_path, config):
+    file_path = tmp_path / 'bins.json'
+    file_path.write_text(config if isinstance(config, str) else json.dumps(config), encoding='utf-8')
+    return str(file_path)
+
+def test_load_replaces_only_the_bins_in_the_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(ehc.binning, 'bins', dict(ehc.binning.bins))
+    engine_time = ehc.binning.bins['engine_time']
+    load_bins_config(write_config(tmp_path, {'loc': {'bins': [[100000, '0 to 100k']], 'overflow': '100k+'}}))
+    assert ehc.binning.bins['loc'].names == ['0 to 100k', '100k+']
+    assert ehc.binning.bins['engine_time'] is engine_time
+
+@pytest.mark.parametrize('config', [
+    'not json',
+    [1, 2],
+    {'size': {'bins': [], 'overflow': 'x'}},
+    {'loc': {'bins': [[1, 'a']]}},
+    {'loc': {'bins': [[1]], 'overflow': 'x'}},
+    {'loc': {'bins': [[2, 'a'], [1, 'b']], 'overflow': 'x'}}
+])
+def test_load_rejects_invalid_configs(tmp_path, monkeypatch, config):
+    monkeypatch.setattr(ehc.binning, 'bins', dict(ehc.binning.bins))
+    loc = ehc.binning.bins['loc']
+    with pytest.raises(ValueError):
+        load_bins_config(write_config(tmp_path, config))
+    assert ehc.binning.bins['loc'] is loc
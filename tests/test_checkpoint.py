@@ -0,0 +1,148 @@
+import gzip
+import json
+import os
+import signal
+import pytest
+import EHC_analyze
+import ehc.accumulators
+from EHC_analyze import ScanProcessor, process_file
+from ehc.checkpoint import Checkpoint, Quarantine, ScanReader, input_signature
+
+no_full_data = {'enabled': False, 'csv_dir': '', 'field_names': []}
+tiny_budget = 64 * 21
+
+
+# An EHC file with a malformed record after the third scan and a scan check_scan rejects after the tenth
+def write_file_with_bad_records(file_path, scans):
+    items = [json.dumps(scan, indent=4) for scan in scans]
+    items.insert(3, '{"Id": 99, "ProjectName": "broken", }')
+    bad_scan = dict(scans[10], Id=98, QueuedOn='not a date')
+    items.insert(11, json.dumps(bad_scan))
+    with open(file_path, 'w', encoding='utf-8') as file:
+        file.write('{"@odata.context": "test", "value": [\n' + ',\n'.join(items) + '\n]}')
+    return str(file_path)
+
+
+def test_scan_reader_reads_every_scan(ehc_file, scans):
+    assert list(ScanReader(ehc_file)) == scans
+
+def test_scan_reader_quarantines_malformed_records(tmp_path, scans):
+    file_path = write_file_with_bad_records(tmp_path / 'bad.json', scans)
+    quarantine = Quarantine(str(tmp_path / 'quarantine.jsonl'))
+    read = list(ScanReader(file_path, 0, quarantine))
+    quarantine.close()
+    assert [scan['Id'] for scan in read] == [scan['Id'] for scan in scans[:10]] + [98] + [scan['Id'] for scan in scans[10:]]
+    with open(quarantine.path, encoding='utf-8') as file:
+        records = [json.loads(line) for line in file]
+    assert len(records) == 1 and records[0]['raw'].startswith('{"Id": 99')
+    with open(file_path, 'rb') as file:
+        assert file.read()[records[0]['offset']:].startswith(b'{"Id": 99')
+
+# The offsets are those of the scans in the file: non-ASCII text, other key orders and scans larger than the decoded window
+# don't throw them off
+def test_scan_reader_offsets_are_byte_offsets(tmp_path, scans):
+    scans = [dict(scan) for scan in scans]
+    scans[1]['ProjectName'] = 'projet-é-中'
+    scans[2] = dict([('ProjectId', scans[2]['ProjectId'])] + list(scans[2].items()))
+    scans[3]['Comments'] = ['é' * 10000]
+    file_path = str(tmp_path / 'ehc.json')
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump({'@odata.context': 'test', 'value': scans}, file, ensure_ascii=False)
+    with open(file_path, 'rb') as file:
+        data = file.read()
+    reader = ScanReader(file_path)
+    read = []
+    for scan in reader:
+        assert json.loads(data[reader.scan_offset:reader.offset]) == scan
+        read.append(scan)
+    assert read == scans
+
+@pytest.mark.parametrize('compressed', [False, True], ids=['mapped', 'gz'])
+def test_scan_reader_resumes_at_an_offset(tmp_path, scans, compressed):
+    file_path = str(tmp_path / ('ehc.json.gz' if compressed else 'ehc.json'))
+    with (gzip.open if compressed else open)(file_path, 'wt', encoding='utf-8') as file:
+        json.dump({'@odata.context': 'test', 'value': scans}, file)
+    reader = ScanReader(file_path)
+    for count, _ in enumerate(reader, 1):
+        if count == 100:
+            break
+    assert list(ScanReader(file_path, reader.offset)) == scans[100:]
+
+def test_scan_reader_flags_a_truncated_file(tmp_path, scans):
+    file_path = str(tmp_path / 'truncated.json')
+    with open(file_path, 'w', encoding='utf-8') as file:
+        file.write(json.dumps({'value': scans})[:-1000])
+    reader = ScanReader(file_path)
+    assert len(list(reader)) < len(scans)
+    assert reader.truncated
+
+
+def test_checkpoint_save_load_and_remove(tmp_path, ehc_file):
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.pickle'), 0)
+    assert checkpoint.load() is None
+    checkpoint.save({'input': input_signature(ehc_file), 'scan_count': 5})
+    assert checkpoint.load()['scan_count'] == 5
+    os.makedirs(checkpoint.runs_dir)
+    checkpoint.remove()
+    assert not os.path.exists(checkpoint.path) and not os.path.exists(checkpoint.runs_dir)
+
+
+def run_to_the_end(file_path, quarantine_path):
+    quarantine = Quarantine(quarantine_path, 0)
+    try:
+        return process_file(file_path, no_full_data, quarantine, cc_memory_budget=tiny_budget, progress=False)
+    finally:
+        quarantine.close()
+
+def test_checkpoint_then_resume_matches_an_uninterrupted_run(tmp_path, scans, monkeypatch):
+    file_path = write_file_with_bad_records(tmp_path / 'ehc.json', scans)
+    expected = run_to_the_end(file_path, str(tmp_path / 'expected.jsonl'))
+
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.pickle'), 0)
+    ehc.accumulators.use_spill_directory(checkpoint.runs_dir)
+    monkeypatch.setattr(EHC_analyze, 'checkpoint_check_scans', 10)
+
+    # stop the run with a SIGTERM part way through, after a few checkpoints
+    add = ScanProcessor.add
+    added = []
+    def add_then_stop(self, scan, weight=1):
+        added.append(scan['Id'])
+        if len(added) == 137:
+            os.kill(os.getpid(), signal.SIGTERM)
+        add(self, scan, weight)
+    monkeypatch.setattr(ScanProcessor, 'add', add_then_stop)
+
+    quarantine_path = str(tmp_path / 'quarantine.jsonl')
+    quarantine = Quarantine(quarantine_path, 0)
+    with pytest.raises(SystemExit):
+        process_file(file_path, no_full_data, quarantine, cc_memory_budget=tiny_budget, checkpoint=checkpoint, progress=False)
+    quarantine.close()
+    monkeypatch.setattr(ScanProcessor, 'add', add)
+
+    resume = checkpoint.load()
+    assert resume['scan_count'] == 137 and resume['input'] == input_signature(file_path)
+    # the spilled records are kept with the checkpoint
+    assert os.listdir(checkpoint.runs_dir)
+
+    quarantine = Quarantine(quarantine_path, resume['quarantine_size'], resume['quarantine_count'])
+    try:
+        resumed = process_file(file_path, no_full_data, quarantine, cc_memory_budget=tiny_budget, checkpoint=checkpoint, resume=resume, progress=False)
+    finally:
+        quarantine.close()
+    checkpoint.remove()
+
+    assert resumed == expected
+    assert quarantine.count == 2
+    with open(quarantine_path, encoding='utf-8') as file, open(str(tmp_path / 'expected.jsonl'), encoding='utf-8') as expected_file:
+        assert file.read() == expected_file.read()
+
+def test_resume_needs_the_spilled_records(tmp_path, ehc_file):
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.pickle'), 0)
+    ehc.accumulators.use_spill_directory(checkpoint.runs_dir)
+    processor = ScanProcessor(cc_memory_budget=tiny_budget)
+    for scan in ScanReader(ehc_file):
+        processor.add(scan)
+    checkpoint.save({'processor': processor})
+    processor.cleanup()
+    with pytest.raises(IOError):
+        checkpoint.load()
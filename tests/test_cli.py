@@ -0,0 +1,27 @@
+import io
+import json
+from ehc.cli import main, commands, print_usage
+
+
+def test_usage():
+    assert main([]) == 2
+    assert main(['--help']) == 0
+    output = io.StringIO()
+    print_usage(output)
+    assert all(f"  {name} " in output.getvalue() for name in commands)
+
+def test_unknown_command(capsys):
+    assert main(['frobnicate']) == 2
+    assert "unknown command 'frobnicate'" in capsys.readouterr().err
+
+def test_command_runs_the_script(tmp_path, ehc_file, capsys, monkeypatch):
+    monkeypatch.setattr('sys.argv', ['ehc'])
+    assert main(['filter', ehc_file, '--filter-project', 'project-1']) == 0
+    with open(tmp_path / 'filtered-project-1-ehc.json', encoding='utf-8') as file:
+        assert all(scan['ProjectName'] == 'project-1' for scan in json.load(file)['value'])
+
+# the exit code of the script is returned, e.g. for a missing argument
+def test_command_exit_code(capsys, monkeypatch):
+    monkeypatch.setattr('sys.argv', ['ehc'])
+    assert main(['split']) == 2
+    assert "required: input-file" in capsys.readouterr().err
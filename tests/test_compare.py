@@ -0,0 +1,37 @@
+import pytest
+from EHC_compare import Tolerances, cells_match, compare_values, compare_input, write_synthetic_file, suites, parse_hms
+from ehc.fileio import read_context, field_names_from_context
+
+tolerances = Tolerances(1e-6, 0.0, 1, [('*engine*', 0.1)])
+
+
+def test_cells_match_within_the_tolerances():
+    assert cells_match('abc', 'abc', tolerances, 0)
+    assert cells_match('100', '100.00005', tolerances, 1e-6)
+    assert not cells_match('100', '100.1', tolerances, 1e-6)
+    # durations are compared to the second
+    assert cells_match('01:00:00', '01:00:01', tolerances, 0)
+    assert not cells_match('01:00:00', '01:00:02', tolerances, 0)
+    assert parse_hms('-00:01:05') == -65
+    assert tolerances.relative_for('ehc_output_run/15-engine_servers.csv') == 0.1
+
+def test_compare_values_lists_the_differences():
+    differences = []
+    compare_values({'a': [1, 2.0], 'b': 'x', 'c': True}, {'a': [1, 2.5], 'b': 'y', 'd': 1}, tolerances, 1e-6, '', differences)
+    assert differences == ["/a[1]: 2.5 instead of 2.0", "/b: 'y' instead of 'x'", "/c: missing", "/d: not in the reference"]
+
+
+# The synthetic export has the field list --full-data writes the columns of
+def test_synthetic_file_has_the_full_context(tmp_path):
+    input_file = write_synthetic_file(str(tmp_path / 'ehc.json'), 10)
+    field_names = field_names_from_context(read_context(input_file))
+    assert field_names[:3] == ['Id', 'ProjectId', 'ProjectName'] and field_names[-1] == 'ScannedLanguages'
+
+# The engines write the same results as the reference copies of the tools as they were before them
+@pytest.mark.parametrize('suite', ['deviation', 'split', 'merge'])
+def test_suites_are_the_same_as_the_reference(tmp_path, suite):
+    assert suites[suite]['reference'].startswith('{python} {reference}/')
+    input_file = write_synthetic_file(str(tmp_path / 'ehc.json'), 200)
+    results = compare_input(input_file, suites[suite]['reference'], suites[suite]['engines'], tolerances, 1, False)
+    assert [result['exit_code'] for result in results] == [0, 0, 0]
+    assert results[0]['files'] and all(result['differences'] == {} for result in results[1:])
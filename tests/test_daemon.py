@@ -0,0 +1,60 @@
+import os
+import shutil
+from ehc.daemon import PollingWatcher, StateStore, file_fingerprint, is_ehc_file
+
+
+def test_is_ehc_file():
+    assert is_ehc_file('export.json') and is_ehc_file('export.JSON.gz') and is_ehc_file('export.json.zst')
+    assert not is_ehc_file('.export.json') and not is_ehc_file('export.csv') and not is_ehc_file('export.json.tmp')
+
+def test_fingerprint_goes_by_content(tmp_path, ehc_file):
+    copy = str(tmp_path / 'copy.json')
+    shutil.copy(ehc_file, copy)
+    assert file_fingerprint(copy) == file_fingerprint(ehc_file)
+    with open(copy, 'a', encoding='utf-8') as file:
+        file.write(' ')
+    assert file_fingerprint(copy) != file_fingerprint(ehc_file)
+
+
+def test_polling_reports_files_once_they_are_stable(tmp_path):
+    directory = tmp_path / 'watched'
+    directory.mkdir()
+    (directory / 'a.json').write_text('{}')
+    watcher = PollingWatcher(str(directory), 0)
+    # existing files are reported on the first poll
+    assert watcher.poll() == ([str(directory / 'a.json')], [])
+
+    (directory / 'b.json').write_text('{}')
+    (directory / 'notes.txt').write_text('')
+    # a new file waits until it is the same on two polls
+    assert watcher.poll() == ([], [])
+    assert watcher.poll() == ([str(directory / 'b.json')], [])
+
+    os.remove(directory / 'a.json')
+    assert watcher.poll() == ([], [str(directory / 'a.json')])
+    watcher.close()
+
+
+def test_state_store_keeps_the_files_and_partials(tmp_path, ehc_file):
+    state_dir = str(tmp_path / 'state')
+    store = StateStore(state_dir)
+    assert not store.unchanged(ehc_file)
+    record = store.register(ehc_file)
+    store.save_partial(record, {'scan_count': 3})
+    os.makedirs(store.runs_path(record))
+    with open(store.quarantine_path(record), 'w', encoding='utf-8') as file:
+        file.write('{}\n')
+    store.save()
+
+    reloaded = StateStore(state_dir)
+    assert reloaded.unchanged(ehc_file)
+    assert reloaded.load_partial(reloaded.files[ehc_file]) == {'scan_count': 3}
+    # a touched file with the same content is still unchanged
+    os.utime(ehc_file, ns=(0, 0))
+    assert reloaded.unchanged(ehc_file) and reloaded.files[ehc_file]['mtime_ns'] == 0
+    assert [file_path for file_path, _ in reloaded.ordered()] == [ehc_file]
+
+    assert reloaded.remove(ehc_file)['fingerprint'] == record['fingerprint']
+    for path in (reloaded.partial_path(record), reloaded.runs_path(record), reloaded.quarantine_path(record)):
+        assert not os.path.exists(path)
+    assert reloaded.remove(ehc_file) is None
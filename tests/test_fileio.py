@@ -0,0 +1,46 @@
+import json
+import os
+import pytest
+from ehc.fileio import (open_input, open_output, input_position, detect_compression, compressed_path, strip_compression_suffix,
+    base_name, read_context, field_names_from_context, zstandard_available)
+
+test_context = "https://cx.example/Cxwebinterface/odata/v1/$metadata#Scans(Id,ProjectId,ProjectName,ScannedLanguages(LanguageName))"
+compressions = [None, 'gz', 'bz2', 'xz'] + (['zst'] if zstandard_available else [])
+
+
+@pytest.mark.parametrize('compression', compressions)
+def test_written_file_reads_back(tmp_path, scans, compression):
+    file_path = compressed_path(str(tmp_path / 'ehc.json'), compression)
+    with open_output(file_path) as file:
+        json.dump({'@odata.context': test_context, 'value': scans}, file)
+    assert detect_compression(file_path) == compression
+    with open_input(file_path) as file:
+        assert json.loads(file.read())['value'] == scans
+        assert input_position(file) == os.path.getsize(file_path)
+    assert read_context(file_path) == test_context
+    assert base_name(file_path) == 'ehc'
+
+@pytest.mark.parametrize('compression', ['gz', 'bz2', 'xz'])
+def test_compression_detected_without_a_suffix(tmp_path, compression):
+    file_path = compressed_path(str(tmp_path / 'ehc.json'), compression)
+    with open_output(file_path, binary=True) as file:
+        file.write(b'{"value": []}')
+    os.rename(file_path, str(tmp_path / 'ehc.data'))
+    assert detect_compression(str(tmp_path / 'ehc.data')) == compression
+
+def test_paths():
+    assert compressed_path('out.json', 'gz') == 'out.json.gz'
+    assert compressed_path('out.json.gz', 'gz') == 'out.json.gz'
+    assert compressed_path('out.json', None) == 'out.json'
+    assert strip_compression_suffix('/data/ehc.json.XZ') == '/data/ehc.json'
+    assert base_name('/data/ehc.json.bz2') == 'ehc'
+
+def test_context_far_into_the_file(tmp_path):
+    file_path = str(tmp_path / 'late.json')
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump({'padding': 'x' * 100000, '@odata.context': 'late "context"', 'value': []}, file)
+    assert read_context(file_path) == 'late "context"'
+
+def test_field_names_from_context():
+    assert field_names_from_context(test_context) == ['Id', 'ProjectId', 'ProjectName', 'ScannedLanguages']
+    assert field_names_from_context(None) == []
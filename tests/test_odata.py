@@ -0,0 +1,96 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import pytest
+import ehc.odata
+from ehc.odata import OdataFetcher, scans_url, retry_after_seconds
+from ehc.odata_stub import StubOdataServer, load_scans, parse_filter
+
+tools_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def stub_server(request, ehc_file):
+    server_page_size, fail_every = getattr(request, 'param', (0, 0))
+    server = StubOdataServer(('127.0.0.1', 0), load_scans(ehc_file), 'stub context', server_page_size, fail_every)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def service_root(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/Cxwebinterface/odata/v1"
+
+
+def test_scans_url():
+    assert scans_url('https://cx.example/Cxwebinterface/odata/v1') == 'https://cx.example/Cxwebinterface/odata/v1/Scans'
+    assert scans_url('https://cx.example/Cxwebinterface/odata/v1/Scans') == 'https://cx.example/Cxwebinterface/odata/v1/Scans'
+
+def test_parse_filter():
+    predicate = parse_filter("Id gt 5 and ScanRequestedOn ge '2024-01-02T00:00:00Z'")
+    assert predicate({'Id': 6, 'ScanRequestedOn': '2024-01-02T00:00:00.000Z'})
+    assert not predicate({'Id': 5, 'ScanRequestedOn': '2024-01-03T00:00:00.000Z'})
+    assert not predicate({'Id': 6, 'ScanRequestedOn': '2024-01-01T23:59:59.000Z'})
+    with pytest.raises(ValueError):
+        parse_filter("ProjectName eq 'x'")
+
+def test_retry_after_seconds():
+    assert retry_after_seconds('3') == 3
+    assert retry_after_seconds(None) is None
+
+
+# the pages are fetched in parallel, yet the scans come in Id order; with the server paging the results itself and with failing
+# requests that are retried
+@pytest.mark.parametrize('stub_server', [(0, 0), (7, 0), (0, 3)], indirect=True, ids=['plain', 'server paging', 'retries'])
+def test_fetch_all_scans(stub_server, scans, monkeypatch):
+    monkeypatch.setattr(ehc.odata, 'backoff_base', 0.01)
+    fetcher = OdataFetcher(service_root(stub_server), token='secret', page_size=25, prefetch=3, connections=2)
+    fetched = list(fetcher.scans())
+    assert fetched == sorted(scans, key=lambda scan: scan['Id'])
+    assert fetcher.context == 'stub context'
+    assert fetcher.last_id == max(scan['Id'] for scan in scans)
+    if stub_server.fail_every:
+        assert fetcher.retry_count > 0
+
+def test_incremental_fetch(stub_server, scans):
+    ordered = sorted(scans, key=lambda scan: scan['Id'])
+    after_id = ordered[99]['Id']
+    fetcher = OdataFetcher(service_root(stub_server), page_size=40, after_id=after_id)
+    assert list(fetcher.scans()) == ordered[100:]
+
+def test_fetch_fails_after_the_retries(ehc_file, monkeypatch):
+    monkeypatch.setattr(ehc.odata, 'backoff_base', 0.01)
+    server = StubOdataServer(('127.0.0.1', 0), load_scans(ehc_file), 'stub context', 0, 1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        fetcher = OdataFetcher(service_root(server), page_size=25, retries=2)
+        with pytest.raises(IOError, match="after 3 attempts"):
+            list(fetcher.scans())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def run_fetch(work_dir, *args):
+    return subprocess.run([sys.executable, os.path.join(tools_dir, 'EHC_fetch.py')] + list(args), cwd=work_dir, capture_output=True,
+        text=True, timeout=300)
+
+# EHC_fetch.py writes the scans as an export; with --state the next run only fetches the scans added since
+def test_fetch_command_writes_an_export(tmp_path, stub_server, scans):
+    url = service_root(stub_server)
+    state_file = str(tmp_path / 'state.json')
+    result = run_fetch(tmp_path, url, '--output', 'fetched.json', '--state', state_file, '--page-size', '50')
+    assert result.returncode == 0, result.stdout + result.stderr
+    with open(tmp_path / 'fetched.json', encoding='utf-8') as file:
+        assert json.load(file) == {'@odata.context': 'stub context', 'value': sorted(scans, key=lambda scan: scan['Id'])}
+
+    result = run_fetch(tmp_path, url, '--output', 'again.json', '--state', state_file)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert f"Fetching the scans after Id {max(scan['Id'] for scan in scans)}" in result.stdout
+    with open(tmp_path / 'again.json', encoding='utf-8') as file:
+        assert json.load(file)['value'] == []
+    assert not list(tmp_path.glob('*.part'))
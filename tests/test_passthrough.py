@@ -0,0 +1,116 @@
+import gzip
+import json
+import os
+import re
+import subprocess
+import sys
+import pytest
+from EHC_split import split_scans, split_scans_raw
+from EHC_project_filter import filter_scans, filter_scans_raw
+from EHC_merge import combine_scans, combine_scans_raw
+import ehc.passthrough
+from ehc.passthrough import RawScanReader, RawScanWriter, routing_fields
+from ehc.synthetic import make_scans, write_ehc_file
+
+tools_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load(file_path):
+    opener = gzip.open if file_path.endswith('.gz') else open
+    with opener(file_path, 'rt', encoding='utf-8') as file:
+        return json.load(file)
+
+# Scans with the things that could throw the raw item splitting off: a separator and routing keys inside strings, escapes,
+# non-ASCII names and objects nested more deeply than the ScannedLanguages items
+def awkward_scans(scans):
+    scans = [dict(scan) for scan in scans]
+    scans[1]['ProjectName'] = 'odd }, {"Id": 5, "ProjectName": "project-1"'
+    scans[2]['PresetName'] = 'quoted \\"preset\\" with "ProjectName": "project-1"'
+    scans[3]['ProjectName'] = 'projet-é-中'
+    scans[4]['Extra'] = {'nested': {'Id': 7, 'ProjectName': 'project-1', 'deeper': [{'Id': 8}]}}
+    return scans
+
+@pytest.fixture(params=[4, None], ids=['indented', 'compact'])
+def passthrough_file(request, tmp_path):
+    # over 90 days, so every part of the split has scans
+    return write_ehc_file(tmp_path / 'ehc.json', awkward_scans(make_scans(300, days=90)), request.param)
+
+
+def test_raw_reader_finds_every_item_and_routing_field(passthrough_file):
+    expected = load(passthrough_file)['value']
+    items = list(RawScanReader(passthrough_file, ('Id', 'ProjectName', 'ScanRequestedOn')))
+    assert [json.loads(raw) for raw, _ in items] == expected
+    assert [fields for _, fields in items] == [{'Id': scan['Id'], 'ProjectName': scan['ProjectName'], 'ScanRequestedOn': scan['ScanRequestedOn']}
+        for scan in expected]
+
+# Scans that don't start with "Id" aren't followed by a separator, and are found by following their strings and objects
+def test_raw_reader_finds_items_with_other_key_orders(tmp_path):
+    scans = [dict([('ProjectId', scan['ProjectId'])] + list(scan.items())) if index % 3 else scan for index, scan in enumerate(make_scans(300))]
+    file_path = write_ehc_file(tmp_path / 'reordered.json', scans)
+    items = list(RawScanReader(file_path, ('Id', 'ProjectName')))
+    assert [json.loads(raw) for raw, _ in items] == scans
+    assert [fields for _, fields in items] == [{'Id': scan['Id'], 'ProjectName': scan['ProjectName']} for scan in scans]
+
+def test_routing_fields_skip_strings_and_nested_objects():
+    raw = b'{"Extra": {"ProjectName": "inner"}, "Note": "\\"ProjectName\\": \\"quoted\\"", "ProjectName": "outer", "Id": 3}'
+    assert routing_fields(raw, ('ProjectName', 'Id')) == {'ProjectName': 'outer', 'Id': 3}
+
+# The patterns have to compile on Python 3.9 and 3.10 too, which have neither possessive quantifiers nor atomic groups
+def test_patterns_compile_without_possessive_quantifiers():
+    patterns = [value for name, value in vars(ehc.passthrough).items() if name.endswith('_pattern')]
+    patterns += list(ehc.passthrough.raw_key_patterns.values())
+    for pattern in patterns:
+        assert re.compile(pattern.pattern).pattern == pattern.pattern
+        assert not re.search(rb'[*+?}]\+|\(\?>', pattern.pattern), pattern.pattern
+
+def test_item_pattern_fails_quickly_on_unterminated_items():
+    assert ehc.passthrough.raw_item_pattern.match(b'{"Id": 1, "ProjectName": "' + b'x\\"' * 200000) is None
+    assert ehc.passthrough.raw_item_pattern.match(b'{"Id": 1' + b', "a": {"b": 1}' * 200000) is None
+
+# The tools only import ehc.passthrough for --passthrough
+def test_tools_import_passthrough_lazily():
+    code = "import sys, EHC_split, EHC_project_filter, EHC_merge; sys.exit('ehc.passthrough' in sys.modules)"
+    assert subprocess.run([sys.executable, '-c', code], cwd=tools_dir).returncode == 0
+
+def test_raw_reader_rejects_unknown_keys_and_truncated_files(tmp_path, passthrough_file):
+    with pytest.raises(ValueError):
+        RawScanReader(passthrough_file, ('PresetName',))
+    truncated = str(tmp_path / 'truncated.json')
+    with open(passthrough_file, 'rb') as source, open(truncated, 'wb') as file:
+        file.write(source.read()[:-500])
+    with pytest.raises(ValueError):
+        list(RawScanReader(truncated))
+
+def test_raw_writer_writes_valid_json(tmp_path):
+    output_file = str(tmp_path / 'out.json.gz')
+    writer = RawScanWriter(output_file, 'gz', 'context')
+    for raw in (b'{"Id": 1}', b'{"Id": 2}'):
+        writer.add(raw)
+    writer.finish()
+    assert load(output_file) == {'@odata.context': 'context', 'value': [{'Id': 1}, {'Id': 2}]}
+
+
+def test_split_passthrough_equals_reserialized(passthrough_file, capsys):
+    expected = [load(file_path) for file_path in split_scans(passthrough_file)]
+    output_files = split_scans_raw(passthrough_file)
+    assert all(part['value'] for part in expected)
+    assert [load(file_path) for file_path in output_files] == expected
+
+def test_split_passthrough_compressed(passthrough_file, capsys):
+    expected = [load(file_path) for file_path in split_scans(passthrough_file)]
+    output_files = split_scans_raw(passthrough_file, 'gz')
+    assert all(file_path.endswith('.json.gz') for file_path in output_files)
+    assert [load(file_path) for file_path in output_files] == expected
+
+def test_filter_passthrough_equals_reserialized(passthrough_file, capsys):
+    expected = load(filter_scans(passthrough_file, 'project-1'))
+    output_file = filter_scans_raw(passthrough_file, 'project-1')
+    assert expected['value'] and all(scan['ProjectName'] == 'project-1' for scan in expected['value'])
+    assert load(output_file) == expected
+
+def test_merge_passthrough_equals_reserialized(tmp_path, passthrough_file):
+    other_file = write_ehc_file(tmp_path / 'other.json', make_scans(50, seed=2))
+    metadata, combined_scans = combine_scans([passthrough_file, other_file])
+    output_file = combine_scans_raw([passthrough_file, other_file], str(tmp_path / 'merged.json'))
+    assert load(output_file) == {'@odata.context': metadata, 'value': combined_scans}
+    assert len(combined_scans) == 350
@@ -0,0 +1,66 @@
+import json
+from EHC_analyze import ScanProcessor, process_file
+from EHC_project_filter import ProjectFilter, filter_scans
+from ehc.checkpoint import Quarantine
+from ehc.pipeline import Pipeline
+from ehc.synthetic import write_ehc_file
+
+no_full_data = {'enabled': False, 'csv_dir': '', 'field_names': []}
+
+
+class Collector:
+    def __init__(self):
+        self.scans = []
+
+    def add(self, scan):
+        self.scans.append(scan)
+
+    def finish(self):
+        return len(self.scans)
+
+class FailingWriter(Collector):
+    def add(self, scan):
+        raise IOError("disk full")
+
+
+def test_consumers_get_every_scan_of_one_parse(ehc_file, scans, capsys):
+    pipeline = Pipeline(ehc_file)
+    collector = pipeline.register(Collector())
+    results = pipeline.run()
+    assert results == [len(scans)] and collector.scans == scans
+    assert pipeline.progress()[0] == len(scans)
+
+def test_scans_from_an_iterable(scans, capsys):
+    pipeline = Pipeline(None, iter(scans))
+    pipeline.register(Collector())
+    assert pipeline.run() == [len(scans)]
+    assert pipeline.progress() == (len(scans), None)
+
+def test_results_match_the_separate_tools(tmp_path, scans, capsys):
+    bad_scans = [dict(scan) for scan in scans]
+    bad_scans[7]['QueuedOn'] = 'not a date'
+    file_path = write_ehc_file(tmp_path / 'ehc.json', bad_scans)
+
+    quarantine = Quarantine(str(tmp_path / 'pipeline.jsonl'), 0)
+    pipeline = Pipeline(file_path, quarantine=quarantine)
+    pipeline.register(ScanProcessor())
+    pipeline.register(FailingWriter())
+    pipeline.register(ProjectFilter(file_path, 'project-1'))
+    data, _, filtered_file = pipeline.run()
+    quarantine.close()
+    # the rejected scan is quarantined once, and a consumer's IOError isn't a rejection
+    assert pipeline.rejected_count == 1 and quarantine.count == 1
+    assert "IOError when writing to file: disk full" in capsys.readouterr().out
+
+    expected_quarantine = Quarantine(str(tmp_path / 'analyze.jsonl'), 0)
+    expected = process_file(file_path, no_full_data, expected_quarantine, progress=False)
+    expected_quarantine.close()
+    assert data == expected
+    with open(quarantine.path, encoding='utf-8') as file, open(expected_quarantine.path, encoding='utf-8') as expected_file:
+        assert file.read() == expected_file.read()
+
+    # the filter still gets the rejected scan, as EHC_project_filter.py would
+    with open(filtered_file, encoding='utf-8') as file:
+        filtered = json.load(file)
+    with open(filter_scans(file_path, 'project-1'), encoding='utf-8') as file:
+        assert json.load(file) == filtered
@@ -0,0 +1,65 @@
+import gzip
+from ehc.sampling import StratifiedSampler, StratifiedEstimates, estimate_ratios
+from ehc.synthetic import write_ehc_file
+
+
+def sampled(file_path, rate):
+    sampler = StratifiedSampler(rate)
+    return sampler, list(sampler.read(file_path))
+
+def test_sample_is_deterministic_and_weighted_to_the_strata(ehc_file, scans):
+    sampler, sample = sampled(ehc_file, 0.2)
+    assert sampler.skipped_parsing
+    assert sampled(ehc_file, 0.2)[1] == sample
+    counted = [scan for scan in scans if scan.get('LOC') is not None]
+    assert sampler.total_count() == len(counted)
+    assert sampler.sampled_count() == len(sample) < len(counted)
+    weights = sampler.weights()
+    # the weights add the sample back up to the number of scans
+    assert round(sum(weights[stratum] for stratum, _ in sample)) == len(counted)
+    # every stratum has at least min_per_stratum scans sampled, or all of them
+    for stratum, total in sampler.stratum_totals.items():
+        assert sampler.stratum_sampled[stratum] >= min(total, sampler.min_per_stratum)
+
+# Scans whose keys are in another order are each counted and sampled, as when every scan is parsed
+def test_scans_with_other_key_orders(tmp_path, scans):
+    reordered = [dict([('ProjectId', scan['ProjectId'])] + list(scan.items())) if index % 2 else scan for index, scan in enumerate(scans)]
+    file_path = write_ehc_file(tmp_path / 'reordered.json', reordered)
+    sampler, sample = sampled(file_path, 0.2)
+    parsed_sampler = StratifiedSampler(0.2)
+    parsed_sample = list(parsed_sampler.read_parsed(file_path))
+    assert sampler.skipped_parsing
+    assert sampler.total_count() == parsed_sampler.total_count() == len([scan for scan in scans if scan.get('LOC') is not None])
+    assert sampler.stratum_totals == parsed_sampler.stratum_totals
+    assert [(stratum, scan['Id']) for stratum, scan in sample] == [(stratum, scan['Id']) for stratum, scan in parsed_sample]
+
+def test_compressed_file_gives_the_same_sample(tmp_path, ehc_file):
+    compressed_file = str(tmp_path / 'ehc.json.gz')
+    with open(ehc_file, 'rb') as source, gzip.open(compressed_file, 'wb') as file:
+        file.write(source.read())
+    sampler, sample = sampled(compressed_file, 0.2)
+    assert not sampler.skipped_parsing
+    assert [scan['Id'] for _, scan in sample] == [scan['Id'] for _, scan in sampled(ehc_file, 0.2)[1]]
+
+def test_full_rate_estimates_are_exact(ehc_file):
+    sampler, sample = sampled(ehc_file, 1)
+    estimates = StratifiedEstimates()
+    for stratum, scan in sample:
+        estimates.add(stratum, scan)
+    intervals = estimates.intervals(sampler.stratum_totals)
+    assert set(intervals) <= set(estimate_ratios)
+    # with every scan sampled there is no sampling error
+    assert all(interval['margin'] == 0 for interval in intervals.values())
+
+def test_merged_estimates_equal_one(ehc_file):
+    sampler, sample = sampled(ehc_file, 0.5)
+    whole, left, right = StratifiedEstimates(), StratifiedEstimates(), StratifiedEstimates()
+    for index, (stratum, scan) in enumerate(sample):
+        whole.add(stratum, scan)
+        (left if index % 2 else right).add(stratum, scan)
+    merged = left.merge(right).intervals(sampler.stratum_totals)
+    expected = whole.intervals(sampler.stratum_totals)
+    assert merged.keys() == expected.keys()
+    for name in expected:
+        assert abs(merged[name]['estimate'] - expected[name]['estimate']) < 1e-9
+        assert abs(merged[name]['margin'] - expected[name]['margin']) < 1e-9
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+from ehc.schedule import peak_concurrency, simulate_queue_seconds, plan_schedule_shift, slot_of, slot_name, spread, week_slots
+
+
+def test_peak_concurrency_ends_before_starts():
+    assert peak_concurrency([]) == 0
+    assert peak_concurrency([(0, 10), (10, 10), (20, 10)]) == 1
+    assert peak_concurrency([(0, 10), (5, 10), (6, 1), (12, 5)]) == 3
+    # runs that take no time don't count
+    assert peak_concurrency([(0, 10), (5, 0)]) == 1
+
+def test_simulate_queue_seconds():
+    scans = [(0, 10, True), (0, 10, True), (1, 5, False), (2, 5, True)]
+    # one engine: the scans queue 0, 10, 19 and 23 seconds
+    assert simulate_queue_seconds(scans, 1) == 0 + 10 + 23
+    # two engines: 0, 0, 9 and 8 seconds
+    assert simulate_queue_seconds(scans, 2) == 8
+    assert simulate_queue_seconds(scans, 4) == 0
+
+def test_slots():
+    monday = datetime(2024, 1, 1, 10, 30)
+    assert slot_of(monday.timestamp()) == (10, 1800)
+    assert slot_name(10) == 'Mon 10:00' and slot_name(week_slots - 1) == 'Sun 23:00'
+    load = [0] * week_slots
+    spread(load, week_slots - 1, 1800, 7200)
+    assert load[week_slots - 1] == 1800 and load[0] == 3600 and load[1] == 1800
+
+
+# Four weeks of CI scans at 10:00 on weekdays and a nightly scheduled scan of one project started at 10:00 on Mondays, the busiest
+# hour of the week
+def busy_monday_scans():
+    start = datetime(2024, 1, 1)
+    scans = []
+    for day in range(28):
+        for minute in (0, 10, 20) if day % 7 < 5 else ():
+            queued_on = (start + timedelta(days=day, hours=10, minutes=minute)).timestamp()
+            scans.append((queued_on, queued_on + 60, 1800, '1_web', 'Jenkins'))
+        if day % 7 == 0:
+            queued_on = (start + timedelta(days=day, hours=10, minutes=5)).timestamp()
+            scans.append((queued_on, queued_on + 60, 3000, '2_nightly', 'System'))
+    scans.sort()
+    return lambda: iter(scans)
+
+def test_plan_moves_the_scheduled_scans_out_of_the_busy_hour():
+    plan = plan_schedule_shift(busy_monday_scans(), 2)
+    assert plan['scheduled_scan_count'] == 4 and plan['ci_scan_count'] == 60
+    assert plan['schedule_count'] == 1 and plan['moved_schedule_count'] == 1
+    schedule = plan['schedules'][0]
+    assert schedule['project'] == 'nightly' and schedule['from_slot'] == 'Mon 10:00' and schedule['to_slot'] != 'Mon 10:00'
+    assert plan['peak_concurrency']['after'] < plan['peak_concurrency']['before']
+    assert plan['ci_queue_seconds']['after'] < plan['ci_queue_seconds']['before']
+    assert plan['busiest_hour']['after']['concurrency'] < plan['busiest_hour']['before']['concurrency']
+
+def test_plan_sorts_in_a_memory_budget_and_without_engines():
+    expected = plan_schedule_shift(busy_monday_scans(), 2)
+    assert plan_schedule_shift(busy_monday_scans(), 2, 17 * 4) == expected
+    # without engines, the queue isn't simulated
+    plan = plan_schedule_shift(busy_monday_scans(), 0)
+    assert plan['ci_queue_seconds']['before'] is None and plan['ci_queue_seconds']['after'] is None
+    assert plan['schedules'] == expected['schedules']
+
+def test_plan_of_no_scans():
+    plan = plan_schedule_shift(lambda: iter(()), 1)
+    assert plan['schedule_count'] == 0 and plan['peak_concurrency'] == {'before': 0, 'after': 0}
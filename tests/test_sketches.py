@@ -0,0 +1,74 @@
+import pickle
+import random
+from ehc.sketches import HyperLogLog, SpaceSaving
+
+
+def test_hyperloglog_within_error_bound():
+    for true_count in (100, 5000, 50000):
+        sketch = HyperLogLog(12)
+        for value in range(true_count):
+            sketch.add(f"project-{value}")
+        # 3 standard errors
+        assert abs(sketch.count() - true_count) <= 3 * sketch.relative_error() * true_count
+
+def test_hyperloglog_merge_counts_the_union():
+    left, right, union = HyperLogLog(12), HyperLogLog(12), HyperLogLog(12)
+    for value in range(20000):
+        (left if value % 2 else right).add(value)
+        union.add(value)
+    # an overlap doesn't add to the count
+    for value in range(5000):
+        left.add(value)
+    assert left.merge(right).count() == union.count()
+
+def test_hyperloglog_duplicates_and_pickle():
+    sketch = HyperLogLog()
+    for _ in range(10):
+        for value in range(1000):
+            sketch.add(value)
+    assert abs(sketch.count() - 1000) <= 3 * sketch.relative_error() * 1000
+    assert pickle.loads(pickle.dumps(sketch)).count() == sketch.count()
+
+
+def weighted_stream(seed=1):
+    generator = random.Random(seed)
+    # a few heavy keys among many light ones
+    return [(f"key-{int(generator.paretovariate(1.2)) % 2000}", generator.randint(1, 10)) for _ in range(20000)]
+
+def true_counts(stream):
+    counts = {}
+    for key, weight in stream:
+        counts[key] = counts.get(key, 0) + weight
+    return counts
+
+def assert_space_saving_bounds(sketch, counts):
+    monitored = {key: (count, error) for key, count, error in sketch.top(sketch.capacity)}
+    for key, (count, error) in monitored.items():
+        assert count - error <= counts[key] <= count
+    for key, count in counts.items():
+        if key not in monitored:
+            assert count <= sketch.max_error()
+
+def test_space_saving_error_bounds():
+    stream = weighted_stream()
+    sketch = SpaceSaving(50)
+    for key, weight in stream:
+        sketch.add(key, weight)
+    counts = true_counts(stream)
+    assert_space_saving_bounds(sketch, counts)
+    # the heaviest key is found
+    assert sketch.top(1)[0][0] == max(counts, key=counts.get)
+
+def test_space_saving_merge_keeps_the_bounds():
+    stream = weighted_stream(2)
+    left, right = SpaceSaving(50), SpaceSaving(50)
+    for index, (key, weight) in enumerate(stream):
+        (left if index % 3 else right).add(key, weight)
+    assert_space_saving_bounds(left.merge(right), true_counts(stream))
+
+def test_space_saving_is_exact_below_capacity():
+    sketch = SpaceSaving(10)
+    for key, weight in [('a', 3), ('b', 1), ('a', 2), ('c', 4)]:
+        sketch.add(key, weight)
+    assert sketch.top(3) == [('a', 5, 0), ('c', 4, 0), ('b', 1, 0)]
+    assert sketch.max_error() == 0
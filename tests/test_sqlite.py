@@ -0,0 +1,46 @@
+import csv
+import sqlite3
+import pytest
+from EHC_sqlite import load_database, run_query, list_views, resolve_view, report_views
+
+
+@pytest.fixture
+def database(tmp_path, ehc_file, capsys):
+    db_file = str(tmp_path / 'ehc.sqlite')
+    # small batches, so the load goes through several commits
+    load_database(ehc_file, db_file, 40, 2)
+    return db_file
+
+def test_load_keeps_every_scan_and_language(database, scans):
+    conn = sqlite3.connect(database)
+    assert conn.execute("SELECT COUNT(*) FROM scans").fetchone()[0] == len(scans)
+    assert conn.execute("SELECT COUNT(*) FROM scan_languages").fetchone()[0] == sum(len(scan['ScannedLanguages']) for scan in scans)
+    assert conn.execute("SELECT scan_count FROM meta").fetchone()[0] == len(scans)
+    ids = [row[0] for row in conn.execute("SELECT Id FROM scans ORDER BY scan_key")]
+    assert ids == [scan['Id'] for scan in scans]
+
+def test_every_report_view_runs(database):
+    conn = sqlite3.connect(database)
+    assert list_views(conn) == sorted(report_views)
+    for view in list_views(conn):
+        assert conn.execute(f"SELECT * FROM {view}").fetchall(), view
+
+def test_resolve_view(database):
+    conn = sqlite3.connect(database)
+    assert resolve_view(conn, 'report_05_languages') == 'report_05_languages'
+    assert resolve_view(conn, '05-languages') == 'report_05_languages'
+    assert resolve_view(conn, '5') == 'report_05_languages'
+    assert resolve_view(conn, 'no_such_view') is None
+
+def test_query_to_csv(tmp_path, database, scans, capsys):
+    output_file = str(tmp_path / 'projects.csv')
+    run_query(database, None, "SELECT ProjectName, COUNT(*) AS scans FROM scans GROUP BY ProjectName ORDER BY ProjectName", output_file, False)
+    with open(output_file, newline='', encoding='utf-8') as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ['ProjectName', 'scans']
+    assert sum(int(count) for _, count in rows[1:]) == len(scans)
+
+def test_query_errors_exit(database, capsys):
+    with pytest.raises(SystemExit):
+        run_query(database, None, "SELECT nothing FROM nowhere", None, False)
+    assert "SQL error" in capsys.readouterr().out
@@ -0,0 +1,50 @@
+import json
+from ehc.telemetry import Telemetry, format_size, format_duration, metrics_format_of
+
+
+def test_formats():
+    assert format_size(512) == '512 B'
+    assert format_size(1536) == '1.5 KB'
+    assert format_size(3 * 1024 ** 3) == '3.0 GB'
+    assert format_duration(3725.9) == '01:02:05'
+    assert metrics_format_of('/var/lib/node_exporter/ehc.prom') == 'prometheus'
+    assert metrics_format_of('metrics.jsonl') == 'jsonl'
+
+
+def run_stages(telemetry):
+    progress = [0, 0]
+    telemetry.set_stage("Processing scans", lambda: tuple(progress), 1000)
+    progress[:] = [250, 500]
+    sample = telemetry.sample()
+    telemetry.set_stage("Writing reports")
+    telemetry.stop()
+    return sample
+
+def test_samples_and_jsonl_metrics(tmp_path):
+    metrics_file = str(tmp_path / 'metrics.jsonl')
+    telemetry = Telemetry(60, False, metrics_file, run_name='nightly')
+    sample = run_stages(telemetry)
+    assert sample['stage'] == "Processing scans" and sample['scans'] == 250 and sample['bytes'] == 500
+    assert sample['eta_seconds'] is not None and sample['finished'] == 0
+
+    with open(metrics_file, encoding='utf-8') as file:
+        records = [json.loads(line) for line in file]
+    # the last sample is recorded when the run stops, with the counts of the stage before
+    assert records[-1]['stage'] == "Writing reports" and records[-1]['finished'] == 1
+    assert records[-1]['scans'] == 250 and records[-1]['run'] == 'nightly'
+
+def test_prometheus_metrics(tmp_path):
+    metrics_file = str(tmp_path / 'ehc.prom')
+    run_stages(Telemetry(60, False, metrics_file, run_name='a "quoted" run'))
+    with open(metrics_file, encoding='utf-8') as file:
+        lines = file.read().splitlines()
+    assert 'ehc_scans_read_total{run="a \\"quoted\\" run"} 250' in lines
+    assert 'ehc_finished{run="a \\"quoted\\" run"} 1' in lines
+    assert 'ehc_stage{run="a \\"quoted\\" run",stage="Writing reports"} 1' in lines
+    assert not (tmp_path / 'ehc.prom.tmp').exists()
+
+def test_disabled_telemetry_starts_no_thread():
+    telemetry = Telemetry(60, False)
+    telemetry.set_stage("Processing scans", lambda: (0, 0))
+    assert not telemetry.enabled() and telemetry.thread is None
+    telemetry.stop()
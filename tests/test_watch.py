@@ -0,0 +1,65 @@
+import os
+from EHC_analyze import ScanProcessor, reports
+from EHC_watch import WatchFolder, analyze_file
+from ehc.synthetic import write_ehc_file
+
+# The results that don't depend on the order the scans were added in (the cost attribution shares can differ in the last digit)
+compared_keys = ['first_date', 'last_date', 'scan_stats_by_date', 'scanned_projects', 'distinct_counts', 'size_bins', 'results',
+    'cc_metrics', 'queue_episodes', 'schedule_shift', 'engine_servers']
+
+
+def expected_results(scans):
+    processor = ScanProcessor()
+    for scan in scans:
+        processor.add(scan)
+    data = processor.finish()
+    return {key: data[key] for key in compared_keys}
+
+def aggregate_results(watch_folder):
+    data = watch_folder.aggregate.finish(cleanup=False)
+    return {key: data[key] for key in compared_keys}
+
+def watched_files(tmp_path, scans, write_ehc_file):
+    directory = tmp_path / 'watched'
+    directory.mkdir()
+    # nightly exports overlap: the scans of the second are partly in the first
+    first = write_ehc_file(directory / 'first.json', scans[:200])
+    second = write_ehc_file(directory / 'second.json', scans[100:])
+    return directory, first, second
+
+
+def test_analyze_file_skips_the_excluded_scans(tmp_path, scans):
+    file_path = write_ehc_file(tmp_path / 'ehc.json', scans)
+    excluded = sorted(scan['Id'] for scan in scans[:100])
+    partial = analyze_file(file_path, [excluded], True, None, True, str(tmp_path / 'quarantine.jsonl'))
+    assert list(partial['ids']) == sorted(scan['Id'] for scan in scans)
+    assert partial['rejected_count'] == 0
+    data = partial['processor'].finish()
+    assert data['engine_servers'] == expected_results(scans[100:])['engine_servers']
+
+def test_overlapping_files_count_every_scan_once(tmp_path, scans, capsys):
+    directory, first, second = watched_files(tmp_path, scans, write_ehc_file)
+    state_dir, output_dir = str(tmp_path / 'state'), str(tmp_path / 'reports')
+    watch_folder = WatchFolder(str(directory), state_dir, output_dir, reports, 2, 64 * 21)
+    try:
+        watch_folder.update([first, second], [])
+        assert aggregate_results(watch_folder) == expected_results(scans)
+        assert sorted(os.listdir(output_dir)) == sorted(report['file'] for report in reports)
+
+        # a removed file's scans are taken out again, also those the other file skipped
+        os.remove(second)
+        watch_folder.update([], [second])
+        assert aggregate_results(watch_folder) == expected_results(scans[:200])
+        assert "Updated reports" in capsys.readouterr().out
+    finally:
+        watch_folder.close()
+
+    # a restart carries on from the saved state: an unchanged file isn't analyzed again
+    write_ehc_file(directory / 'second.json', scans[100:])
+    watch_folder = WatchFolder(str(directory), state_dir, output_dir, reports, 1, 64 * 21)
+    try:
+        watch_folder.update([first, second], [])
+        assert "Analyzing " + first not in capsys.readouterr().out
+        assert aggregate_results(watch_folder) == expected_results(scans)
+    finally:
+        watch_folder.close()